@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
-import { userAPI } from '../services/api';
+import { userAPI, storeServiceToken, clearServiceToken } from '../services/api';
 
 interface User {
   id: number;
@@ -68,6 +68,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       // 保存到本地存储
       localStorage.setItem('authToken', userToken);
       localStorage.setItem('user', JSON.stringify(userData));
+      storeServiceToken(response);
       
     } catch (error: any) {
       console.error('Login error:', error);
@@ -90,6 +91,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       // 保存到本地存储
       localStorage.setItem('authToken', userToken);
       localStorage.setItem('user', JSON.stringify(newUser));
+      storeServiceToken(response);
       
     } catch (error: any) {
       console.error('Registration error:', error);
@@ -103,11 +105,11 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
   const logout = () => {
     setUser(null);
     setToken(null);
-    localStorage.removeItem('authToken');
     localStorage.removeItem('user');
+    clearServiceToken();
     
-    // 调用登出API
-    userAPI.logout().catch(console.error);
+    // 调用登出API（服务端同时撤销服务令牌），完成后再清除 DRF 令牌
+    userAPI.logout().catch(console.error).finally(() => localStorage.removeItem('authToken'));
   };
 
   const value: AuthContextType = {
@@ -8,6 +8,13 @@ import { activityAPI } from '../services/api';
 
 const { Title } = Typography;
 
+interface ImageVariants {
+  original: string;
+  thumb: string;
+  card: string;
+  full: string;
+}
+
 interface Activity {
   id: number;
   title: string;
@@ -23,6 +30,7 @@ interface Activity {
   organizer_name: string;
   organizer_id: number;
   images?: string[];
+  image_variants?: ImageVariants[];
 }
 
 const ActivitiesPage: React.FC = () => {
@@ -366,7 +374,7 @@ const ActivitiesPage: React.FC = () => {
                 {activity.images && activity.images.length > 0 && (
                   <div style={{ flexShrink: 0 }}>
                     <Image
-                      src={activity.images[0]}
+                      src={activity.image_variants?.[0]?.thumb ?? activity.images[0]}
                       alt={activity.title}
                       width={120}
                       height={120}
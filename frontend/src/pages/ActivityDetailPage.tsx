@@ -36,6 +36,13 @@ import { activityAPI } from '../services/api';
 const { Title, Paragraph } = Typography;
 const { TextArea } = Input;
 
+interface ImageVariants {
+  original: string;
+  thumb: string;
+  card: string;
+  full: string;
+}
+
 interface Activity {
   organizer_id: number;
   id: number;
@@ -60,6 +67,7 @@ interface Activity {
   equipment_needed: string;
   created_at: string;
   images?: string[];
+  image_variants?: ImageVariants[];
 }
 
 const ActivityDetailPage: React.FC = () => {
@@ -236,7 +244,8 @@ const ActivityDetailPage: React.FC = () => {
                     {activity.images.map((image, index) => (
                       <Image
                         key={index}
-                        src={image}
+                        src={activity.image_variants?.[index]?.thumb ?? image}
+                        preview={{ src: activity.image_variants?.[index]?.full ?? image }}
                         alt={`${activity.title} - ${index + 1}`}
                         width={150}
                         height={150}
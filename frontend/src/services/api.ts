@@ -33,6 +33,7 @@ api.interceptors.response.use(
     if (error.response?.status === 401) {
       localStorage.removeItem('authToken');
       localStorage.removeItem('user');
+      clearServiceToken();
       window.location.href = '/login';
     }
     
@@ -118,6 +119,47 @@ export const userAPI = {
   },
 };
 
+// 签名服务令牌：活动服务在本地校验，无需每次请求回调用户服务
+const SERVICE_TOKEN_REFRESH_MARGIN = 60; // 过期前 60 秒续签
+
+export const storeServiceToken = (data: { service_token?: string; service_token_expires_at?: number }) => {
+  if (data.service_token && data.service_token_expires_at) {
+    localStorage.setItem('serviceToken', data.service_token);
+    localStorage.setItem('serviceTokenExpiresAt', String(data.service_token_expires_at));
+  }
+};
+
+export const clearServiceToken = () => {
+  localStorage.removeItem('serviceToken');
+  localStorage.removeItem('serviceTokenExpiresAt');
+};
+
+let serviceTokenRefresh: Promise<string | null> | null = null;
+
+// 返回有效的服务令牌，临近过期时用 DRF 令牌续签；失败时返回 null（回退到 Token 认证）
+const getServiceToken = async (): Promise<string | null> => {
+  const token = localStorage.getItem('serviceToken');
+  const expiresAt = Number(localStorage.getItem('serviceTokenExpiresAt') || 0);
+  if (token && expiresAt - Date.now() / 1000 > SERVICE_TOKEN_REFRESH_MARGIN) {
+    return token;
+  }
+  if (!localStorage.getItem('authToken')) {
+    return null;
+  }
+  if (!serviceTokenRefresh) {
+    serviceTokenRefresh = api.post('/auth/service-token/')
+      .then((response) => {
+        storeServiceToken(response.data);
+        return response.data.service_token as string;
+      })
+      .catch(() => null)
+      .finally(() => {
+        serviceTokenRefresh = null;
+      });
+  }
+  return serviceTokenRefresh;
+};
+
 // 活动API配置
 const activityApi = axios.create({
   baseURL: ACTIVITY_API_BASE_URL,
@@ -128,10 +170,14 @@ const activityApi = axios.create({
 
 // 活动API请求拦截器
 activityApi.interceptors.request.use(
-  (config) => {
+  async (config) => {
     const token = localStorage.getItem('authToken');
     console.log('Activity API interceptor - Token:', token);
-    if (token) {
+    const serviceToken = await getServiceToken();
+    if (serviceToken) {
+      config.headers.Authorization = `Bearer ${serviceToken}`;
+      console.log('Activity API interceptor - Added service token');
+    } else if (token) {
       config.headers.Authorization = `Token ${token}`;
       console.log('Activity API interceptor - Added Authorization header');
     } else {
@@ -151,6 +197,7 @@ activityApi.interceptors.response.use(
     if (error.response?.status === 401) {
       localStorage.removeItem('authToken');
       localStorage.removeItem('user');
+      clearServiceToken();
       window.location.href = '/login';
     }
     
@@ -215,7 +262,7 @@ export const activityAPI = {
 
   // 获取待审批活动 (管理员)
   getPendingActivities: async () => {
-    const response = await activityApi.get('/activities/?approval_status=pending');
+    const response = await activityApi.get('/activities/?approval_status=pending&view=full');
     return response.data;
   },
 
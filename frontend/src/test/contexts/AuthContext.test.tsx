@@ -18,6 +18,8 @@ vi.mock('../../services/api', () => ({
     getProfile: vi.fn().mockResolvedValue({ id: 1, username: 'testuser', role: 'volunteer' }),
     login: vi.fn().mockResolvedValue({ token: 'test-token', user: { id: 1 } }),
   },
+  storeServiceToken: vi.fn(),
+  clearServiceToken: vi.fn(),
 }));
 
 describe('AuthContext', () => {
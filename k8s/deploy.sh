@@ -47,6 +47,20 @@ create_config() {
     kubectl apply -f configmap.yaml
 }
 
+# 创建服务间共享密钥（已有的值保留，缺少的键取同名环境变量或随机生成）
+create_secrets() {
+    echo "🔐 创建服务密钥..."
+    kubectl get secret service-secrets -n $NAMESPACE >/dev/null 2>&1 || \
+        kubectl create secret generic service-secrets -n $NAMESPACE
+    for key in INTERNAL_SERVICE_TOKEN SERVICE_TOKEN_SIGNING_KEYS; do
+        if [ -z "$(kubectl get secret service-secrets -n $NAMESPACE -o jsonpath="{.data.$key}")" ]; then
+            value=${!key:-$(openssl rand -hex 32)}
+            kubectl patch secret service-secrets -n $NAMESPACE --type merge \
+                -p "{\"stringData\":{\"$key\":\"$value\"}}"
+        fi
+    done
+}
+
 # 创建数据库服务
 deploy_databases() {
     echo "🗄️  部署数据库服务..."
@@ -188,6 +202,7 @@ update_deployment() {
     echo "🔄 更新部署..."
     
     kubectl apply -f configmap.yaml
+    create_secrets
     kubectl apply -f microservices-deployments.yaml
     kubectl apply -f frontend-deployment.yaml
     kubectl apply -f nginx-deployment.yaml
@@ -204,6 +219,7 @@ case $OPERATION in
     "deploy")
         create_namespace
         create_config
+        create_secrets
         deploy_databases
         deploy_microservices
         deploy_frontend
@@ -2,10 +2,38 @@
 Custom authentication for activity service.
 """
 import requests
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
 from rest_framework.exceptions import AuthenticationFailed
 from django.conf import settings
 
+from .service_tokens import InvalidServiceToken, verify_service_token
+
+
+class SignedServiceTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates ``Authorization: Bearer <service token>`` from the signed
+    claims alone, without calling the user service.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid token header.')
+        try:
+            token = auth[1].decode()
+            claims = verify_service_token(token)
+        except UnicodeError:
+            raise AuthenticationFailed('Invalid token header.')
+        except InvalidServiceToken as exc:
+            raise AuthenticationFailed(str(exc))
+        return (MockUser(claims), token)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
 
 class UserServiceTokenAuthentication(TokenAuthentication):
     """
@@ -0,0 +1,113 @@
+"""
+Response cache for public activity reads.
+
+Anonymous visitors and volunteers see exactly the same activity queryset
+(approved activities only), so their list/detail responses can be shared.
+Entries are keyed by a normalized form of the request and by a generation
+counter; bumping the generation invalidates every cached response at once.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from service_common.metrics import record_cache
+
+GENERATION_KEY = 'activities:response:generation'
+KEY_PREFIX = 'activities:response'
+
+# 只有这些角色看到的是同一份"已批准活动"数据，可以共享缓存
+PUBLIC_ROLES = ('volunteer',)
+
+
+def is_cacheable_request(request):
+    """Return True if the request sees the public (approved-only) view."""
+    if request.method != 'GET':
+        return False
+    user = getattr(request, 'user', None)
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return True
+    return getattr(user, 'role', None) in PUBLIC_ROLES
+
+
+def normalize_query_params(query_params):
+    """
+    Build a canonical string from query parameters.
+
+    Parameters are sorted by name, multi-valued parameters are sorted by
+    value and empty values are dropped, so ``?b=2&a=1&c=`` and ``?a=1&b=2``
+    share a cache entry.
+    """
+    parts = []
+    for name in sorted(query_params.keys()):
+        values = sorted(v for v in query_params.getlist(name) if v != '')
+        for value in values:
+            parts.append(f'{name}={value}')
+    return '&'.join(parts)
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time()), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def build_cache_key(request, scope):
+    """
+    Cache key for a public activity response.
+
+    ``scope`` distinguishes list from detail responses. The host is part of
+    the key because ``ActivitySerializer.get_images`` builds absolute URLs.
+    """
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        normalize_query_params(request.query_params),
+    ])
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:{get_generation()}:{scope}:{digest}'
+
+
+def get_or_compute(key, compute):
+    """
+    Return the cached value for ``key`` or compute and store it.
+
+    A short-lived lock (``cache.add``) makes sure only one request recomputes
+    a missing entry; concurrent requests poll for the result for up to
+    ``ACTIVITY_RESPONSE_CACHE_LOCK_WAIT`` seconds before computing it
+    themselves. Exceptions raised by ``compute`` (404, validation errors)
+    propagate and are never cached.
+    """
+    value = cache.get(key)
+    record_cache('activity-response', value is not None)
+    if value is not None:
+        return value
+
+    timeout = settings.ACTIVITY_RESPONSE_CACHE_TIMEOUT
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, settings.ACTIVITY_RESPONSE_CACHE_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + settings.ACTIVITY_RESPONSE_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return compute()
+
+
+def invalidate_activity_cache():
+    """Drop every cached public activity response by bumping the generation."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # 计数器不存在（首次写入或缓存被清空）
+        cache.set(GENERATION_KEY, int(time.time()), None)
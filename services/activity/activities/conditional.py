@@ -0,0 +1,114 @@
+"""
+Conditional GET support (ETag / Last-Modified) for read-only endpoints.
+
+Validators are computed from cheap aggregate queries, so a matching
+``If-None-Match`` / ``If-Modified-Since`` request is answered with
+``304 Not Modified`` before any serialization happens.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .cache import normalize_query_params
+
+
+def make_weak_etag(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return 'W/"%s"' % hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def get_audience(request):
+    """
+    Identify whose view of the data a response represents.
+
+    Anonymous users and volunteers share the approved-only view; organizers
+    and admins get per-user validators because their querysets differ.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return 'public'
+    role = getattr(user, 'role', None)
+    if role in (None, 'volunteer'):
+        return 'public'
+    return f'{role}:{user.id}'
+
+
+class ConditionalGetMixin:
+    """
+    Add ETag / Last-Modified validators to ``list`` and ``retrieve``.
+
+    List pages get a weak ETag derived from ``max(updated_at)`` and the row
+    count of the filtered queryset (plus the normalized query string, which
+    selects the page). Detail responses get ``Last-Modified`` from the
+    object's ``updated_at`` as well as an ETag.
+    """
+    last_modified_field = 'updated_at'
+
+    def get_list_validators(self, queryset):
+        stats = queryset.order_by().aggregate(
+            last_modified=Max(self.last_modified_field),
+            total=Count('pk'),
+        )
+        last_modified = stats['last_modified']
+        etag = make_weak_etag(
+            self.request.path,
+            get_audience(self.request),
+            normalize_query_params(self.request.query_params),
+            last_modified.isoformat() if last_modified else '',
+            stats['total'],
+        )
+        # 列表不返回 Last-Modified：删除行不会改变 max(updated_at)
+        return etag, None
+
+    def get_object_validators(self, instance):
+        last_modified = getattr(instance, self.last_modified_field)
+        etag = make_weak_etag(
+            self.request.path,
+            get_audience(self.request),
+            instance.pk,
+            last_modified.isoformat(),
+        )
+        return etag, int(last_modified.timestamp())
+
+    def get_list_data(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data).data
+        return self.get_serializer(queryset, many=True).data
+
+    def get_cached_list_data(self, items):
+        """Paginate a list of already-serialized items."""
+        page = self.paginate_queryset(items)
+        if page is not None:
+            return self.get_paginated_response(page).data
+        return items
+
+    def conditional_response(self, request, validators, get_data):
+        """
+        Return 304 if the client's validators match, otherwise a 200 built
+        from ``get_data()``. Both carry the ETag / Last-Modified headers.
+        """
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(get_data())
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            request, self.get_list_validators(queryset), lambda: self.get_list_data(queryset)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response(
+            request, self.get_object_validators(instance), lambda: self.get_serializer(instance).data
+        )
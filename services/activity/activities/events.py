@@ -0,0 +1,161 @@
+"""
+Participation lifecycle events for the user service.
+
+Every participant save or delete writes a ``ParticipationEvent`` row in the
+same transaction (a transactional outbox), so an event exists exactly when
+the change commits. Participant writes must therefore run in
+``transaction.atomic()``; recording an event outside one raises. The
+request does nothing else: a separate relay process, ``manage.py
+publish_participation_events``, polls the outbox and appends pending rows
+to the ``participation`` topic of the event broker (``activities.broker``).
+If the broker is unavailable the rows stay pending and the relay retries.
+
+Each event carries the participation's full current state, so consumers
+can apply them idempotently and keep only the newest event per
+participation. Outbox ids are only unique within one database (every
+replica has its own), so messages also carry the database's ``source``
+(``EventSource``) and consumers order and deduplicate by
+``(source, id)``. ``manage.py replay_participation_events`` republishes stored
+events or, with ``--snapshot``, emits one event per current participant to
+backfill a consumer.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .broker import get_broker
+from .stats import activity_duration_seconds
+
+TOPIC = 'participation'
+UPSERTED = 'participation.upserted'
+DELETED = 'participation.deleted'
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def participant_hours(participant):
+    """Hours credited for a completed participation (recorded hours, else the activity's duration)."""
+    if participant.status != 'completed':
+        return participant.hours_volunteered
+    return participant.hours_volunteered or round(activity_duration_seconds(participant) / 3600)
+
+
+def build_payload(participant, event_type):
+    payload = {
+        'type': event_type,
+        'participant_id': participant.pk,
+        'activity_id': participant.activity_id,
+        'user_id': participant.user_id,
+        'occurred_at': timezone.now().isoformat(),
+    }
+    if event_type == UPSERTED:
+        payload.update({
+            'status': participant.status,
+            'hours': participant_hours(participant),
+            'registered_at': _isoformat(participant.registered_at),
+            'attended_at': _isoformat(participant.attended_at),
+            'completed_at': _isoformat(participant.completed_at),
+        })
+    return payload
+
+
+def record_participation_event(participant, event_type=UPSERTED):
+    """
+    Store an outbox event for ``participant``; the relay publishes it.
+    Must run inside the transaction that changes the participant.
+    """
+    from .models import ParticipationEvent
+
+    if not transaction.get_connection().in_atomic_block:
+        raise transaction.TransactionManagementError(
+            'Participant changes must run in transaction.atomic() so the outbox event commits with them.'
+        )
+    event = ParticipationEvent.objects.create(
+        event_type=event_type,
+        activity_id=participant.activity_id,
+        participant_id=participant.pk,
+        user_id=participant.user_id,
+        payload=build_payload(participant, event_type),
+    )
+    return event
+
+
+def get_source():
+    """This database's outbox identity (``EventSource``), created on first use."""
+    from .models import EventSource
+
+    return str(EventSource.objects.get_or_create(pk=1)[0].source)
+
+
+def to_message(event, source):
+    return {'id': event.id, 'source': source, **event.payload}
+
+
+def publish_events(events):
+    """Publish ``events`` (``ParticipationEvent`` rows) in order and mark them published."""
+    from .models import ParticipationEvent
+
+    if not events:
+        return 0
+    source = get_source()
+    get_broker().publish(TOPIC, [to_message(event, source) for event in events])
+    ParticipationEvent.objects.filter(pk__in=[event.pk for event in events]).update(published_at=timezone.now())
+    return len(events)
+
+
+def publish_pending(batch_size=500):
+    """
+    Publish every unpublished event, oldest first. Returns how many were sent.
+    Concurrent publishers may send an event twice; consumers deduplicate by
+    ``(source, id)``.
+    """
+    from .models import ParticipationEvent
+
+    published = 0
+    while True:
+        batch = list(ParticipationEvent.objects.filter(published_at__isnull=True).order_by('id')[:batch_size])
+        if not batch:
+            return published
+        published += publish_events(batch)
+
+
+def replay_events(from_id=0, batch_size=500):
+    """Republish stored events with ``id >= from_id``. Returns how many were sent."""
+    from .models import ParticipationEvent
+
+    replayed = 0
+    last_id = from_id - 1
+    while True:
+        batch = list(ParticipationEvent.objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return replayed
+        replayed += publish_events(batch)
+        last_id = batch[-1].id
+
+
+def snapshot_participants(batch_size=500):
+    """
+    Record a fresh upsert event for every current participant (backfill)
+    and publish them. Returns how many were recorded.
+    """
+    from .models import ActivityParticipant, ParticipationEvent
+
+    recorded = 0
+    participants = ActivityParticipant.objects.select_related('activity').order_by('pk')
+    batch = []
+    for participant in participants.iterator(chunk_size=batch_size):
+        batch.append(ParticipationEvent(
+            event_type=UPSERTED,
+            activity_id=participant.activity_id,
+            participant_id=participant.pk,
+            user_id=participant.user_id,
+            payload=build_payload(participant, UPSERTED),
+        ))
+        if len(batch) >= batch_size:
+            recorded += len(ParticipationEvent.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        recorded += len(ParticipationEvent.objects.bulk_create(batch))
+    publish_pending(batch_size)
+    return recorded
@@ -0,0 +1,184 @@
+"""
+Image variants for activity photos.
+
+Uploaded originals are kept as they are; for each one the pipeline writes
+resized variants (``thumb``, ``card``, ``full``) in ``ACTIVITY_IMAGE_FORMAT``
+under content-addressed names, so re-uploading the same photo or
+reprocessing an activity never produces duplicates. Variant paths are stored
+on ``Activity.image_variants`` keyed by the original path.
+
+Processing runs in a small thread pool, scheduled after the upload commits or
+lazily the first time an activity without variants is serialized. Until the
+variants exist, serializers fall back to the original URL.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# 变体名 -> 最大宽高（等比缩放，不放大）
+VARIANTS = {
+    'thumb': (160, 160),
+    'card': (640, 400),
+    'full': (1600, 1600),
+}
+VARIANT_DIR = 'activities/variants'
+
+_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def get_output_format():
+    """Return ``(pil_format, extension)``; falls back to JPEG without WebP support."""
+    name = settings.ACTIVITY_IMAGE_FORMAT.lower()
+    if name == 'webp' and not features.check('webp'):
+        name = 'jpeg'
+    return _FORMATS.get(name, _FORMATS['jpeg'])
+
+
+def variant_name(digest, variant, extension):
+    width, height = VARIANTS[variant]
+    return f'{VARIANT_DIR}/{digest[:2]}/{digest}_{variant}_{width}x{height}.{extension}'
+
+
+def _render_variant(image, size, pil_format):
+    resized = image.copy()
+    resized.thumbnail(size, Image.LANCZOS)
+    if pil_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+        resized = resized.convert('RGB')
+    buffer = io.BytesIO()
+    resized.save(buffer, pil_format, quality=settings.ACTIVITY_IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_variants(source_path):
+    """
+    Create every variant of one stored original.
+
+    Returns ``{variant: path}`` with paths in the same ``/relative/path``
+    form as ``Activity.images``. Variants that already exist in storage
+    (same content, same size) are reused.
+    """
+    with default_storage.open(source_path.lstrip('/'), 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+    pil_format, extension = get_output_format()
+
+    image = None
+    variants = {}
+    for variant, size in VARIANTS.items():
+        name = variant_name(digest, variant, extension)
+        if not default_storage.exists(name):
+            if image is None:
+                image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+            name = default_storage.save(name, ContentFile(_render_variant(image, size, pil_format)))
+        variants[variant] = '/' + name
+    return variants
+
+
+def process_activity_images(activity_id):
+    """Generate missing variants for every image of an activity."""
+    from .cache import invalidate_activity_cache
+    from .models import Activity
+
+    activity = Activity.objects.filter(pk=activity_id).only('images', 'image_variants').first()
+    if activity is None:
+        return
+    variants = dict(activity.image_variants or {})
+    missing = [path for path in activity.images or [] if path not in variants]
+    if not missing:
+        return
+
+    for path in missing:
+        try:
+            variants[path] = generate_variants(path)
+        except Exception:  # 原图损坏或丢失：记录空结果，不再重复尝试
+            logger.exception('Failed to generate variants for %s', path)
+            variants[path] = {}
+
+    Activity.objects.filter(pk=activity_id).update(image_variants=variants, updated_at=timezone.now())
+    # update() 不触发信号，手动让公共响应缓存失效
+    invalidate_activity_cache()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ACTIVITY_IMAGE_WORKERS,
+                thread_name_prefix='activity-images',
+            )
+        return _executor
+
+
+def _run(activity_id):
+    try:
+        process_activity_images(activity_id)
+    except Exception:
+        logger.exception('Image processing failed for activity %s', activity_id)
+    finally:
+        with _pending_lock:
+            _pending.discard(activity_id)
+        # 工作线程使用自己的数据库连接，用完关闭
+        connections.close_all()
+
+
+def _submit(activity_id):
+    with _pending_lock:
+        if activity_id in _pending:
+            return
+        _pending.add(activity_id)
+    _get_executor().submit(_run, activity_id)
+
+
+def schedule_activity_images(activity_id):
+    """
+    Queue variant generation for an activity, once the current transaction
+    commits. Repeated calls while a job is pending are ignored. With
+    ``ACTIVITY_IMAGE_PROCESSING_EAGER`` the work runs inline instead.
+    """
+    if settings.ACTIVITY_IMAGE_PROCESSING_EAGER:
+        process_activity_images(activity_id)
+        return
+    # 提交后才标记为待处理：事务回滚时回调被丢弃，不会留下永远占位的 id
+    transaction.on_commit(lambda: _submit(activity_id))
+
+
+def needs_variants(images, variants):
+    """True if any original has not been processed yet."""
+    variants = variants or {}
+    return any(path not in variants for path in images or [])
+
+
+def build_variant_paths(images, variants):
+    """
+    One ``{'original', 'thumb', 'card', 'full'}`` dict of paths per image;
+    variants that do not exist yet point at the original.
+    """
+    variants = variants or {}
+    result = []
+    for path in images or []:
+        generated = variants.get(path) or {}
+        item = {'original': path}
+        for variant in VARIANTS:
+            item[variant] = generated.get(variant, path)
+        result.append(item)
+    return result
@@ -0,0 +1,41 @@
+"""
+Relay participation events from the outbox to the event broker.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from activities.broker import BrokerError
+from activities.events import publish_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Publish pending participation events to the event broker; runs until interrupted unless --once is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--once', action='store_true', help='Publish the pending events and exit.')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        while True:
+            # 长时间运行：每轮丢弃失效或超过 CONN_MAX_AGE 的数据库连接
+            close_old_connections()
+            try:
+                published = publish_pending(options['batch_size'])
+            except BrokerError as exc:
+                if options['once']:
+                    raise CommandError(f'Publishing participation events failed: {exc}') from exc
+                # 事件保留为待发送，下一轮重试
+                logger.exception('Publishing participation events failed')
+                published = 0
+            if published or options['once']:
+                self.stdout.write(self.style.SUCCESS(f'Published {published} participation events'))
+            if options['once']:
+                return
+            if not published:
+                time.sleep(options['poll_interval'])
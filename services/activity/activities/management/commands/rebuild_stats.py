@@ -0,0 +1,17 @@
+"""
+Recompute the landing-page statistics from scratch.
+"""
+from django.core.management.base import BaseCommand
+
+from activities.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the approved-activity count and completed volunteer hours.'
+
+    def handle(self, *args, **options):
+        values = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"approved_activities={values['approved_activities']} "
+            f"completed_seconds={values['completed_seconds']}"
+        ))
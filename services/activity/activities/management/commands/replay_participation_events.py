@@ -0,0 +1,27 @@
+"""
+Replay participation events to the event broker (consumer backfill).
+"""
+from django.core.management.base import BaseCommand
+
+from activities.events import replay_events, snapshot_participants
+
+
+class Command(BaseCommand):
+    help = (
+        'Republish stored participation events from --from-id, or with --snapshot '
+        'emit one event per current participant.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-id', type=int, default=0)
+        parser.add_argument('--snapshot', action='store_true',
+                            help='Record and publish the current state of every participant.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['snapshot']:
+            count = snapshot_participants(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Recorded and published {count} snapshot events'))
+        else:
+            count = replay_events(options['from_id'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Replayed {count} participation events'))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.24 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitycategory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='activitytag',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
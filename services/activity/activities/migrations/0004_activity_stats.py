@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-19 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0003_activity_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approved_activities', models.PositiveIntegerField(default=0)),
+                ('completed_seconds', models.BigIntegerField(default=0)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Activity Stats',
+                'verbose_name_plural': 'Activity Stats',
+                'db_table': 'activity_stats',
+            },
+        ),
+    ]
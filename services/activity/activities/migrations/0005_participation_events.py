@@ -0,0 +1,32 @@
+# Generated by Django 4.2.24 on 2026-10-19 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0004_activity_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('participation.upserted', 'Participation Upserted'), ('participation.deleted', 'Participation Deleted')], max_length=50)),
+                ('activity_id', models.PositiveIntegerField()),
+                ('participant_id', models.PositiveIntegerField()),
+                ('user_id', models.PositiveIntegerField()),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Participation Event',
+                'verbose_name_plural': 'Participation Events',
+                'db_table': 'activity_participation_events',
+                'ordering': ['id'],
+            },
+        ),
+    ]
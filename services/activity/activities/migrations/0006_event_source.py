@@ -0,0 +1,27 @@
+# Generated by Django 4.2.24 on 2026-10-19 20:30
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0005_participation_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSource',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('source', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Event Source',
+                'verbose_name_plural': 'Event Source',
+                'db_table': 'activity_event_source',
+            },
+        ),
+    ]
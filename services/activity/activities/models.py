@@ -1,6 +1,8 @@
 """
 Activity models for the volunteer platform.
 """
+import uuid
+
 from django.db import models
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -16,6 +18,7 @@ class ActivityCategory(models.Model):
     color = models.CharField(max_length=7, default='#1890ff')  # Hex color
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'activity_categories'
@@ -44,6 +47,9 @@ class Activity(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # 计入参与人数的报名状态
+    PARTICIPATING_STATUSES = ['approved', 'registered', 'attended', 'completed']
+    
     title = models.CharField(max_length=255)
     description = models.TextField()
     full_description = models.TextField(blank=True)
@@ -73,6 +79,8 @@ class Activity(models.Model):
     # Media
     cover_image = models.ImageField(upload_to='activities/', blank=True, null=True)
     images = models.JSONField(default=list, blank=True)
+    # 原图路径 -> {'thumb': ..., 'card': ..., 'full': ...}，由 images.py 生成
+    image_variants = models.JSONField(default=dict, blank=True)
     
     # Status and metadata
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
@@ -140,7 +148,7 @@ class Activity(models.Model):
     
     def get_participants_count(self):
         """Get current number of participants."""
-        return self.participants.filter(status__in=['approved', 'registered', 'attended', 'completed']).count()
+        return self.participants.filter(status__in=self.PARTICIPATING_STATUSES).count()
     
     def get_available_spots(self):
         """Get number of available spots."""
@@ -257,6 +265,7 @@ class ActivityTag(models.Model):
     color = models.CharField(max_length=7, default='#52c41a')  # Hex color
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'activity_tags'
@@ -329,3 +338,73 @@ class ActivityShare(models.Model):
     
     def __str__(self):
         return f"Share: {self.activity.title} on {self.platform} by user {self.user_id}"
+
+
+class ActivityStats(models.Model):
+    """
+    Platform-wide activity aggregates (single row, maintained by
+    ``activities.stats``).
+    """
+    approved_activities = models.PositiveIntegerField(default=0)
+    # 已完成参与的活动时长总和（秒）
+    completed_seconds = models.BigIntegerField(default=0)
+    rebuilt_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'activity_stats'
+        verbose_name = 'Activity Stats'
+        verbose_name_plural = 'Activity Stats'
+    
+    def __str__(self):
+        return f"{self.approved_activities} activities, {self.completed_seconds}s"
+
+
+class ParticipationEvent(models.Model):
+    """
+    Outbox of participant lifecycle events for other services (see
+    ``activities.events``). Rows are written in the same transaction as the
+    participant change and kept after publishing so they can be replayed.
+    """
+    EVENT_TYPES = [
+        ('participation.upserted', 'Participation Upserted'),
+        ('participation.deleted', 'Participation Deleted'),
+    ]
+    
+    event_type = models.CharField(max_length=50, choices=EVENT_TYPES)
+    # 不使用外键：活动或报名被删除后事件仍需保留
+    activity_id = models.PositiveIntegerField()
+    participant_id = models.PositiveIntegerField()
+    user_id = models.PositiveIntegerField()
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    
+    class Meta:
+        db_table = 'activity_participation_events'
+        verbose_name = 'Participation Event'
+        verbose_name_plural = 'Participation Events'
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.event_type} #{self.id} (user {self.user_id}, activity {self.activity_id})"
+
+
+class EventSource(models.Model):
+    """
+    Identity of this database's participation event outbox. Outbox ids are
+    only unique within one database, so events are published as
+    ``(source, id)`` (see ``activities.events``). Single row, created on
+    first use.
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    source = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'activity_event_source'
+        verbose_name = 'Event Source'
+        verbose_name_plural = 'Event Source'
+    
+    def __str__(self):
+        return str(self.source)
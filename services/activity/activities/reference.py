@@ -0,0 +1,113 @@
+"""
+Process-local cache for reference data (activity categories and tags).
+
+Categories and tags change rarely, yet every activity list row needs a
+category name. ``manage.py seed_data --categories-only`` seeds them and
+admins edit them occasionally. Each process keeps a serialized copy in
+memory, tagged with a version number stored in the shared Django cache.
+Edits bump the shared version through model signals, and other processes
+pick up the new version on their next check (at most every
+``REFERENCE_DATA_CHECK_INTERVAL`` seconds) and reload.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'activities:reference:version'
+
+
+class ReferenceDataCache:
+    """
+    In-memory snapshot of categories and tags.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._category_names = {}
+        self._categories = []
+        self._tags = []
+
+    def _shared_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, int(time.time()), None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _load(self, version):
+        from .models import ActivityCategory, ActivityTag
+        from .serializers import ActivityCategorySerializer, ActivityTagSerializer
+
+        categories = list(ActivityCategory.objects.all())
+        tags = ActivityTag.objects.filter(is_active=True)
+        self._category_names = {category.id: category.name for category in categories}
+        self._categories = ActivityCategorySerializer(
+            [category for category in categories if category.is_active], many=True
+        ).data
+        self._tags = ActivityTagSerializer(tags, many=True).data
+        self._version = version
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        interval = settings.REFERENCE_DATA_CHECK_INTERVAL
+        if self._version is not None and now - self._checked_at < interval:
+            return
+        with self._lock:
+            version = self._shared_version()
+            if version != self._version:
+                self._load(version)
+            self._checked_at = now
+
+    def warm(self):
+        """Load the snapshot eagerly (called at process startup)."""
+        self._ensure_fresh()
+
+    @property
+    def version(self):
+        self._ensure_fresh()
+        return self._version
+
+    def categories(self):
+        """Serialized active categories, ordered by name."""
+        self._ensure_fresh()
+        return self._categories
+
+    def tags(self):
+        """Serialized active tags, ordered by name."""
+        self._ensure_fresh()
+        return self._tags
+
+    def category_name(self, category_id):
+        """Name of any category (active or not) by id, or None if unknown."""
+        self._ensure_fresh()
+        return self._category_names.get(category_id)
+
+    def category_names(self, category_ids):
+        """
+        Names for ``category_ids`` as a dict. Ids missing from the snapshot
+        (categories created since the last reload) are loaded with one query.
+        """
+        self._ensure_fresh()
+        known = self._category_names
+        names = {category_id: known[category_id] for category_id in category_ids if category_id in known}
+        missing = set(category_ids) - names.keys()
+        if missing:
+            from .models import ActivityCategory
+            names.update(ActivityCategory.objects.filter(pk__in=missing).values_list('id', 'name'))
+        return names
+
+    def invalidate(self):
+        """Bump the shared version and drop the local snapshot."""
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, int(time.time()), None)
+        with self._lock:
+            self._version = None
+
+
+reference_data = ReferenceDataCache()
@@ -0,0 +1,244 @@
+"""
+Synthetic categories, activities and participants (``manage.py seed_data``).
+
+At scale 1 the dataset has the categories, 100,000 activities and
+1,000,000 participants. Activities belong to organizers of the shared
+user population (``.synthetic``), mostly in the organizer's own city, at
+coordinates around the city centre. They run from 180 days ago to 180
+days ahead and ask for skills of their category.
+
+Applications go to approved activities and are long-tailed: a few
+activities draw most of them. Most applicants live in the activity's
+city, and their skills are matched against the required ones.
+Application statuses follow the date: past activities have attended,
+completed and no-show volunteers, upcoming ones applied and approved
+applications.
+"""
+import time
+from datetime import timedelta
+
+from .models import Activity, ActivityCategory, ActivityParticipant
+from .stats import rebuild_stats
+from .synthetic import (
+    CITIES, analyze, anchor, bulk_load, city_of, city_volunteer, city_volunteers, coordinates,
+    explicit_timestamps, population, rng, scaled, user_fields, user_skills,
+)
+
+ACTIVITIES = 100_000
+PARTICIPANTS = 1_000_000
+
+# 名称、说明、图标、颜色、常见活动与所需技能
+CATEGORIES = (
+    ('环境保护', '环保、清洁、绿化等活动', '🌱', '#52c41a',
+     ('Beach Cleanup', 'Tree Planting', 'Park Cleanup', 'Recycling Drive'), ('gardening', 'driving')),
+    ('教育支持', '支教、辅导、培训等活动', '📚', '#1890ff',
+     ('Homework Club', 'Reading Club', 'Coding Workshop', 'Language Cafe'), ('teaching', 'programming', 'translation')),
+    ('社区服务', '社区活动、邻里互助等', '🏘️', '#722ed1',
+     ('Food Bank Shift', 'Neighbourhood Repair Day', 'Community Kitchen'), ('cooking', 'carpentry', 'driving')),
+    ('医疗健康', '义诊、健康宣传、医疗援助等', '🏥', '#eb2f96',
+     ('Blood Drive', 'Health Fair', 'Clinic Support'), ('first aid', 'counselling')),
+    ('动物保护', '流浪动物救助、动物保护宣传等', '🐾', '#fa8c16',
+     ('Shelter Support', 'Dog Walking', 'Adoption Day'), ('driving', 'photography')),
+    ('老年关怀', '陪伴老人、助老服务等', '👴', '#faad14',
+     ('Senior Visits', 'Meal Delivery', 'Tech Help for Seniors'), ('counselling', 'cooking', 'programming')),
+    ('儿童关怀', '关爱儿童、陪伴成长等', '👶', '#13c2c2',
+     ('Kids Art Class', 'Playground Day', 'Story Time'), ('teaching', 'first aid')),
+    ('文化艺术', '文化活动、艺术表演、文物保护等', '🎨', '#2f54eb',
+     ('Museum Guide', 'Street Festival', 'Heritage Walk'), ('photography', 'event planning', 'translation')),
+    ('体育运动', '体育活动、健身指导等', '⚽', '#fa541c',
+     ('Charity Run', 'Youth Football Coaching', 'Marathon Water Station'), ('event planning', 'first aid')),
+    ('应急救援', '灾害救援、应急响应等', '🚨', '#f5222d',
+     ('Flood Relief', 'Emergency Shelter Setup', 'Disaster Drill'), ('first aid', 'driving', 'fundraising')),
+)
+ADJECTIVES = ('Community', 'Weekend', 'Morning', 'Neighbourhood', 'Charity', 'Family', 'Youth', 'Citywide')
+
+# 报名状态及比例：已结束的活动与未开始的活动不同
+PAST_STATUSES = (('completed', 60), ('attended', 12), ('no_show', 8), ('cancelled', 6), ('rejected', 14))
+UPCOMING_STATUSES = (('applied', 30), ('approved', 48), ('registered', 8), ('rejected', 8), ('cancelled', 6))
+EXPERIENCE_LEVELS = (('beginner', 45), ('intermediate', 35), ('advanced', 15), ('expert', 5))
+# 申请人中与活动同城的比例
+LOCAL_SHARE = 0.8
+
+
+def _cumulative(weighted):
+    names, weights = zip(*weighted)
+    total, cumulative = 0, []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return names, cumulative
+
+
+def ensure_categories():
+    """Create the missing categories; returns the ids of ``CATEGORIES`` in order."""
+    existing = set(ActivityCategory.objects.values_list('name', flat=True))
+    ActivityCategory.objects.bulk_create([
+        ActivityCategory(name=name, description=description, icon=icon, color=color)
+        for name, description, icon, color, _, _ in CATEGORIES if name not in existing
+    ])
+    ids = dict(ActivityCategory.objects.values_list('name', 'pk'))
+    return [ids[category[0]] for category in CATEGORIES]
+
+
+def seed(scale=1.0, seed=42, batch_size=5000, use_copy=False, log=None):
+    """
+    Generate the dataset into an activity database without activities.
+    Returns the number of rows per model; ``log`` receives progress lines.
+    """
+    log = log or (lambda message: None)
+    category_ids = ensure_categories()
+    now = anchor()
+    # 每个活动生成参与者时需要的信息，与插入顺序（即 id 顺序）一致
+    schedule = []
+
+    started = time.perf_counter()
+    activities = _activities(rng(seed, 'activities'), scale, category_ids, now, schedule)
+    with explicit_timestamps(Activity):
+        activity_count = bulk_load(Activity, activities, batch_size, use_copy)
+    log(f'activities: {activity_count} in {time.perf_counter() - started:.1f}s')
+
+    started = time.perf_counter()
+    participants = _participants(rng(seed, 'participants'), scale, now, schedule)
+    with explicit_timestamps(ActivityParticipant):
+        participant_count = bulk_load(ActivityParticipant, participants, batch_size, use_copy)
+    log(f'participants: {participant_count} in {time.perf_counter() - started:.1f}s')
+
+    rebuild_stats()
+    analyze()
+    return {'categories': len(category_ids), 'activities': activity_count, 'participants': participant_count}
+
+
+def _activities(rand, scale, category_ids, now, schedule):
+    organizers, _ = population(scale)
+    for _ in range(scaled(ACTIVITIES, scale)):
+        organizer_id = rand.randint(1, organizers)
+        organizer = user_fields(organizer_id)
+        city = city_of(organizer_id) if rand.random() < 0.7 else rand.randrange(len(CITIES))
+        category = rand.randrange(len(CATEGORIES))
+        _, _, _, _, causes, skills = CATEGORIES[category]
+        title = f'{rand.choice(ADJECTIVES)} {rand.choice(causes)} in {CITIES[city][0]}'
+        start_date = now + timedelta(days=rand.randint(-180, 180), hours=rand.randint(8, 18))
+        end_date = start_date + timedelta(hours=rand.randint(2, 8))
+        created_at = min(start_date - timedelta(days=rand.randint(7, 60)), now) - timedelta(
+            seconds=rand.randint(0, 86400)
+        )
+        approval_status = rand.choices(('approved', 'pending', 'rejected'), (85, 10, 5))[0]
+        approved = approval_status == 'approved'
+        if approved:
+            status = 'completed' if end_date < now else 'published'
+        else:
+            status = 'pending_approval' if approval_status == 'pending' else 'rejected'
+        published_at = min(created_at + timedelta(hours=rand.randint(1, 72)), now) if approved else None
+        latitude, longitude = coordinates(rand, city)
+        required_skills = rand.sample(skills, rand.randint(1, min(2, len(skills))))
+        max_participants = rand.randint(10, 200)
+        views = int(rand.paretovariate(1.5) * 50)
+        schedule.append((
+            approved, city, start_date, end_date, created_at, organizer_id, required_skills, max_participants,
+        ))
+        yield Activity(
+            title=title,
+            description=f'{title}. Join {organizer["first_name"]} and other volunteers for a few hours.',
+            category_id=category_ids[category],
+            location=CITIES[city][0],
+            address=f'{rand.randint(1, 300)} Main Street, {CITIES[city][0]}',
+            latitude=latitude,
+            longitude=longitude,
+            start_date=start_date,
+            end_date=end_date,
+            registration_deadline=start_date - timedelta(days=rand.randint(1, 7)),
+            max_participants=max_participants,
+            min_participants=rand.randint(1, 5),
+            required_skills=required_skills,
+            status=status,
+            is_featured=rand.random() < 0.02,
+            is_urgent=rand.random() < 0.05,
+            approval_status=approval_status,
+            approved_at=published_at,
+            rejection_reason='Incomplete description' if approval_status == 'rejected' else '',
+            organizer_id=organizer_id,
+            organizer_name=f'{organizer["first_name"]} {organizer["last_name"]}',
+            organizer_email=organizer['email'],
+            organizer_phone=organizer['phone'],
+            views_count=views,
+            likes_count=views // rand.randint(10, 40),
+            shares_count=views // rand.randint(40, 200),
+            created_at=created_at,
+            updated_at=published_at or created_at,
+            published_at=published_at,
+        )
+
+
+def _applicants(rand, organizers, users, city, count):
+    # 同城志愿者中连续的一段，其余来自另一个城市；同一活动内不重复
+    local = min(round(count * LOCAL_SHARE), city_volunteers(organizers, users, city))
+    other = (city + 1 + rand.randrange(len(CITIES) - 1)) % len(CITIES)
+    remote = min(count - local, city_volunteers(organizers, users, other))
+    for group, size in ((city, local), (other, remote)):
+        first = rand.randrange(max(1, city_volunteers(organizers, users, group)))
+        for offset in range(size):
+            yield city_volunteer(organizers, users, group, first + offset)
+
+
+def _participants(rand, scale, now, schedule):
+    organizers, users = population(scale)
+    # 已批准活动的申请人数呈长尾分布
+    activity_ids = list(Activity.objects.order_by('pk').values_list('pk', flat=True))
+    approved = [(activity_id, row) for activity_id, row in zip(activity_ids, schedule) if row[0]]
+    weights = [rand.paretovariate(1.2) for _ in approved]
+    total_weight = sum(weights)
+    target = scaled(PARTICIPANTS, scale)
+    # 每个活动的申请人不超过名额的两倍，也不超过可选的志愿者
+    smallest_city = min(city_volunteers(organizers, users, city) for city in range(len(CITIES)))
+    limits = [
+        min(2 * row[7], city_volunteers(organizers, users, row[1]) + smallest_city) for _, row in approved
+    ]
+    counts = [min(limit, int(target * weight / total_weight)) for weight, limit in zip(weights, limits)]
+    missing = target - sum(counts)
+    while missing > 0:
+        open_indexes = [index for index, (count, limit) in enumerate(zip(counts, limits)) if count < limit]
+        if not open_indexes:
+            break
+        for index in rand.choices(open_indexes, k=missing):
+            if counts[index] < limits[index]:
+                counts[index] += 1
+                missing -= 1
+    past_statuses, past_weights = _cumulative(PAST_STATUSES)
+    upcoming_statuses, upcoming_weights = _cumulative(UPCOMING_STATUSES)
+    levels, level_weights = _cumulative(EXPERIENCE_LEVELS)
+
+    for (activity_id, row), count in zip(approved, counts):
+        _, city, start_date, end_date, created_at, organizer_id, required_skills, _ = row
+        past = end_date < now
+        names, cumulative = (past_statuses, past_weights) if past else (upcoming_statuses, upcoming_weights)
+        statuses = rand.choices(names, cum_weights=cumulative, k=count)
+        # 申请时间在活动发布之后、开始（或今天）之前
+        window = max(1, int((min(start_date, now) - created_at).total_seconds()))
+        for user_id, status in zip(_applicants(rand, organizers, users, city, count), statuses):
+            user = user_fields(user_id)
+            registered_at = created_at + timedelta(seconds=rand.randrange(window))
+            decided = status not in ('applied', 'cancelled')
+            attended = status in ('attended', 'completed')
+            completed = status == 'completed'
+            yield ActivityParticipant(
+                activity_id=activity_id,
+                user_id=user_id,
+                user_name=f'{user["first_name"]} {user["last_name"]}',
+                user_email=user['email'],
+                user_phone=user['phone'],
+                status=status,
+                registered_at=registered_at,
+                attended_at=start_date if attended else None,
+                completed_at=end_date if completed else None,
+                cancelled_at=(
+                    registered_at + timedelta(hours=rand.randint(1, 72)) if status == 'cancelled' else None
+                ),
+                application_message='I would like to help.',
+                skills_match=[skill for skill in user_skills(user_id) if skill in required_skills],
+                experience_level=rand.choices(levels, cum_weights=level_weights)[0],
+                approved_by_id=organizer_id if decided and status != 'rejected' else None,
+                approved_at=registered_at + timedelta(hours=rand.randint(1, 48)) if decided else None,
+                rejection_reason='The activity is full' if status == 'rejected' else '',
+                hours_volunteered=int((end_date - start_date).total_seconds() // 3600) if completed else 0,
+                rating=rand.randint(3, 5) if completed and rand.random() < 0.5 else None,
+            )
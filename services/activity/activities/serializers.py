@@ -1,50 +1,237 @@
 """
 Serializers for activities app.
 """
+from django.conf import settings
+from django.db import models as db_models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
+from rest_framework.request import Request
+from .images import build_variant_paths, needs_variants, schedule_activity_images
+from .reference import reference_data
+from .uploads import save_content_addressed
+from .user_directory import get_user_directory
+from .values import ValuesSerializer
 from .models import (
     ActivityCategory, Activity, ActivityParticipant, ActivityReview,
     ActivityTag, ActivityTagMapping, ActivityLike, ActivityShare
 )
 
 
+# 每个活动的参与人数（相关子查询），列表一次查询即可取得，无需逐行 COUNT
+PARTICIPANTS_TOTAL = Coalesce(
+    Subquery(
+        ActivityParticipant.objects.filter(
+            activity=OuterRef('pk'),
+            status__in=Activity.PARTICIPATING_STATUSES,
+        ).order_by().values('activity').annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField(),
+    ),
+    Value(0),
+)
+
+
+def parse_field_list(value):
+    """Split a comma separated ``fields`` / ``omit`` query parameter."""
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Narrow serialized fields with ``?fields=a,b`` and ``?omit=c,d``.
+
+    Unknown names are ignored. ``method_field_sources`` lists the model
+    columns each SerializerMethodField reads, so views can narrow the SQL
+    with ``.only()`` to exactly what the remaining fields need.
+    """
+    method_field_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if not isinstance(request, Request):
+            return
+        wanted = parse_field_list(request.query_params.get('fields', ''))
+        omitted = set(parse_field_list(request.query_params.get('omit', '')))
+        if wanted:
+            for name in set(self.fields) - set(wanted):
+                self.fields.pop(name)
+        for name in omitted & set(self.fields):
+            self.fields.pop(name)
+
+    def get_required_columns(self):
+        """Model columns needed to render the current field set."""
+        columns = {'id'}
+        for name, field in self.fields.items():
+            if name in self.method_field_sources:
+                columns.update(self.method_field_sources[name])
+            elif field.source != '*':
+                columns.add(field.source.split('.')[0])
+        return columns
+
+
+def build_image_urls(image_paths, request=None):
+    """返回完整的图片URL"""
+    if not image_paths:
+        return []
+    if request:
+        # 使用request构建完整URL
+        return [request.build_absolute_uri(image_path) for image_path in image_paths]
+    # 如果没有request，使用默认的媒体URL
+    base_url = getattr(settings, 'MEDIA_DOMAIN', 'http://activity-service:8000')
+    return [f"{base_url}{image_path}" for image_path in image_paths]
+
+
+def build_image_variant_urls(activity_id, image_paths, variants, request=None):
+    """
+    Per-image dict of original / thumb / card / full URLs. Missing variants
+    fall back to the original and are queued for generation.
+    """
+    if needs_variants(image_paths, variants):
+        schedule_activity_images(activity_id)
+    result = []
+    for item in build_variant_paths(image_paths, variants):
+        urls = build_image_urls(list(item.values()), request)
+        result.append(dict(zip(item.keys(), urls)))
+    return result
+
+
 class ActivityCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = ActivityCategory
         fields = '__all__'
 
 
-class ActivitySerializer(serializers.ModelSerializer):
-    category_name = serializers.CharField(source='category.name', read_only=True)
+class ActivityListSerializer(serializers.ListSerializer):
+    """
+    Resolves the category names of the whole page in one batch before the
+    rows are rendered, so a stale reference snapshot costs one query rather
+    than one per row.
+    """
+    def to_representation(self, data):
+        activities = data.all() if isinstance(data, db_models.Manager) else data
+        activities = list(activities)
+        if 'category_name' in self.child.fields:
+            self.child.category_names = reference_data.category_names(
+                {activity.category_id for activity in activities}
+            )
+        return super().to_representation(activities)
+
+
+class ActivitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    category_name = serializers.SerializerMethodField()
     participants_count = serializers.SerializerMethodField()
     available_spots = serializers.SerializerMethodField()
     images = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    
+    method_field_sources = {
+        'category_name': ['category'],
+        'participants_count': [],
+        'available_spots': ['max_participants'],
+        'images': ['images'],
+        'image_variants': ['images', 'image_variants'],
+    }
     
     class Meta:
         model = Activity
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at', 'published_at', 'views_count', 'likes_count', 'shares_count']
+        list_serializer_class = ActivityListSerializer
+    
+    # 列表序列化时由 ActivityListSerializer 按页预先填充
+    category_names = None
     
+    def get_category_name(self, obj):
+        # 从进程内分类缓存取名称，避免每行 join / 查询 category
+        if self.category_names is not None and obj.category_id in self.category_names:
+            return self.category_names[obj.category_id]
+        name = reference_data.category_name(obj.category_id)
+        if name is None:
+            name = obj.category.name
+        return name
+
+    def annotate_queryset(self, queryset):
+        """Add the participant count the current field set needs to ``queryset``."""
+        if {'participants_count', 'available_spots'} & set(self.fields):
+            queryset = queryset.annotate(participants_total=PARTICIPANTS_TOTAL)
+        return queryset
+
     def get_participants_count(self, obj):
-        return obj.get_participants_count()
+        # 视图通过 annotate_queryset 预先取得人数；单独序列化的实例回退到逐个 COUNT
+        total = getattr(obj, 'participants_total', None)
+        return obj.get_participants_count() if total is None else total
     
     def get_available_spots(self, obj):
-        return obj.get_available_spots()
+        return max(0, obj.max_participants - self.get_participants_count(obj))
     
     def get_images(self, obj):
         """返回完整的图片URL"""
-        if not obj.images:
-            return []
-        
-        request = self.context.get('request')
-        if request:
-            # 使用request构建完整URL
-            return [request.build_absolute_uri(image_path) for image_path in obj.images]
-        else:
-            # 如果没有request，使用默认的媒体URL
-            from django.conf import settings
-            base_url = getattr(settings, 'MEDIA_DOMAIN', 'http://activity-service:8000')
-            return [f"{base_url}{image_path}" for image_path in obj.images]
+        return build_image_urls(obj.images, self.context.get('request'))
+    
+    def get_image_variants(self, obj):
+        """返回每张图片各尺寸变体的URL"""
+        return build_image_variant_urls(obj.id, obj.images, obj.image_variants, self.context.get('request'))
+
+
+class ActivityCardSerializer(ActivitySerializer):
+    """
+    Compact activity representation for list pages (activity cards).
+
+    Leaves out long text (full_description, physical_requirements,
+    admin_notes, ...) and organizer contact details.
+    """
+    class Meta(ActivitySerializer.Meta):
+        fields = [
+            'id', 'title', 'description', 'category', 'category_name', 'location',
+            'start_date', 'end_date', 'max_participants', 'participants_count',
+            'available_spots', 'images', 'image_variants', 'status', 'approval_status',
+            'is_featured', 'is_urgent', 'organizer_id', 'organizer_name', 'views_count',
+            'likes_count', 'created_at',
+        ]
+
+
+class ActivityCardValuesSerializer(ValuesSerializer):
+    """
+    ``values()`` fast path producing the same output as
+    ``ActivityCardSerializer``; participant counts come from a correlated
+    subquery in the page query instead of a COUNT per row.
+    """
+    model = Activity
+    fields = [
+        'id', 'title', 'description', 'category', 'location', 'start_date', 'end_date',
+        'max_participants', 'images', 'image_variants', 'status', 'approval_status',
+        'is_featured', 'is_urgent', 'organizer_id', 'organizer_name', 'views_count',
+        'likes_count', 'created_at',
+    ]
+    output_fields = ActivityCardSerializer.Meta.fields
+    annotations = {'participants_total': PARTICIPANTS_TOTAL}
+
+    _category_names = {}
+
+    def serialize(self, rows):
+        # 整页缺失于分类缓存的名称合并为一次查询
+        rows = list(rows)
+        self._category_names = reference_data.category_names({row['category'] for row in rows})
+        return super().serialize(rows)
+
+    def get_category_name(self, row):
+        names = self._category_names
+        if row['category'] not in names:
+            names = reference_data.category_names({row['category']})
+        return names.get(row['category'])
+
+    def get_participants_count(self, row):
+        return row['participants_total']
+
+    def get_available_spots(self, row):
+        return max(0, row['max_participants'] - row['participants_total'])
+
+    def get_images(self, row):
+        return build_image_urls(row['images'], self.context.get('request'))
+
+    def get_image_variants(self, row):
+        return build_image_variant_urls(row['id'], row['images'], row['image_variants'], self.context.get('request'))
 
 
 class ActivityCreateSerializer(serializers.ModelSerializer):
@@ -65,10 +252,6 @@ class ActivityCreateSerializer(serializers.ModelSerializer):
         ]
     
     def create(self, validated_data):
-        import os
-        from django.core.files.storage import default_storage
-        from django.conf import settings
-        
         # 提取images字段（如果存在）
         images_data = validated_data.pop('images', [])
         
@@ -98,14 +281,9 @@ class ActivityCreateSerializer(serializers.ModelSerializer):
         # 处理多个图片上传
         image_paths = []
         if images_data:
-            for idx, image_file in enumerate(images_data):
-                # 生成文件名
-                ext = os.path.splitext(image_file.name)[1]
-                filename = f"activity_{validated_data['organizer_id']}_{idx}_{image_file.name}"
-                filepath = os.path.join('activities', filename)
-                
-                # 保存文件
-                saved_path = default_storage.save(filepath, image_file)
+            for image_file in images_data:
+                # 按内容哈希命名，相同图片只存一份
+                saved_path = save_content_addressed(image_file, 'activities')
                 # 保存相对路径到数组，确保以/开头
                 if not saved_path.startswith('/'):
                     saved_path = '/' + saved_path
@@ -113,7 +291,11 @@ class ActivityCreateSerializer(serializers.ModelSerializer):
         
         validated_data['images'] = image_paths
         
-        return super().create(validated_data)
+        activity = super().create(validated_data)
+        if image_paths:
+            # 缩略图等变体在后台线程池中生成，不阻塞请求
+            schedule_activity_images(activity.id)
+        return activity
 
 
 class ActivityApprovalSerializer(serializers.ModelSerializer):
@@ -155,13 +337,47 @@ class ActivityStatusUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
+class ActivityParticipantListSerializer(serializers.ListSerializer):
+    """
+    Resolves every participant's user in one batch lookup before the rows
+    are rendered.
+    """
+    def to_representation(self, data):
+        request = self.context.get('request')
+        if request is not None:
+            participants = data.all() if isinstance(data, db_models.Manager) else data
+            participants = list(participants)
+            get_user_directory(request).prefetch(participant.user_id for participant in participants)
+            data = participants
+        return super().to_representation(data)
+
+
 class ActivityParticipantSerializer(serializers.ModelSerializer):
+    """
+    Participant with ``user_name`` / ``user_email`` / ``user_phone``
+    refreshed from the user service when it is reachable (stored copies
+    otherwise) and the user's current ``user_avatar``.
+    """
     activity_title = serializers.CharField(source='activity.title', read_only=True)
     
     class Meta:
         model = ActivityParticipant
         fields = '__all__'
         read_only_fields = ['registered_at', 'attended_at', 'completed_at', 'cancelled_at']
+        list_serializer_class = ActivityParticipantListSerializer
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        user = get_user_directory(request).get(instance.user_id) if request is not None else None
+        data['user_avatar'] = None
+        if user:
+            full_name = f"{user.get('first_name') or ''} {user.get('last_name') or ''}".strip()
+            data['user_name'] = full_name or user.get('username') or data['user_name']
+            data['user_email'] = user.get('email') or data['user_email']
+            data['user_phone'] = user.get('phone') or data['user_phone']
+            data['user_avatar'] = user.get('avatar')
+        return data
 
 
 class ActivityParticipantApplicationSerializer(serializers.ModelSerializer):
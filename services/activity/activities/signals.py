@@ -0,0 +1,103 @@
+"""
+Signal handlers for activities app.
+"""
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Activity, ActivityParticipant, ActivityLike, ActivityCategory, ActivityTag
+from .cache import invalidate_activity_cache
+from .reference import reference_data
+from . import events, stats
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+@receiver(post_save, sender=ActivityParticipant)
+@receiver(post_delete, sender=ActivityParticipant)
+@receiver(post_save, sender=ActivityLike)
+@receiver(post_delete, sender=ActivityLike)
+def activity_changed(sender, instance, **kwargs):
+    """
+    Invalidate cached public activity responses.
+
+    Covers creation, approval, updates, likes and participant changes, all
+    of which alter the serialized activity (status, counts, spots). The
+    generation is bumped once the write commits, so a concurrent cache miss
+    cannot store pre-commit rows under the new generation.
+    """
+    transaction.on_commit(invalidate_activity_cache)
+
+
+@receiver(post_save, sender=ActivityParticipant)
+@receiver(post_delete, sender=ActivityParticipant)
+def participant_changed(sender, instance, **kwargs):
+    """
+    Touch the activity's ``updated_at``.
+
+    ``participants_count`` and ``available_spots`` are part of the activity
+    representation, so ETag / Last-Modified validators must change with them.
+    """
+    Activity.objects.filter(pk=instance.activity_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ActivityCategory)
+@receiver(post_delete, sender=ActivityCategory)
+@receiver(post_save, sender=ActivityTag)
+@receiver(post_delete, sender=ActivityTag)
+def reference_data_changed(sender, instance, **kwargs):
+    """
+    Bump the reference data version on category / tag edits, once they
+    commit; before that, other processes would reload the old rows and keep
+    them for the new version.
+
+    Cached activity responses embed ``category_name`` and are dropped too.
+    """
+    transaction.on_commit(reference_data.invalidate)
+    transaction.on_commit(invalidate_activity_cache)
+
+
+@receiver(post_init, sender=Activity)
+def remember_activity_stats_fields(sender, instance, **kwargs):
+    stats.remember(instance, stats.ACTIVITY_TRACKED_FIELDS)
+
+
+@receiver(post_init, sender=ActivityParticipant)
+def remember_participant_stats_fields(sender, instance, **kwargs):
+    stats.remember(instance, stats.PARTICIPANT_TRACKED_FIELDS)
+
+
+@receiver(post_save, sender=Activity)
+def activity_stats_saved(sender, instance, created, raw=False, **kwargs):
+    """Keep the approved-activity count and volunteer hours in sync."""
+    if not raw:
+        stats.activity_saved(instance, created)
+
+
+@receiver(post_delete, sender=Activity)
+def activity_stats_deleted(sender, instance, **kwargs):
+    stats.activity_deleted(instance)
+
+
+@receiver(post_save, sender=ActivityParticipant)
+def participant_stats_saved(sender, instance, created, raw=False, **kwargs):
+    """Add or remove the activity's duration when a participation completes."""
+    if not raw:
+        stats.participant_saved(instance, created)
+
+
+@receiver(post_delete, sender=ActivityParticipant)
+def participant_stats_deleted(sender, instance, **kwargs):
+    stats.participant_deleted(instance)
+
+
+@receiver(post_save, sender=ActivityParticipant)
+def participant_event_saved(sender, instance, raw=False, **kwargs):
+    """Emit a participation event for the user service (see ``activities.events``)."""
+    if not raw:
+        events.record_participation_event(instance)
+
+
+@receiver(post_delete, sender=ActivityParticipant)
+def participant_event_deleted(sender, instance, **kwargs):
+    events.record_participation_event(instance, events.DELETED)
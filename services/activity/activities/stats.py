@@ -0,0 +1,198 @@
+"""
+Landing-page statistics (approved activities, completed volunteer hours).
+
+The aggregates live in the single ``ActivityStats`` row and are maintained
+incrementally by the model signals in ``activities.signals``: approvals,
+participation status changes and date edits adjust the counters with
+``F()`` updates instead of re-aggregating every participation. Bulk
+``QuerySet.update()`` calls and raw fixture loads bypass signals, so
+``rebuild_stats`` (also ``manage.py rebuild_stats``) recomputes the row
+from scratch.
+
+Reads go through ``activity_stats``, a per-process snapshot of the row that
+is reloaded at most every ``STATS_MAX_AGE`` seconds, so serving the stats
+costs no database query on the hot path. Writes in this process drop the
+snapshot immediately; other processes see them within ``STATS_MAX_AGE``.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, Sum, fields
+from django.utils import timezone
+
+STATS_PK = 1
+
+# 需要跟踪旧值的字段（用于在 post_save 中计算增量）
+ACTIVITY_TRACKED_FIELDS = ('approval_status', 'start_date', 'end_date')
+PARTICIPANT_TRACKED_FIELDS = ('status',)
+
+
+def compute_stats():
+    """Aggregate the statistics from scratch."""
+    from .models import Activity, ActivityParticipant
+
+    approved_activities = Activity.objects.filter(approval_status='approved').count()
+    total_duration = ActivityParticipant.objects.filter(status='completed').annotate(
+        duration=ExpressionWrapper(F('activity__end_date') - F('activity__start_date'), output_field=fields.DurationField())
+    ).aggregate(total_duration=Sum('duration'))['total_duration']
+    return {
+        'approved_activities': approved_activities,
+        'completed_seconds': round(total_duration.total_seconds()) if total_duration else 0,
+    }
+
+
+def rebuild_stats():
+    """Recompute the stats row and return the new values."""
+    from .models import ActivityStats
+
+    values = compute_stats()
+    ActivityStats.objects.update_or_create(
+        pk=STATS_PK, defaults={**values, 'rebuilt_at': timezone.now()}
+    )
+    activity_stats.invalidate_on_commit()
+    return values
+
+
+def adjust_stats(**deltas):
+    """Add ``deltas`` to the stats counters; rebuilds if the row is missing."""
+    from .models import ActivityStats
+
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = ActivityStats.objects.filter(pk=STATS_PK).update(
+        updated_at=timezone.now(),
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+    if not updated:
+        # 统计行不存在：重建（已经包含本次变更）
+        rebuild_stats()
+        return
+    activity_stats.invalidate_on_commit()
+
+
+def remember(instance, field_names):
+    """
+    Snapshot the loaded values of ``field_names`` on ``instance``.
+
+    Deferred fields are skipped rather than loaded, so ``.only()`` querysets
+    do not trigger extra queries.
+    """
+    instance._stats_original = {
+        name: instance.__dict__[name] for name in field_names if name in instance.__dict__
+    }
+
+
+def _original(instance, name):
+    return getattr(instance, '_stats_original', {}).get(name)
+
+
+def _duration_seconds(start_date, end_date):
+    return round((end_date - start_date).total_seconds())
+
+
+def activity_duration_seconds(participant):
+    """Duration of the participant's activity, reusing a cached activity if loaded."""
+    from .models import Activity, ActivityParticipant
+
+    if ActivityParticipant.activity.is_cached(participant):
+        activity = participant.activity
+        if 'start_date' in activity.__dict__ and 'end_date' in activity.__dict__:
+            return _duration_seconds(activity.start_date, activity.end_date)
+    dates = Activity.objects.filter(pk=participant.activity_id).values_list('start_date', 'end_date').first()
+    return _duration_seconds(*dates) if dates else 0
+
+
+def activity_saved(activity, created):
+    deltas = {}
+    status = activity.__dict__.get('approval_status')
+    was_approved = False if created else _original(activity, 'approval_status')
+    if status is not None and was_approved is not None:
+        deltas['approved_activities'] = int(status == 'approved') - int(was_approved == 'approved')
+
+    if not created:
+        old_start, old_end = _original(activity, 'start_date'), _original(activity, 'end_date')
+        new_start, new_end = activity.__dict__.get('start_date'), activity.__dict__.get('end_date')
+        if None not in (old_start, old_end, new_start, new_end) and (old_start, old_end) != (new_start, new_end):
+            # 活动时长变化会影响该活动所有已完成参与的时长
+            completed = activity.participants.filter(status='completed').count()
+            if completed:
+                change = _duration_seconds(new_start, new_end) - _duration_seconds(old_start, old_end)
+                deltas['completed_seconds'] = change * completed
+
+    adjust_stats(**deltas)
+    remember(activity, ACTIVITY_TRACKED_FIELDS)
+
+
+def activity_deleted(activity):
+    status = _original(activity, 'approval_status') or activity.__dict__.get('approval_status')
+    if status == 'approved':
+        adjust_stats(approved_activities=-1)
+
+
+def participant_saved(participant, created):
+    status = participant.__dict__.get('status')
+    was_status = None if created else _original(participant, 'status')
+    if status is not None and (created or 'status' in getattr(participant, '_stats_original', {})):
+        change = int(status == 'completed') - int(was_status == 'completed')
+        if change:
+            adjust_stats(completed_seconds=change * activity_duration_seconds(participant))
+    remember(participant, PARTICIPANT_TRACKED_FIELDS)
+
+
+def participant_deleted(participant):
+    status = _original(participant, 'status') or participant.__dict__.get('status')
+    if status == 'completed':
+        adjust_stats(completed_seconds=-activity_duration_seconds(participant))
+
+
+class StatsSnapshot:
+    """
+    Per-process copy of the public statistics, at most ``STATS_MAX_AGE``
+    seconds old.
+    """
+
+    def __init__(self):
+        # 可重入：_load() 在缺少统计行时调用 rebuild_stats()，后者会再次 invalidate()
+        self._lock = threading.RLock()
+        self._value = None
+        self._loaded_at = 0.0
+
+    def _load(self):
+        from .models import ActivityStats
+
+        row = ActivityStats.objects.filter(pk=STATS_PK).values('approved_activities', 'completed_seconds').first()
+        if row is None:
+            row = rebuild_stats()
+        return {
+            'total_activities': row['approved_activities'],
+            'total_hours': round(row['completed_seconds'] / 3600, 2),
+        }
+
+    def get(self):
+        """Public statistics dict (``total_activities``, ``total_hours``)."""
+        value, loaded_at = self._value, self._loaded_at
+        if value is not None and time.monotonic() - loaded_at < settings.STATS_MAX_AGE:
+            return value
+        with self._lock:
+            if self._value is None or time.monotonic() - self._loaded_at >= settings.STATS_MAX_AGE:
+                self._value = self._load()
+                self._loaded_at = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def invalidate_on_commit(self):
+        """
+        Drop the snapshot now and again once the transaction commits, so a
+        reload that raced the write cannot keep uncommitted-era values.
+        """
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+
+activity_stats = StatsSnapshot()
@@ -1,7 +1,7 @@
 """
 Unit tests for activities app.
 """
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
@@ -2219,4 +2219,1722 @@ class ActivityCreateSerializerTestCase(APITestCase):
         # is_valid() 不会触发认证检查，只有在 save() 时才会检查
         serializer.is_valid()
         with self.assertRaises(ValidationError):
-            serializer.save()
\ No newline at end of file
+            serializer.save()
+
+class ActivityResponseCacheTestCase(APITestCase):
+    """测试匿名/志愿者活动响应缓存"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.category = ActivityCategory.objects.create(name='缓存分类')
+        self.activity = Activity.objects.create(
+            title='缓存活动',
+            description='测试',
+            organizer_id=1,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10,
+            approval_status='approved'
+        )
+        self.volunteer_user = type('User', (), {
+            'id': 3,
+            'username': 'volunteer',
+            'email': 'volunteer@test.com',
+            'role': 'volunteer',
+            'is_authenticated': True,
+            'is_anonymous': False,
+            'first_name': 'Volunteer',
+            'last_name': 'User',
+            'phone': ''
+        })()
+        self.admin_user = type('User', (), {
+            'id': 8,
+            'username': 'admin',
+            'email': 'admin@test.com',
+            'role': 'admin',
+            'is_authenticated': True,
+            'is_anonymous': False,
+            'first_name': 'Admin',
+            'last_name': 'User',
+            'phone': ''
+        })()
+    
+    def test_anonymous_list_served_from_cache(self):
+        """测试第二次匿名请求不查询数据库"""
+        url = reverse('activity-list')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.data, second.data)
+    
+    def test_query_params_are_normalized(self):
+        """测试参数顺序和空参数不影响缓存键"""
+        url = reverse('activity-list')
+        self.client.get(url + '?status=draft&category=%d&search=' % self.category.id)
+        with self.assertNumQueries(0):
+            response = self.client.get(url + '?category=%d&status=draft' % self.category.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_volunteer_shares_anonymous_cache(self):
+        """测试志愿者与匿名用户共享缓存"""
+        url = reverse('activity-detail', kwargs={'pk': self.activity.pk})
+        self.client.get(url)
+        self.client.force_authenticate(user=self.volunteer_user)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['title'], '缓存活动')
+    
+    def test_admin_bypasses_cache(self):
+        """测试管理员请求不使用缓存"""
+        url = reverse('activity-list')
+        self.client.get(url)
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        Activity.objects.create(
+            title='待审批',
+            description='测试',
+            organizer_id=2,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10,
+            approval_status='pending'
+        )
+        self.assertEqual(self.client.get(url).data['count'], 2)
+    
+    def test_cache_invalidated_on_update(self):
+        """测试活动更新后缓存失效"""
+        url = reverse('activity-detail', kwargs={'pk': self.activity.pk})
+        self.client.get(url)
+        self.activity.title = '已更新'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.activity.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['title'], '已更新')
+    
+    def test_cache_generation_bumped_after_commit(self):
+        """测试缓存代数在事务提交后才递增"""
+        from django.core.cache import cache
+        from .cache import GENERATION_KEY
+        self.client.get(reverse('activity-list'))
+        generation = cache.get(GENERATION_KEY)
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.activity.title = '已更新'
+            self.activity.save()
+            self.assertEqual(cache.get(GENERATION_KEY), generation)
+        
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.get(GENERATION_KEY), generation)
+    
+    def test_cache_invalidated_on_new_participant(self):
+        """测试新增参与者后缓存失效"""
+        url = reverse('activity-detail', kwargs={'pk': self.activity.pk})
+        self.assertEqual(self.client.get(url).data['participants_count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            ActivityParticipant.objects.create(
+                activity=self.activity,
+                user_id=5,
+                user_name='Volunteer',
+                user_email='v@test.com',
+                status='approved'
+            )
+        self.assertEqual(self.client.get(url).data['participants_count'], 1)
+    
+    def test_pending_detail_not_cached(self):
+        """测试404响应不写入缓存"""
+        pending = Activity.objects.create(
+            title='待审批',
+            description='测试',
+            organizer_id=2,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10,
+            approval_status='pending'
+        )
+        url = reverse('activity-detail', kwargs={'pk': pending.pk})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        pending.approval_status = 'approved'
+        pending.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+    
+    def test_stampede_lock_waits_for_computation(self):
+        """测试缓存锁被占用时等待结果而不是重复计算"""
+        from django.core.cache import cache
+        from . import cache as activity_cache
+        
+        key = 'activities:response:test'
+        cache.add(key + ':lock', 1, 10)
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            return {'value': 1}
+        
+        with unittest.mock.patch('activities.cache.time.sleep', side_effect=lambda _: cache.set(key, {'value': 2})):
+            value = activity_cache.get_or_compute(key, compute)
+        
+        self.assertEqual(value, {'value': 2})
+        self.assertEqual(calls, [])
+
+
+class ActivityConditionalGetTestCase(APITestCase):
+    """测试 ETag / Last-Modified 条件请求"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = ActivityCategory.objects.create(name='条件分类')
+        self.activity = Activity.objects.create(
+            title='条件活动',
+            description='测试',
+            organizer_id=1,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10,
+            approval_status='approved'
+        )
+        self.admin_user = type('User', (), {
+            'id': 8,
+            'username': 'admin',
+            'email': 'admin@test.com',
+            'role': 'admin',
+            'is_authenticated': True,
+            'is_anonymous': False,
+            'first_name': 'Admin',
+            'last_name': 'User',
+            'phone': ''
+        })()
+    
+    def test_list_returns_weak_etag(self):
+        """测试列表返回弱 ETag"""
+        response = self.client.get(reverse('activity-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+    
+    def test_list_not_modified(self):
+        """测试 If-None-Match 命中返回 304"""
+        url = reverse('activity-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_list_not_modified_skips_serialization(self):
+        """测试非缓存路径下 304 只执行一次聚合查询"""
+        from .serializers import ActivitySerializer
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('activity-list')
+        etag = self.client.get(url)['ETag']
+        with unittest.mock.patch.object(ActivitySerializer, 'to_representation') as mock_repr:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        mock_repr.assert_not_called()
+    
+    def test_list_etag_depends_on_query(self):
+        """测试不同分页参数产生不同 ETag"""
+        url = reverse('activity-list')
+        first = self.client.get(url)['ETag']
+        second = self.client.get(url, {'page_size': 5, 'ordering': 'start_date'})['ETag']
+        self.assertNotEqual(first, second)
+    
+    def test_list_etag_changes_after_update(self):
+        """测试活动更新后 ETag 变化"""
+        url = reverse('activity-list')
+        etag = self.client.get(url)['ETag']
+        self.activity.title = '已更新'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.activity.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_detail_last_modified(self):
+        """测试详情返回 Last-Modified 并支持 If-Modified-Since"""
+        url = reverse('activity-detail', kwargs={'pk': self.activity.pk})
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_detail_etag_changes_with_participants(self):
+        """测试参与者变化后详情 ETag 变化"""
+        url = reverse('activity-detail', kwargs={'pk': self.activity.pk})
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            ActivityParticipant.objects.create(
+                activity=self.activity,
+                user_id=5,
+                user_name='Volunteer',
+                user_email='v@test.com',
+                status='approved'
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['participants_count'], 1)
+    
+    def test_categories_not_modified(self):
+        """测试分类列表支持条件请求"""
+        url = reverse('activity-categories')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.category.name = '新名称'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_tags_not_modified(self):
+        """测试标签列表支持条件请求"""
+        from .models import ActivityTag
+        ActivityTag.objects.create(name='户外')
+        url = reverse('activity-tags')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ReferenceDataCacheTestCase(APITestCase):
+    """测试分类/标签进程内缓存"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = ActivityCategory.objects.create(name='环境保护')
+            self.inactive_category = ActivityCategory.objects.create(name='已停用', is_active=False)
+    
+    def test_categories_served_without_queries(self):
+        """测试预热后分类列表不查询数据库"""
+        from .reference import reference_data
+        reference_data.warm()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('activity-categories'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in response.data['results']]
+        self.assertEqual(names, ['环境保护'])
+    
+    def test_category_name_includes_inactive(self):
+        """测试停用分类也能解析名称"""
+        from .reference import reference_data
+        self.assertEqual(reference_data.category_name(self.inactive_category.id), '已停用')
+        self.assertIsNone(reference_data.category_name(999999))
+    
+    def test_serializer_does_not_load_category(self):
+        """测试序列化活动时不加载 category 关联对象"""
+        from .serializers import ActivitySerializer
+        activity = Activity.objects.create(
+            title='活动',
+            description='测试',
+            organizer_id=1,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10,
+        )
+        activity = Activity.objects.get(pk=activity.pk)
+        data = ActivitySerializer(activity).data
+        self.assertEqual(data['category_name'], '环境保护')
+        self.assertFalse(Activity.category.is_cached(activity))
+    
+    def test_edit_invalidates_snapshot(self):
+        """测试编辑分类后缓存失效"""
+        from .reference import reference_data
+        reference_data.warm()
+        self.category.name = '生态环保'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(reference_data.category_name(self.category.id), '生态环保')
+    
+    def test_version_bumped_after_commit(self):
+        """测试分类编辑提交后才递增共享版本号"""
+        from django.core.cache import cache
+        from .reference import reference_data, VERSION_KEY
+        reference_data.warm()
+        version = cache.get(VERSION_KEY)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = '生态环保'
+            self.category.save()
+            self.assertEqual(cache.get(VERSION_KEY), version)
+        
+        self.assertNotEqual(cache.get(VERSION_KEY), version)
+    
+    def test_reload_on_shared_version_change(self):
+        """测试其他进程更新版本号后重新加载"""
+        from django.core.cache import cache
+        from .reference import reference_data, VERSION_KEY
+        reference_data.warm()
+        ActivityCategory.objects.filter(pk=self.category.pk).update(name='其他进程修改')
+        cache.incr(VERSION_KEY)
+        with self.settings(REFERENCE_DATA_CHECK_INTERVAL=0):
+            self.assertEqual(reference_data.category_name(self.category.id), '其他进程修改')
+    
+    def test_stale_snapshot_resolved_once_per_page(self):
+        """测试分类缓存未命中时每页只查询一次分类名称"""
+        from django.db import connection
+        from django.test import override_settings
+        from django.test.utils import CaptureQueriesContext
+        from .cache import invalidate_activity_cache
+        from .reference import reference_data
+        reference_data.warm()
+        # 不执行提交回调：新分类不在进程内快照中
+        for index in range(3):
+            category = ActivityCategory.objects.create(name=f'新分类{index}')
+            Activity.objects.create(
+                title=f'活动{index}',
+                description='测试',
+                organizer_id=1,
+                organizer_name='Organizer',
+                organizer_email='org@test.com',
+                category=category,
+                location='地点',
+                start_date=timezone.now() + timedelta(days=1),
+                end_date=timezone.now() + timedelta(days=1, hours=2),
+                max_participants=10,
+                approval_status='approved',
+            )
+        
+        for fast in (True, False):
+            invalidate_activity_cache()
+            with self.subTest(fast=fast), override_settings(FAST_LIST_SERIALIZATION=fast):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(reverse('activity-list'))
+                names = sorted(item['category_name'] for item in response.json()['results'])
+                self.assertEqual(names, ['新分类0', '新分类1', '新分类2'])
+                category_queries = [q for q in ctx.captured_queries if 'activity_categories' in q['sql']]
+                self.assertEqual(len(category_queries), 1)
+    
+    def test_tags_list(self):
+        """测试标签列表来自缓存"""
+        from .models import ActivityTag
+        with self.captureOnCommitCallbacks(execute=True):
+            ActivityTag.objects.create(name='户外')
+            ActivityTag.objects.create(name='停用标签', is_active=False)
+        response = self.client.get(reverse('activity-tags'))
+        self.assertEqual([item['name'] for item in response.data['results']], ['户外'])
+
+
+class ActivitySparseFieldsetTestCase(APITestCase):
+    """测试稀疏字段集和卡片格式"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = ActivityCategory.objects.create(name='字段分类')
+        self.activity = Activity.objects.create(
+            title='字段活动',
+            description='简介',
+            full_description='很长的详细描述' * 200,
+            physical_requirements='体力要求',
+            admin_notes='内部备注',
+            organizer_id=1,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            organizer_phone='123456',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10,
+            approval_status='approved'
+        )
+        self.url = reverse('activity-list')
+    
+    def test_list_defaults_to_card(self):
+        """测试列表默认返回卡片格式"""
+        from .serializers import ActivityCardSerializer
+        item = self.client.get(self.url).data['results'][0]
+        self.assertEqual(set(item), set(ActivityCardSerializer.Meta.fields))
+        for name in ('full_description', 'physical_requirements', 'admin_notes', 'organizer_email', 'organizer_phone'):
+            self.assertNotIn(name, item)
+    
+    def test_list_card_query_skips_text_columns(self):
+        """测试卡片列表 SQL 不读取长文本列"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        select_sql = [q['sql'] for q in ctx.captured_queries if 'FROM "activities"' in q['sql']]
+        self.assertTrue(select_sql)
+        for sql in select_sql:
+            self.assertNotIn('full_description', sql)
+            self.assertNotIn('admin_notes', sql)
+    
+    def test_view_full(self):
+        """测试 view=full 返回完整字段"""
+        item = self.client.get(self.url, {'view': 'full'}).data['results'][0]
+        self.assertEqual(item['organizer_email'], 'org@test.com')
+        self.assertIn('full_description', item)
+    
+    def test_fields_param(self):
+        """测试 fields 参数只返回指定字段"""
+        item = self.client.get(self.url, {'fields': 'id,title,available_spots,unknown'}).data['results'][0]
+        self.assertEqual(set(item), {'id', 'title', 'available_spots'})
+        self.assertEqual(item['available_spots'], 10)
+    
+    def test_omit_param(self):
+        """测试 omit 参数排除字段"""
+        item = self.client.get(self.url, {'omit': 'description,images'}).data['results'][0]
+        self.assertNotIn('description', item)
+        self.assertNotIn('images', item)
+        self.assertIn('title', item)
+    
+    def test_detail_fields_param(self):
+        """测试详情同样支持 fields 参数"""
+        url = reverse('activity-detail', kwargs={'pk': self.activity.pk})
+        data = self.client.get(url, {'fields': 'id,category_name,full_description'}).data
+        self.assertEqual(set(data), {'id', 'category_name', 'full_description'})
+        self.assertEqual(data['category_name'], '字段分类')
+    
+    def test_detail_defaults_to_full(self):
+        """测试详情默认返回完整字段"""
+        url = reverse('activity-detail', kwargs={'pk': self.activity.pk})
+        data = self.client.get(url).data
+        self.assertIn('full_description', data)
+        self.assertIn('organizer_email', data)
+
+
+class ActivityFastSerializationTestCase(APITestCase):
+    """测试活动列表的 values() 快速序列化路径"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.category = ActivityCategory.objects.create(name='快速分类')
+        self.activity = Activity.objects.create(
+            title='快速活动',
+            description='简介',
+            organizer_id=1,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10,
+            images=['activities/a.jpg', 'https://cdn.example.com/b.jpg'],
+            approval_status='approved'
+        )
+        Activity.objects.create(
+            title='空活动',
+            description='简介',
+            organizer_id=1,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=2),
+            end_date=timezone.now() + timedelta(days=2, hours=2),
+            max_participants=5,
+            approval_status='approved'
+        )
+        for index, participant_status in enumerate(['approved', 'registered', 'cancelled']):
+            ActivityParticipant.objects.create(
+                activity=self.activity,
+                user_id=100 + index,
+                user_name=f'user{index}',
+                user_email=f'user{index}@test.com',
+                status=participant_status
+            )
+        self.url = reverse('activity-list')
+    
+    def test_values_serializer_matches_card_serializer(self):
+        """测试 values() 序列化与卡片序列化输出一致"""
+        import json
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .serializers import ActivityCardSerializer, ActivityCardValuesSerializer
+        
+        request = Request(APIRequestFactory().get(self.url))
+        queryset = Activity.objects.order_by('id')
+        expected = ActivityCardSerializer(queryset, many=True, context={'request': request}).data
+        serializer = ActivityCardValuesSerializer(context={'request': request})
+        actual = serializer.serialize(serializer.prepare(queryset))
+        
+        self.assertEqual(
+            json.loads(JSONRenderer().render(actual)),
+            json.loads(JSONRenderer().render(expected))
+        )
+        self.assertEqual(actual[0]['participants_count'], 2)
+        self.assertEqual(actual[0]['available_spots'], 8)
+        self.assertEqual(actual[1]['participants_count'], 0)
+    
+    def test_list_response_matches_slow_path(self):
+        """测试开启与关闭快速路径时列表 JSON 相同"""
+        import json
+        from django.core.cache import cache
+        from django.test import override_settings
+        
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            fast = json.loads(self.client.get(self.url).content)
+        cache.clear()
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            slow = json.loads(self.client.get(self.url).content)
+        
+        self.assertEqual(fast, slow)
+        self.assertEqual(len(fast['results']), 2)
+    
+    def test_omit_uses_serializer(self):
+        """测试 omit 参数回退到普通序列化器"""
+        item = self.client.get(self.url, {'omit': 'images'}).json()['results'][0]
+        self.assertNotIn('images', item)
+
+
+class ActivityCompressionTestCase(APITestCase):
+    """测试响应压缩和预压缩缓存"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        category = ActivityCategory.objects.create(name='压缩分类')
+        for index in range(10):
+            Activity.objects.create(
+                title=f'压缩活动 {index}',
+                description='可压缩的活动简介 ' * 10,
+                organizer_id=1,
+                organizer_name='Organizer',
+                organizer_email='org@test.com',
+                category=category,
+                location='地点',
+                start_date=timezone.now() + timedelta(days=1),
+                end_date=timezone.now() + timedelta(days=1, hours=2),
+                max_participants=10,
+                approval_status='approved'
+            )
+        self.url = reverse('activity-list')
+    
+    def test_gzip_list(self):
+        """测试客户端支持 gzip 时压缩列表响应"""
+        import gzip
+        import json
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), json.loads(plain.content))
+    
+    def test_no_accept_encoding(self):
+        """测试客户端不支持压缩时返回原始响应"""
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_small_body_not_compressed(self):
+        """测试小于阈值的响应不压缩"""
+        from django.test import override_settings
+        with override_settings(RESPONSE_COMPRESSION_MIN_SIZE=1024 * 1024):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_cached_response_not_recompressed(self):
+        """测试缓存命中时复用已压缩的响应体"""
+        from . import compression
+        with unittest.mock.patch.object(compression, '_gzip', wraps=compression._gzip) as mock_gzip:
+            first = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertEqual(mock_gzip.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+    
+    def test_not_modified_not_compressed(self):
+        """测试 304 响应不压缩"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_negotiate_encoding(self):
+        """测试 Accept-Encoding 协商"""
+        from . import compression
+        self.assertEqual(compression.negotiate_encoding('gzip')[0], 'gzip')
+        self.assertEqual(compression.negotiate_encoding('*')[0], 'gzip')
+        self.assertIsNone(compression.negotiate_encoding('identity'))
+        self.assertIsNone(compression.negotiate_encoding(''))
+        
+        fake_brotli = unittest.mock.Mock()
+        with unittest.mock.patch.object(compression, 'brotli', fake_brotli):
+            self.assertEqual(compression.negotiate_encoding('gzip, br')[0], 'br')
+            self.assertEqual(compression.negotiate_encoding('gzip;q=1.0, br;q=0.5')[0], 'gzip')
+
+
+class ActivityImageVariantsTestCase(APITestCase):
+    """测试活动图片变体生成"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        from django.test import override_settings
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, ACTIVITY_IMAGE_PROCESSING_EAGER=True
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.category = ActivityCategory.objects.create(name='图片分类')
+    
+    def _store_image(self, name, size=(2000, 1000), color='red'):
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        buffer = BytesIO()
+        Image.new('RGB', size, color=color).save(buffer, format='JPEG')
+        return '/' + default_storage.save(f'activities/{name}', ContentFile(buffer.getvalue()))
+    
+    def _create_activity(self, images):
+        return Activity.objects.create(
+            title='图片活动',
+            description='简介',
+            organizer_id=1,
+            organizer_name='Organizer',
+            organizer_email='org@test.com',
+            category=self.category,
+            location='地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10,
+            images=images,
+            approval_status='approved'
+        )
+    
+    def test_generate_variants(self):
+        """测试生成各尺寸 WebP 变体"""
+        from PIL import Image
+        from django.core.files.storage import default_storage
+        from .images import VARIANTS, generate_variants
+        
+        variants = generate_variants(self._store_image('photo.jpg'))
+        
+        self.assertEqual(set(variants), set(VARIANTS))
+        for name, path in variants.items():
+            self.assertTrue(path.endswith('.webp'))
+            with default_storage.open(path.lstrip('/')) as handle:
+                image = Image.open(handle)
+                self.assertEqual(image.format, 'WEBP')
+                self.assertLessEqual(image.width, VARIANTS[name][0])
+                self.assertLessEqual(image.height, VARIANTS[name][1])
+    
+    def test_variants_are_content_addressed(self):
+        """测试相同内容的图片复用同一组变体"""
+        from .images import generate_variants
+        first = generate_variants(self._store_image('a.jpg'))
+        second = generate_variants(self._store_image('b.jpg'))
+        other = generate_variants(self._store_image('c.jpg', color='blue'))
+        
+        self.assertEqual(first, second)
+        self.assertNotEqual(first['card'], other['card'])
+    
+    def test_jpeg_format(self):
+        """测试配置为 JPEG 格式"""
+        from .images import generate_variants
+        with self.settings(ACTIVITY_IMAGE_FORMAT='jpeg'):
+            variants = generate_variants(self._store_image('photo.jpg'))
+        self.assertTrue(variants['thumb'].endswith('.jpg'))
+    
+    def test_lazy_generation_on_read(self):
+        """测试首次读取时生成缺失的变体"""
+        path = self._store_image('lazy.jpg')
+        activity = self._create_activity([path])
+        url = reverse('activity-detail', kwargs={'pk': activity.pk})
+        
+        self.client.get(url)
+        
+        activity.refresh_from_db()
+        self.assertEqual(set(activity.image_variants[path]), {'thumb', 'card', 'full'})
+        data = self.client.get(url).json()
+        self.assertTrue(data['image_variants'][0]['card'].endswith('.webp'))
+        self.assertTrue(data['image_variants'][0]['original'].endswith('lazy.jpg'))
+    
+    def test_fallback_to_original(self):
+        """测试变体尚未生成时返回原图地址"""
+        path = self._store_image('pending.jpg')
+        activity = self._create_activity([path])
+        url = reverse('activity-list')
+        
+        with unittest.mock.patch('activities.serializers.schedule_activity_images') as mock_schedule:
+            item = self.client.get(url).json()['results'][0]
+        
+        mock_schedule.assert_called_once_with(activity.id)
+        self.assertEqual(item['image_variants'][0]['card'], item['images'][0])
+    
+    def test_broken_image_not_retried(self):
+        """测试损坏的图片记录为空，不重复处理"""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .images import process_activity_images
+        path = '/' + default_storage.save('activities/broken.jpg', ContentFile(b'not an image'))
+        activity = self._create_activity([path])
+        
+        with self.assertLogs('activities.images', level='ERROR'):
+            process_activity_images(activity.id)
+        
+        activity.refresh_from_db()
+        self.assertEqual(activity.image_variants, {path: {}})
+        with unittest.mock.patch('activities.serializers.schedule_activity_images') as mock_schedule:
+            self.client.get(reverse('activity-list'))
+        mock_schedule.assert_not_called()
+    
+    def test_rolled_back_schedule_does_not_block_later_jobs(self):
+        """测试事务回滚后的调度不会阻止后续处理"""
+        from django.db import transaction
+        from . import images
+        path = self._store_image('rollback.jpg')
+        activity = self._create_activity([path])
+        
+        with self.settings(ACTIVITY_IMAGE_PROCESSING_EAGER=False), \
+                unittest.mock.patch.object(images, '_get_executor') as mock_executor:
+            try:
+                with transaction.atomic():
+                    images.schedule_activity_images(activity.id)
+                    raise RuntimeError('rollback')
+            except RuntimeError:
+                pass
+            self.assertNotIn(activity.id, images._pending)
+            
+            with self.captureOnCommitCallbacks(execute=True):
+                images.schedule_activity_images(activity.id)
+        
+        self.addCleanup(images._pending.discard, activity.id)
+        mock_executor.return_value.submit.assert_called_once_with(images._run, activity.id)
+        self.assertIn(activity.id, images._pending)
+    
+    def test_create_schedules_processing(self):
+        """测试创建活动后处理上传的图片"""
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), color='green').save(buffer, format='JPEG')
+        organizer = type('User', (), {
+            'id': 1, 'username': 'organizer', 'email': 'org@test.com', 'role': 'organizer',
+            'is_authenticated': True, 'is_anonymous': False, 'first_name': '', 'last_name': '',
+        })()
+        self.client.force_authenticate(user=organizer)
+        
+        with unittest.mock.patch('requests.post'), unittest.mock.patch('requests.get'):
+            response = self.client.post(reverse('activity-list'), {
+                'title': '上传活动',
+                'description': '简介',
+                'category': self.category.id,
+                'location': '地点',
+                'start_date': (timezone.now() + timedelta(days=7)).isoformat(),
+                'end_date': (timezone.now() + timedelta(days=7, hours=3)).isoformat(),
+                'max_participants': 20,
+                'images': [SimpleUploadedFile('upload.jpg', buffer.getvalue(), content_type='image/jpeg')],
+            }, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        activity = Activity.objects.get(title='上传活动')
+        self.assertEqual(len(activity.image_variants), 1)
+        self.assertIn('card', activity.image_variants[activity.images[0]])
+
+
+class ActivityStreamingUploadTestCase(APITestCase):
+    """测试流式图片上传"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, ACTIVITY_IMAGE_PROCESSING_EAGER=True
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.category = ActivityCategory.objects.create(name='上传分类')
+        organizer = type('User', (), {
+            'id': 1, 'username': 'organizer', 'email': 'org@test.com', 'role': 'organizer',
+            'is_authenticated': True, 'is_anonymous': False, 'first_name': '', 'last_name': '',
+        })()
+        self.client.force_authenticate(user=organizer)
+        patcher = unittest.mock.patch('requests.post')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = unittest.mock.patch('requests.get')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def _jpeg(self, name='photo.jpg', color='red'):
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64), color=color).save(buffer, format='JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+    
+    def _post(self, title, images):
+        return self.client.post(reverse('activity-list'), {
+            'title': title,
+            'description': '简介',
+            'category': self.category.id,
+            'location': '地点',
+            'start_date': (timezone.now() + timedelta(days=7)).isoformat(),
+            'end_date': (timezone.now() + timedelta(days=7, hours=3)).isoformat(),
+            'max_participants': 20,
+            'images': images,
+        }, format='multipart')
+    
+    def test_upload_stored_by_content_hash(self):
+        """测试上传图片按内容哈希存储"""
+        import hashlib
+        image = self._jpeg()
+        digest = hashlib.sha256(image.read()).hexdigest()
+        image.seek(0)
+        
+        response = self._post('上传活动', [image])
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        activity = Activity.objects.get(title='上传活动')
+        self.assertEqual(activity.images, [f'/activities/{digest[:2]}/{digest}.jpg'])
+    
+    def test_identical_uploads_deduplicated(self):
+        """测试相同内容的图片只保存一份"""
+        import os
+        self._post('活动一', [self._jpeg('a.jpg')])
+        self._post('活动二', [self._jpeg('b.jpg')])
+        
+        first = Activity.objects.get(title='活动一')
+        second = Activity.objects.get(title='活动二')
+        self.assertEqual(first.images, second.images)
+        directory = os.path.dirname(os.path.join(self.media_root, first.images[0].lstrip('/')))
+        self.assertEqual(len(os.listdir(directory)), 1)
+    
+    def test_reject_non_image_content_type(self):
+        """测试拒绝非图片类型的文件"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        document = SimpleUploadedFile('notes.txt', b'hello', content_type='text/plain')
+        
+        response = self._post('文本活动', [document])
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('images', response.data)
+        self.assertFalse(Activity.objects.filter(title='文本活动').exists())
+    
+    def test_reject_fake_image(self):
+        """测试拒绝内容不是图片的文件"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        fake = SimpleUploadedFile('fake.jpg', b'not really a jpeg', content_type='image/jpeg')
+        
+        response = self._post('伪造活动', [fake])
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('not a supported image', response.data['images'][0])
+    
+    def test_reject_oversized_file(self):
+        """测试拒绝超过大小限制的文件"""
+        with self.settings(UPLOAD_MAX_IMAGE_SIZE=100):
+            response = self._post('超大活动', [self._jpeg()])
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('exceeds', response.data['images'][0])
+    
+    def test_reject_oversized_request(self):
+        """测试请求体超过限制时在读取前拒绝"""
+        with self.settings(UPLOAD_MAX_REQUEST_SIZE=100):
+            response = self._post('超大请求', [self._jpeg()])
+        
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+
+class ActivityIncrementalStatsTestCase(APITestCase):
+    """测试增量维护的首页统计"""
+    
+    def setUp(self):
+        from . import stats
+        self.stats = stats
+        self.category = ActivityCategory.objects.create(name='统计分类')
+        self.activity = self._create_activity('approved')
+        stats.activity_stats.invalidate()
+    
+    def _create_activity(self, approval_status, hours=3):
+        start = timezone.now() - timedelta(days=2)
+        return Activity.objects.create(
+            title='统计活动', description='测试', organizer_id=1,
+            organizer_name='Organizer', organizer_email='organizer@test.com',
+            category=self.category, location='测试地点',
+            start_date=start, end_date=start + timedelta(hours=hours),
+            max_participants=10, approval_status=approval_status
+        )
+    
+    def _participant(self, activity, user_id, status='registered'):
+        return ActivityParticipant.objects.create(
+            activity=activity, user_id=user_id, user_name='User',
+            user_email='user@test.com', status=status
+        )
+    
+    def _stored(self):
+        from .models import ActivityStats
+        return ActivityStats.objects.values('approved_activities', 'completed_seconds').get()
+    
+    def test_counters_follow_changes(self):
+        """测试审批、完成、改期、删除后计数与全量重算一致"""
+        pending = self._create_activity('pending')
+        first = self._participant(self.activity, 1)
+        second = self._participant(pending, 2, status='completed')
+        self.assertEqual(self._stored(), self.stats.compute_stats())
+        
+        pending.approval_status = 'approved'
+        pending.save()
+        first.status = 'completed'
+        first.save()
+        first.save()  # 重复保存不应重复计数
+        self.assertEqual(self._stored(), self.stats.compute_stats())
+        self.assertEqual(self._stored()['completed_seconds'], 6 * 3600)
+        
+        self.activity.end_date = self.activity.end_date + timedelta(hours=1)
+        self.activity.save()
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(self._stored(), self.stats.compute_stats())
+        
+        pending.delete()
+        self.assertFalse(ActivityParticipant.objects.filter(pk=second.pk).exists())
+        self.assertEqual(self._stored(), {'approved_activities': 1, 'completed_seconds': 0})
+    
+    def test_hot_path_has_no_queries(self):
+        """测试统计接口命中快照时不查询数据库"""
+        self._participant(self.activity, 1, status='completed')
+        url = reverse('activity-stats')
+        self.client.get(url)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.data, {'total_activities': 1, 'total_hours': 3.0})
+    
+    def test_missing_stats_row_is_rebuilt(self):
+        """测试统计行缺失时接口重建统计行而不会死锁"""
+        from .models import ActivityStats
+        self._participant(self.activity, 1, status='completed')
+        ActivityStats.objects.all().delete()
+        self.stats.activity_stats.invalidate()
+        
+        response = self.client.get(reverse('activity-stats'))
+        
+        self.assertEqual(response.data, {'total_activities': 1, 'total_hours': 3.0})
+        self.assertEqual(self._stored(), self.stats.compute_stats())
+    
+    def test_snapshot_refreshes_after_write(self):
+        """测试本进程写入后快照立即失效"""
+        url = reverse('activity-stats')
+        self.assertEqual(self.client.get(url).data['total_activities'], 1)
+        
+        self._create_activity('approved')
+        
+        self.assertEqual(self.client.get(url).data['total_activities'], 2)
+    
+    def test_rebuild_command_repairs_drift(self):
+        """测试绕过信号的批量更新可以通过重建命令修复"""
+        from django.core.management import call_command
+        from io import StringIO
+        
+        Activity.objects.update(approval_status='rejected')
+        self.assertEqual(self._stored()['approved_activities'], 1)
+        
+        call_command('rebuild_stats', stdout=StringIO())
+        
+        self.assertEqual(self._stored()['approved_activities'], 0)
+        self.assertEqual(self.client.get(reverse('activity-stats')).data['total_activities'], 0)
+
+
+@override_settings(EVENT_BROKER_URL='memory://')
+class ParticipationEventTestCase(APITestCase):
+    """测试参与事件的发件箱和发布"""
+    
+    def setUp(self):
+        from .broker import get_broker
+        self.broker = get_broker()
+        self.broker.clear()
+        category = ActivityCategory.objects.create(name='事件分类')
+        start = timezone.now() - timedelta(days=3)
+        self.activity = Activity.objects.create(
+            title='事件活动', description='测试', organizer_id=1,
+            organizer_name='Organizer', organizer_email='organizer@test.com',
+            category=category, location='测试地点',
+            start_date=start, end_date=start + timedelta(hours=4),
+            max_participants=10, approval_status='approved'
+        )
+    
+    def _participant(self, user_id=7):
+        return ActivityParticipant.objects.create(
+            activity=self.activity, user_id=user_id, user_name='User', user_email='user@test.com'
+        )
+    
+    def _messages(self):
+        return self.broker.read('participation', 0, 1000)[0]
+    
+    def _relay(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('publish_participation_events', once=True, stdout=StringIO())
+    
+    def test_event_requires_atomic_block(self):
+        """测试在事务之外记录事件会报错"""
+        from django.db import connection, transaction
+        from .events import record_participation_event
+        participant = self._participant()
+        
+        with unittest.mock.patch.object(connection, 'in_atomic_block', False):
+            with self.assertRaises(transaction.TransactionManagementError):
+                record_participation_event(participant)
+    
+    @unittest.mock.patch('requests.post')
+    def test_outbox_failure_rolls_back_application(self, mock_post):
+        """测试发件箱写入失败时报名一并回滚"""
+        from django.db import DatabaseError
+        from .models import ParticipationEvent
+        volunteer = type('User', (), {
+            'id': 2, 'username': 'volunteer', 'email': 'volunteer@test.com', 'role': 'volunteer',
+            'is_authenticated': True, 'is_anonymous': False, 'first_name': '', 'last_name': '',
+        })()
+        self.client.force_authenticate(user=volunteer)
+        
+        with unittest.mock.patch.object(ParticipationEvent.objects, 'create', side_effect=DatabaseError('outbox down')):
+            with self.assertRaises(DatabaseError):
+                self.client.post(reverse('participant-list'), {'activity': self.activity.id}, format='json')
+        
+        self.assertFalse(ActivityParticipant.objects.exists())
+    
+    def test_lifecycle_events_published_by_relay(self):
+        """测试报名、完成、删除只写入发件箱，由中继进程发布"""
+        from .models import EventSource, ParticipationEvent
+        with self.captureOnCommitCallbacks(execute=True):
+            participant = self._participant()
+        with self.captureOnCommitCallbacks(execute=True):
+            participant.status = 'completed'
+            participant.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            participant.delete()
+        self.assertEqual(self._messages(), [])
+        self.assertEqual(ParticipationEvent.objects.filter(published_at__isnull=True).count(), 3)
+        
+        self._relay()
+        
+        messages = self._messages()
+        self.assertEqual([message['type'] for message in messages], [
+            'participation.upserted', 'participation.upserted', 'participation.deleted'
+        ])
+        self.assertEqual(messages[1]['status'], 'completed')
+        self.assertEqual(messages[1]['hours'], 4)
+        self.assertEqual(messages[2]['user_id'], 7)
+        self.assertEqual([message['id'] for message in messages],
+                         list(ParticipationEvent.objects.values_list('id', flat=True)))
+        self.assertFalse(ParticipationEvent.objects.filter(published_at__isnull=True).exists())
+        # 事件 id 只在本数据库内唯一，消息带上数据库的来源标识
+        source = str(EventSource.objects.get().source)
+        self.assertEqual({message['source'] for message in messages}, {source})
+    
+    def test_broker_failure_keeps_events_pending(self):
+        """测试代理不可用时事件保留为待发送，之后由中继补发"""
+        from django.core.management.base import CommandError
+        from .broker import BrokerError
+        from .models import ParticipationEvent
+        
+        self._participant()
+        failing = unittest.mock.Mock()
+        failing.publish.side_effect = BrokerError('down')
+        with unittest.mock.patch('activities.events.get_broker', return_value=failing):
+            with self.assertRaisesMessage(CommandError, 'down'):
+                self._relay()
+        self.assertEqual(ParticipationEvent.objects.filter(published_at__isnull=True).count(), 1)
+        
+        self._relay()
+        
+        self.assertEqual(len(self._messages()), 1)
+        self.assertFalse(ParticipationEvent.objects.filter(published_at__isnull=True).exists())
+    
+    def test_relay_keeps_polling_after_broker_failure(self):
+        """测试持续运行的中继在代理故障后继续轮询并补发"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .broker import BrokerError
+        
+        self._participant()
+        failing = unittest.mock.Mock()
+        failing.publish.side_effect = BrokerError('down')
+        command = 'activities.management.commands.publish_participation_events'
+        with unittest.mock.patch('activities.events.get_broker', side_effect=[failing, self.broker]), \
+                unittest.mock.patch(f'{command}.time.sleep', side_effect=[None, KeyboardInterrupt]):
+            with self.assertLogs(command, level='ERROR'), self.assertRaises(KeyboardInterrupt):
+                call_command('publish_participation_events', stdout=StringIO())
+        
+        self.assertEqual(len(self._messages()), 1)
+    
+    def test_replay_and_snapshot(self):
+        """测试重放已存储事件和为现有报名生成快照事件"""
+        from io import StringIO
+        from django.core.management import call_command
+        self._participant(1)
+        self._participant(2)
+        
+        call_command('replay_participation_events', stdout=StringIO())
+        self.assertEqual([message['user_id'] for message in self._messages()], [1, 2])
+        
+        self.broker.clear()
+        call_command('replay_participation_events', snapshot=True, stdout=StringIO())
+        messages = self._messages()
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(all(message['type'] == 'participation.upserted' for message in messages))
+    
+    def test_file_broker_offsets(self):
+        """测试文件代理按字节偏移读取，忽略未写完的行"""
+        import tempfile
+        from .broker import create_broker
+        with tempfile.TemporaryDirectory() as directory:
+            broker = create_broker(f'file://{directory}')
+            broker.publish('topic', [{'id': 1}, {'id': 2}])
+            first, offset = broker.read('topic', 0, 1)
+            rest, end = broker.read('topic', offset, 10)
+            with open(f'{directory}/topic.jsonl', 'a') as log:
+                log.write('{"id": 3')
+            tail, same = broker.read('topic', end, 10)
+        
+        self.assertEqual(first, [{'id': 1}])
+        self.assertEqual(rest, [{'id': 2}])
+        self.assertEqual((tail, same), ([], end))
+
+
+class ParticipantUserEnrichmentTestCase(APITestCase):
+    """测试参与者列表通过批量查询补全用户信息"""
+    
+    def setUp(self):
+        category = ActivityCategory.objects.create(name='补全分类')
+        self.activity = Activity.objects.create(
+            title='补全活动', description='测试', organizer_id=1,
+            organizer_name='Organizer', organizer_email='organizer@test.com',
+            category=category, location='测试地点',
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10, approval_status='approved'
+        )
+        for user_id in (11, 12, 13):
+            ActivityParticipant.objects.create(
+                activity=self.activity, user_id=user_id, user_name=f'Old {user_id}',
+                user_email=f'old{user_id}@test.com'
+            )
+        organizer = type('User', (), {
+            'id': 1, 'username': 'organizer', 'role': 'organizer',
+            'is_authenticated': True, 'is_anonymous': False,
+        })()
+        self.client.force_authenticate(user=organizer)
+        self.url = reverse('participant-list')
+    
+    @unittest.mock.patch('activities.user_directory.requests.post')
+    def test_list_resolves_users_in_one_call(self, mock_post):
+        """测试整页参与者只发起一次批量查询并使用最新信息"""
+        mock_post.return_value.json.return_value = {
+            'users': [
+                {'id': 11, 'first_name': 'New', 'last_name': 'Name', 'email': 'new11@test.com',
+                 'phone': '555', 'avatar': 'http://media/a.png'},
+                {'id': 12, 'first_name': '', 'last_name': '', 'username': 'user12', 'email': 'new12@test.com',
+                 'phone': '', 'avatar': None},
+            ],
+            'missing': [13],
+        }
+        
+        response = self.client.get(self.url, {'activity': self.activity.id})
+        
+        mock_post.assert_called_once()
+        self.assertEqual(mock_post.call_args.kwargs['json']['ids'], [11, 12, 13])
+        self.assertIn('X-Service-Token', mock_post.call_args.kwargs['headers'])
+        rows = {row['user_id']: row for row in response.data['results']}
+        self.assertEqual(rows[11]['user_name'], 'New Name')
+        self.assertEqual(rows[11]['user_avatar'], 'http://media/a.png')
+        self.assertEqual(rows[12]['user_name'], 'user12')
+        self.assertEqual(rows[13]['user_name'], 'Old 13')
+    
+    @unittest.mock.patch('activities.user_directory.requests.post')
+    def test_lookup_failure_keeps_stored_copies(self, mock_post):
+        """测试用户服务不可用时保留本地副本"""
+        import requests
+        mock_post.side_effect = requests.exceptions.ConnectionError('down')
+        
+        with self.assertLogs('activities.user_directory', level='WARNING'):
+            response = self.client.get(self.url, {'activity': self.activity.id})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(sorted(row['user_email'] for row in response.data['results']),
+                         ['old11@test.com', 'old12@test.com', 'old13@test.com'])
+
+
+@override_settings(
+    EVENT_BROKER_URL='memory://',
+    SERVICE_TOKEN_SIGNING_KEYS=['new-key', 'old-key'],
+    SERVICE_TOKEN_TTL=900,
+    SERVICE_TOKEN_REVOCATION_POLL=0,
+)
+class SignedServiceTokenAuthenticationTestCase(APITestCase):
+    """测试本地校验签名服务令牌（不调用用户服务）"""
+    
+    def setUp(self):
+        from .broker import get_broker
+        from .service_tokens import revocations
+        self.broker = get_broker()
+        self.broker.clear()
+        revocations.reset()
+    
+    def _authenticate(self, token):
+        from rest_framework.test import APIRequestFactory
+        from .authentication import SignedServiceTokenAuthentication
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return SignedServiceTokenAuthentication().authenticate(request)
+    
+    @unittest.mock.patch('activities.authentication.requests.get')
+    def test_valid_token_builds_user_without_network(self, mock_get):
+        """测试有效令牌直接构造 MockUser"""
+        from .service_tokens import issue_service_token
+        token, _ = issue_service_token({
+            'id': 7, 'username': 'organizer', 'email': 'org@test.com', 'first_name': 'Org',
+            'last_name': 'User', 'role': 'organizer', 'phone': '555',
+        })
+        
+        user, auth = self._authenticate(token)
+        
+        mock_get.assert_not_called()
+        self.assertEqual(auth, token)
+        self.assertEqual((user.id, user.role, user.email, user.phone), (7, 'organizer', 'org@test.com', '555'))
+        self.assertTrue(user.is_authenticated)
+    
+    def test_token_signed_with_rotated_out_key_rejected(self):
+        """测试仅接受配置中的密钥签发的令牌"""
+        from rest_framework.exceptions import AuthenticationFailed
+        from .service_tokens import issue_service_token
+        with self.settings(SERVICE_TOKEN_SIGNING_KEYS=['old-key']):
+            old_token, _ = issue_service_token({'id': 7})
+        with self.settings(SERVICE_TOKEN_SIGNING_KEYS=['retired-key']):
+            retired_token, _ = issue_service_token({'id': 7})
+        
+        self.assertEqual(self._authenticate(old_token)[0].id, 7)
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(retired_token)
+    
+    def test_revoked_token_rejected(self):
+        """测试用户服务发布撤销后令牌失效"""
+        import time
+        from .service_tokens import issue_service_token
+        token, _ = issue_service_token({'id': 7, 'role': 'volunteer'})
+        self.broker.publish('token-revocations', [
+            {'user_id': 7, 'revoked_at': time.time() + 1, 'expires_at': time.time() + 900},
+        ])
+        
+        response = self.client.get(reverse('activity-list'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(str(response.data['detail']), 'Service token has been revoked.')
+    
+    def test_revocation_limited_to_issuing_token(self):
+        """测试按 sid 撤销只影响同一 API 令牌签发的服务令牌"""
+        import time
+        from rest_framework.exceptions import AuthenticationFailed
+        from .service_tokens import issue_service_token
+        revoked, _ = issue_service_token({'id': 7}, 'device-a')
+        other, _ = issue_service_token({'id': 7}, 'device-b')
+        self.broker.publish('token-revocations', [
+            {'user_id': 7, 'sid': 'device-a', 'revoked_at': time.time() + 1, 'expires_at': time.time() + 900},
+        ])
+        
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(revoked)
+        self.assertEqual(self._authenticate(other)[0].id, 7)
+
+
+class RequestTimingTestCase(APITestCase):
+    """测试本服务的出站调用计入请求计时"""
+    
+    def setUp(self):
+        from service_common.metrics import registry
+        registry.clear()
+        self.url = reverse('activity-list')
+    
+    def test_outbound_http_time_measured(self):
+        """测试出站 HTTP 调用（向用户服务校验令牌）计入 http 耗时"""
+        import re
+        import time
+        import requests
+        
+        def slow_send(adapter, request, **kwargs):
+            time.sleep(0.02)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"id": 5, "username": "volunteer", "role": "volunteer"}'
+            return response
+        
+        with unittest.mock.patch('requests.adapters.HTTPAdapter.send', slow_send):
+            response = self.client.get(self.url, HTTP_AUTHORIZATION='Token abc')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        http_ms = float(re.search(r'http;dur=([\d.]+)', response['Server-Timing']).group(1))
+        self.assertGreaterEqual(http_ms, 20)
+
+
+class MetricsTestCase(APITestCase):
+    """测试本服务的 Prometheus 指标（响应缓存命中率）"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from service_common.metrics import registry
+        cache.clear()
+        registry.clear()
+    
+    def test_cache_hit_ratio(self):
+        """测试公共响应缓存的命中与未命中计数"""
+        from . import cache as activity_cache
+        
+        for _ in range(3):
+            activity_cache.get_or_compute('metrics-test', lambda: {'value': 1})
+        
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('cache_requests_total{cache="activity-response",result="hit"} 2', body)
+        self.assertIn('cache_requests_total{cache="activity-response",result="miss"} 1', body)
+
+
+class ActivityQueryCountTestCase(APITestCase):
+    """测试列表接口不逐行查询关联数据"""
+    
+    def setUp(self):
+        self.category = ActivityCategory.objects.create(name='检测分类')
+        for index in range(6):
+            activity = Activity.objects.create(
+                title=f'活动{index}',
+                description='测试',
+                organizer_id=1,
+                organizer_name='Organizer',
+                organizer_email='org@test.com',
+                category=self.category,
+                location='地点',
+                start_date=timezone.now() + timedelta(days=1),
+                end_date=timezone.now() + timedelta(days=1, hours=2),
+                max_participants=10,
+                approval_status='approved'
+            )
+            ActivityParticipant.objects.create(
+                activity=activity, user_id=100 + index, user_name='Volunteer',
+                user_email='v@test.com', status='approved'
+            )
+    
+    def test_full_activity_list_counts_participants_in_one_query(self):
+        """测试完整格式列表的参与人数随列表查询取得（不再逐行 COUNT）"""
+        admin = type('User', (), {
+            'id': 9, 'username': 'admin', 'email': 'admin@test.com', 'role': 'admin',
+            'is_authenticated': True, 'is_anonymous': False,
+        })()
+        self.client.force_authenticate(user=admin)
+        
+        response = self.client.get(reverse('activity-list'), {'view': 'full'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['participants_count'] for item in response.data['results']}, {1})
+        self.assertEqual({item['available_spots'] for item in response.data['results']}, {9})
+    
+    def test_participant_list_loads_activity_titles_with_rows(self):
+        """测试参与者列表的活动标题随同一查询取得"""
+        organizer = type('User', (), {
+            'id': 1, 'username': 'org', 'email': 'org@test.com', 'role': 'organizer',
+            'is_authenticated': True, 'is_anonymous': False,
+        })()
+        self.client.force_authenticate(user=organizer)
+        
+        with unittest.mock.patch('activities.user_directory.UserDirectory._fetch', return_value={}):
+            response = self.client.get('/api/v1/participants/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertTrue(all(item['activity_title'].startswith('活动') for item in response.data['results']))
+
+
+class StructuredLoggingTestCase(APITestCase):
+    """测试本服务视图的结构化日志（请求 id 写入记录并转发给出站调用）"""
+    
+    def _handler(self, logger_name, **kwargs):
+        import io
+        import logging
+        from service_common.logs import QueueJSONHandler
+        stream = kwargs.pop('stream', None) or io.StringIO()
+        handler = QueueJSONHandler(stream=stream, **kwargs)
+        logger = logging.getLogger(logger_name)
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(handler.close)
+        self.addCleanup(logger.removeHandler, handler)
+        self.addCleanup(setattr, logger, 'propagate', True)
+        return handler, stream
+    
+    def _records(self, handler, stream):
+        import json
+        handler.flush()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+    
+    def test_view_logs_json_with_request_id_and_forwards_it(self):
+        """测试视图日志以 JSON 输出并带有请求 id，出站调用转发同一 id"""
+        import requests
+        activity = Activity.objects.create(
+            title='日志活动', description='测试', organizer_id=1, organizer_name='Org',
+            organizer_email='org@test.com', location='地点',
+            category=ActivityCategory.objects.create(name='日志分类'),
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=1, hours=2),
+            max_participants=10, approval_status='approved',
+        )
+        participant = ActivityParticipant.objects.create(
+            activity=activity, user_id=2, user_name='Volunteer User', user_email='volunteer@test.com', status='applied',
+        )
+        organizer = type('User', (), {
+            'id': 1, 'username': 'org', 'email': 'org@test.com', 'role': 'organizer',
+            'is_authenticated': True, 'is_anonymous': False,
+        })()
+        forwarded = []
+        
+        def unreachable(adapter, request, **kwargs):
+            forwarded.append(request.headers.get('X-Request-ID'))
+            raise requests.exceptions.ConnectionError('notification service down')
+        
+        handler, stream = self._handler('activities.views')
+        self.client.force_authenticate(user=organizer)
+        with unittest.mock.patch('requests.adapters.HTTPAdapter.send', unreachable):
+            response = self.client.patch(
+                reverse('participant-detail', kwargs={'pk': participant.pk}), {'status': 'approved'}, format='json',
+                HTTP_X_REQUEST_ID='req-123',
+            )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(forwarded), {'req-123'})
+        records = self._records(handler, stream)
+        approved = next(record for record in records if record['level'] == 'INFO')
+        failed = next(record for record in records if record['level'] == 'WARNING')
+        self.assertEqual(approved['participant_id'], participant.pk)
+        self.assertIn('notification service down', failed['message'])
+        self.assertEqual({record['request_id'] for record in records}, {'req-123'})
+
+
+class SeedDataTestCase(TestCase):
+    """测试合成数据生成（seed_data 命令）"""
+    
+    def _rows(self):
+        activities = list(Activity.objects.order_by('pk').values_list(
+            'title', 'organizer_id', 'latitude', 'start_date', 'status', 'approval_status'
+        ))
+        participants = list(ActivityParticipant.objects.order_by('pk').values_list(
+            'activity_id', 'user_id', 'status', 'registered_at'
+        ))
+        return activities, participants
+    
+    def test_same_seed_same_rows(self):
+        """测试相同的种子与规模生成相同的数据"""
+        from .seeding import seed
+        counts = seed(scale=0.002, seed=7)
+        self.assertEqual(counts['activities'], 200)
+        self.assertEqual(counts['participants'], 2000)
+        first = self._rows()
+        ActivityParticipant.objects.all().delete()
+        Activity.objects.all().delete()
+        seed(scale=0.002, seed=7)
+        # 活动 id 不同，比较除 id 外的内容
+        activities, participants = self._rows()
+        self.assertEqual(activities, first[0])
+        self.assertEqual([row[1:] for row in participants], [row[1:] for row in first[1]])
+        ActivityParticipant.objects.all().delete()
+        Activity.objects.all().delete()
+        seed(scale=0.002, seed=8)
+        self.assertNotEqual(self._rows()[0], first[0])
+    
+    def test_participants_consistent_with_activities(self):
+        """测试参与者唯一、只报名已批准活动，且状态与日期一致"""
+        from .seeding import seed
+        from .synthetic import anchor
+        seed(scale=0.002, seed=1)
+        now = anchor()
+        pairs = list(ActivityParticipant.objects.values_list('activity_id', 'user_id'))
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertFalse(ActivityParticipant.objects.exclude(activity__approval_status='approved').exists())
+        for participant in ActivityParticipant.objects.select_related('activity'):
+            activity = participant.activity
+            self.assertGreaterEqual(participant.registered_at, activity.created_at)
+            self.assertLessEqual(participant.registered_at, min(activity.start_date, now))
+            if activity.end_date < now:
+                self.assertNotIn(participant.status, ('applied', 'approved', 'registered'))
+            else:
+                self.assertNotIn(participant.status, ('attended', 'completed', 'no_show'))
+            self.assertEqual(participant.completed_at is not None, participant.status == 'completed')
+            self.assertEqual(participant.cancelled_at is not None, participant.status == 'cancelled')
+        # 统计行随数据一起重建
+        from .models import ActivityStats
+        from .stats import compute_stats
+        row = ActivityStats.objects.get()
+        self.assertEqual(
+            (row.approved_activities, row.completed_seconds),
+            tuple(compute_stats()[name] for name in ('approved_activities', 'completed_seconds')),
+        )
+    
+    def test_command(self):
+        """测试命令只在空库中生成，--categories-only 可重复执行，--copy 需要 PostgreSQL"""
+        from io import StringIO
+        from django.core.management import CommandError, call_command
+        from .seeding import CATEGORIES
+        
+        call_command('seed_data', categories_only=True, stdout=StringIO())
+        call_command('seed_data', categories_only=True, stdout=StringIO())
+        self.assertEqual(ActivityCategory.objects.count(), len(CATEGORIES))
+        self.assertFalse(Activity.objects.exists())
+        with self.assertRaisesMessage(CommandError, 'PostgreSQL'):
+            call_command('seed_data', copy=True, stdout=StringIO())
+        
+        out = StringIO()
+        call_command('seed_data', scale=0.001, stdout=out)
+        self.assertIn('activities=100', out.getvalue())
+        with self.assertRaisesMessage(CommandError, 'already has activities'):
+            call_command('seed_data', scale=0.001, stdout=StringIO())
+    
+    def test_copy_format(self):
+        """测试 COPY 文本格式的转义与空值"""
+        from datetime import datetime, timezone as dt_timezone
+        from decimal import Decimal
+        from .synthetic import copy_formatter
+        
+        def field(name):
+            return copy_formatter(Activity._meta.get_field(name))
+        
+        self.assertEqual(field('title')('a\tb\\c\nd'), 'a\\tb\\\\c\\nd')
+        self.assertEqual(field('approved_at')(None), '\\N')
+        self.assertEqual(field('is_featured')(True), 't')
+        self.assertEqual(field('required_skills')(['first aid', 'tab\t']), '["first aid", "tab\\\\t"]')
+        self.assertEqual(field('latitude')(Decimal('51.507400')), '51.507400')
+        self.assertEqual(
+            field('start_date')(datetime(2024, 5, 1, 9, 30, tzinfo=dt_timezone.utc)), '2024-05-01T09:30:00+00:00'
+        )
+
+
+class DatabaseConnectionSettingsTestCase(TestCase):
+    """测试数据库持久连接与 PgBouncer 事务模式的配置"""
+    
+    def _load(self, **environ):
+        import importlib.util
+        from pathlib import Path
+        from unittest import mock
+        from django.conf import settings
+        path = Path(settings.BASE_DIR) / 'activity_service/settings/base.py'
+        with mock.patch.dict('os.environ', environ):
+            spec = importlib.util.spec_from_file_location('settings_under_test', path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        return module.DATABASES['default']
+    
+    def test_persistent_connections_with_health_checks(self):
+        """测试默认保留连接并在复用前检查，可用 DB_CONN_MAX_AGE=0 关闭"""
+        database = self._load(USE_SQLITE='False')
+        self.assertEqual(database['CONN_MAX_AGE'], 600)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertFalse(database['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertEqual(database['OPTIONS']['application_name'], 'activity-service')
+        self.assertEqual(self._load(USE_SQLITE='False', DB_CONN_MAX_AGE='0')['CONN_MAX_AGE'], 0)
+        self.assertEqual(self._load(USE_SQLITE='True')['CONN_MAX_AGE'], 600)
+    
+    def test_pgbouncer_transaction_mode(self):
+        """测试事务模式关闭服务端游标，未知模式报错"""
+        database = self._load(USE_SQLITE='False', DB_POOL_MODE='transaction')
+        self.assertTrue(database['DISABLE_SERVER_SIDE_CURSORS'])
+        with self.assertRaises(ValueError):
+            self._load(DB_POOL_MODE='statement')
+    
+    def test_open_connections_gauge_counts_every_thread(self):
+        """测试连接数指标包含其他线程（gthread worker）的持久连接"""
+        import threading
+        from django.db import connection
+        from service_common.metrics import _open_connections
+        
+        connection.ensure_connection()
+        opened, release = threading.Event(), threading.Event()
+        
+        def worker():
+            from django.db import connection
+            connection.ensure_connection()
+            opened.set()
+            release.wait(5)
+        
+        thread = threading.Thread(target=worker)
+        thread.start()
+        self.assertTrue(opened.wait(5))
+        try:
+            self.assertEqual(_open_connections()[('default',)], 2)
+        finally:
+            release.set()
+            thread.join()
+
+
+class ServiceSecretSettingsTestCase(TestCase):
+    """测试服务间密钥在关闭 DEBUG 时必须显式配置"""
+    
+    def _load(self, **environ):
+        import importlib.util
+        from pathlib import Path
+        from unittest import mock
+        from django.conf import settings
+        path = Path(settings.BASE_DIR) / 'activity_service/settings/base.py'
+        environ.setdefault('INTERNAL_SERVICE_TOKEN', '')
+        environ.setdefault('SERVICE_TOKEN_SIGNING_KEYS', '')
+        with mock.patch.dict('os.environ', environ):
+            spec = importlib.util.spec_from_file_location('settings_under_test', path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        return module
+    
+    def test_internal_service_token_required_without_debug(self):
+        """测试生产环境缺少内部服务令牌时拒绝启动，DEBUG 下回退到开发令牌"""
+        from django.core.exceptions import ImproperlyConfigured
+        with self.assertRaisesMessage(ImproperlyConfigured, 'INTERNAL_SERVICE_TOKEN'):
+            self._load(DEBUG='False')
+        module = self._load(DEBUG='False', INTERNAL_SERVICE_TOKEN='rotated-token', SERVICE_TOKEN_SIGNING_KEYS='key')
+        self.assertEqual(module.INTERNAL_SERVICE_TOKEN, 'rotated-token')
+        self.assertTrue(self._load(DEBUG='True').INTERNAL_SERVICE_TOKEN)
+    
+    def test_signing_keys_required_without_debug(self):
+        """测试生产环境缺少服务令牌签名密钥时拒绝启动，DEBUG 下回退到开发密钥"""
+        from django.core.exceptions import ImproperlyConfigured
+        with self.assertRaisesMessage(ImproperlyConfigured, 'SERVICE_TOKEN_SIGNING_KEYS'):
+            self._load(DEBUG='False', INTERNAL_SERVICE_TOKEN='token')
+        module = self._load(DEBUG='False', SERVICE_TOKEN_SIGNING_KEYS='new, old', INTERNAL_SERVICE_TOKEN='token')
+        self.assertEqual(module.SERVICE_TOKEN_SIGNING_KEYS, ['new', 'old'])
+        self.assertTrue(self._load(DEBUG='True').SERVICE_TOKEN_SIGNING_KEYS)
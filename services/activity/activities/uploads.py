@@ -0,0 +1,153 @@
+"""
+Streaming image uploads.
+
+``HashingUploadHandler`` replaces Django's default upload handlers for image
+endpoints: each chunk is checked, hashed and written to a temporary file as
+it arrives, so nothing is buffered in memory and oversized or non-image
+files are rejected after their first chunk instead of after the whole
+request has been read. Files are then stored under their SHA-256
+(``save_content_addressed``), which deduplicates identical uploads and lets
+``FileSystemStorage`` move the temporary file into place instead of copying.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# 文件头魔数 -> 扩展名；只接受这些图片格式
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+ALLOWED_IMAGE_CONTENT_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp')
+
+
+def sniff_image_extension(header):
+    """Return the extension matching the file's magic bytes, or None."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Upload exceeds the maximum request size.'
+    default_code = 'request_too_large'
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Write image uploads to disk chunk by chunk while hashing them.
+
+    Rejected files are skipped and the reason is appended to
+    ``request.upload_errors``; the completed file carries ``sha256`` and
+    ``detected_extension`` attributes.
+    """
+
+    def __init__(self, request=None, max_file_size=None):
+        super().__init__(request)
+        self.max_file_size = max_file_size or settings.UPLOAD_MAX_IMAGE_SIZE
+        if request is not None and not hasattr(request, 'upload_errors'):
+            request.upload_errors = []
+
+    def _reject(self, message):
+        if self.request is not None:
+            self.request.upload_errors.append(message)
+        raise SkipFile()
+
+    def new_file(self, field_name, file_name, content_type, content_length, *args, **kwargs):
+        if content_type not in ALLOWED_IMAGE_CONTENT_TYPES:
+            self._reject(f'{file_name}: unsupported file type {content_type}')
+        if content_length is not None and content_length > self.max_file_size:
+            self._reject(f'{file_name}: file exceeds {self.max_file_size} bytes')
+        super().new_file(field_name, file_name, content_type, content_length, *args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.detected_extension = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            self.detected_extension = sniff_image_extension(raw_data)
+            if self.detected_extension is None:
+                self._reject(f'{self.file_name}: not a supported image')
+        if start + len(raw_data) > self.max_file_size:
+            self._reject(f'{self.file_name}: file exceeds {self.max_file_size} bytes')
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.sha256.hexdigest()
+        uploaded.detected_extension = self.detected_extension
+        return uploaded
+
+
+class StreamingUploadMixin:
+    """
+    View mixin installing ``HashingUploadHandler`` on multipart requests.
+
+    The declared ``Content-Length`` is checked against
+    ``UPLOAD_MAX_REQUEST_SIZE`` before the body is read.
+    """
+    upload_max_file_size = None
+
+    @staticmethod
+    def is_multipart(request):
+        return request.META.get('CONTENT_TYPE', '').startswith('multipart/form-data')
+
+    def initialize_request(self, request, *args, **kwargs):
+        if self.is_multipart(request):
+            request.upload_handlers = [HashingUploadHandler(request, self.upload_max_file_size)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self.is_multipart(request):
+            return
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > settings.UPLOAD_MAX_REQUEST_SIZE:
+            raise RequestTooLarge()
+
+    def get_upload_errors(self, request):
+        """Reasons the upload handler rejected files (parses the body if needed)."""
+        request.data  # 触发请求体解析
+        return getattr(request._request, 'upload_errors', [])
+
+
+def content_hash(uploaded_file):
+    """SHA-256 of an uploaded file, reusing the digest computed while streaming."""
+    digest = getattr(uploaded_file, 'sha256', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        sha256.update(chunk)
+    uploaded_file.seek(0)
+    return sha256.hexdigest()
+
+
+def save_content_addressed(uploaded_file, prefix):
+    """
+    Store an upload as ``<prefix>/<aa>/<sha256><ext>`` and return its
+    storage name. Identical content is stored once.
+    """
+    digest = content_hash(uploaded_file)
+    extension = (
+        getattr(uploaded_file, 'detected_extension', None)
+        or os.path.splitext(uploaded_file.name)[1].lower()
+    )
+    name = f'{prefix}/{digest[:2]}/{digest}{extension}'
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, uploaded_file)
@@ -8,6 +8,7 @@ from .views import (
     ActivityParticipantViewSet,
     AdminActivityApprovalViewSet,
     ActivityCategoryViewSet,
+    ActivityTagViewSet,
     ActivityStatsView,
     health,
 )
@@ -21,5 +22,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('stats/', ActivityStatsView.as_view(), name='activity-stats'),
     path('categories/', ActivityCategoryViewSet.as_view(), name='activity-categories'),
+    path('tags/', ActivityTagViewSet.as_view(), name='activity-tags'),
     path('health/', health, name='health'),
 ]
@@ -0,0 +1,68 @@
+"""
+Request-scoped client for the user service's internal batch user lookup.
+
+The activity service keeps copies of user names and emails on its rows;
+``UserDirectory`` resolves the current values for many users with one
+``POST /api/v1/internal/users/batch/`` call and memoizes the answer for the
+rest of the request, so rendering a participant list costs a single round
+trip however many participants it has. Lookup failures are logged and
+resolve to None, and callers keep the stored copies.
+"""
+import logging
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = '/api/v1/internal/users/batch/'
+# 与用户服务 UserBatchLookupSerializer.MAX_IDS 保持一致
+MAX_IDS_PER_CALL = 500
+FIELDS = ['first_name', 'last_name', 'username', 'email', 'phone', 'avatar']
+
+
+class UserDirectory:
+    """
+    Memoizing user lookups for one request. Unknown users, and users whose
+    lookup failed, resolve to None and are not retried within the request.
+    """
+
+    def __init__(self):
+        self._users = {}
+
+    def _fetch(self, user_ids):
+        try:
+            response = requests.post(
+                f'{settings.USER_SERVICE_URL}{BATCH_PATH}',
+                json={'ids': user_ids, 'fields': FIELDS},
+                headers={'X-Service-Token': settings.INTERNAL_SERVICE_TOKEN},
+                timeout=settings.USER_LOOKUP_TIMEOUT,
+            )
+            response.raise_for_status()
+            return {user['id']: user for user in response.json()['users']}
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as exc:
+            logger.warning('Batch user lookup for %d users failed: %s', len(user_ids), exc)
+            return {}
+
+    def prefetch(self, user_ids):
+        """Resolve every not yet known id in ``user_ids`` (one call per 500 ids)."""
+        missing = sorted({int(user_id) for user_id in user_ids if user_id} - self._users.keys())
+        for start in range(0, len(missing), MAX_IDS_PER_CALL):
+            chunk = missing[start:start + MAX_IDS_PER_CALL]
+            self._users.update(dict.fromkeys(chunk))
+            self._users.update(self._fetch(chunk))
+
+    def get(self, user_id):
+        """Current user data dict for ``user_id``, or None."""
+        if user_id not in self._users:
+            self.prefetch([user_id])
+        return self._users.get(user_id)
+
+
+def get_user_directory(request):
+    """The ``UserDirectory`` of ``request`` (DRF or Django), created on first use."""
+    request = getattr(request, '_request', request)
+    directory = getattr(request, 'user_directory', None)
+    if directory is None:
+        directory = request.user_directory = UserDirectory()
+    return directory
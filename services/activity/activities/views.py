@@ -1,6 +1,8 @@
 """
 Views for activities app.
 """
+import logging
+
 from rest_framework import generics, status, permissions, viewsets
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
@@ -9,22 +11,35 @@ from rest_framework.permissions import AllowAny
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
-from .authentication import UserServiceTokenAuthentication
+from .authentication import SignedServiceTokenAuthentication, UserServiceTokenAuthentication
+from .renderers import FastJSONRenderer
+from rest_framework.renderers import BrowsableAPIRenderer
+from django.conf import settings
+from . import cache as activity_cache
+from .compression import mark_precompressible
+from .conditional import ConditionalGetMixin, make_weak_etag
+from .reference import reference_data
+from .stats import activity_stats
+from .uploads import StreamingUploadMixin
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Q, Sum, F, ExpressionWrapper, fields
+from django.db import transaction
+from django.db.models import Q
 from .models import (
     ActivityCategory, Activity, ActivityParticipant, ActivityReview,
     ActivityTag, ActivityTagMapping, ActivityLike, ActivityShare
 )
 from .serializers import (
-    ActivityCategorySerializer, ActivitySerializer, ActivityCreateSerializer,
+    ActivityCategorySerializer, ActivitySerializer, ActivityCardSerializer, ActivityCardValuesSerializer,
+    ActivityCreateSerializer,
     ActivityApprovalSerializer, ActivityStatusUpdateSerializer, ActivityParticipantSerializer,
     ActivityParticipantApplicationSerializer, ActivityParticipantApprovalSerializer,
     ActivityReviewSerializer, ActivityTagSerializer, ActivityTagMappingSerializer,
     ActivityLikeSerializer, ActivityShareSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 # 自定义权限类
 class ActivityPermission(permissions.BasePermission):
     """
@@ -86,7 +101,7 @@ class ActivityPermission(permissions.BasePermission):
         return False
 
 
-class ActivityCategoryViewSet(generics.ListAPIView):
+class ActivityCategoryViewSet(ConditionalGetMixin, generics.ListAPIView):
     """
     List all activity categories.
     """
@@ -95,8 +110,20 @@ class ActivityCategoryViewSet(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
     authentication_classes = []  # 完全禁用认证
 
+    def list(self, request, *args, **kwargs):
+        # 分类数据来自进程内缓存，不访问数据库
+        categories = reference_data.categories()
+        etag = make_weak_etag(
+            request.path,
+            reference_data.version,
+            activity_cache.normalize_query_params(request.query_params),
+        )
+        return self.conditional_response(
+            request, (etag, None), lambda: self.get_cached_list_data(categories)
+        )
+
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(StreamingUploadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     List and create activities.
     """
@@ -108,27 +135,83 @@ class ActivityViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'start_date', 'views_count', 'likes_count']
     ordering = ['-created_at']
     permission_classes = [ActivityPermission]  # 使用自定义权限类
-    authentication_classes = [UserServiceTokenAuthentication]  # 使用跨服务认证
+    authentication_classes = [UserServiceTokenAuthentication, SignedServiceTokenAuthentication]  # 使用跨服务认证
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    # 查询预算（query_inspection）：参与人数与分类名不随行数增加查询；
+    # 含参考数据刷新（2 条）与首次读取时生成图片变体（2 条）
+    query_budget = {'list': 6, 'retrieve': 5}
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return ActivityCreateSerializer
+        # 列表默认返回精简的卡片格式；?view=full 或 ?fields= 返回完整字段
+        if self.action == 'list':
+            params = self.request.query_params
+            if params.get('view') != 'full' and not params.get('fields'):
+                return ActivityCardSerializer
         return ActivitySerializer
 
+    def get_list_data(self, queryset):
+        # 默认卡片格式走 values() 快速序列化路径
+        use_fast_path = (
+            settings.FAST_LIST_SERIALIZATION
+            and self.get_serializer_class() is ActivityCardSerializer
+            and not self.request.query_params.get('omit')
+        )
+        if not use_fast_path:
+            return super().get_list_data(queryset)
+        serializer = ActivityCardValuesSerializer(context=self.get_serializer_context())
+        rows = serializer.prepare(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page)).data
+        return serializer.serialize(rows)
+
+    def list(self, request, *args, **kwargs):
+        # 匿名用户和志愿者看到的数据相同，走共享响应缓存
+        if not activity_cache.is_cacheable_request(request):
+            return super().list(request, *args, **kwargs)
+
+        def compute():
+            queryset = self.filter_queryset(self.get_queryset())
+            return self.get_list_validators(queryset), self.get_list_data(queryset)
+
+        key = activity_cache.build_cache_key(request, 'list')
+        validators, data = activity_cache.get_or_compute(key, compute)
+        response = self.conditional_response(request, validators, lambda: data)
+        # 压缩后的响应体与缓存条目一同存储，命中时无需重复压缩
+        return mark_precompressible(response, key, settings.ACTIVITY_RESPONSE_CACHE_TIMEOUT)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not activity_cache.is_cacheable_request(request):
+            return super().retrieve(request, *args, **kwargs)
+
+        def compute():
+            instance = self.get_object()
+            return self.get_object_validators(instance), self.get_serializer(instance).data
+
+        key = activity_cache.build_cache_key(request, 'detail')
+        validators, data = activity_cache.get_or_compute(key, compute)
+        response = self.conditional_response(request, validators, lambda: data)
+        # 压缩后的响应体与缓存条目一同存储，命中时无需重复压缩
+        return mark_precompressible(response, key, settings.ACTIVITY_RESPONSE_CACHE_TIMEOUT)
+
+    def create(self, request, *args, **kwargs):
+        # 上传处理器在读取请求体时已拒绝超限或非图片文件
+        upload_errors = self.get_upload_errors(request)
+        if upload_errors:
+            return Response({'images': upload_errors}, status=status.HTTP_400_BAD_REQUEST)
+        return super().create(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         activity = serializer.save()
-        print("\n" + "="*60)
-        print(f"📢 新活动已创建:")
-        print(f"   活动ID: {activity.id}")
-        print(f"   活动名称: {activity.title}")
-        print(f"   创建者: {activity.organizer_name} (ID: {activity.organizer_id})")
-        print(f"   创建者邮箱: {activity.organizer_email}")
-        print(f"   审批状态: {activity.approval_status}")
-        print("="*60)
-        print("正在发送通知给管理员...")
+        logger.info(
+            'Activity %s created by organizer %s, approval status %s',
+            activity.id, activity.organizer_id, activity.approval_status,
+            extra={'activity_id': activity.id, 'organizer_id': activity.organizer_id},
+        )
         # NGO 创建活动后通知所有管理员
         self._notify_admins_new_activity(activity)
-        print("="*60 + "\n")
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -153,6 +236,18 @@ class ActivityViewSet(viewsets.ModelViewSet):
             # 未登录用户只能看到已批准的活动
             return queryset.filter(approval_status='approved')
     
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # 只查询当前字段集需要的列，参与人数随同一查询取得
+        if self.action in ('list', 'retrieve'):
+            serializer = self.get_serializer()
+            columns = serializer.get_required_columns()
+            if self.action == 'retrieve':
+                # 对象权限与条件请求校验读取这些列，避免延迟加载逐列查询
+                columns |= {'approval_status', 'organizer_id', self.last_modified_field}
+            queryset = serializer.annotate_queryset(queryset.only(*columns))
+        return queryset
+    
     @action(detail=True, methods=['patch'], permission_classes=[permissions.IsAuthenticated])
     def approve(self, request, pk=None):
         """
@@ -244,14 +339,17 @@ class ActivityViewSet(viewsets.ModelViewSet):
                 )
                 
                 if response.status_code == 201:
-                    print(f"Notification sent successfully for activity {activity.id}")
+                    logger.debug('Approval notification sent for activity %s', activity.id)
                 else:
-                    print(f"Failed to send notification: {response.status_code}")
+                    logger.warning(
+                        'Notification service answered %s to the approval notification for activity %s',
+                        response.status_code, activity.id,
+                    )
             except requests.exceptions.RequestException as e:
-                print(f"Error sending notification: {e}")
+                logger.warning('Sending the approval notification for activity %s failed: %s', activity.id, e)
                 
-        except Exception as e:
-            print(f"Error in _send_approval_notification: {e}")
+        except Exception:
+            logger.exception('Approval notification for activity %s failed', activity.id)
     
     def _get_approval_message(self, activity_id, approval_status, admin_notes=None):
         """
@@ -292,17 +390,17 @@ class ActivityViewSet(viewsets.ModelViewSet):
                     )
                     if response.status_code == 200:
                         admins = response.json()
-                        print(f"Successfully fetched {len(admins)} admin(s) from user service")
+                        logger.debug('Fetched %d admin(s) from the user service', len(admins))
                 except (requests.exceptions.RequestException, requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
                     # Log the error but continue with fallback logic
-                    print(f"⚠️  Failed to fetch admin list from user service: {type(e).__name__}: {str(e)}")
+                    logger.warning('Fetching the admin list from the user service failed: %s: %s', type(e).__name__, e)
                 
                 # 如果API调用失败，使用默认管理员ID列表
                 if not admins:
                     # 根据您的数据库，管理员ID是8
                     default_admin_ids = [8]  # admin@volunteer-platform.com
                     
-                    print(f"⚠ Unable to fetch admin list from API, using default admin IDs: {default_admin_ids}")
+                    logger.info('No admin list from the user service, using default admin ids %s', default_admin_ids)
                     
                     for admin_id in default_admin_ids:
                         if admin_id == 8:
@@ -319,10 +417,9 @@ class ActivityViewSet(viewsets.ModelViewSet):
                                 'first_name': 'Admin',
                                 'last_name': str(admin_id)
                             })
-                    print(f"✓ Using admin list: {len(admins)} admin(s) - IDs: {default_admin_ids}")
                     
-            except Exception as e:
-                print(f"Error fetching admin users: {e}")
+            except Exception:
+                logger.exception('Fetching admin users failed')
                 # 最小化fallback：至少通知ID为8的管理员
                 admins = [{'id': 8, 'email': 'admin@volunteer-platform.com', 'first_name': 'Admin', 'last_name': 'User'}]
             
@@ -364,7 +461,7 @@ Start Date: {activity.start_date}
                         headers={'Content-Type': 'application/json'}
                     )
                     
-                    print(f"Notification service response for admin {admin_id}: {response.status_code}")
+                    logger.debug('Notification service answered %s for admin %s', response.status_code, admin_id)
                     
                     # 同时在用户服务中创建通知
                     user_notification_data = {
@@ -380,20 +477,21 @@ Start Date: {activity.start_date}
                         timeout=5
                     )
                     
-                    print(f"User service notification response for admin {admin_id}: {user_response.status_code}")
+                    logger.debug('User service answered %s for admin %s', user_response.status_code, admin_id)
                     
                     if response.status_code in [200, 201]:
-                        print(f"✓ Notification sent to admin {admin_id} ({admin_name}) for activity {activity.id}")
+                        logger.debug('Admin %s notified of activity %s', admin_id, activity.id)
                     else:
-                        print(f"✗ Failed to send notification to admin {admin_id}: {response.status_code} - {response.text}")
+                        logger.warning(
+                            'Notifying admin %s of activity %s failed: %s %s',
+                            admin_id, activity.id, response.status_code, response.text[:200],
+                        )
                         
                 except requests.exceptions.RequestException as e:
-                    print(f"✗ Error sending notification to admin {admin_id}: {e}")
+                    logger.warning('Notifying admin %s of activity %s failed: %s', admin_id, activity.id, e)
                     
-        except Exception as e:
-            print(f"✗ Error in _notify_admins_new_activity: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception('Notifying admins of activity %s failed', activity.id)
 
 
 
@@ -405,7 +503,7 @@ class AdminActivityApprovalViewSet(viewsets.ModelViewSet):
     queryset = Activity.objects.all()
     serializer_class = ActivityApprovalSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [UserServiceTokenAuthentication]
+    authentication_classes = [UserServiceTokenAuthentication, SignedServiceTokenAuthentication]
     
     def get_queryset(self):
         # 管理员可获取所有活动，方便对任意状态执行审批动作
@@ -496,14 +594,17 @@ class AdminActivityApprovalViewSet(viewsets.ModelViewSet):
                 )
                 
                 if response.status_code == 201:
-                    print(f"Notification sent successfully for activity {activity.id}")
+                    logger.debug('Approval notification sent for activity %s', activity.id)
                 else:
-                    print(f"Failed to send notification: {response.status_code}")
+                    logger.warning(
+                        'Notification service answered %s to the approval notification for activity %s',
+                        response.status_code, activity.id,
+                    )
             except requests.exceptions.RequestException as e:
-                print(f"Error sending notification: {e}")
+                logger.warning('Sending the approval notification for activity %s failed: %s', activity.id, e)
                 
-        except Exception as e:
-            print(f"Error in _send_approval_notification: {e}")
+        except Exception:
+            logger.exception('Approval notification for activity %s failed', activity.id)
     
     def _get_approval_message(self, activity_id, approval_status, admin_notes=None):
         """
@@ -528,6 +629,7 @@ class ActivityParticipantViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['activity', 'status', 'user_id']
+    query_budget = {'list': 4, 'retrieve': 3}
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -598,10 +700,12 @@ class ActivityParticipantViewSet(viewsets.ModelViewSet):
                     requests.post('http://notification-service:8000/api/v1/notifications/', json=notification_data, timeout=5)
                 except requests.exceptions.RequestException as e:
                     # Log notification failure but don't block the main operation
-                    print(f"⚠️  Failed to send notification: {type(e).__name__}: {str(e)}")
-        except Exception as e:
+                    logger.warning(
+                        'Notifying the organizer of application %s failed: %s: %s', participant.id, type(e).__name__, e,
+                    )
+        except Exception:
             # Log unexpected errors but don't block the response
-            print(f"⚠️  Unexpected error in participant creation: {type(e).__name__}: {str(e)}")
+            logger.exception('Notifying the organizer of a new application failed')
         return response
     
     def update(self, request, *args, **kwargs):
@@ -617,19 +721,12 @@ class ActivityParticipantViewSet(viewsets.ModelViewSet):
         # 如果状态发生变化（从pending变为approved或rejected），发送通知
         new_status = serializer.instance.status
         if old_status != new_status and new_status in ['approved', 'rejected']:
-            print("\n" + "="*60)
-            print(f"📢 志愿者申请审批:")
-            print(f"   申请ID: {instance.id}")
-            print(f"   志愿者: {instance.user_name} (ID: {instance.user_id})")
-            print(f"   志愿者邮箱: {instance.user_email}")
-            print(f"   活动ID: {instance.activity_id}")
-            print(f"   审批状态: {old_status} → {new_status}")
-            print("="*60)
-            print("正在发送通知给志愿者...")
-            
+            logger.info(
+                'Application %s of user %s for activity %s changed from %s to %s',
+                instance.id, instance.user_id, instance.activity_id, old_status, new_status,
+                extra={'participant_id': instance.id, 'activity_id': instance.activity_id},
+            )
             self._notify_volunteer_application_result(serializer.instance)
-            
-            print("="*60 + "\n")
         
         return Response(serializer.data)
     
@@ -638,6 +735,19 @@ class ActivityParticipantViewSet(viewsets.ModelViewSet):
         kwargs['partial'] = True
         return self.update(request, *args, **kwargs)
     
+    # 参与者变更与其发件箱事件（activities.events）在同一事务中写入
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+    
     def _notify_volunteer_application_result(self, participant):
         """通知志愿者申请审批结果"""
         try:
@@ -647,8 +757,6 @@ class ActivityParticipantViewSet(viewsets.ModelViewSet):
             # 获取活动详情
             activity = Activity.objects.get(id=participant.activity_id)
             
-            print(f"   活动详情: {activity.title}")
-            
             # 根据审批结果设置不同的通知内容
             if participant.status == 'approved':
                 title = 'Application Approved'
@@ -659,8 +767,7 @@ class ActivityParticipantViewSet(viewsets.ModelViewSet):
                 message = f"Sorry, your application for activity \"{activity.title}\" has been rejected."
                 notification_type = 'volunteer_rejection'
             
-            print(f"   通知标题: {title}")
-            print(f"   通知内容: {message}")
+            logger.debug('Notifying user %s: %s', participant.user_id, title)
             
             # 创建通知服务的通知
             notification_data = {
@@ -677,13 +784,12 @@ class ActivityParticipantViewSet(viewsets.ModelViewSet):
             
             try:
                 # 发送到通知服务
-                print(f"   → 发送通知到通知服务 (recipient_id={participant.user_id})...")
                 response = requests.post(
                     'http://notification-service:8000/api/v1/notifications/',
                     json=notification_data,
                     timeout=5
                 )
-                print(f"   ← 通知服务响应: {response.status_code}")
+                logger.debug('Notification service answered %s for user %s', response.status_code, participant.user_id)
                 
                 # 同时在用户服务中创建通知
                 user_notification_data = {
@@ -693,29 +799,28 @@ class ActivityParticipantViewSet(viewsets.ModelViewSet):
                     'message': message,
                     'activity_id': participant.activity_id,
                 }
-                print(f"   → 发送通知到用户服务 (user_id={participant.user_id})...")
                 user_response = requests.post(
                     'http://user-service:8000/api/v1/notifications/create/',
                     json=user_notification_data,
                     timeout=5
                 )
-                print(f"   ← 用户服务响应: {user_response.status_code}")
+                logger.debug('User service answered %s for user %s', user_response.status_code, participant.user_id)
                 
                 if response.status_code in [200, 201]:
-                    print(f"   ✓ 志愿者通知发送成功 (participant_id={participant.id}, user_id={participant.user_id})")
+                    logger.debug('User %s notified of application %s', participant.user_id, participant.id)
                 else:
-                    print(f"   ✗ 志愿者通知发送失败: {response.status_code} - {response.text}")
+                    logger.warning(
+                        'Notifying user %s of application %s failed: %s %s',
+                        participant.user_id, participant.id, response.status_code, response.text[:200],
+                    )
             except requests.exceptions.RequestException as e:
-                print(f"   ✗ 发送志愿者通知时出错: {e}")
-                import traceback
-                traceback.print_exc()
-        except Exception as e:
-            print(f"   ✗ _notify_volunteer_application_result 错误: {e}")
-            import traceback
-            traceback.print_exc()
+                logger.warning('Notifying user %s of application %s failed: %s', participant.user_id, participant.id, e)
+        except Exception:
+            logger.exception('Notifying the volunteer of application %s failed', participant.id)
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # activity_title 读取 activity.title，随参与者一并查询
+        queryset = super().get_queryset().select_related('activity')
         
         # 根据用户角色过滤参与者
         if self.request.user.is_authenticated and hasattr(self.request.user, 'role'):
@@ -748,22 +853,17 @@ class ActivityParticipantApprovalView(generics.UpdateAPIView):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        
-        print("\n" + "="*60)
-        print(f"📢 志愿者申请审批:")
-        print(f"   申请ID: {instance.id}")
-        print(f"   志愿者: {instance.user_name} (ID: {instance.user_id})")
-        print(f"   志愿者邮箱: {instance.user_email}")
-        print(f"   活动ID: {instance.activity_id}")
-        print(f"   审批状态: {instance.status}")
-        print("="*60)
-        print("正在发送通知给志愿者...")
+        # 与发件箱事件在同一事务中写入
+        with transaction.atomic():
+            serializer.save()
         
+        logger.info(
+            'Application %s of user %s for activity %s set to %s',
+            instance.id, instance.user_id, instance.activity_id, instance.status,
+            extra={'participant_id': instance.id, 'activity_id': instance.activity_id},
+        )
         # 审批后通知志愿者
         self._notify_volunteer_application_result(instance)
-        
-        print("="*60 + "\n")
         return Response(serializer.data)
     
     def _notify_volunteer_application_result(self, participant):
@@ -777,8 +877,6 @@ class ActivityParticipantApprovalView(generics.UpdateAPIView):
             # 获取活动详情
             activity = Activity.objects.get(id=participant.activity_id)
             
-            print(f"   活动详情: {activity.title}")
-            
             # 根据审批结果设置不同的通知内容
             if participant.status == 'approved':
                 title = 'Application Approved'
@@ -789,8 +887,7 @@ class ActivityParticipantApprovalView(generics.UpdateAPIView):
                 message = f"Sorry, your application for activity \"{activity.title}\" has been rejected."
                 notification_type = 'volunteer_rejection'
             
-            print(f"   通知标题: {title}")
-            print(f"   通知内容: {message}")
+            logger.debug('Notifying user %s: %s', participant.user_id, title)
             
             # 创建通知服务的通知
             notification_data = {
@@ -807,13 +904,12 @@ class ActivityParticipantApprovalView(generics.UpdateAPIView):
             
             try:
                 # 发送到通知服务
-                print(f"   → 发送通知到通知服务 (recipient_id={participant.user_id})...")
                 response = requests.post(
                     'http://notification-service:8000/api/v1/notifications/',
                     json=notification_data,
                     timeout=5
                 )
-                print(f"   ← 通知服务响应: {response.status_code}")
+                logger.debug('Notification service answered %s for user %s', response.status_code, participant.user_id)
                 
                 # 同时在用户服务中创建通知
                 user_notification_data = {
@@ -823,26 +919,24 @@ class ActivityParticipantApprovalView(generics.UpdateAPIView):
                     'message': message,
                     'activity_id': participant.activity_id,
                 }
-                print(f"   → 发送通知到用户服务 (user_id={participant.user_id})...")
                 user_response = requests.post(
                     'http://user-service:8000/api/v1/notifications/create/',
                     json=user_notification_data,
                     timeout=5
                 )
-                print(f"   ← 用户服务响应: {user_response.status_code}")
+                logger.debug('User service answered %s for user %s', user_response.status_code, participant.user_id)
                 
                 if response.status_code in [200, 201]:
-                    print(f"   ✓ 志愿者通知发送成功 (participant_id={participant.id}, user_id={participant.user_id})")
+                    logger.debug('User %s notified of application %s', participant.user_id, participant.id)
                 else:
-                    print(f"   ✗ 志愿者通知发送失败: {response.status_code} - {response.text}")
+                    logger.warning(
+                        'Notifying user %s of application %s failed: %s %s',
+                        participant.user_id, participant.id, response.status_code, response.text[:200],
+                    )
             except requests.exceptions.RequestException as e:
-                print(f"   ✗ 发送志愿者通知时出错: {e}")
-                import traceback
-                traceback.print_exc()
-        except Exception as e:
-            print(f"   ✗ _notify_volunteer_application_result 错误: {e}")
-            import traceback
-            traceback.print_exc()
+                logger.warning('Notifying user %s of application %s failed: %s', participant.user_id, participant.id, e)
+        except Exception:
+            logger.exception('Notifying the volunteer of application %s failed', participant.id)
 
 
 class ActivityReviewViewSet(generics.ListCreateAPIView):
@@ -856,7 +950,7 @@ class ActivityReviewViewSet(generics.ListCreateAPIView):
     filterset_fields = ['activity', 'rating', 'is_verified']
 
 
-class ActivityTagViewSet(generics.ListAPIView):
+class ActivityTagViewSet(ConditionalGetMixin, generics.ListAPIView):
     """
     List all activity tags.
     """
@@ -864,6 +958,17 @@ class ActivityTagViewSet(generics.ListAPIView):
     serializer_class = ActivityTagSerializer
     permission_classes = [permissions.AllowAny]
 
+    def list(self, request, *args, **kwargs):
+        tags = reference_data.tags()
+        etag = make_weak_etag(
+            request.path,
+            reference_data.version,
+            activity_cache.normalize_query_params(request.query_params),
+        )
+        return self.conditional_response(
+            request, (etag, None), lambda: self.get_cached_list_data(tags)
+        )
+
 
 class ActivityLikeView(generics.CreateAPIView):
     """
@@ -923,24 +1028,12 @@ class ActivityShareView(generics.CreateAPIView):
 class ActivityStatsView(APIView):
     """
     Provides statistics about activities.
+    
+    Served from the incrementally maintained stats snapshot (see
+    ``activities.stats``); no aggregation runs per request.
     """
     def get(self, request, *args, **kwargs):
-        total_activities = Activity.objects.filter(approval_status='approved').count()
-        
-        # Calculate total volunteer hours
-        completed_participations = ActivityParticipant.objects.filter(status='completed')
-        total_hours = completed_participations.annotate(
-            duration=ExpressionWrapper(F('activity__end_date') - F('activity__start_date'), output_field=fields.DurationField())
-        ).aggregate(total_duration=Sum('duration'))['total_duration']
-        
-        total_hours_in_hours = 0
-        if total_hours:
-            total_hours_in_hours = total_hours.total_seconds() / 3600
-
-        return Response({
-            'total_activities': total_activities,
-            'total_hours': round(total_hours_in_hours, 2),
-        }, status=status.HTTP_200_OK)
+        return Response(activity_stats.get(), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -0,0 +1,10 @@
+"""
+Settings for the test suite:
+``python manage.py test activities --settings=activity_service.test_settings``.
+"""
+import os
+
+# 读取服务设置之前选择丢弃日志输出，测试不打印 JSON 记录（assertLogs 自带处理器，不受影响）
+os.environ.setdefault('LOG_HANDLER', 'null')
+
+from .settings import *
@@ -9,3 +9,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'activity_service.settings')
 
 application = get_wsgi_application()
+
+# 启动时预加载分类/标签缓存；数据库未就绪时首次请求再加载
+from django.db import DatabaseError
+from activities.reference import reference_data
+
+try:
+    reference_data.warm()
+except DatabaseError:
+    pass
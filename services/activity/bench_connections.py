@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Measure what persistent database connections save per request.
+
+Sends the same anonymous activity detail requests through Django's WSGI
+handler with ``CONN_MAX_AGE = 0`` (a new connection for every request,
+Django's default) and with persistent connections (``DB_CONN_MAX_AGE``),
+and reports the latency percentiles and the connections opened per
+request.
+Response caching is switched off so every request reaches the database.
+Runs against a throwaway test database seeded with ``seed_data``'s
+generator, so the local db.sqlite3 is never touched; with ``--postgres``
+the ``DB_*`` settings are used, which is where connection setup (TCP,
+authentication, session setup) costs the most.
+
+Usage: python bench_connections.py [--requests N] [--postgres]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+import django
+
+if '--postgres' in sys.argv:
+    os.environ['USE_SQLITE'] = 'False'
+# 只测量请求本身：关闭开发用的检查与日志
+os.environ.update({'DEBUG': 'False', 'QUERY_INSPECTION': 'False', 'LOG_LEVEL': 'WARNING'})
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'activity_service.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from django.test.utils import override_settings, setup_test_environment
+
+from activities import seeding
+from activities.models import Activity
+
+
+def percentile(sorted_samples, fraction):
+    return sorted_samples[max(0, min(len(sorted_samples) - 1, round(fraction * len(sorted_samples)) - 1))]
+
+
+def run(handler, ids, count, max_age):
+    """Latencies (ms) of ``count`` requests and the connections opened for them."""
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = max_age
+    opened = []
+
+    def count_connection(sender, **kwargs):
+        opened.append(1)
+
+    connection_created.connect(count_connection)
+    rng = random.Random(1)
+    latencies = []
+    try:
+        for _ in range(count):
+            # 测试客户端不会在请求之间关闭连接：直接调用 WSGI 处理器，
+            # 关闭响应时触发 request_finished（close_old_connections）
+            environ = RequestFactory()._base_environ(PATH_INFO=f'/api/v1/activities/{rng.choice(ids)}/')
+            statuses = []
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers: statuses.append(status))
+            b''.join(response)
+            response.close()
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert statuses[0].startswith('200'), statuses[0]
+    finally:
+        connection_created.disconnect(count_connection)
+    latencies.sort()
+    return latencies, len(opened)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--postgres', action='store_true', help='use the DB_* PostgreSQL settings')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', message='No directory at')
+    setup_test_environment(debug=False)
+    override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}).enable()
+    persistent = settings.DATABASES['default']['CONN_MAX_AGE'] or 600
+    old_name = connection.settings_dict['NAME']
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == 'sqlite':
+            # 内存中的测试库不会关闭连接：使用临时文件
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            seeding.seed(scale=0.01)
+            ids = list(Activity.objects.filter(approval_status='approved').values_list('pk', flat=True))
+            handler = WSGIHandler()
+            run(handler, ids, 50, persistent)  # 预热
+            results = [
+                (f'CONN_MAX_AGE={max_age}', *run(handler, ids, args.requests, max_age)) for max_age in (0, persistent)
+            ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print(f'{connection.vendor}, {args.requests} requests')
+    print(f'{"connections":<18} {"p50 ms":>8} {"p95 ms":>8} {"mean ms":>8} {"opened/request":>15}')
+    for name, latencies, opened in results:
+        print(
+            f'{name:<18} {percentile(latencies, 0.5):>8.3f} {percentile(latencies, 0.95):>8.3f} '
+            f'{sum(latencies) / len(latencies):>8.3f} {opened / len(latencies):>15.3f}'
+        )
+    saved = percentile(results[0][1], 0.5) - percentile(results[1][1], 0.5)
+    print(f'p50 saved by persistent connections: {saved:.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
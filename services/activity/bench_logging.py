@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Measure the request-path cost of the participant approval diagnostics.
+
+Compares, per request, the ``print()`` output the approval views used to
+write (a banner and step-by-step progress lines) with the structured
+records that replaced it (one INFO record and a few DEBUG records):
+
+``print``
+    The old output, written to stdout.
+``logging (sync)``
+    The new records, formatted as JSON and written by the request thread.
+``logging (queued)``
+    The new records through ``QueueJSONHandler`` and ``SamplingFilter``,
+    as configured in ``LOGGING``: the request thread only queues them.
+
+Output goes to a pipe drained by a reader thread, like a worker's stdout
+under a container runtime. ``--reader-delay-us`` slows the reader down
+to show what a lagging log collector does to each variant. Each request
+also waits ``--request-io-us`` (its database and HTTP calls), during
+which the listener thread can write; the figures are the time added to
+a request that does nothing but that wait: wall time, and CPU time of
+the request thread (which leaves out the writer thread's work).
+
+Usage: python bench_logging.py [--requests N] [--repeat N] [--line-buffered]
+       [--reader-delay-us N] [--request-io-us N] [--sample-rate R]
+"""
+import argparse
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'activity_service.settings')
+django.setup()
+
+from service_common import logs
+
+PARTICIPANT = {'id': 4211, 'user_id': 52, 'user_name': 'Volunteer User', 'user_email': 'volunteer@test.com'}
+ACTIVITY = {'id': 318, 'title': 'Community Garden Cleanup'}
+
+
+def print_diagnostics(out):
+    # 原审批视图在请求线程中输出的内容
+    p, a = PARTICIPANT, ACTIVITY
+    print("\n" + "=" * 60, file=out)
+    print("📢 志愿者申请审批:", file=out)
+    print(f"   申请ID: {p['id']}", file=out)
+    print(f"   志愿者: {p['user_name']} (ID: {p['user_id']})", file=out)
+    print(f"   志愿者邮箱: {p['user_email']}", file=out)
+    print(f"   活动ID: {a['id']}", file=out)
+    print("   审批状态: applied → approved", file=out)
+    print("=" * 60, file=out)
+    print("正在发送通知给志愿者...", file=out)
+    print(f"   活动详情: {a['title']}", file=out)
+    print("   通知标题: Application Approved", file=out)
+    print(f"   通知内容: Congratulations! Your application for activity \"{a['title']}\" has been approved.", file=out)
+    print(f"   → 发送通知到通知服务 (recipient_id={p['user_id']})...", file=out)
+    print("   ← 通知服务响应: 201", file=out)
+    print(f"   → 发送通知到用户服务 (user_id={p['user_id']})...", file=out)
+    print("   ← 用户服务响应: 201", file=out)
+    print(f"   ✓ 志愿者通知发送成功 (participant_id={p['id']}, user_id={p['user_id']})", file=out)
+    print("=" * 60 + "\n", file=out)
+
+
+def log_diagnostics(logger):
+    # 替换后的记录：一条 INFO，其余为按请求取样的 DEBUG
+    p, a = PARTICIPANT, ACTIVITY
+    logger.info(
+        'Application %s of user %s for activity %s changed from %s to %s',
+        p['id'], p['user_id'], a['id'], 'applied', 'approved',
+        extra={'participant_id': p['id'], 'activity_id': a['id']},
+    )
+    logger.debug('Notifying user %s: %s', p['user_id'], 'Application Approved')
+    logger.debug('Notification service answered %s for user %s', 201, p['user_id'])
+    logger.debug('User service answered %s for user %s', 201, p['user_id'])
+    logger.debug('User %s notified of application %s', p['user_id'], p['id'])
+
+
+def drain(fd, delay):
+    while os.read(fd, 65536):
+        if delay:
+            time.sleep(delay)
+
+
+def per_request(handle_request, count, repeat, settle, io_wait):
+    """
+    Best ``(wall time, request thread CPU time)`` per request over
+    ``repeat`` runs. ``settle()`` waits for the output and is not counted.
+    """
+    best = None
+    for _ in range(repeat):
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        for _ in range(count):
+            handle_request()
+            if io_wait:
+                time.sleep(io_wait)
+        elapsed = ((time.perf_counter() - started) / count, (time.thread_time() - cpu_started) / count)
+        settle()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--line-buffered', action='store_true', help='stdout as with a tty or PYTHONUNBUFFERED=1')
+    parser.add_argument('--reader-delay-us', type=float, default=0, help='pause of the reader after each read')
+    parser.add_argument('--request-io-us', type=float, default=200, help='time each request waits on I/O')
+    parser.add_argument('--sample-rate', type=float, default=0, help='LOG_DEBUG_SAMPLE_RATE (0: no debug records)')
+    args = parser.parse_args()
+
+    read_fd, write_fd = os.pipe()
+    threading.Thread(target=drain, args=(read_fd, args.reader_delay_us / 1e6), daemon=True).start()
+    out = io.TextIOWrapper(os.fdopen(write_fd, 'wb'), encoding='utf-8', line_buffering=args.line_buffered)
+
+    sync_handler = logging.StreamHandler(out)
+    sync_handler.setFormatter(logs.JSONFormatter())
+    queued_handler = logs.QueueJSONHandler(stream=out)
+    io_wait = args.request_io_us / 1e6
+    baseline = per_request(lambda: None, args.requests, args.repeat, lambda: None, io_wait)
+    results = [('print', per_request(lambda: print_diagnostics(out), args.requests, args.repeat, out.flush, io_wait))]
+    for name, handler in (('logging (sync)', sync_handler), ('logging (queued)', queued_handler)):
+        handler.addFilter(logs.SamplingFilter(args.sample_rate))
+        logger = logging.getLogger(f'bench_logging.{name}')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG if args.sample_rate > 0 else logging.INFO)
+        logger.addHandler(handler)
+
+        def handle_request(logger=logger):
+            # RequestIdMiddleware 为每个请求生成 id
+            token = logs._request_id.set(uuid.uuid4().hex)
+            try:
+                log_diagnostics(logger)
+            finally:
+                logs._request_id.reset(token)
+
+        results.append((name, per_request(handle_request, args.requests, args.repeat, handler.flush, io_wait)))
+
+    dropped = sum(value for _, value in logs.records_dropped.samples())
+    print(f'{"variant":<18} {"wall µs/request":>16} {"thread CPU µs/request":>22}')
+    for name, (wall, cpu) in results:
+        print(f'{name:<18} {(wall - baseline[0]) * 1e6:>16.2f} {(cpu - baseline[1]) * 1e6:>22.2f}')
+    print(f'queued records dropped: {dropped}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Microbenchmark for activity list serialization.
+
+Compares the default path (``ActivityCardSerializer`` + DRF ``JSONRenderer``)
+with the fast path (``ActivityCardValuesSerializer`` + ``FastJSONRenderer``)
+at 20, 200 and 2000 rows. Runs against a throwaway test database, so the
+local db.sqlite3 is never touched.
+
+Usage: python bench_serialization.py [--repeat N]
+"""
+import argparse
+import os
+import time
+from datetime import timedelta
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'activity_service.settings')
+django.setup()
+
+from django.db import connection
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from activities.models import Activity, ActivityCategory, ActivityParticipant
+from activities.renderers import FastJSONRenderer
+from activities.serializers import ActivityCardSerializer, ActivityCardValuesSerializer
+
+SIZES = (20, 200, 2000)
+
+
+def seed(total):
+    category = ActivityCategory.objects.create(name='Benchmark')
+    now = timezone.now()
+    Activity.objects.bulk_create([
+        Activity(
+            title=f'Activity {i}',
+            description='Benchmark activity',
+            organizer_id=1,
+            organizer_name='Organizer',
+            organizer_email='org@example.com',
+            category=category,
+            location='Somewhere',
+            start_date=now + timedelta(days=1),
+            end_date=now + timedelta(days=1, hours=2),
+            max_participants=20,
+            images=[f'activities/{i}.jpg'],
+            approval_status='approved',
+        )
+        for i in range(total)
+    ], batch_size=500)
+    ActivityParticipant.objects.bulk_create([
+        ActivityParticipant(
+            activity=activity,
+            user_id=n,
+            user_name=f'user{n}',
+            user_email=f'user{n}@example.com',
+            status='approved',
+        )
+        for activity in Activity.objects.all()
+        for n in range(3)
+    ], batch_size=500)
+
+
+def slow_path(queryset, request):
+    data = ActivityCardSerializer(queryset, many=True, context={'request': request}).data
+    return JSONRenderer().render(data)
+
+
+def fast_path(queryset, request):
+    serializer = ActivityCardValuesSerializer(context={'request': request})
+    return FastJSONRenderer().render(serializer.serialize(serializer.prepare(queryset)))
+
+
+def measure(func, queryset, request, repeat):
+    # 取多次运行中最快的一次，减少噪声
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(queryset, request)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(max(SIZES))
+        request = Request(APIRequestFactory().get('/api/v1/activities/'))
+        # 卡片序列化器需要 only() 后的查询集，与视图保持一致
+        columns = ActivityCardSerializer(context={'request': request}).get_required_columns()
+
+        print(f'{"rows":>6} {"serializer (ms)":>16} {"values (ms)":>12} {"rows/s slow":>12} {"rows/s fast":>12} {"speedup":>8}')
+        for size in SIZES:
+            queryset = Activity.objects.only(*columns).order_by('id')[:size]
+            slow = measure(slow_path, queryset, request, args.repeat)
+            fast = measure(fast_path, queryset, request, args.repeat)
+            print(f'{size:>6} {slow * 1000:>16.2f} {fast * 1000:>12.2f} '
+                  f'{size / slow:>12.0f} {size / fast:>12.0f} {slow / fast:>7.1f}x')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Gunicorn settings, read from the working directory at startup.
+
+Each worker thread keeps one persistent database connection (see
+``DB_CONN_MAX_AGE`` in the settings), so the service holds up to
+``workers × threads`` connections. The three services share one
+PostgreSQL database, so each gets a budget of ``DB_MAX_CONNECTIONS``:
+the default worker count is the usual ``2 × CPUs + 1`` capped by the
+budget, and a larger explicit ``GUNICORN_WORKERS``/``-w`` is logged at
+startup. Behind PgBouncer in transaction mode (``DB_POOL_MODE``) the
+budget applies to PgBouncer's server pool instead.
+
+Worker metrics files left in ``METRICS_MULTIPROC_DIR`` by a previous run
+would be merged into ``/metrics`` as exited workers, so the directory is
+emptied before the workers start (see ``service_common.metrics``).
+"""
+import glob
+import multiprocessing
+import os
+
+# 不直接导入 config：gunicorn 会把配置文件里名为 config 的对象当作设置项
+import decouple
+
+_db_max_connections = decouple.config('DB_MAX_CONNECTIONS', default=30, cast=int)
+
+threads = decouple.config('GUNICORN_THREADS', default=1, cast=int)
+workers = decouple.config(
+    'GUNICORN_WORKERS', default=min(multiprocessing.cpu_count() * 2 + 1, max(1, _db_max_connections // threads)),
+    cast=int,
+)
+
+
+def on_starting(server):
+    connections = server.cfg.workers * server.cfg.threads
+    if decouple.config('DB_POOL_MODE', default='session') == 'session' and connections > _db_max_connections:
+        server.log.warning(
+            '%d workers x %d threads may hold %d database connections, more than DB_MAX_CONNECTIONS=%d',
+            server.cfg.workers, server.cfg.threads, connections, _db_max_connections,
+        )
+    _clear_metrics_dir()
+
+
+def _clear_metrics_dir():
+    directory = decouple.config('METRICS_MULTIPROC_DIR', default='')
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')) + glob.glob(os.path.join(directory, '*.tmp')):
+        os.remove(path)
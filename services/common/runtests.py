@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Run the tests of the shared ``service_common`` package.
+
+The services install the package rather than copying it, so its tests run
+once, here, against minimal settings instead of in every service:
+``python runtests.py [-v 2] [test labels]``.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.test.utils import get_runner
+
+BASE_DIR = Path(__file__).resolve().parent
+
+SETTINGS = {
+    'BASE_DIR': BASE_DIR,
+    'SECRET_KEY': 'service-common-tests',
+    'DATABASES': {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+    'ROOT_URLCONF': 'service_common.tests',
+    'MIDDLEWARE': [
+        'service_common.logs.RequestIdMiddleware',
+        'service_common.timing.TimingMiddleware',
+        'service_common.query_inspection.QueryInspectionMiddleware',
+    ],
+    'USE_TZ': True,
+    # 与各服务 settings 中的同名配置对应
+    'METRICS_MULTIPROC_DIR': '',
+    'METRICS_FLUSH_INTERVAL': 5.0,
+    'REQUEST_TIMING_LOG': False,
+    'QUERY_INSPECTION': False,
+    'QUERY_INSPECTION_STRICT': False,
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'SLOW_QUERY_MS': 100,
+    'TEST_RUNNER': 'service_common.query_inspection.QueryInspectionTestRunner',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('labels', nargs='*', default=['service_common'])
+    parser.add_argument('-v', '--verbosity', type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BASE_DIR))
+    settings.configure(**SETTINGS)
+    django.setup()
+    runner = get_runner(settings)(verbosity=args.verbosity)
+    failures = runner.run_tests(args.labels)
+    sys.exit(bool(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+"""
+Code shared by the user, activity and notification services.
+
+Each service installs this package from ``services/common`` (see its
+``requirements.txt``) instead of keeping a copy. The modules only read
+Django settings, so every service configures them in its own settings.
+Run the package's tests with ``python runtests.py`` from
+``services/common``.
+"""
@@ -0,0 +1,223 @@
+"""
+Structured logging that keeps log I/O off the request thread.
+
+The ``LOGGING`` setting sends every record to ``QueueJSONHandler``. The
+thread that logs only puts the record on a bounded queue; a background
+writer thread formats it as one JSON object per line and writes it to
+stderr, one write for all the records queued meanwhile. If the stream
+cannot keep up and the queue fills, records are dropped (and counted in
+``log_records_dropped_total``) instead of blocking the request.
+
+Every record carries the id of the request it was logged in.
+``RequestIdMiddleware`` takes the id from the ``X-Request-ID`` header
+(set by the ingress or the calling service) or generates one, and
+returns it in the response. The ``requests`` hook of ``.timing`` forwards
+it on outbound calls, so one id follows a request across the services.
+
+Debug records are high-volume. ``SamplingFilter`` keeps the debug records
+of a ``LOG_DEBUG_SAMPLE_RATE`` fraction of requests. Requests are chosen
+by id, so a sampled request keeps all of its debug records. Records at
+INFO and above are always kept.
+
+The activity service's ``bench_logging.py`` compares the request-path
+cost with ``print()``.
+"""
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+
+from django.core.signals import request_finished
+
+from .metrics import registry
+
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# 外部传入的 id 只接受较短的安全字符，否则重新生成
+_VALID_REQUEST_ID = re.compile(r'[A-Za-z0-9._:-]{1,128}')
+
+# LogRecord 的标准属性；其余属性（extra=...）作为 JSON 字段输出
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+records_dropped = registry.counter(
+    'log_records_dropped_total', 'Log records dropped because the log queue was full.',
+)
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def current_request_id():
+    """The id of the request being handled, or None."""
+    return _request_id.get()
+
+
+class RequestIdMiddleware:
+    """Bind a request id to the request's log records and return it in ``X-Request-ID``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not _VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        # 不在返回时复位：Django 在中间件之外记录 4xx/5xx 响应（django.request），
+        # 由 request_finished 复位
+        _request_id.set(request_id)
+        response = self.get_response(request)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+def _request_finished(sender, **kwargs):
+    _request_id.set(None)
+
+
+request_finished.connect(_request_finished, dispatch_uid='logs_request_finished')
+
+
+class SamplingFilter(logging.Filter):
+    """Keep the DEBUG records of a ``rate`` fraction of requests and every other record."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        request_id = _request_id.get()
+        if request_id is None:
+            return random.random() < self.rate
+        # 按请求 id 取样：同一请求的调试记录要么全部保留，要么全部丢弃
+        return zlib.crc32(request_id.encode()) < self.rate * 2 ** 32
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request id and extra fields."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'process': record.process,
+        }
+        for name, value in record.__dict__.items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith('_'):
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# 写入线程每次最多取出的记录数
+WRITE_BATCH_SIZE = 256
+_STOP = object()
+
+
+class QueueJSONHandler(QueueHandler):
+    """
+    Queue records for a writer thread that writes them as JSON lines to
+    ``stream`` (stderr by default). Records that do not fit in the queue
+    (``queue_size``) are dropped.
+    """
+
+    def __init__(self, queue_size=10000, stream=None):
+        super().__init__(queue.Queue(queue_size))
+        self.setFormatter(JSONFormatter())
+        self.stream = sys.stderr if stream is None else stream
+        self._writer = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # fork 出的 worker 没有父进程的写入线程，队列的锁也可能处于被持有状态
+                self.queue = queue.Queue(self.queue.maxsize)
+            self._writer = threading.Thread(target=self._write, name='log-writer', daemon=True)
+            self._writer.start()
+            self._pid = os.getpid()
+
+    def _write(self):
+        # 一次取出队列中已有的全部记录（最多 WRITE_BATCH_SIZE 条），合并为一次写入
+        records = self.queue
+        while True:
+            batch = [records.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is _STOP:
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    self.handleError(record)
+            if lines:
+                try:
+                    self.stream.write('\n'.join(lines) + '\n')
+                    self.stream.flush()
+                except Exception:
+                    self.handleError(batch[-1])
+            for _ in batch:
+                records.task_done()
+            if batch[-1] is _STOP:
+                return
+
+    def prepare(self, record):
+        # 请求线程只合并消息参数并记下请求 id，JSON 格式化与写入留给写入线程
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        record.request_id = _request_id.get()
+        if record.exc_info:
+            # traceback 引用的栈帧会继续变化，在当前线程格式化
+            record.exc_text = self.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            records_dropped.inc()
+
+    def flush(self):
+        """Wait until the writer thread has written every queued record."""
+        if self._pid == os.getpid():
+            self.queue.join()
+
+    def close(self):
+        # logging.shutdown() 在退出时调用：写完队列中剩余的记录
+        if self._pid == os.getpid():
+            # 队列已满时等待空位
+            self.queue.put(_STOP)
+            self._writer.join()
+            self._pid = None
+        super().close()
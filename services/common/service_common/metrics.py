@@ -0,0 +1,342 @@
+"""
+Prometheus metrics in the text exposition format, without prometheus_client.
+
+Instruments are created on ``registry``:
+
+``registry.counter(name, help, labelnames)``
+    ``.inc(*labelvalues, amount=1)``.
+``registry.histogram(name, help, labelnames, buckets)``
+    ``.observe(value, *labelvalues)``.
+``registry.gauge(name, help, collect, labelnames)``
+    ``collect()`` returns ``{labelvalues: value}`` for this process and is
+    called whenever the registry is read.
+
+Gunicorn runs several worker processes, each with its own registry. When
+``METRICS_MULTIPROC_DIR`` is set, every worker writes its samples to
+``<dir>/<pid>.json`` at most every ``METRICS_FLUSH_INTERVAL`` seconds and
+when it answers a scrape, and ``metrics_view`` merges the files of all
+workers. Counters and histograms are summed over every file, so the counts
+of a worker that exited are kept. Gauges are summed over the workers that
+are still alive. The directory must be emptied when the server starts
+(``gunicorn.conf.py`` does this). Without the setting, each process reports
+only itself.
+
+Values that describe the whole service rather than one worker (e.g. the
+Celery queue depth) are computed at scrape time by collectors added with
+``registry.add_collector``.
+
+``/metrics`` is meant for the Prometheus scraper inside the cluster and is
+not routed by the ingress.
+"""
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+COUNTER, GAUGE, HISTOGRAM = 'counter', 'gauge', 'histogram'
+# 直方图桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames):
+        self._lock = registry._lock
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._samples = {}
+
+    def family(self):
+        return {'type': self.kind, 'help': self.help, 'labels': list(self.labelnames)}
+
+    def samples(self):
+        with self._lock:
+            return list(self._samples.items())
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class Counter(Metric):
+    kind = COUNTER
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._samples[labelvalues] = self._samples.get(labelvalues, 0) + amount
+
+
+class Histogram(Metric):
+    """Samples are ``[count per bucket..., count above the last bucket, sum]``."""
+    kind = HISTOGRAM
+
+    def __init__(self, registry, name, help_text, labelnames, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def family(self):
+        return {**super().family(), 'buckets': list(self.buckets)}
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._samples.get(labelvalues)
+            if series is None:
+                series = self._samples[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            return [(labelvalues, list(series)) for labelvalues, series in self._samples.items()]
+
+
+class Gauge(Metric):
+    kind = GAUGE
+
+    def __init__(self, registry, name, help_text, collect, labelnames):
+        super().__init__(registry, name, help_text, labelnames)
+        self._collect = collect
+
+    def samples(self):
+        try:
+            return list(self._collect().items())
+        except Exception:
+            logger.warning('Collecting gauge %s failed', self.name, exc_info=True)
+            return []
+
+
+class Registry:
+    """The instruments of this process and their multi-process exposition."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+        self._flushed_at = None
+
+    def _add(self, cls, name, *args):
+        # 模块可能被重复导入（测试、autoreload），同名指标只注册一次
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, *args)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram, name, help_text, labelnames, buckets)
+
+    def gauge(self, name, help_text, collect, labelnames=()):
+        return self._add(Gauge, name, help_text, collect, labelnames)
+
+    def add_collector(self, collect):
+        """
+        Add a scrape-time collector. ``collect()`` returns an iterable of
+        ``(name, type, help, labelnames, {labelvalues: value})``.
+        """
+        if collect not in self._collectors:
+            self._collectors.append(collect)
+
+    def snapshot(self):
+        """JSON-serializable families and samples of this process."""
+        return {
+            name: {**metric.family(), 'samples': [[list(labels), value] for labels, value in metric.samples()]}
+            for name, metric in list(self._metrics.items())
+        }
+
+    def clear(self):
+        """Reset every counter and histogram of this process."""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def flush(self, directory):
+        """Write this process's snapshot to ``<directory>/<pid>.json``."""
+        if self._flushed_at is None:
+            atexit.register(self.flush, directory)
+        self._flushed_at = time.monotonic()
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, separators=(',', ':'))
+            # 原子替换，读取方不会看到写了一半的文件
+            os.replace(temp_path, path)
+        except OSError:
+            logger.warning('Writing metrics to %s failed', path, exc_info=True)
+
+    def maybe_flush(self):
+        """Flush if multi-process mode is on and the last flush is old enough."""
+        directory = settings.METRICS_MULTIPROC_DIR
+        if not directory:
+            return
+        flushed_at = self._flushed_at
+        if flushed_at is None or time.monotonic() - flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush(directory)
+
+    def collect(self):
+        """Families merged over all worker processes, plus the collectors' values."""
+        directory = settings.METRICS_MULTIPROC_DIR
+        if directory:
+            self.flush(directory)
+            families = merge(read_snapshots(directory))
+        else:
+            families = merge([(self.snapshot(), True)])
+        for collect in self._collectors:
+            try:
+                for name, kind, help_text, labelnames, values in collect():
+                    families[name] = {
+                        'type': kind, 'help': help_text, 'labels': list(labelnames),
+                        'samples': {tuple(labels): value for labels, value in values.items()},
+                    }
+            except Exception:
+                logger.warning('Metrics collector %r failed', collect, exc_info=True)
+        return families
+
+
+def _is_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_snapshots(directory):
+    """``[(snapshot, alive)]`` for every worker file in ``directory``."""
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            pid = int(os.path.basename(path)[:-len('.json')])
+            with open(path, encoding='utf-8') as f:
+                snapshots.append((json.load(f), _is_alive(pid)))
+        except (OSError, ValueError):
+            # 文件刚被清理或不是 worker 文件
+            continue
+    return snapshots
+
+
+def merge(snapshots):
+    """Sum ``[(snapshot, alive)]`` into ``{name: family}`` with dict samples."""
+    families = {}
+    for snapshot, alive in snapshots:
+        for name, family in snapshot.items():
+            if family['type'] == GAUGE and not alive:
+                continue
+            merged = families.setdefault(name, {**family, 'samples': {}})
+            samples = merged['samples']
+            for labels, value in family['samples']:
+                labels = tuple(labels)
+                current = samples.get(labels)
+                if current is None:
+                    samples[labels] = value
+                elif family['type'] == HISTOGRAM:
+                    samples[labels] = [a + b for a, b in zip(current, value)]
+                else:
+                    samples[labels] = current + value
+    return families
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if isinstance(value, float):
+        return '+Inf' if value == float('inf') else repr(round(value, 6))
+    return str(value)
+
+
+def render(families):
+    """Prometheus text exposition of ``Registry.collect()``."""
+    lines = []
+    for name, family in sorted(families.items()):
+        lines.append(f'# HELP {name} {family["help"]}')
+        lines.append(f'# TYPE {name} {family["type"]}')
+        names = family['labels']
+        for labels, value in sorted(family['samples'].items(), key=lambda item: tuple(map(str, item[0]))):
+            if family['type'] != HISTOGRAM:
+                lines.append(f'{name}{_labels(names, labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(family['buckets'] + [float('inf')], value[:-1]):
+                cumulative += count
+                le = 'le="%s"' % _number(float(bound))
+                lines.append(f'{name}_bucket{_labels(names, labels, le)} {cumulative}')
+            lines.append(f'{name}_count{_labels(names, labels)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(names, labels)} {_number(float(value[-1]))}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Serve the metrics of every worker in the Prometheus text format."""
+    return HttpResponse(render(registry.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+registry = Registry()
+
+cache_requests = registry.counter('cache_requests_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+
+
+def record_cache(cache, hit):
+    cache_requests.inc(cache, 'hit' if hit else 'miss')
+
+
+# 连接是线程本地的：记下各线程建立过连接的 DatabaseWrapper（gthread worker 每个线程一个）
+_wrappers = weakref.WeakSet()
+_wrappers_lock = threading.Lock()
+
+
+def _open_connections():
+    counts = {(alias,): 0 for alias in connections}
+    with _wrappers_lock:
+        wrappers = set(_wrappers)
+    for wrapper in wrappers | {connections[alias] for alias in connections}:
+        if wrapper.connection is not None:
+            counts[(wrapper.alias,)] = counts.get((wrapper.alias,), 0) + 1
+    return counts
+
+
+registry.gauge(
+    'db_connections_open', 'Open (persistent) database connections of the workers.', _open_connections, ('alias',),
+)
+db_connections_opened = registry.counter(
+    'db_connections_opened_total', 'Database connections established.', ('alias',),
+)
+
+
+def _connection_created(sender, connection, **kwargs):
+    with _wrappers_lock:
+        _wrappers.add(connection)
+    db_connections_opened.inc(connection.alias)
+
+
+connection_created.connect(_connection_created, dispatch_uid='metrics_connection_created')
@@ -0,0 +1,194 @@
+"""
+Query inspection for development and CI: N+1 patterns, slow queries and
+per-view query budgets.
+
+``QueryInspectionMiddleware`` records the SQL queries of each request and
+groups them by template (``sql_template``). The template drops literals
+and the length of ``IN (...)`` lists, so a query issued once per row of a
+list falls into a single group. When the response is ready it reports, on
+the ``query_inspection`` logger:
+
+- every template run ``N_PLUS_ONE_THRESHOLD`` times or more (a likely
+  N+1), with the code that issued it first;
+- every query slower than ``SLOW_QUERY_MS``, with the code that issued it;
+- a query count above the view's budget (transaction control statements
+  are not counted). Views declare budgets with a
+  ``query_budget`` attribute (an int, or a dict of viewset action -> int)
+  or with the ``query_budget`` decorator on function views.
+
+With ``QUERY_INSPECTION_STRICT`` N+1 patterns and exceeded budgets raise
+``QueryInspectionError`` instead, which fails the request and, under the
+test client, the test. ``QueryInspectionTestRunner`` (``TEST_RUNNER``)
+runs ``manage.py test`` in strict mode. Slow queries are only logged,
+since timings vary between machines.
+
+The middleware only runs when ``QUERY_INSPECTION`` is on (default:
+``DEBUG``). Otherwise Django drops it at startup.
+"""
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+logger = logging.getLogger('query_inspection')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+# 事务控制语句（测试中的 SAVEPOINT 等）不参与 N+1 检测
+_TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT', 'ROLLBACK')
+ORIGIN_FRAMES = 3
+# 调用位置中略过本模块与计时中间件的执行包装
+_SKIPPED_FILES = (__file__, str(Path(__file__).with_name('timing.py')))
+
+
+class QueryInspectionError(AssertionError):
+    """A request ran an N+1 query pattern or exceeded its query budget."""
+
+
+def sql_template(sql):
+    """``sql`` with literals replaced by ``?`` and ``IN`` lists collapsed."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def query_budget(budget):
+    """Declare the query budget of a function view (int or action -> int)."""
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def _origin():
+    """The innermost project frames of the current stack, outside this module."""
+    base_dir = str(Path(settings.BASE_DIR).resolve())
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename
+        and frame.filename not in _SKIPPED_FILES
+    ]
+    return ' <- '.join(
+        f'{Path(frame.filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+        for frame in reversed(frames[-ORIGIN_FRAMES:])
+    ) or 'unknown'
+
+
+class RequestQueries:
+    """The queries of one request: SQL, duration and where the code issued them."""
+
+    def __init__(self):
+        self.queries = []
+        self._origins = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries.append(sql)
+            # 同一 SQL 只在第一次出现时记录调用位置
+            if sql not in self._origins:
+                self._origins[sql] = _origin()
+            if duration * 1000 >= settings.SLOW_QUERY_MS:
+                self.slow.append((sql, duration, _origin()))
+
+    def statements(self):
+        """The recorded SQL without transaction control statements."""
+        return [sql for sql in self.queries if not sql.lstrip().upper().startswith(_TRANSACTION_CONTROL)]
+
+    def repeated(self, threshold):
+        """``[(template, count, origin)]`` of templates run ``threshold`` times or more."""
+        groups = {}
+        for sql in self.statements():
+            template = sql_template(sql)
+            group = groups.get(template)
+            if group is None:
+                groups[template] = [1, self._origins[sql]]
+            else:
+                group[0] += 1
+        return [
+            (template, count, origin)
+            for template, (count, origin) in groups.items() if count >= threshold
+        ]
+
+
+def view_budget(request):
+    """The query budget declared by the view handling ``request``, or None."""
+    match = request.resolver_match
+    if match is None:
+        return None
+    func = match.func
+    budget = getattr(func, 'query_budget', None)
+    if budget is None:
+        view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        # DRF viewset：按 HTTP 方法找到对应的 action
+        action = (getattr(func, 'actions', None) or {}).get(request.method.lower())
+        budget = budget.get(action)
+    return budget
+
+
+class QueryInspectionMiddleware:
+    """Report N+1 patterns, slow queries and exceeded query budgets per request."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = RequestQueries()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        self.inspect(request, recorder)
+        return response
+
+    def inspect(self, request, recorder):
+        where = f'{request.method} {request.path}'
+        for sql, duration, origin in recorder.slow:
+            logger.warning('Slow query (%.1f ms) in %s at %s: %s', duration * 1000, where, origin, sql)
+
+        problems = [
+            f'{count} queries with the same template at {origin}: {template}'
+            for template, count, origin in recorder.repeated(settings.N_PLUS_ONE_THRESHOLD)
+        ]
+        budget = view_budget(request)
+        count = len(recorder.statements())
+        if budget is not None and count > budget:
+            problems.append(f'{count} queries, budget is {budget}')
+        if not problems:
+            return
+        message = f'{where}: ' + '; '.join(problems)
+        if settings.QUERY_INSPECTION_STRICT:
+            raise QueryInspectionError(message)
+        logger.warning('Query inspection: %s', message)
+
+
+class QueryInspectionTestRunner(DiscoverRunner):
+    """``DiscoverRunner`` that fails tests whose requests break the query rules."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._strict = override_settings(QUERY_INSPECTION=True, QUERY_INSPECTION_STRICT=True)
+        self._strict.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._strict.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,348 @@
+"""
+Tests for the shared service_common package.
+"""
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest.mock
+
+import requests
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import ResolverMatch, path, reverse
+
+from . import logs, metrics
+from .query_inspection import QueryInspectionError, QueryInspectionMiddleware, query_budget, sql_template
+
+
+def ping(request):
+    return HttpResponse('pong')
+
+
+def ping_with_query(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return HttpResponse('pong')
+
+
+def two_queries(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.execute('SELECT 2')
+    return HttpResponse('ok')
+
+
+def outbound(request):
+    response = requests.get('http://user-service:8000/api/v1/health/')
+    return HttpResponse(str(response.status_code))
+
+
+# runtests.py 以本模块为 ROOT_URLCONF
+urlpatterns = [
+    path('ping/', ping, name='ping'),
+    path('queries/', two_queries, name='queries'),
+    path('outbound/', outbound, name='outbound'),
+    path('metrics', metrics.metrics_view, name='metrics'),
+]
+
+
+def dead_pid():
+    """A pid no running process has."""
+    pid = 4194000
+    while True:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return pid
+        except PermissionError:
+            pass
+        pid += 1
+
+
+class MetricsTestCase(TestCase):
+    """测试 Prometheus 指标（文本格式与多进程合并）"""
+    
+    def setUp(self):
+        metrics.registry.clear()
+        self.jobs = metrics.registry.counter('test_jobs_total', 'Jobs by result.', ('result',))
+        self.duration = metrics.registry.histogram('test_job_duration_seconds', 'Job duration.', (), (0.1, 1.0))
+    
+    def test_text_exposition(self):
+        """测试计数器与直方图按 Prometheus 文本格式输出"""
+        self.jobs.inc('ok')
+        self.jobs.inc('ok', amount=2)
+        self.jobs.inc('fail"ed')
+        self.duration.observe(0.05)
+        self.duration.observe(0.5)
+        
+        response = self.client.get('/metrics')
+        
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE test_jobs_total counter', body)
+        self.assertIn('test_jobs_total{result="ok"} 3', body)
+        self.assertIn('test_jobs_total{result="fail\\"ed"} 1', body)
+        self.assertIn('test_job_duration_seconds_bucket{le="0.1"} 1', body)
+        self.assertIn('test_job_duration_seconds_bucket{le="1.0"} 2', body)
+        self.assertIn('test_job_duration_seconds_bucket{le="+Inf"} 2', body)
+        self.assertIn('test_job_duration_seconds_count 2', body)
+        self.assertIn('test_job_duration_seconds_sum 0.55', body)
+    
+    def test_worker_files_are_merged(self):
+        """测试合并各 worker 的计数；已退出 worker 的计数保留，其 gauge 丢弃"""
+        with tempfile.TemporaryDirectory() as directory:
+            worker = {
+                'test_jobs_total': {
+                    'type': 'counter', 'help': 'Jobs by result.',
+                    'labels': ['result'], 'samples': [[['ok'], 41]],
+                },
+                'db_connections_open': {
+                    'type': 'gauge', 'help': 'Open database connections.',
+                    'labels': ['alias'], 'samples': [[['default'], 7]],
+                },
+            }
+            with open(os.path.join(directory, f'{dead_pid()}.json'), 'w') as f:
+                json.dump(worker, f)
+            
+            with self.settings(METRICS_MULTIPROC_DIR=directory):
+                self.jobs.inc('ok')
+                connection.ensure_connection()
+                body = self.client.get('/metrics').content.decode()
+            
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+        self.assertIn('test_jobs_total{result="ok"} 42', body)
+        self.assertIn('db_connections_open{alias="default"} 1', body)
+    
+    def test_failing_collector_skipped(self):
+        """测试抓取时出错的 collector 被跳过，其余指标照常输出"""
+        def broken():
+            raise RuntimeError('queue unreachable')
+        
+        metrics.registry.add_collector(broken)
+        self.addCleanup(metrics.registry._collectors.remove, broken)
+        self.jobs.inc('ok')
+        
+        with self.assertLogs('service_common.metrics', level='WARNING'):
+            body = self.client.get('/metrics').content.decode()
+        
+        self.assertIn('test_jobs_total{result="ok"} 1', body)
+
+
+class StructuredLoggingTestCase(TestCase):
+    """测试结构化日志（请求 id、JSON 输出、调试日志取样与队列满时丢弃）"""
+    
+    def setUp(self):
+        metrics.registry.clear()
+    
+    def _handler(self, logger_name, **kwargs):
+        stream = kwargs.pop('stream', None) or io.StringIO()
+        handler = logs.QueueJSONHandler(stream=stream, **kwargs)
+        logger = logging.getLogger(logger_name)
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(handler.close)
+        self.addCleanup(logger.removeHandler, handler)
+        self.addCleanup(setattr, logger, 'propagate', True)
+        return handler, stream
+    
+    def _records(self, handler, stream):
+        handler.flush()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+    
+    def test_request_id_generated_or_taken_from_header(self):
+        """测试响应带有请求 id：沿用合法的请求头，否则生成新的"""
+        url = reverse('ping')
+        
+        generated = self.client.get(url)['X-Request-ID']
+        forwarded = self.client.get(url, HTTP_X_REQUEST_ID='ingress-42')['X-Request-ID']
+        rejected = self.client.get(url, HTTP_X_REQUEST_ID='bad id {}')['X-Request-ID']
+        
+        self.assertRegex(generated, r'^[0-9a-f]{32}$')
+        self.assertEqual(forwarded, 'ingress-42')
+        self.assertRegex(rejected, r'^[0-9a-f]{32}$')
+    
+    def test_extra_fields_and_exception(self):
+        """测试 extra 字段与异常堆栈写入 JSON"""
+        handler, stream = self._handler('service_common.tests.logging')
+        
+        try:
+            raise ValueError('broken')
+        except ValueError:
+            logging.getLogger('service_common.tests.logging').exception('Failed %s', 'once', extra={'job_id': 7})
+        
+        record = self._records(handler, stream)[0]
+        self.assertEqual(record['message'], 'Failed once')
+        self.assertEqual(record['job_id'], 7)
+        self.assertIn('ValueError: broken', record['exc_info'])
+        self.assertIsNone(record['request_id'])
+    
+    def test_debug_sampled_per_request(self):
+        """测试调试日志按请求取样：同一请求的记录一起保留或丢弃，INFO 始终保留"""
+        sampling = logs.SamplingFilter(rate=0.5)
+        debug = logging.makeLogRecord({'levelno': logging.DEBUG})
+        info = logging.makeLogRecord({'levelno': logging.INFO})
+        
+        kept = 0
+        for number in range(200):
+            token = logs._request_id.set(f'request-{number}')
+            try:
+                decisions = {sampling.filter(debug) for _ in range(3)}
+                self.assertTrue(sampling.filter(info))
+            finally:
+                logs._request_id.reset(token)
+            self.assertEqual(len(decisions), 1)
+            kept += decisions.pop()
+        self.assertTrue(60 < kept < 140)
+        self.assertFalse(logs.SamplingFilter(rate=0).filter(debug))
+    
+    def test_full_queue_drops_instead_of_blocking(self):
+        """测试输出跟不上时队列满后丢弃记录并计数，不阻塞记录日志的线程"""
+        class SlowStream(io.StringIO):
+            def __init__(self):
+                super().__init__()
+                self.writing = threading.Event()
+                self.release = threading.Event()
+            
+            def write(self, text):
+                self.writing.set()
+                self.release.wait(5)
+                return super().write(text)
+        
+        stream = SlowStream()
+        handler, _ = self._handler('service_common.tests.slow', queue_size=1, stream=stream)
+        logger = logging.getLogger('service_common.tests.slow')
+        
+        logger.warning('first')
+        self.assertTrue(stream.writing.wait(5))
+        logger.warning('second')
+        logger.warning('third')
+        stream.release.set()
+        
+        messages = [record['message'] for record in self._records(handler, stream)]
+        self.assertEqual(messages, ['first', 'second'])
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('log_records_dropped_total 1', body)
+
+
+class RequestTimingTestCase(TestCase):
+    """测试请求计时中间件（Server-Timing、日志与指标）"""
+    
+    def setUp(self):
+        metrics.registry.clear()
+    
+    def test_server_timing_reports_queries(self):
+        """测试 Server-Timing 头包含数据库查询次数与各项耗时"""
+        response = self.client.get(reverse('queries'))
+        
+        header = response['Server-Timing']
+        self.assertIn('desc="2 queries"', header)
+        for metric in ('total;dur=', 'db;dur=', 'http;dur=', 'render;dur='):
+            self.assertIn(metric, header)
+    
+    def test_outbound_call_timed_and_carries_request_id(self):
+        """测试出站调用计入 http 耗时、按目标主机记录延迟并转发请求 id"""
+        forwarded = []
+        
+        def slow_send(adapter, request, **kwargs):
+            forwarded.append(request.headers.get('X-Request-ID'))
+            time.sleep(0.02)
+            response = requests.Response()
+            response.status_code = 503
+            return response
+        
+        with unittest.mock.patch('requests.adapters.HTTPAdapter.send', slow_send):
+            response = self.client.get(reverse('outbound'), HTTP_X_REQUEST_ID='trace-1')
+        
+        self.assertEqual(forwarded, ['trace-1'])
+        http_ms = float(re.search(r'http;dur=([\d.]+)', response['Server-Timing']).group(1))
+        self.assertGreaterEqual(http_ms, 20)
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('http_client_request_duration_seconds_count{host="user-service:8000",status="503"} 1', body)
+    
+    def test_metrics_expose_route_histograms(self):
+        """测试指标端点输出按路由的延迟直方图"""
+        self.client.get(reverse('queries'))
+        
+        body = self.client.get('/metrics').content.decode()
+        
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_count{route="queries/",method="GET"} 1', body)
+        self.assertIn('http_responses_total{route="queries/",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_db_queries_total{route="queries/",method="GET"} 2', body)
+    
+    @override_settings(REQUEST_TIMING_LOG=True)
+    def test_structured_log_line(self):
+        """测试开启后每个请求输出一行结构化日志"""
+        with self.assertLogs('request_timing', level='INFO') as captured:
+            self.client.get(reverse('queries'))
+        
+        record = captured.records[0]
+        self.assertEqual(record.timing['status'], 200)
+        self.assertEqual(record.timing['method'], 'GET')
+        self.assertEqual(record.timing['db_queries'], 2)
+        self.assertIn('db_queries=2', record.getMessage())
+
+
+class QueryInspectionTestCase(TestCase):
+    """测试 N+1 查询检测、慢查询日志与视图查询预算"""
+    
+    def _call(self, view, budget=None):
+        if budget is not None:
+            view = query_budget(budget)(view)
+        request = RequestFactory().get('/inspected/')
+        request.resolver_match = ResolverMatch(view, (), {})
+        return QueryInspectionMiddleware(view)(request)
+    
+    @staticmethod
+    def _per_row_view(request):
+        with connection.cursor() as cursor:
+            for number in range(6):
+                cursor.execute(f'SELECT {number}')
+        return HttpResponse()
+    
+    def test_sql_template(self):
+        """测试字面量与 IN 列表长度被归一化"""
+        self.assertEqual(
+            sql_template("SELECT * FROM t WHERE a = 'x' AND b = 3 AND c IN (%s, %s,  %s)"),
+            sql_template("SELECT * FROM t WHERE a = 'y' AND b = 42 AND c IN (%s)"),
+        )
+    
+    def test_n_plus_one_fails_in_strict_mode(self):
+        """测试严格模式下逐行查询抛出异常并指出调用位置"""
+        with self.assertRaises(QueryInspectionError) as raised:
+            self._call(self._per_row_view)
+        
+        self.assertIn('6 queries with the same template', str(raised.exception))
+        self.assertIn('service_common/tests.py', str(raised.exception))
+    
+    @override_settings(QUERY_INSPECTION_STRICT=False)
+    def test_findings_logged_outside_strict_mode(self):
+        """测试非严格模式下只记录日志"""
+        with self.assertLogs('query_inspection', level='WARNING') as captured:
+            self._call(self._per_row_view)
+        
+        self.assertIn('queries with the same template', captured.output[0])
+    
+    def test_query_budget(self):
+        """测试超出视图声明的查询预算时失败"""
+        def view(request):
+            return two_queries(request)
+        
+        self.assertEqual(self._call(view, budget=2).status_code, 200)
+        with self.assertRaisesMessage(QueryInspectionError, '2 queries, budget is 1'):
+            self._call(view, budget=1)
+    
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_logged_with_origin(self):
+        """测试慢查询记录耗时与调用位置"""
+        with self.assertLogs('query_inspection', level='WARNING') as captured:
+            self._call(ping_with_query)
+        
+        self.assertIn('Slow query', captured.output[0])
+        self.assertIn('service_common/tests.py', captured.output[0])
@@ -0,0 +1,197 @@
+"""
+Request-level timing: where does a request's time go?
+
+``TimingMiddleware`` measures for every request:
+
+``total``
+    Wall time spent inside the middleware.
+``db``
+    Time and number of SQL queries, through a connection execute wrapper.
+``http``
+    Time spent in outbound ``requests`` calls to the other services.
+``render``
+    Time spent rendering the DRF response (serialization to JSON).
+
+The figures are sent back as a ``Server-Timing`` header, which browser dev
+tools display. When ``REQUEST_TIMING_LOG`` is on, they are also logged as
+one structured line per request (logger ``request_timing``). Every request
+also feeds the per-route metrics of ``.metrics`` (latency histogram,
+responses by status, time breakdown), and every outbound call the
+per-host ``http_client_request_duration_seconds`` histogram. Outbound
+calls also carry the request's ``X-Request-ID`` (see ``.logs``).
+
+The bookkeeping costs a few microseconds per request. Run the activity
+service's ``bench_timing.py`` to check it stays under 50µs.
+"""
+import contextvars
+import functools
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+
+from .logs import REQUEST_ID_HEADER, current_request_id
+from .metrics import registry
+
+try:
+    import requests
+except ImportError:  # pragma: no cover - 未安装 requests 的服务没有出站调用
+    requests = None
+
+logger = logging.getLogger('request_timing')
+
+UNMATCHED_ROUTE = 'unmatched'
+
+ROUTE_LABELS = ('route', 'method')
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ROUTE_LABELS,
+)
+responses = registry.counter(
+    'http_responses_total', 'Responses by route and status code.', ROUTE_LABELS + ('status',),
+)
+db_seconds = registry.counter('http_request_db_seconds_total', 'Time spent in SQL queries by route.', ROUTE_LABELS)
+db_queries = registry.counter('http_request_db_queries_total', 'SQL queries executed by route.', ROUTE_LABELS)
+outbound_seconds = registry.counter(
+    'http_request_outbound_seconds_total', 'Time spent in outbound HTTP calls by route.', ROUTE_LABELS,
+)
+render_seconds = registry.counter(
+    'http_request_render_seconds_total', 'Time spent rendering responses by route.', ROUTE_LABELS,
+)
+client_duration = registry.histogram(
+    'http_client_request_duration_seconds', 'Outbound HTTP call latency by target host and status code.',
+    ('host', 'status'),
+)
+
+
+class RequestTimer:
+    """Accumulated timings of the current request (seconds)."""
+    __slots__ = ('db', 'queries', 'http', 'render')
+
+    def __init__(self):
+        self.db = self.http = self.render = 0.0
+        self.queries = 0
+
+
+_current = contextvars.ContextVar('request_timer', default=None)
+
+
+def current_timer():
+    """The ``RequestTimer`` of the request being handled, or None."""
+    return _current.get()
+
+
+@contextmanager
+def measure(metric):
+    """Add the time spent in the block to ``metric`` of the current request."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timer, metric, getattr(timer, metric) + time.perf_counter() - start)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    timer = _current.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.db += time.perf_counter() - start
+        timer.queries += 1
+
+
+def install_requests_hook():
+    """Time every outbound ``requests`` call and forward the request id (once per process)."""
+    if requests is None or getattr(requests.Session.send, '_request_timing', False):
+        return
+    original = requests.Session.send
+
+    @functools.wraps(original)
+    def send(self, request, **kwargs):
+        request_id = current_request_id()
+        if request_id is not None and REQUEST_ID_HEADER not in request.headers:
+            request.headers[REQUEST_ID_HEADER] = request_id
+        status = 'error'
+        start = time.perf_counter()
+        try:
+            with measure('http'):
+                response = original(self, request, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            client_duration.observe(time.perf_counter() - start, urlsplit(request.url).netloc, status)
+
+    send._request_timing = True
+    requests.Session.send = send
+
+
+def server_timing(total, timer):
+    return (
+        f'total;dur={total * 1000:.1f}, '
+        f'db;dur={timer.db * 1000:.1f};desc="{timer.queries} queries", '
+        f'http;dur={timer.http * 1000:.1f}, '
+        f'render;dur={timer.render * 1000:.1f}'
+    )
+
+
+class TimingMiddleware:
+    """
+    Measure each request and report it in ``Server-Timing``, the route
+    metrics and (optionally) the ``request_timing`` log.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_requests_hook()
+
+    def __call__(self, request):
+        timer = RequestTimer()
+        token = _current.set(timer)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = (match.route or match.view_name) if match is not None else UNMATCHED_ROUTE
+        labels = (route, request.method)
+        request_duration.observe(total, *labels)
+        responses.inc(*labels, str(response.status_code))
+        db_seconds.inc(*labels, amount=timer.db)
+        db_queries.inc(*labels, amount=timer.queries)
+        outbound_seconds.inc(*labels, amount=timer.http)
+        render_seconds.inc(*labels, amount=timer.render)
+        registry.maybe_flush()
+        response['Server-Timing'] = server_timing(total, timer)
+        if settings.REQUEST_TIMING_LOG and logger.isEnabledFor(logging.INFO):
+            fields = {
+                'method': request.method, 'route': route, 'status': response.status_code,
+                'total_ms': round(total * 1000, 2), 'db_ms': round(timer.db * 1000, 2),
+                'db_queries': timer.queries, 'http_ms': round(timer.http * 1000, 2),
+                'render_ms': round(timer.render * 1000, 2),
+            }
+            logger.info(
+                ' '.join(f'{name}=%s' for name in fields), *fields.values(),
+                extra={'timing': fields},
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF 响应在这里渲染（序列化为 JSON）；渲染后 Django 不会再次渲染
+        with measure('render'):
+            response.render()
+        return response
@@ -10,5 +10,8 @@ class NotificationServiceConfig(AppConfig):
     verbose_name = 'Notification Service'
     
     def ready(self):
-        """Import signal handlers when the app is ready."""
+        """Import signal handlers and register metrics collectors when the app is ready."""
         import notification_service.signals
+        from .celery import queue_depth_metrics
+        from service_common.metrics import registry
+        registry.add_collector(queue_depth_metrics)
@@ -0,0 +1,124 @@
+"""
+Minimal append-only event log shared by the platform services.
+
+Producers ``publish`` JSON events to a named topic; consumers ``read`` them
+back in order from an integer offset they store themselves, so a consumer
+can stop, restart or rewind (replay) at will. The backend is chosen by
+``EVENT_BROKER_URL``:
+
+``memory://``
+    Process-local lists; for tests.
+``file:///path/to/dir``
+    One JSON-lines file per topic in a directory both services can reach;
+    offsets are byte positions, so reads never rescan the file.
+"""
+import json
+import os
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows 开发环境没有 fcntl
+    fcntl = None
+
+
+class BrokerError(Exception):
+    """The broker could not store or read events."""
+
+
+class MemoryBroker:
+    """Events kept in process memory; offsets are list indices."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics = defaultdict(list)
+
+    def publish(self, topic, events):
+        with self._lock:
+            self._topics[topic].extend(json.loads(json.dumps(event)) for event in events)
+
+    def read(self, topic, offset=0, limit=100):
+        """Return ``(events, next_offset)`` starting at ``offset``."""
+        with self._lock:
+            events = self._topics[topic][offset:offset + limit]
+        return events, offset + len(events)
+
+    def clear(self):
+        with self._lock:
+            self._topics.clear()
+
+
+class FileBroker:
+    """Events appended to ``<directory>/<topic>.jsonl``; offsets are byte positions."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, topic):
+        return os.path.join(self.directory, f'{topic}.jsonl')
+
+    def publish(self, topic, events):
+        data = ''.join(json.dumps(event, separators=(',', ':')) + '\n' for event in events)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._lock, open(self._path(topic), 'a', encoding='utf-8') as log:
+                # 跨进程追加写入时加文件锁，避免行交错
+                if fcntl is not None:
+                    fcntl.flock(log, fcntl.LOCK_EX)
+                try:
+                    log.write(data)
+                    log.flush()
+                    os.fsync(log.fileno())
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(log, fcntl.LOCK_UN)
+        except OSError as exc:
+            raise BrokerError(str(exc)) from exc
+
+    def read(self, topic, offset=0, limit=100):
+        """Return ``(events, next_offset)`` starting at byte ``offset``."""
+        events = []
+        try:
+            with open(self._path(topic), 'rb') as log:
+                log.seek(offset)
+                while len(events) < limit:
+                    line = log.readline()
+                    # 没有换行符的行可能仍在写入，下次再读
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    if line.strip():
+                        events.append(json.loads(line))
+        except FileNotFoundError:
+            return [], offset
+        except OSError as exc:
+            raise BrokerError(str(exc)) from exc
+        return events, offset
+
+
+def create_broker(url):
+    parsed = urlparse(url)
+    if parsed.scheme == 'memory':
+        return MemoryBroker()
+    if parsed.scheme == 'file':
+        return FileBroker(url2pathname(parsed.path))
+    raise ValueError(f'Unsupported EVENT_BROKER_URL: {url}')
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    """The broker configured by ``EVENT_BROKER_URL`` (one instance per URL)."""
+    url = settings.EVENT_BROKER_URL
+    with _brokers_lock:
+        if url not in _brokers:
+            _brokers[url] = create_broker(url)
+        return _brokers[url]
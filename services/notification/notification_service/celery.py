@@ -1,8 +1,10 @@
 """
 Celery configuration for notification service.
 """
+import logging
 import os
 from celery import Celery
+from celery.signals import task_postrun
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'notification_service.settings')
@@ -16,7 +18,39 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+logger = logging.getLogger(__name__)
+
+# 抓取 /metrics 时连接消息队列的超时（秒）
+QUEUE_DEPTH_TIMEOUT = 2
+
+
+def queue_depth_metrics():
+    """
+    Metrics collector: messages waiting in each task queue. Nothing is
+    reported when tasks run eagerly or the broker cannot be reached.
+    """
+    if app.conf.task_always_eager:
+        return []
+    depths = {}
+    try:
+        with app.connection_for_read(connect_timeout=QUEUE_DEPTH_TIMEOUT) as connection:
+            connection.ensure_connection(max_retries=1)
+            channel = connection.default_channel
+            for queue in sorted(app.amqp.queues):
+                depths[(queue,)] = channel.queue_declare(queue=queue, passive=True).message_count
+    except Exception as exc:
+        logger.warning('Reading Celery queue depth failed: %s', exc)
+        return []
+    return [('celery_queue_length', 'gauge', 'Messages waiting in each Celery queue.', ('queue',), depths)]
+
 
 @app.task(bind=True)
 def debug_task(self):
-    print(f'Request: {self.request!r}')
+    logger.info('Request: %r', self.request)
+
+
+@task_postrun.connect
+def flush_metrics(**kwargs):
+    """Let task metrics of worker processes reach METRICS_MULTIPROC_DIR."""
+    from service_common.metrics import registry
+    registry.maybe_flush()
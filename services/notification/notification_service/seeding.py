@@ -0,0 +1,91 @@
+"""
+Synthetic notifications (``manage.py seed_data``).
+
+At scale 1 the dataset has 1,000,000 notifications from the last 90
+days for the shared user population (``.synthetic``), skewed towards the
+most active (low id) users. Organizers get activity review results,
+volunteers application results, reminders and activity updates, and
+everyone the occasional announcement. Older notifications are more
+likely to have been read; the newest few may still be waiting to be
+sent.
+"""
+import time
+from datetime import timedelta
+
+from .models import Notification
+from .synthetic import (
+    analyze, anchor, active_user, bulk_load, explicit_timestamps, population, rng, scaled, user_fields,
+)
+
+NOTIFICATIONS = 1_000_000
+# 活动服务数据集中的活动数（scale 为 1 时）
+ACTIVITIES = 100_000
+HISTORY_DAYS = 90
+
+# 类型、标题、优先级及比例
+ORGANIZER_TYPES = (
+    ('activity_approval', 'Activity Approved', 'medium', 50),
+    ('activity_rejection', 'Activity Rejected', 'high', 10),
+    ('activity_status_change', 'Activity Updated', 'low', 25),
+    ('system_announcement', 'Platform News', 'low', 15),
+)
+VOLUNTEER_TYPES = (
+    ('volunteer_approval', 'Application Approved', 'medium', 40),
+    ('volunteer_rejection', 'Application Rejected', 'medium', 8),
+    ('activity_reminder', 'Activity Reminder', 'high', 30),
+    ('activity_status_change', 'Activity Updated', 'low', 15),
+    ('system_announcement', 'Platform News', 'low', 7),
+)
+
+
+def seed(scale=1.0, seed=42, batch_size=5000, use_copy=False, log=None):
+    """
+    Generate the dataset into a notification database. Returns the number
+    of rows per model; ``log`` receives progress lines.
+    """
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    notifications = _notifications(rng(seed, 'notifications'), scale, anchor())
+    with explicit_timestamps(Notification):
+        count = bulk_load(Notification, notifications, batch_size, use_copy)
+    log(f'notifications: {count} in {time.perf_counter() - started:.1f}s')
+    analyze()
+    return {'notifications': count}
+
+
+def _notifications(rand, scale, now):
+    organizers, users = population(scale)
+    activities = scaled(ACTIVITIES, scale)
+    kinds = {
+        role: (types, [weight for *_, weight in types])
+        for role, types in (('organizer', ORGANIZER_TYPES), ('volunteer', VOLUNTEER_TYPES))
+    }
+    for _ in range(scaled(NOTIFICATIONS, scale)):
+        recipient_id = active_user(rand, users)
+        user = user_fields(recipient_id)
+        types, weights = kinds['organizer' if recipient_id <= organizers else 'volunteer']
+        notification_type, title, priority, _ = rand.choices(types, weights)[0]
+        age = timedelta(seconds=rand.randrange(HISTORY_DAYS * 86400))
+        created_at = now - age
+        # 越早的通知越可能已读
+        is_read = rand.random() < min(0.95, 0.2 + age.days / 30)
+        is_sent = is_read or age > timedelta(minutes=10) or rand.random() < 0.5
+        sent_at = created_at + timedelta(seconds=rand.randint(1, 120)) if is_sent else None
+        read_at = min(sent_at + timedelta(seconds=int(rand.expovariate(1 / 86400))), now) if is_read else None
+        activity_id = None if notification_type == 'system_announcement' else rand.randint(1, activities)
+        yield Notification(
+            recipient_id=recipient_id,
+            recipient_email=user['email'],
+            recipient_name=f'{user["first_name"]} {user["last_name"]}',
+            notification_type=notification_type,
+            title=title,
+            message=f'{title}: activity #{activity_id}.' if activity_id else f'{title}: see what is new this week.',
+            priority=priority,
+            is_read=is_read,
+            is_sent=is_sent,
+            sent_at=sent_at,
+            read_at=read_at,
+            activity_id=activity_id,
+            created_at=created_at,
+            updated_at=read_at or sent_at or created_at,
+        )
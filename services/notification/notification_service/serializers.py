@@ -3,6 +3,7 @@ Serializers for notification service.
 """
 from rest_framework import serializers
 from .models import Notification, NotificationTemplate, NotificationPreference
+from .values import ValuesSerializer
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -23,6 +24,15 @@ class NotificationSerializer(serializers.ModelSerializer):
         return notification
 
 
+class NotificationValuesSerializer(ValuesSerializer):
+    """
+    ``values()`` fast path for notification lists, same output as
+    ``NotificationSerializer``.
+    """
+    model = Notification
+    fields = '__all__'
+
+
 class NotificationTemplateSerializer(serializers.ModelSerializer):
     """
     Serializer for NotificationTemplate model.
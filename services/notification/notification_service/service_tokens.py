@@ -0,0 +1,156 @@
+"""
+Short-lived signed service tokens shared by the user, activity and
+notification services.
+
+At login the user service issues a token carrying the user's id, role,
+name, email and phone (``issue_service_token``), plus the id of the API
+token it was issued with (``sid``). The other services check its signature
+and expiry locally (``verify_service_token``), so they authenticate a
+request without calling the user service.
+
+Tokens are signed with ``django.core.signing`` (HMAC-SHA256) using the
+shared ``SERVICE_TOKEN_SIGNING_KEYS``. The first key signs and every key
+verifies. To rotate keys, prepend the new key in every service, wait
+``SERVICE_TOKEN_TTL`` seconds, then drop the old key.
+
+Logout revokes the tokens issued so far with the API token being deleted,
+so other devices stay signed in (``revoke_user_tokens``); without an API
+token every token of the user is revoked. The revocation is published to
+the ``token-revocations`` topic of the event broker (``.broker``). Each
+verifying process follows that topic, at most every
+``SERVICE_TOKEN_REVOCATION_POLL`` seconds, into an in-memory revocation
+list. An entry is dropped once the tokens it revokes have expired.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+
+from .broker import BrokerError, get_broker
+
+logger = logging.getLogger(__name__)
+
+SALT = 'service-token'
+TOPIC = 'token-revocations'
+CLAIMS = ('id', 'username', 'email', 'first_name', 'last_name', 'role', 'phone')
+
+
+class InvalidServiceToken(Exception):
+    """The token is malformed, forged, expired or revoked."""
+
+
+def issue_service_token(claims, session_id=None):
+    """
+    Sign the ``CLAIMS`` found in ``claims``, tagged with ``session_id`` (the
+    id of the API token it is issued with) when given. Returns
+    ``(token, expires_at)``, where ``expires_at`` is a Unix timestamp.
+    """
+    issued_at = round(time.time(), 3)
+    expires_at = int(issued_at + settings.SERVICE_TOKEN_TTL)
+    payload = {name: claims.get(name) for name in CLAIMS}
+    payload.update(iat=issued_at, exp=expires_at)
+    if session_id is not None:
+        payload['sid'] = session_id
+    token = signing.dumps(payload, key=settings.SERVICE_TOKEN_SIGNING_KEYS[0], salt=SALT, compress=True)
+    return token, expires_at
+
+
+def verify_service_token(token):
+    """Return the claims of a valid token; raises ``InvalidServiceToken`` otherwise."""
+    keys = settings.SERVICE_TOKEN_SIGNING_KEYS
+    try:
+        payload = signing.loads(token, key=keys[0], fallback_keys=keys[1:], salt=SALT)
+    except signing.BadSignature as exc:
+        raise InvalidServiceToken('Invalid service token.') from exc
+    if not isinstance(payload, dict) or not {'id', 'iat', 'exp'} <= payload.keys():
+        raise InvalidServiceToken('Invalid service token.')
+    if payload['exp'] <= time.time():
+        raise InvalidServiceToken('Service token has expired.')
+    if revocations.is_revoked(payload['id'], payload['iat'], payload.get('sid')):
+        raise InvalidServiceToken('Service token has been revoked.')
+    return payload
+
+
+def revoke_user_tokens(user_id, session_id=None):
+    """
+    Revoke the tokens issued to ``user_id`` up to now: only those tagged
+    with ``session_id`` when given, otherwise all of them. Raises
+    ``BrokerError`` if the revocation could not be published.
+    """
+    revoked_at = round(time.time(), 3)
+    event = {
+        'user_id': user_id,
+        'revoked_at': revoked_at,
+        # 被撤销的令牌最晚在此时过期，之后该条目可以丢弃
+        'expires_at': revoked_at + settings.SERVICE_TOKEN_TTL,
+    }
+    if session_id is not None:
+        event['sid'] = session_id
+    get_broker().publish(TOPIC, [event])
+    revocations.add(event)
+    return event
+
+
+class RevocationList:
+    """Per-process view of the ``token-revocations`` topic."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every revocation and re-read the topic from the start on next use."""
+        with self._lock:
+            self._revoked = {}
+            self._offset = 0
+            self._polled_at = None
+
+    def add(self, event):
+        # 带 sid 的条目只撤销该 API 令牌签发的服务令牌，否则撤销整个用户
+        key = ('sid', event['sid']) if event.get('sid') else ('user', event['user_id'])
+        current = self._revoked.get(key)
+        if current is None or event['revoked_at'] > current[0]:
+            self._revoked[key] = (event['revoked_at'], event['expires_at'])
+
+    def _is_fresh(self):
+        polled_at = self._polled_at
+        return polled_at is not None and time.monotonic() - polled_at < settings.SERVICE_TOKEN_REVOCATION_POLL
+
+    def refresh(self):
+        """Read new revocations from the broker unless polled recently."""
+        if self._is_fresh():
+            return
+        with self._lock:
+            if self._is_fresh():
+                return
+            broker = get_broker()
+            try:
+                while True:
+                    events, offset = broker.read(TOPIC, self._offset, 500)
+                    if offset == self._offset:
+                        break
+                    for event in events:
+                        self.add(event)
+                    self._offset = offset
+            except BrokerError:
+                # 保留已知的撤销记录；令牌有效期很短，下次轮询再试
+                logger.warning('Reading token revocations failed', exc_info=True)
+            now = time.time()
+            self._revoked = {key: entry for key, entry in self._revoked.items() if entry[1] > now}
+            self._polled_at = time.monotonic()
+
+    def is_revoked(self, user_id, issued_at, session_id=None):
+        self.refresh()
+        keys = [('user', user_id)]
+        if session_id:
+            keys.append(('sid', session_id))
+        for key in keys:
+            entry = self._revoked.get(key)
+            if entry is not None and issued_at <= entry[0]:
+                return True
+        return False
+
+
+revocations = RevocationList()
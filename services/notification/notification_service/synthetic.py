@@ -0,0 +1,246 @@
+"""
+Deterministic synthetic data shared by the services' ``seed_data`` commands.
+
+The services draw from one population of users: ids ``1..organizers``
+are organizers and the rest volunteers (``population``). A user's name,
+email, phone, city, skills and languages follow from the id alone
+(``user_fields`` and friends), so the activity service's participants
+and the notification service's recipients agree with the user service's
+rows without a lookup. Generated dates are relative to midnight UTC of
+the current day (``anchor``). Each generator draws from its own
+``random.Random`` derived from the seed (``rng``), so the same seed and
+scale always produce the same rows.
+
+``bulk_load`` inserts model instances in batches with ``bulk_create``,
+or with ``COPY ... FROM STDIN`` on PostgreSQL (``use_copy``), which
+skips the per-row statement overhead for millions of rows.
+"""
+import io
+import json
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+ORGANIZERS = 2_000
+VOLUNTEERS = 200_000
+BATCH_SIZE = 5000
+
+# 城市名与中心坐标
+CITIES = (
+    ('London', 51.5074, -0.1278), ('Beijing', 39.9042, 116.4074), ('Madrid', 40.4168, -3.7038),
+    ('Berlin', 52.5200, 13.4050), ('Lagos', 6.5244, 3.3792), ('Rome', 41.9028, 12.4964),
+    ('Tokyo', 35.6762, 139.6503), ('Prague', 50.0755, 14.4378), ('Lima', -12.0464, -77.0428),
+    ('Seoul', 37.5665, 126.9780),
+)
+FIRST_NAMES = ('Anna', 'Ben', 'Chen', 'Diego', 'Elena', 'Fatima', 'Hiro', 'Ivan', 'Julia', 'Kofi', 'Li', 'Maya')
+LAST_NAMES = ('Smith', 'Wang', 'Garcia', 'Müller', 'Okafor', 'Rossi', 'Tanaka', 'Novak', 'Silva', 'Lee', 'Kim')
+SKILLS = (
+    'first aid', 'teaching', 'cooking', 'driving', 'gardening', 'photography', 'translation',
+    'event planning', 'carpentry', 'counselling', 'programming', 'fundraising',
+)
+LANGUAGES = ('English', 'Chinese', 'Spanish', 'German', 'French', 'Japanese', 'Korean', 'Italian')
+
+
+def rng(seed, name):
+    """The random generator of the ``name`` part of the dataset for ``seed``."""
+    return random.Random(f'{seed}:{name}')
+
+
+def scaled(count, scale):
+    return max(1, round(count * scale))
+
+
+def population(scale):
+    """``(organizers, users)``: user ids ``1..users``, the first ``organizers`` of them organizers."""
+    organizers = scaled(ORGANIZERS, scale)
+    return organizers, organizers + scaled(VOLUNTEERS, scale)
+
+
+def anchor():
+    """Midnight UTC today; runs on different days differ only by this shift."""
+    today = datetime.now(dt_timezone.utc).date()
+    return datetime.combine(today, time.min, tzinfo=dt_timezone.utc)
+
+
+def city_of(user_id):
+    """Index in ``CITIES`` of the city user ``user_id`` lives in."""
+    return user_id % len(CITIES)
+
+
+def user_fields(user_id):
+    """Name and contact fields of user ``user_id``, the same in every service."""
+    first_name = FIRST_NAMES[user_id % len(FIRST_NAMES)]
+    last_name = LAST_NAMES[user_id // len(FIRST_NAMES) % len(LAST_NAMES)]
+    return {
+        'username': f'user{user_id}',
+        'email': f'user{user_id}@example.com',
+        'first_name': first_name,
+        'last_name': last_name,
+        'phone': f'+1555{user_id:07d}',
+        'location': CITIES[city_of(user_id)][0],
+    }
+
+
+def user_skills(user_id):
+    """One to three distinct skills of user ``user_id``."""
+    first = user_id * 7 % len(SKILLS)
+    # 步长 5 与技能数 12 互素，取出的技能互不相同
+    return [SKILLS[(first + 5 * index) % len(SKILLS)] for index in range(1 + user_id % 3)]
+
+
+def user_languages(user_id):
+    languages = ['English']
+    if user_id % 3:
+        languages.append(LANGUAGES[1 + user_id % (len(LANGUAGES) - 1)])
+    return languages
+
+
+def city_volunteers(organizers, users, city):
+    """How many volunteers live in ``CITIES[city]``."""
+    first = organizers + 1 + (city - organizers - 1) % len(CITIES)
+    return 0 if first > users else (users - first) // len(CITIES) + 1
+
+
+def city_volunteer(organizers, users, city, index):
+    """The ``index``-th volunteer (cyclically) living in ``CITIES[city]``."""
+    first = organizers + 1 + (city - organizers - 1) % len(CITIES)
+    return first + len(CITIES) * (index % city_volunteers(organizers, users, city))
+
+
+def active_user(rng, users):
+    """A user id drawn so that early (lower) ids, the more active users, come up more often."""
+    return 1 + int(users * rng.random() ** 2)
+
+
+def coordinates(rng, city):
+    """``(latitude, longitude)`` within about 10 km of the centre of ``CITIES[city]``."""
+    _, latitude, longitude = CITIES[city]
+    return (
+        Decimal(f'{latitude + rng.uniform(-0.1, 0.1):.6f}'),
+        Decimal(f'{longitude + rng.uniform(-0.1, 0.1):.6f}'),
+    )
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Keep the ``auto_now``/``auto_now_add`` values the generator set on ``model`` instances."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def bulk_load(model, objects, batch_size=BATCH_SIZE, use_copy=False):
+    """
+    Insert the ``model`` instances of the iterable ``objects`` in batches,
+    in one transaction. Returns how many were inserted.
+    """
+    write = _copy_batch if use_copy else _create_batch
+    total = 0
+    batch = []
+    with transaction.atomic():
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == batch_size:
+                write(model, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            write(model, batch)
+            total += len(batch)
+    return total
+
+
+def _create_batch(model, batch):
+    model.objects.bulk_create(batch)
+
+
+# COPY 文本格式中需要转义的字符
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+# 取值原样写入（str()）的字段类型
+_PLAIN_TYPES = frozenset((
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'CharField', 'TextField', 'EmailField', 'SlugField',
+    'URLField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField', 'PositiveIntegerField',
+    'PositiveBigIntegerField', 'PositiveSmallIntegerField', 'ForeignKey', 'OneToOneField', 'FloatField',
+))
+
+
+def copy_formatter(field):
+    """A function turning a value of ``field`` into PostgreSQL's ``COPY`` text format."""
+    internal_type = field.get_internal_type()
+    if internal_type == 'JSONField':
+        prepare = lambda value: json.dumps(value, cls=field.encoder)  # noqa: E731
+    elif internal_type == 'BooleanField':
+        prepare = lambda value: 't' if value else 'f'  # noqa: E731
+    elif internal_type in _PLAIN_TYPES:
+        prepare = str
+    elif internal_type == 'DateTimeField':
+        # 带时区的时间直接写 ISO 格式，其余交给字段转换
+        prepare = lambda value: (  # noqa: E731
+            value.isoformat() if value.tzinfo else str(field.get_db_prep_save(value, connection))
+        )
+    elif internal_type in ('DateField', 'DecimalField'):
+        # PostgreSQL 按列的精度解析
+        prepare = str
+    else:
+        prepare = lambda value: str(field.get_db_prep_save(value, connection))  # noqa: E731
+
+    def format_value(value):
+        return '\\N' if value is None else prepare(value).translate(_COPY_ESCAPES)
+    return format_value
+
+
+def _copy_batch(model, batch):
+    # 主键未指定时由序列生成
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and batch[0].pk is None)
+    ]
+    formatters = [copy_formatter(field) for field in fields]
+    # 仍自动赋值的 auto_now 字段需经 pre_save 取值，其余直接读取属性
+    auto = [getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False) for field in fields]
+    data = io.StringIO()
+    for obj in batch:
+        data.write('\t'.join(
+            format_value(field.pre_save(obj, add=True) if is_auto else getattr(obj, field.attname))
+            for field, format_value, is_auto in zip(fields, formatters, auto)
+        ))
+        data.write('\n')
+    quote = connection.ops.quote_name
+    sql = f'COPY {quote(model._meta.db_table)} ({", ".join(quote(field.column) for field in fields)}) FROM STDIN'
+    with connection.cursor() as cursor:
+        driver_cursor = cursor.cursor
+        if hasattr(driver_cursor, 'copy_expert'):
+            # psycopg2
+            data.seek(0)
+            driver_cursor.copy_expert(sql, data)
+        else:
+            # psycopg 3
+            with driver_cursor.copy(sql) as copy:
+                copy.write(data.getvalue())
+
+
+def reset_sequences(*models):
+    """Move the id sequences of ``models`` past rows inserted with explicit ids."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def analyze():
+    """Refresh the planner statistics after a bulk load (PostgreSQL)."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
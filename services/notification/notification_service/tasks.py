@@ -5,16 +5,24 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
+from service_common.metrics import registry
 from .models import Notification
 
+notifications_sent = registry.counter(
+    'notifications_sent_total', 'Notification emails by type and result (sent, failed, missing).',
+    ('type', 'result'),
+)
+
 
 @shared_task
 def send_notification_email(notification_id):
     """
     Send notification email.
     """
+    notification_type = 'unknown'
     try:
         notification = Notification.objects.get(id=notification_id)
+        notification_type = notification.notification_type
         
         # Send email
         send_mail(
@@ -27,12 +35,15 @@ def send_notification_email(notification_id):
         
         # Mark as sent
         notification.mark_as_sent()
+        notifications_sent.inc(notification_type, 'sent')
         
         return f"Email sent successfully to {notification.recipient_email}"
         
     except Notification.DoesNotExist:
+        notifications_sent.inc(notification_type, 'missing')
         return f"Notification with id {notification_id} not found"
     except Exception as e:
+        notifications_sent.inc(notification_type, 'failed')
         return f"Error sending email: {str(e)}"
 
 
@@ -265,3 +265,240 @@ class NotificationModelExtendedTestCase(TestCase):
         self.assertIsNone(notification.read_at)
         self.assertFalse(notification.is_read)
 
+
+
+class NotificationFastPathTestCase(APITestCase):
+    """测试通知列表快速序列化路径"""
+    
+    def setUp(self):
+        post_save.disconnect(signals.notification_created, sender=Notification)
+        for index in range(3):
+            Notification.objects.create(
+                recipient_id=1,
+                recipient_email='test@test.com',
+                recipient_name='Test User',
+                title=f'通知 {index}',
+                message='消息',
+                notification_type='system_announcement',
+                sent_at=timezone.now() if index else None
+            )
+    
+    def tearDown(self):
+        post_save.connect(signals.notification_created, sender=Notification)
+    
+    def test_values_serializer_matches_model_serializer(self):
+        """测试快速路径输出与 NotificationSerializer 一致"""
+        from .serializers import NotificationSerializer, NotificationValuesSerializer
+        queryset = Notification.objects.order_by('id')
+        expected = NotificationSerializer(queryset, many=True).data
+        fast = NotificationValuesSerializer()
+        self.assertEqual(fast.serialize(fast.prepare(queryset)), [dict(item) for item in expected])
+    
+    def test_list_uses_fast_path(self):
+        """测试列表接口返回与慢速路径相同的 JSON"""
+        url = reverse('notification-list')
+        fast = self.client.get(url, {'recipient_id': 1}).json()
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(url, {'recipient_id': 1}).json()
+        self.assertEqual(fast, slow)
+        self.assertEqual(fast['count'], 3)
+    
+    def test_fast_renderer_matches_json_renderer(self):
+        """测试 FastJSONRenderer 与 JSONRenderer 输出等价"""
+        import json
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = {'title': '通知', 'created_at': timezone.now(), 'amount': Decimal('1.50'), 'items': [1, None]}
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data))
+        )
+    
+    def test_list_gzip(self):
+        """测试列表响应按 Accept-Encoding 压缩"""
+        import gzip
+        url = reverse('notification-list')
+        plain = self.client.get(url, {'recipient_id': 1})
+        with self.settings(RESPONSE_COMPRESSION_MIN_SIZE=0):
+            response = self.client.get(url, {'recipient_id': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+
+@override_settings(
+    EVENT_BROKER_URL='memory://',
+    SERVICE_TOKEN_SIGNING_KEYS=['signing-key'],
+    SERVICE_TOKEN_TTL=900,
+    SERVICE_TOKEN_REVOCATION_POLL=0,
+)
+class SignedServiceTokenAuthenticationTestCase(APITestCase):
+    """测试通知服务本地校验签名服务令牌"""
+    
+    def setUp(self):
+        from .broker import get_broker
+        from .service_tokens import revocations
+        self.broker = get_broker()
+        self.broker.clear()
+        revocations.reset()
+        self.url = reverse('notificationpreference-list')
+    
+    def _token(self):
+        from .service_tokens import issue_service_token
+        token, _ = issue_service_token({'id': 3, 'username': 'volunteer', 'role': 'volunteer'})
+        return token
+    
+    def test_signed_token_authenticates(self):
+        """测试签名令牌可访问需要认证的接口"""
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {self._token()}')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_invalid_and_revoked_tokens_rejected(self):
+        """测试伪造或已撤销的令牌被拒绝"""
+        import time
+        token = self._token()
+        forged = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}x')
+        self.broker.publish('token-revocations', [
+            {'user_id': 3, 'revoked_at': time.time() + 1, 'expires_at': time.time() + 900},
+        ])
+        revoked = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}')
+        
+        self.assertEqual(forged.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(revoked.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RequestTimingTestCase(APITestCase):
+    """测试请求计时中间件"""
+    
+    def setUp(self):
+        from service_common.metrics import registry
+        registry.clear()
+    
+    def test_server_timing_and_metrics(self):
+        """测试 Server-Timing 头与按路由的延迟直方图"""
+        response = self.client.get(reverse('notification-list'))
+        
+        self.assertIn('render;dur=', response['Server-Timing'])
+        body = self.client.get('/metrics').content.decode()
+        self.assertRegex(body, r'http_request_duration_seconds_count\{route="[^"]*notifications[^"]*",method="GET"\} 1')
+
+
+class NotificationMetricsTestCase(APITestCase):
+    """测试通知发送速率与 Celery 队列深度指标"""
+    
+    def setUp(self):
+        from service_common.metrics import registry
+        registry.clear()
+    
+    def test_send_results_counted(self):
+        """测试通知邮件按类型与结果计数"""
+        from .tasks import send_notification_email
+        Notification.objects.create(
+            recipient_id=1,
+            recipient_email='user@test.com',
+            recipient_name='User',
+            notification_type='system_announcement',
+            title='Hello',
+            message='World',
+        )
+        send_notification_email(999999)
+        
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('notifications_sent_total{type="system_announcement",result="sent"} 1', body)
+        self.assertIn('notifications_sent_total{type="unknown",result="missing"} 1', body)
+    
+    def test_queue_depth_not_reported_in_eager_mode(self):
+        """测试同步执行任务时不报告队列深度"""
+        body = self.client.get('/metrics').content.decode()
+        
+        self.assertNotIn('celery_queue_length', body)
+    
+    def test_queue_depth_from_broker(self):
+        """测试从消息队列读取各队列的待处理消息数"""
+        from kombu import Connection
+        from .celery import app, queue_depth_metrics
+        # 配置带 CELERY 命名空间，需按完整键名覆盖
+        self.addCleanup(app.conf.__setitem__, 'CELERY_TASK_ALWAYS_EAGER', app.conf.task_always_eager)
+        app.conf['CELERY_TASK_ALWAYS_EAGER'] = False
+        with Connection('memory://') as connection:
+            queue = connection.SimpleQueue('celery')
+            queue.put({'task': 'a'})
+            queue.put({'task': 'b'})
+            with patch.object(app, 'connection_for_read', lambda **kwargs: Connection('memory://')):
+                metrics = queue_depth_metrics()
+            queue.clear()
+            queue.close()
+        
+        self.assertEqual(metrics[0][0], 'celery_queue_length')
+        self.assertEqual(metrics[0][4][('celery',)], 2)
+
+
+class SeedDataTestCase(TestCase):
+    """测试合成通知数据生成（seed_data 命令）"""
+    
+    def test_same_seed_same_rows(self):
+        """测试相同的种子生成相同的通知，且状态与时间一致"""
+        from .seeding import seed
+        from .synthetic import anchor
+        
+        def rows():
+            return list(Notification.objects.order_by('pk').values_list(
+                'recipient_id', 'notification_type', 'is_read', 'created_at', 'read_at'
+            ))
+        
+        self.assertEqual(seed(scale=0.001, seed=5), {'notifications': 1000})
+        first = rows()
+        Notification.objects.all().delete()
+        seed(scale=0.001, seed=5)
+        self.assertEqual(rows(), first)
+        
+        now = anchor()
+        for notification in Notification.objects.all():
+            self.assertLessEqual(notification.created_at, now)
+            self.assertEqual(notification.read_at is not None, notification.is_read)
+            if notification.is_read:
+                self.assertTrue(notification.is_sent)
+                self.assertLessEqual(notification.sent_at, notification.read_at)
+            # 组织者（id 1..2）只收到活动审核类通知
+            if notification.recipient_id <= 2:
+                self.assertNotIn(notification.notification_type, ('volunteer_approval', 'activity_reminder'))
+    
+    def test_command(self):
+        """测试命令只在空库中生成，--copy 需要 PostgreSQL"""
+        from io import StringIO
+        from django.core.management import CommandError, call_command
+        
+        with self.assertRaisesMessage(CommandError, 'PostgreSQL'):
+            call_command('seed_data', copy=True, stdout=StringIO())
+        out = StringIO()
+        call_command('seed_data', scale=0.001, stdout=out)
+        self.assertIn('notifications=1000', out.getvalue())
+        with self.assertRaisesMessage(CommandError, 'already has notifications'):
+            call_command('seed_data', scale=0.001, stdout=StringIO())
+
+
+class ServiceSecretSettingsTestCase(TestCase):
+    """测试服务间密钥在关闭 DEBUG 时必须显式配置"""
+    
+    def _load(self, **environ):
+        import importlib.util
+        from pathlib import Path
+        from unittest import mock
+        from django.conf import settings
+        path = Path(settings.BASE_DIR) / 'notification_service/settings.py'
+        environ.setdefault('SERVICE_TOKEN_SIGNING_KEYS', '')
+        with mock.patch.dict('os.environ', environ):
+            spec = importlib.util.spec_from_file_location('settings_under_test', path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        return module
+    
+    def test_signing_keys_required_without_debug(self):
+        """测试生产环境缺少服务令牌签名密钥时拒绝启动，DEBUG 下回退到开发密钥"""
+        from django.core.exceptions import ImproperlyConfigured
+        with self.assertRaisesMessage(ImproperlyConfigured, 'SERVICE_TOKEN_SIGNING_KEYS'):
+            self._load(DEBUG='False')
+        module = self._load(DEBUG='False', SERVICE_TOKEN_SIGNING_KEYS='new, old')
+        self.assertEqual(module.SERVICE_TOKEN_SIGNING_KEYS, ['new', 'old'])
+        self.assertTrue(self._load(DEBUG='True').SERVICE_TOKEN_SIGNING_KEYS)
@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
 from rest_framework.routers import DefaultRouter
+from service_common import metrics
 from . import views
 
 router = DefaultRouter()
@@ -16,4 +17,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include(router.urls)),
     path('api/v1/health/', lambda request: JsonResponse({'status': 'ok'}, status=200)),
+    path('metrics', metrics.metrics_view, name='metrics'),
 ]
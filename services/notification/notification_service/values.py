@@ -0,0 +1,90 @@
+"""
+Read-only ``queryset.values()`` fast path for list endpoints.
+
+``ValuesSerializer`` subclasses declare a model, the columns to select and
+optional annotations, and render plain dict rows without building a DRF
+field per value. Annotations the queryset already carries (for example
+from the view's ``get_queryset``) are reused rather than added twice.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models as db_models
+from rest_framework import serializers
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path that renders ``queryset.values()`` rows as dicts.
+
+    The conversion plan is compiled once per class: columns whose model
+    field needs formatting (dates, decimals, ...) reuse the DRF field that
+    ``ModelSerializer`` would build, every other column is copied as is, and
+    output names with a ``get_<name>(row)`` method are computed. Rendering a
+    row is then a single loop with no per-field object overhead. File fields
+    are not supported.
+    """
+    model = None
+    fields = ()
+    output_fields = None
+    annotations = {}
+
+    CONVERTED_FIELDS = (
+        db_models.DateTimeField, db_models.DateField, db_models.TimeField,
+        db_models.DecimalField, db_models.DurationField, db_models.UUIDField,
+    )
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self._steps = [
+            (name, getattr(self, f'get_{name}', None), converter)
+            for name, converter in self.get_plan()
+        ]
+
+    @classmethod
+    def get_columns(cls):
+        if cls.fields == '__all__':
+            return [field.name for field in cls.model._meta.concrete_fields]
+        return list(cls.fields)
+
+    @classmethod
+    def get_plan(cls):
+        plan = cls.__dict__.get('_plan')
+        if plan is None:
+            builder = serializers.ModelSerializer()
+            plan = []
+            for name in cls.output_fields or cls.get_columns():
+                converter = None
+                try:
+                    model_field = cls.model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    model_field = None
+                if isinstance(model_field, cls.CONVERTED_FIELDS):
+                    field_class, field_kwargs = builder.build_standard_field(name, model_field)
+                    converter = field_class(**field_kwargs).to_representation
+                plan.append((name, converter))
+            cls._plan = plan
+        return plan
+
+    def prepare(self, queryset):
+        """Apply annotations and switch the queryset to ``values()`` rows."""
+        annotations = {
+            name: expression for name, expression in self.annotations.items()
+            if name not in queryset.query.annotations
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset.values(*self.get_columns(), *self.annotations)
+
+    def to_representation(self, row):
+        ret = {}
+        for name, method, converter in self._steps:
+            if method is not None:
+                ret[name] = method(row)
+                continue
+            value = row[name]
+            ret[name] = value if converter is None or value is None else converter(value)
+        return ret
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
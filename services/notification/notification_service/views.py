@@ -1,16 +1,19 @@
 """
 Views for notification service.
 """
+from django.conf import settings
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import Notification, NotificationTemplate, NotificationPreference
 from .serializers import (
     NotificationSerializer, NotificationTemplateSerializer, 
-    NotificationPreferenceSerializer
+    NotificationPreferenceSerializer, NotificationValuesSerializer
 )
+from .renderers import FastJSONRenderer
 from .tasks import send_notification_email
 
 
@@ -26,6 +29,18 @@ class NotificationViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'message', 'recipient_name']
     ordering_fields = ['created_at', 'priority']
     ordering = ['-created_at']
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    
+    def list(self, request, *args, **kwargs):
+        """List notifications through the values() fast path."""
+        if not settings.FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+        serializer = NotificationValuesSerializer()
+        rows = serializer.prepare(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
     
     def get_queryset(self):
         """Filter by recipient to support role-specific views."""
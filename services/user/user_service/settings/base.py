@@ -4,7 +4,8 @@ Django settings for user service.
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Choices, config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -29,7 +30,7 @@ DJANGO_APPS = [
 
 THIRD_PARTY_APPS = [
     'rest_framework',
-    'rest_framework.authtoken',
+    'rest_framework.authtoken',  # 仅用于把旧的明文令牌迁移为摘要（users 迁移 0007）
     'corsheaders',
     'django_filters',
     'drf_spectacular',
@@ -43,9 +44,13 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'service_common.logs.RequestIdMiddleware',  # 最外层：计时日志也带有请求 id
+    'service_common.timing.TimingMiddleware',  # 计时覆盖整个请求
+    'service_common.query_inspection.QueryInspectionMiddleware',  # 仅在 QUERY_INSPECTION 开启时生效
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'users.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -77,12 +82,23 @@ WSGI_APPLICATION = 'user_service.wsgi.application'
 # Database
 # 支持使用 SQLite 或 PostgreSQL
 USE_SQLITE = config('USE_SQLITE', default=True, cast=bool)
+# SQLite 文件位置；部署时放在与事件中继/消费进程共享的卷上
+SQLITE_PATH = config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3'))
+
+# 持久连接：每个 worker 线程保留自己的数据库连接最多 DB_CONN_MAX_AGE 秒（0 为每个请求重新连接），
+# 复用前先检查连接是否可用。本服务最多占用 worker 数 × 线程数个连接（见 gunicorn.conf.py）。
+# DB_POOL_MODE=transaction：经 PgBouncer 的事务级连接池连接，事务之间会换用不同的服务端连接，
+# 因此关闭服务端游标；数据库（或角色）的默认时区需为 UTC，会话级的 SET 不会保留。
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_POOL_MODE = config('DB_POOL_MODE', default='session', cast=Choices(['session', 'transaction']))
 
 if USE_SQLITE:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': SQLITE_PATH,
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 else:
@@ -94,9 +110,27 @@ else:
             'PASSWORD': config('DB_PASSWORD', default='password'),
             'HOST': config('DB_HOST', default='localhost'),
             'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'transaction',
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+                'application_name': 'user-service',
+            },
         }
     }
 
+# Password hashing
+# 迭代次数变化后，用户下次登录成功时自动以新参数重新哈希
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=600000, cast=int)
+PASSWORD_HASHERS = [
+    'users.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -146,7 +180,7 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -164,8 +198,86 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # 客户端与本服务之间的可信代理数（compose 中为前端 nginx），
+    # 客户端 IP 取 X-Forwarded-For 中由最外层代理追加的那一段
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
 }
 
+# 高频列表接口使用 values() 快速序列化路径
+FAST_LIST_SERIALIZATION = config('FAST_LIST_SERIALIZATION', default=True, cast=bool)
+
+# Streaming image uploads (avatars)
+UPLOAD_MAX_IMAGE_SIZE = config('UPLOAD_MAX_IMAGE_SIZE', default=5 * 1024 * 1024, cast=int)
+UPLOAD_MAX_REQUEST_SIZE = config('UPLOAD_MAX_REQUEST_SIZE', default=6 * 1024 * 1024, cast=int)
+
+# 首页统计快照的最大陈旧时间（秒）
+STATS_MAX_AGE = config('STATS_MAX_AGE', default=30, cast=float)
+
+# 内部服务间调用的共享令牌（逗号分隔，支持轮换；请求头 X-Service-Token）
+# 仅 DEBUG 下回退到公开的开发令牌，生产环境未配置时拒绝启动
+INTERNAL_SERVICE_TOKENS = config(
+    'INTERNAL_SERVICE_TOKENS', default='',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+if not INTERNAL_SERVICE_TOKENS:
+    if not DEBUG:
+        raise ImproperlyConfigured('INTERNAL_SERVICE_TOKENS must be set when DEBUG is off')
+    INTERNAL_SERVICE_TOKENS = ['django-insecure-internal-service-token']
+
+# 参与事件的消息代理：memory:// 或 file:///共享目录（与活动服务一致）
+EVENT_BROKER_URL = config('EVENT_BROKER_URL', default=(BASE_DIR.parent / 'events').as_uri())
+
+# 签名服务令牌：第一个密钥签发，全部密钥校验（逗号分隔，支持轮换；须与活动、通知服务一致）
+# 仅 DEBUG 下回退到公开的开发密钥，生产环境未配置时拒绝启动
+SERVICE_TOKEN_SIGNING_KEYS = config(
+    'SERVICE_TOKEN_SIGNING_KEYS', default='',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+if not SERVICE_TOKEN_SIGNING_KEYS:
+    if not DEBUG:
+        raise ImproperlyConfigured('SERVICE_TOKEN_SIGNING_KEYS must be set when DEBUG is off')
+    SERVICE_TOKEN_SIGNING_KEYS = ['django-insecure-service-token-signing-key']
+# 服务令牌有效期（秒）
+SERVICE_TOKEN_TTL = config('SERVICE_TOKEN_TTL', default=900, cast=int)
+# 令牌撤销列表的轮询间隔（秒）
+SERVICE_TOKEN_REVOCATION_POLL = config('SERVICE_TOKEN_REVOCATION_POLL', default=1.0, cast=float)
+
+# 每个用户最多保留的 API 令牌数（每次登录一个，超出时删除最早的）
+AUTH_TOKENS_PER_USER = config('AUTH_TOKENS_PER_USER', default=10, cast=int)
+
+# 令牌 -> 用户解析的进程内缓存：有效期（秒）与最大条目数
+TOKEN_AUTH_CACHE_TTL = config('TOKEN_AUTH_CACHE_TTL', default=60, cast=float)
+TOKEN_AUTH_CACHE_SIZE = config('TOKEN_AUTH_CACHE_SIZE', default=10000, cast=int)
+# last_seen_at 批量写入的间隔（秒）
+LAST_SEEN_FLUSH_INTERVAL = config('LAST_SEEN_FLUSH_INTERVAL', default=60, cast=float)
+
+# 登录限流（DRF 速率格式，如 20/min），计数保存在 LOGIN_RATE_LIMIT_CACHE 指定的缓存中
+LOGIN_RATE_LIMIT_PER_IP = config('LOGIN_RATE_LIMIT_PER_IP', default='20/min')
+LOGIN_RATE_LIMIT_PER_ACCOUNT = config('LOGIN_RATE_LIMIT_PER_ACCOUNT', default='10/min')
+LOGIN_RATE_LIMIT_CACHE = config('LOGIN_RATE_LIMIT_CACHE', default='default')
+
+# 每个请求输出一行结构化计时日志（logger: request_timing）
+REQUEST_TIMING_LOG = config('REQUEST_TIMING_LOG', default=False, cast=bool)
+
+# Prometheus 指标（/metrics）。多 worker（gunicorn -w N）时设置为各 worker 共享的空目录，
+# 每个 worker 定期把自己的计数写入该目录，抓取时合并
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+
+# 开发与 CI：按请求检测 N+1 查询、慢查询与视图查询预算（logger: query_inspection）
+QUERY_INSPECTION = config('QUERY_INSPECTION', default=DEBUG, cast=bool)
+# 严格模式下 N+1 与超出预算会抛出异常；manage.py test 始终使用严格模式
+QUERY_INSPECTION_STRICT = config('QUERY_INSPECTION_STRICT', default=False, cast=bool)
+N_PLUS_ONE_THRESHOLD = config('N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=100, cast=float)
+TEST_RUNNER = 'service_common.query_inspection.QueryInspectionTestRunner'
+
+# Response compression (brotli / zstd are used when their packages are installed)
+RESPONSE_COMPRESSION_MIN_SIZE = config('RESPONSE_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+RESPONSE_COMPRESSION_GZIP_LEVEL = config('RESPONSE_COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+RESPONSE_COMPRESSION_BROTLI_QUALITY = config('RESPONSE_COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+RESPONSE_COMPRESSION_ZSTD_LEVEL = config('RESPONSE_COMPRESSION_ZSTD_LEVEL', default=3, cast=int)
+
 # CORS settings - 支持通过 nginx 网关和 ingress 访问
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -231,35 +343,47 @@ CACHES = {
 }
 
 # Logging
+# 结构化日志：请求线程只把记录放入有界队列，后台线程以 JSON 行写到 stderr（见 service_common.logs）
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+# 应用调试日志按请求取样的比例（同一请求的调试记录一起保留或丢弃）；0 表示不生成调试记录
+LOG_DEBUG_SAMPLE_RATE = config('LOG_DEBUG_SAMPLE_RATE', default=1.0 if DEBUG else 0.0, cast=float)
+# 队列满时丢弃记录而不阻塞请求（log_records_dropped_total）
+LOG_QUEUE_SIZE = config('LOG_QUEUE_SIZE', default=10000, cast=int)
+# 日志输出：json 写到 stderr，null 丢弃全部输出（测试设置使用；assertLogs 自带处理器，不受影响）
+LOG_HANDLER = config('LOG_HANDLER', default='json', cast=Choices(['json', 'null']))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-            'style': '{',
+    'filters': {
+        'sampling': {
+            '()': 'service_common.logs.SamplingFilter',
+            'rate': LOG_DEBUG_SAMPLE_RATE,
         },
     },
     'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+        'json': {
+            # 用 '()' 而不是 'class'：dictConfig 对 QueueHandler 子类另有处理
+            '()': 'service_common.logs.QueueJSONHandler',
+            'queue_size': LOG_QUEUE_SIZE,
+            'filters': ['sampling'],
+        },
+        'null': {
+            'class': 'logging.NullHandler',
         },
     },
     'root': {
-        'handlers': ['console'],
-        'level': 'INFO',
+        'handlers': [LOG_HANDLER],
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django': {
-            'handlers': ['console'],
+            'handlers': [LOG_HANDLER],
             'level': 'INFO',
             'propagate': False,
         },
         'users': {
-            'handlers': ['console'],
-            'level': 'DEBUG',
-            'propagate': False,
+            'level': 'DEBUG' if LOG_DEBUG_SAMPLE_RATE > 0 else LOG_LEVEL,
         },
     },
 }
@@ -22,10 +22,10 @@ class UserAdmin(BaseUserAdmin):
         ('Role & Permissions', {'fields': ('role', 'is_active', 'is_staff', 'is_superuser', 'is_verified')}),
         ('Volunteer Info', {'fields': ('total_volunteer_hours', 'impact_score', 'interests', 'skills', 'languages')}),
         ('Notifications', {'fields': ('email_notifications', 'sms_notifications', 'push_notifications')}),
-        ('Important dates', {'fields': ('last_login', 'date_joined', 'created_at', 'updated_at')}),
+        ('Important dates', {'fields': ('last_login', 'last_seen_at', 'date_joined', 'created_at', 'updated_at')}),
     )
     
-    readonly_fields = ('created_at', 'updated_at', 'date_joined', 'last_login')
+    readonly_fields = ('created_at', 'updated_at', 'date_joined', 'last_login', 'last_seen_at')
     
     add_fieldsets = (
         (None, {
@@ -0,0 +1,179 @@
+"""
+Token authentication with a per-process token -> user cache.
+
+``CachedTokenAuthentication`` resolves an API token (stored hashed, see
+``users.tokens``) with one ``AuthToken`` + ``User`` + ``UserProfile``
+query and keeps the result, keyed by the token digest, for
+``TOKEN_AUTH_CACHE_TTL`` seconds in a bounded LRU
+(``TOKEN_AUTH_CACHE_SIZE`` entries). Repeat requests in that window, such
+as the activity service's ``/profile/`` calls, are authenticated and
+served without a database query.
+
+Entries are dropped when the token is replaced or deleted (login, logout)
+and, by the signals in ``users.signals``, when the user or their profile
+is saved (password change, profile updates). That only reaches the
+current process. Other processes drop a token's entry once its logout is
+published as a service token revocation (``users.service_tokens``). Other changes reach them within
+``TOKEN_AUTH_CACHE_TTL``. The same applies to ``QuerySet.update()``
+writes, which bypass signals.
+
+Authenticated requests also note the user's ``last_seen_at``. The
+timestamps are buffered and written with one ``bulk_update`` at most
+every ``LAST_SEEN_FLUSH_INTERVAL`` seconds.
+"""
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from service_common.metrics import record_cache
+
+from .service_tokens import revocations
+from .tokens import token_digest
+
+logger = logging.getLogger(__name__)
+
+
+class TokenUserCache:
+    """Bounded LRU of token digest -> ``(user, token, cached_at, monotonic cached_at)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[3] >= settings.TOKEN_AUTH_CACHE_TTL:
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, user, token):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (user, token, time.time(), time.monotonic())
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > settings.TOKEN_AUTH_CACHE_SIZE:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[0].pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[0].pk]
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._discard(key)
+
+    def invalidate_user_on_commit(self, user_id):
+        """
+        Drop the user's entries now and again once the transaction commits,
+        so a lookup that raced the write cannot keep the old row.
+        """
+        self.invalidate_user(user_id)
+        transaction.on_commit(lambda: self.invalidate_user(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+
+token_users = TokenUserCache()
+
+
+class LastSeenRecorder:
+    """Buffers ``last_seen_at`` timestamps and writes them in batches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+
+    def seen(self, user_id):
+        with self._lock:
+            self._pending[user_id] = timezone.now()
+            due = time.monotonic() - self._flushed_at >= settings.LAST_SEEN_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered timestamps. Returns how many users were updated."""
+        from .models import User
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            # bulk_update 不触发 post_save，不会使令牌缓存失效
+            User.objects.bulk_update(
+                [User(pk=user_id, last_seen_at=seen_at) for user_id, seen_at in pending.items()],
+                ['last_seen_at'], batch_size=500,
+            )
+        except DatabaseError:
+            logger.warning('Writing last seen timestamps for %d users failed', len(pending), exc_info=True)
+            return 0
+        return len(pending)
+
+
+last_seen = LastSeenRecorder()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` against hashed ``AuthToken`` rows that serves
+    repeat lookups of a token from ``token_users``. Each request gets its
+    own copy of the cached user.
+    """
+
+    def get_model(self):
+        from .models import AuthToken
+
+        return AuthToken
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        entry = token_users.get(digest)
+        # 其他进程的登出会以服务令牌撤销的形式发布（按令牌或按用户）
+        if entry is not None and revocations.is_revoked(entry[0].pk, entry[2], digest):
+            token_users.invalidate_key(digest)
+            entry = None
+        record_cache('token-users', entry is not None)
+        if entry is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user', 'user__profile').get(digest=digest)
+            except model.DoesNotExist:
+                raise AuthenticationFailed('Invalid token.')
+            if not token.user.is_active:
+                raise AuthenticationFailed('User inactive or deleted.')
+            # 缓存独立副本，请求内对用户对象的修改不会进入缓存
+            token_users.set(digest, *copy.deepcopy((token.user, token)))
+            user = token.user
+        else:
+            user, token = copy.deepcopy((entry[0], entry[1]))
+        last_seen.seen(user.pk)
+        return (user, token)
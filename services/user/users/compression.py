@@ -0,0 +1,152 @@
+"""
+Negotiated response compression for JSON API responses.
+
+Picks the best encoding the client accepts from brotli, zstd (each only if
+its package is installed) and gzip, and skips bodies smaller than
+``RESPONSE_COMPRESSION_MIN_SIZE``. Only JSON is compressed: HTML pages
+(the browsable API, admin) carry CSRF tokens and are left alone (BREACH).
+
+Views that serve a response from a shared cache can call
+``mark_precompressible`` so the compressed body is stored in the cache next
+to the entry it was built from, and later hits skip recompression.
+"""
+import gzip
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from service_common.metrics import record_cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/problem+json')
+
+_accept_re = _lazy_re_compile(r'\s*([^\s;,]+)\s*(?:;\s*q=([0-9.]+))?')
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=settings.RESPONSE_COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=settings.RESPONSE_COMPRESSION_BROTLI_QUALITY)
+
+
+def _zstd(data):
+    return zstandard.ZstdCompressor(level=settings.RESPONSE_COMPRESSION_ZSTD_LEVEL).compress(data)
+
+
+def available_encoders():
+    """Supported encodings in server preference order."""
+    encoders = []
+    if brotli is not None:
+        encoders.append(('br', _brotli))
+    if zstandard is not None:
+        encoders.append(('zstd', _zstd))
+    encoders.append(('gzip', _gzip))
+    return encoders
+
+
+def parse_accept_encoding(header):
+    """Map each coding in an ``Accept-Encoding`` header to its q-value."""
+    accepted = {}
+    for match in _accept_re.finditer(header or ''):
+        coding, quality = match.groups()
+        try:
+            accepted[coding.lower()] = float(quality) if quality is not None else 1.0
+        except ValueError:
+            continue
+    return accepted
+
+
+def negotiate_encoding(header):
+    """
+    Return ``(name, compress)`` for the best encoding the client accepts,
+    or None. Higher client q-values win; ties go to server preference.
+    """
+    accepted = parse_accept_encoding(header)
+    best = None
+    for rank, (name, compress) in enumerate(available_encoders()):
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if quality <= 0:
+            continue
+        if best is None or quality > best[0]:
+            best = (quality, rank, name, compress)
+    return (best[2], best[3]) if best else None
+
+
+def mark_precompressible(response, cache_key, timeout):
+    """
+    Let the middleware cache this response's compressed body under
+    ``cache_key`` (which must identify the body exactly) for ``timeout``
+    seconds.
+    """
+    response.precompressed_cache_key = cache_key
+    response.precompressed_cache_timeout = timeout
+    return response
+
+
+def _is_compressible(response):
+    if response.streaming or response.status_code != 200:
+        return False
+    if response.has_header('Content-Encoding'):
+        return False
+    if 'no-transform' in response.get('Cache-Control', ''):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON responses using the negotiated ``Content-Encoding``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not _is_compressible(response):
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        negotiated = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if negotiated is None:
+            return response
+        name, compress = negotiated
+
+        cache_key = getattr(response, 'precompressed_cache_key', None)
+        if cache_key is not None:
+            # Content-Type 参与缓存键：同一数据可能以不同格式渲染
+            cache_key = f"{cache_key}:{response['Content-Type']}:{name}"
+            compressed = cache.get(cache_key)
+            record_cache('response-compression', compressed is not None)
+            if compressed is None:
+                compressed = compress(response.content)
+                cache.set(cache_key, compressed, response.precompressed_cache_timeout)
+        else:
+            compressed = compress(response.content)
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = name
+        # 压缩后的字节不同，强 ETag 需要降级为弱 ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,20 @@
+"""
+Password hasher with a configurable cost.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with ``PASSWORD_HASH_ITERATIONS`` iterations.
+
+    It keeps the ``pbkdf2_sha256`` algorithm name, so existing hashes stay
+    valid. ``must_update`` compares the stored iteration count with the
+    setting, so Django rehashes a password with the new cost on the user's
+    next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,31 @@
+"""
+Apply participation events from the activity service to UserActivity.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.participation import consume
+
+
+class Command(BaseCommand):
+    help = 'Consume participation events in batches; runs until interrupted unless --once is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--once', action='store_true', help='Drain the pending events and exit.')
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+        parser.add_argument('--from-offset', type=int, default=None,
+                            help='Rewind the consumer to this offset first (0 replays everything).')
+
+    def handle(self, *args, **options):
+        from_offset = options['from_offset']
+        while True:
+            read, changed = consume(options['batch_size'], from_offset=from_offset)
+            from_offset = None
+            if read or options['once']:
+                self.stdout.write(f'Applied {read} events ({changed} participations changed)')
+            if options['once']:
+                return
+            if not read:
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,16 @@
+"""
+Recompute the landing-page statistics from scratch.
+"""
+from django.core.management.base import BaseCommand
+
+from users.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the volunteer and organizer counts.'
+
+    def handle(self, *args, **options):
+        values = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"total_volunteers={values['total_volunteers']} total_ngos={values['total_ngos']}"
+        ))
@@ -0,0 +1,28 @@
+"""
+Recompute every user's impact score in batches (e.g. after a rule change).
+"""
+from django.core.management.base import BaseCommand
+
+from users.scoring import recompute_impact_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute impact scores in batches; use --dry-run to only show the differences.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true', help='Report changes without writing them.')
+        parser.add_argument('--show', type=int, default=20, help='Number of changed scores to list.')
+
+    def handle(self, *args, **options):
+        report = recompute_impact_scores(
+            batch_size=options['batch_size'], dry_run=options['dry_run'], diff_limit=options['show']
+        )
+        for user_id, old, new in report.changes:
+            self.stdout.write(f'user {user_id}: {old} -> {new}')
+        levels = ', '.join(f'{level}={count}' for level, count in sorted(report.levels.items()))
+        verb = 'would change' if report.dry_run else 'changed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{report.processed} users, {report.changed} scores {verb} in {report.elapsed:.2f}s '
+            f'({report.users_per_second:.0f} users/s); levels: {levels}'
+        ))
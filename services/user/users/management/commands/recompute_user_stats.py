@@ -0,0 +1,26 @@
+"""
+Rebuild the per-user dashboard statistics (backfills, repairs).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.stats import recompute_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute UserStats rows and sync total_volunteer_hours / impact_score.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only recompute this user id (repeatable).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        processed = recompute_user_stats(options['user_ids'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed stats for {processed} users in {elapsed:.2f}s ({rate:.0f} users/s)'
+        ))
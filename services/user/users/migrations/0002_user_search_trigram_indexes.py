@@ -0,0 +1,52 @@
+# Generated by Django 4.2.24 on 2026-10-19 17:42
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+import users.models
+
+
+def delete_orphaned_rows(apps, schema_editor):
+    """
+    Drop tokens and profiles whose user no longer exists (left behind by
+    deletes made while SQLite enforced no foreign keys). SQLite checks every
+    foreign key after each migration, so a single orphan fails this and
+    every later migration.
+    """
+    user_ids = apps.get_model('users', 'User').objects.values('pk')
+    for model in (apps.get_model('authtoken', 'Token'), apps.get_model('users', 'UserProfile')):
+        model.objects.exclude(user_id__in=user_ids).delete()
+
+
+class AddIndexOnPostgres(migrations.AddIndex):
+    """AddIndex that only touches the database on PostgreSQL (GIN / pg_trgm)."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('authtoken', '0003_tokenproxy'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_orphaned_rows, migrations.RunPython.noop),
+        # 非 PostgreSQL 数据库上自动跳过
+        TrigramExtension(),
+        AddIndexOnPostgres(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(users.models.SearchDocument('first_name', 'last_name', 'email'), name='gin_trgm_ops'), name='users_search_trgm'),
+        ),
+        AddIndexOnPostgres(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('location', name='gin_trgm_ops'), name='users_location_trgm'),
+        ),
+    ]
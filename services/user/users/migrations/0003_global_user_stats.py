@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-19 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_volunteers', models.PositiveIntegerField(default=0)),
+                ('total_ngos', models.PositiveIntegerField(default=0)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Global User Stats',
+                'verbose_name_plural': 'Global User Stats',
+                'db_table': 'user_global_stats',
+            },
+        ),
+    ]
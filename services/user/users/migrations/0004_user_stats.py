@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-19 17:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_global_user_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('activities_joined', models.PositiveIntegerField(default=0)),
+                ('activities_completed', models.PositiveIntegerField(default=0)),
+                ('achievements_earned', models.PositiveIntegerField(default=0)),
+                ('total_hours', models.PositiveIntegerField(default=0)),
+                ('recent_activities', models.JSONField(blank=True, default=list)),
+                ('recent_achievements', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User Stats',
+                'verbose_name_plural': 'User Stats',
+                'db_table': 'user_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.24 on 2026-10-19 17:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventConsumerOffset',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('offset', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Event Consumer Offset',
+                'verbose_name_plural': 'Event Consumer Offsets',
+                'db_table': 'event_consumer_offsets',
+            },
+        ),
+        migrations.AddField(
+            model_name='useractivity',
+            name='last_event_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='useractivity',
+            name='registered_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
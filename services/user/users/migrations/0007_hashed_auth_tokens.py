@@ -0,0 +1,43 @@
+# Generated by Django 4.2.24 on 2026-10-19 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import hashlib
+
+
+def hash_existing_tokens(apps, schema_editor):
+    """Copy DRF tokens as digests and drop the plaintext keys; clients keep their tokens."""
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('users', 'AuthToken')
+    AuthToken.objects.bulk_create([
+        AuthToken(user_id=user_id, digest=hashlib.sha256(key.encode()).hexdigest(), created=created)
+        for key, user_id, created in Token.objects.values_list('key', 'user_id', 'created').iterator()
+    ], batch_size=1000)
+    Token.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_last_seen_at'),
+        ('authtoken', '0003_tokenproxy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='hashed_token', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Auth Token',
+                'verbose_name_plural': 'Auth Tokens',
+                'db_table': 'user_auth_tokens',
+            },
+        ),
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+    ]
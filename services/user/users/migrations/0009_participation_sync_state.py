@@ -0,0 +1,48 @@
+# Generated by Django 4.2.24 on 2026-10-19 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_last_event_ids(apps, schema_editor):
+    """Carry the ids applied so far over; earlier events had no source."""
+    UserActivity = apps.get_model('users', 'UserActivity')
+    ParticipationSyncState = apps.get_model('users', 'ParticipationSyncState')
+    rows = UserActivity.objects.filter(last_event_id__gt=0).values_list('user_id', 'activity_id', 'last_event_id')
+    ParticipationSyncState.objects.bulk_create(
+        [ParticipationSyncState(user_id=user_id, activity_id=activity_id, source='', last_event_id=event_id)
+         for user_id, activity_id, event_id in rows.iterator()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_auth_token_per_device'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipationSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_id', models.PositiveIntegerField()),
+                ('source', models.CharField(blank=True, max_length=36)),
+                ('last_event_id', models.PositiveBigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Participation Sync State',
+                'verbose_name_plural': 'Participation Sync States',
+                'db_table': 'participation_sync_state',
+                'unique_together': {('user', 'activity_id', 'source')},
+            },
+        ),
+        migrations.RunPython(copy_last_event_ids, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='useractivity',
+            name='last_event_id',
+        ),
+    ]
@@ -2,10 +2,26 @@
 User models for the volunteer platform.
 """
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
 from django.utils import timezone
 
 
+class SearchDocument(models.Func):
+    """
+    Space-joined text columns using ``||``. Unlike ``Concat`` (``CONCAT()``
+    on PostgreSQL, which is not IMMUTABLE) it can be used in an index.
+    Columns must be NOT NULL.
+    """
+    template = '(%(expressions)s)'
+    arg_joiner = " || ' ' || "
+    output_field = models.TextField()
+
+
+# 用户搜索使用的组合文本（姓名 + 邮箱），PostgreSQL 上有对应的 trigram 索引
+USER_SEARCH_DOCUMENT = SearchDocument('first_name', 'last_name', 'email')
+
+
 class User(AbstractUser):
     """
     Custom user model extending Django's AbstractUser.
@@ -27,6 +43,8 @@ class User(AbstractUser):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # 最近一次认证请求的时间（批量写入，见 users.authentication）
+    last_seen_at = models.DateTimeField(blank=True, null=True)
     
     # Volunteer specific fields
     total_volunteer_hours = models.PositiveIntegerField(default=0)
@@ -49,6 +67,11 @@ class User(AbstractUser):
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        # 仅在 PostgreSQL 上创建（见迁移 0002），SQLite 走 LIKE 回退
+        indexes = [
+            GinIndex(OpClass(USER_SEARCH_DOCUMENT, name='gin_trgm_ops'), name='users_search_trgm'),
+            GinIndex(OpClass('location', name='gin_trgm_ops'), name='users_location_trgm'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
@@ -59,41 +82,40 @@ class User(AbstractUser):
     
     def get_volunteer_level(self):
         """Get volunteer level based on total hours."""
-        if self.total_volunteer_hours >= 500:
-            return 'Expert'
-        elif self.total_volunteer_hours >= 200:
-            return 'Advanced'
-        elif self.total_volunteer_hours >= 50:
-            return 'Intermediate'
-        elif self.total_volunteer_hours >= 10:
-            return 'Beginner'
-        else:
-            return 'New'
+        return volunteer_level(self.total_volunteer_hours)
+    
+    def calculate_impact_score(self):
+        """Impact score for the current field values (not saved)."""
+        return calculate_impact_score(
+            self.total_volunteer_hours, self.skills, self.languages, self.interests, self.is_verified
+        )
     
     def update_impact_score(self):
         """Calculate and update impact score based on various factors."""
-        score = 0
-        
-        # Base score from volunteer hours
-        score += min(self.total_volunteer_hours * 2, 200)
-        
-        # Bonus for skills
-        score += len(self.skills) * 5
-        
-        # Bonus for languages
-        score += len(self.languages) * 3
-        
-        # Bonus for interests
-        score += len(self.interests) * 2
-        
-        # Bonus for verification
-        if self.is_verified:
-            score += 50
-        
-        self.impact_score = min(score, 1000)  # Cap at 1000
+        self.impact_score = self.calculate_impact_score()
         self.save(update_fields=['impact_score'])
 
 
+def volunteer_level(total_hours):
+    """Volunteer level for a number of volunteer hours."""
+    if total_hours >= 500:
+        return 'Expert'
+    elif total_hours >= 200:
+        return 'Advanced'
+    elif total_hours >= 50:
+        return 'Intermediate'
+    elif total_hours >= 10:
+        return 'Beginner'
+    else:
+        return 'New'
+
+
+def calculate_impact_score(total_hours, skills, languages, interests, is_verified):
+    """Calculate impact score based on various factors (rules in ``users.scoring``)."""
+    from .scoring import score_columns
+    return score_columns([total_hours], [skills], [languages], [interests], [is_verified])[0]
+
+
 class UserProfile(models.Model):
     """
     Extended user profile information.
@@ -177,7 +199,8 @@ class UserActivity(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
     activity_id = models.PositiveIntegerField()  # Reference to activity service
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='registered')
-    registered_at = models.DateTimeField(auto_now_add=True)
+    # 同步事件需要写入活动服务中的报名时间，因此不用 auto_now_add
+    registered_at = models.DateTimeField(default=timezone.now, editable=False)
     attended_at = models.DateTimeField(blank=True, null=True)
     completed_at = models.DateTimeField(blank=True, null=True)
     hours_volunteered = models.PositiveIntegerField(default=0)
@@ -194,6 +217,71 @@ class UserActivity(models.Model):
         return f"{self.user.full_name} - Activity {self.activity_id}"
 
 
+class UserStats(models.Model):
+    """
+    Materialized dashboard statistics for one user (maintained by
+    ``users.stats``).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    activities_joined = models.PositiveIntegerField(default=0)
+    activities_completed = models.PositiveIntegerField(default=0)
+    achievements_earned = models.PositiveIntegerField(default=0)
+    total_hours = models.PositiveIntegerField(default=0)
+    
+    # 最近的参与 / 成就（各最多 RECENT_ITEMS 条，已序列化）
+    recent_activities = models.JSONField(default=list, blank=True)
+    recent_achievements = models.JSONField(default=list, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'user_stats'
+        verbose_name = 'User Stats'
+        verbose_name_plural = 'User Stats'
+    
+    def __str__(self):
+        return f"Stats for user {self.user_id}"
+
+
+class ParticipationSyncState(models.Model):
+    """
+    Newest participation event applied per (user, activity) and event
+    source (see ``users.participation``). Rows outlive the ``UserActivity``
+    they describe, so a deletion keeps blocking older events (tombstone).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    activity_id = models.PositiveIntegerField()
+    # 发出事件的活动服务数据库（事件 id 只在单个数据库内唯一）
+    source = models.CharField(max_length=36, blank=True)
+    last_event_id = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'participation_sync_state'
+        verbose_name = 'Participation Sync State'
+        verbose_name_plural = 'Participation Sync States'
+        unique_together = ['user', 'activity_id', 'source']
+    
+    def __str__(self):
+        return f"User {self.user_id} - Activity {self.activity_id} @ {self.source or '-'}#{self.last_event_id}"
+
+
+class EventConsumerOffset(models.Model):
+    """
+    Position of an event consumer in its broker topic.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    offset = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'event_consumer_offsets'
+        verbose_name = 'Event Consumer Offset'
+        verbose_name_plural = 'Event Consumer Offsets'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.offset}"
+
+
 class UserNotification(models.Model):
     """
     User notifications.
@@ -232,3 +320,39 @@ class UserNotification(models.Model):
         self.is_read = True
         self.read_at = timezone.now()
         self.save(update_fields=['is_read', 'read_at'])
+
+
+class GlobalUserStats(models.Model):
+    """
+    Platform-wide user counts (single row, maintained by ``users.stats``).
+    """
+    total_volunteers = models.PositiveIntegerField(default=0)
+    total_ngos = models.PositiveIntegerField(default=0)
+    rebuilt_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'user_global_stats'
+        verbose_name = 'Global User Stats'
+        verbose_name_plural = 'Global User Stats'
+    
+    def __str__(self):
+        return f"{self.total_volunteers} volunteers, {self.total_ngos} NGOs"
+
+
+class AuthToken(models.Model):
+    """
+    API token of a user, stored as the SHA-256 digest of the key (see
+    ``users.tokens``). Each login adds one, so every device keeps its own.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auth_tokens')
+    created = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'user_auth_tokens'
+        verbose_name = 'Auth Token'
+        verbose_name_plural = 'Auth Tokens'
+    
+    def __str__(self):
+        return f"Token for user {self.user_id}"
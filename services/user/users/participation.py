@@ -0,0 +1,156 @@
+"""
+Consumer for the activity service's participation events.
+
+Events are read in batches from the ``participation`` topic of the event
+broker (``users.broker``) starting at the offset stored in
+``EventConsumerOffset``. Each batch is applied in one transaction together
+with the new offset:
+
+* events are identified by ``(source, id)``: outbox ids are only unique
+  within one activity database, and every replica has its own;
+* events are collapsed to the newest one per (user, activity, source);
+* events not newer than the last one applied from their source
+  (``ParticipationSyncState``) are skipped, so redelivered or replayed
+  events are harmless. The state outlives deleted participations, so an
+  old create cannot resurrect them;
+* upserts go through one ``bulk_create(update_conflicts=True)`` and
+  deletions through one ``delete()``;
+* the affected users' dashboard stats and ``total_volunteer_hours`` are
+  recomputed once per batch (``users.stats.recompute_user_stats``).
+
+Events for users this service does not know are ignored.
+"""
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .broker import get_broker
+from .models import EventConsumerOffset, ParticipationSyncState, User, UserActivity
+from .stats import recompute_user_stats
+
+TOPIC = 'participation'
+CONSUMER_NAME = 'user-activity-sync'
+UPSERTED = 'participation.upserted'
+DELETED = 'participation.deleted'
+
+# 活动服务的报名状态 -> UserActivity 状态
+STATUS_MAP = {
+    'applied': 'registered',
+    'approved': 'registered',
+    'registered': 'registered',
+    'attended': 'attended',
+    'completed': 'completed',
+    'rejected': 'cancelled',
+    'cancelled': 'cancelled',
+    'no_show': 'cancelled',
+}
+
+
+def _datetime(value):
+    return parse_datetime(value) if value else None
+
+
+def apply_events(events):
+    """
+    Apply a batch of participation events idempotently. Returns the number
+    of (user, activity) rows created, updated or deleted.
+    """
+    # 每个 (用户, 活动, 来源) 只保留 id 最大的事件，并记住它在批次中的位置
+    latest = {}
+    for position, event in enumerate(events):
+        key = (event['user_id'], event['activity_id'], event.get('source', ''))
+        if key not in latest or event['id'] > latest[key][1]['id']:
+            latest[key] = (position, event)
+    if not latest:
+        return 0
+
+    user_ids = {user_id for user_id, _, _ in latest}
+    activity_ids = {activity_id for _, activity_id, _ in latest}
+    known_users = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    applied = {
+        (user_id, activity_id, source): last_event_id
+        for user_id, activity_id, source, last_event_id in ParticipationSyncState.objects.filter(
+            user_id__in=known_users, activity_id__in=activity_ids
+        ).values_list('user_id', 'activity_id', 'source', 'last_event_id')
+    }
+
+    states, newest = [], {}
+    for key, (position, event) in latest.items():
+        user_id, activity_id, source = key
+        if user_id not in known_users or event['id'] <= applied.get(key, 0):
+            continue
+        states.append(ParticipationSyncState(
+            user_id=user_id, activity_id=activity_id, source=source, last_event_id=event['id'],
+        ))
+        # 不同来源的事件按到达顺序生效
+        if (user_id, activity_id) not in newest or position > newest[(user_id, activity_id)][0]:
+            newest[(user_id, activity_id)] = (position, event)
+    if not states:
+        return 0
+
+    upserts, deleted_keys = [], set()
+    for (user_id, activity_id), (_, event) in newest.items():
+        if event['type'] == DELETED:
+            deleted_keys.add((user_id, activity_id))
+            continue
+        upserts.append(UserActivity(
+            user_id=user_id,
+            activity_id=activity_id,
+            status=STATUS_MAP.get(event['status'], 'registered'),
+            registered_at=_datetime(event.get('registered_at')) or timezone.now(),
+            attended_at=_datetime(event.get('attended_at')),
+            completed_at=_datetime(event.get('completed_at')),
+            hours_volunteered=event.get('hours') or 0,
+        ))
+
+    ParticipationSyncState.objects.bulk_create(
+        states,
+        update_conflicts=True,
+        unique_fields=['user', 'activity_id', 'source'],
+        update_fields=['last_event_id'],
+    )
+    if upserts:
+        UserActivity.objects.bulk_create(
+            upserts,
+            update_conflicts=True,
+            unique_fields=['user', 'activity_id'],
+            update_fields=['status', 'attended_at', 'completed_at', 'hours_volunteered'],
+        )
+    deleted = 0
+    if deleted_keys:
+        deletions = [
+            pk for pk, user_id, activity_id in UserActivity.objects.filter(
+                user_id__in={user_id for user_id, _ in deleted_keys},
+                activity_id__in={activity_id for _, activity_id in deleted_keys},
+            ).values_list('pk', 'user_id', 'activity_id')
+            if (user_id, activity_id) in deleted_keys
+        ]
+        deleted = UserActivity.objects.filter(pk__in=deletions).delete()[0]
+    recompute_user_stats(sorted({user_id for user_id, _ in newest}))
+    return len(upserts) + deleted
+
+
+def consume(batch_size=500, max_batches=None, from_offset=None):
+    """
+    Apply pending events until the topic is drained (or ``max_batches`` is
+    reached). ``from_offset`` rewinds the consumer first (replay).
+    Returns ``(events_read, rows_changed)``.
+    """
+    broker = get_broker()
+    position, _ = EventConsumerOffset.objects.get_or_create(name=CONSUMER_NAME)
+    if from_offset is not None:
+        position.offset = from_offset
+        position.save(update_fields=['offset', 'updated_at'])
+
+    read = changed = batches = 0
+    while max_batches is None or batches < max_batches:
+        events, next_offset = broker.read(TOPIC, position.offset, batch_size)
+        if next_offset == position.offset:
+            break
+        with transaction.atomic():
+            changed += apply_events(events)
+            position.offset = next_offset
+            position.save(update_fields=['offset', 'updated_at'])
+        read += len(events)
+        batches += 1
+    return read, changed
@@ -0,0 +1,28 @@
+"""
+Permissions for internal service-to-service endpoints.
+"""
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+SERVICE_TOKEN_HEADER = 'HTTP_X_SERVICE_TOKEN'
+
+
+class IsInternalService(BasePermission):
+    """
+    Allow requests carrying one of ``INTERNAL_SERVICE_TOKENS`` in the
+    ``X-Service-Token`` header. Several tokens may be configured so they can
+    be rotated without downtime.
+    """
+    message = 'Service authentication required.'
+
+    def has_permission(self, request, view):
+        token = request.META.get(SERVICE_TOKEN_HEADER, '')
+        if not token:
+            return False
+        # 逐个常量时间比较，不提前返回
+        matched = False
+        for expected in settings.INTERNAL_SERVICE_TOKENS:
+            matched |= hmac.compare_digest(token.encode(), expected.encode())
+        return matched
@@ -0,0 +1,107 @@
+"""
+User search backend for ``search_users``.
+
+On PostgreSQL the name/email document (``USER_SEARCH_DOCUMENT``) and
+``location`` are matched with ``ILIKE``, which the pg_trgm GIN indexes from
+migration 0002 can serve, and results are ranked by ``word_similarity``.
+Other databases (SQLite in tests and local development) fall back to
+``icontains`` with a simple prefix-based rank. Pages are keyset-paginated
+on ``(rank, id)``, so deep pages cost the same as the first one.
+"""
+import base64
+import binascii
+import json
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Lookup, Q, Value, When
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+
+from .models import USER_SEARCH_DOCUMENT
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ILike(Lookup):
+    """``lhs ILIKE rhs`` (PostgreSQL); usable directly in ``filter()``."""
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+def _contains_pattern(value):
+    return '%' + connection.ops.prep_for_like_query(value) + '%'
+
+
+def _search_postgresql(queryset, query, location):
+    if query:
+        queryset = queryset.filter(ILike(USER_SEARCH_DOCUMENT, _contains_pattern(query)))
+        # real -> double precision，保证游标中的排名值能精确往返
+        rank = Cast(TrigramWordSimilarity(query, USER_SEARCH_DOCUMENT), FloatField())
+    else:
+        rank = Value(0.0, output_field=FloatField())
+    if location:
+        queryset = queryset.filter(ILike(F('location'), _contains_pattern(location)))
+    return queryset.annotate(search_rank=rank)
+
+
+def _search_fallback(queryset, query, location):
+    if query:
+        queryset = queryset.filter(
+            Q(first_name__icontains=query) |
+            Q(last_name__icontains=query) |
+            Q(email__icontains=query)
+        )
+        # 姓名前缀匹配优先，其次邮箱前缀，最后是任意位置包含
+        rank = Case(
+            When(Q(first_name__istartswith=query) | Q(last_name__istartswith=query), then=Value(1.0)),
+            When(email__istartswith=query, then=Value(0.5)),
+            default=Value(0.25),
+            output_field=FloatField(),
+        )
+    else:
+        rank = Value(0.0, output_field=FloatField())
+    if location:
+        queryset = queryset.filter(location__icontains=location)
+    return queryset.annotate(search_rank=rank)
+
+
+def search(queryset, query='', location=''):
+    """Filter ``queryset`` and annotate ``search_rank`` (higher is better)."""
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(queryset, query, location)
+    return _search_fallback(queryset, query, location)
+
+
+def encode_cursor(user):
+    raw = json.dumps([user.search_rank, user.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        rank, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(rank), int(user_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def search_page(queryset, query='', location='', cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return ``(users, next_cursor)`` for one page of ranked results.
+    ``next_cursor`` is None on the last page.
+    """
+    queryset = search(queryset, query, location).order_by('-search_rank', 'id')
+    if cursor:
+        rank, last_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(search_rank__lt=rank) | Q(search_rank=rank, id__gt=last_id))
+    users = list(queryset[:page_size + 1])
+    if len(users) > page_size:
+        users = users[:page_size]
+        return users, encode_cursor(users[-1])
+    return users, None
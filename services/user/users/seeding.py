@@ -0,0 +1,116 @@
+"""
+Synthetic users and profiles (``manage.py seed_data``).
+
+At scale 1 the dataset has 202,000 users with ids ``1..202000``: 2,000
+organizers and 200,000 volunteers, the shared population of the other
+services' datasets (``.synthetic``). Names, contact details, city,
+skills and languages follow from the id. Accounts joined over the last
+three years in id order, so low ids are the older and more active
+users: they have more volunteer hours, are more often verified and were
+seen more recently. Seeded accounts have no usable password.
+"""
+import time
+from datetime import date, timedelta
+
+from . import stats
+from .models import User, UserProfile
+from .scoring import score_columns
+from .synthetic import (
+    CITIES, analyze, anchor, bulk_load, city_of, explicit_timestamps, population, reset_sequences, rng,
+    user_fields, user_languages, user_skills,
+)
+
+INTERESTS = (
+    'environment', 'education', 'community', 'health', 'animals', 'elderly care', 'children', 'culture',
+    'sports', 'emergency relief',
+)
+OCCUPATIONS = ('Student', 'Teacher', 'Nurse', 'Engineer', 'Designer', 'Retired', 'Accountant', 'Chef', 'Driver')
+RELATIONSHIPS = ('Parent', 'Partner', 'Sibling', 'Friend')
+TIME_SLOTS = ('weekday mornings', 'weekday evenings', 'weekends')
+# 注册时间分布在最近三年内
+HISTORY_DAYS = 3 * 365
+
+
+def seed(scale=1.0, seed=42, batch_size=5000, use_copy=False, log=None):
+    """
+    Generate the dataset into a user database without users. Returns the
+    number of rows per model; ``log`` receives progress lines.
+    """
+    log = log or (lambda message: None)
+    now = anchor()
+
+    started = time.perf_counter()
+    with explicit_timestamps(User):
+        user_count = bulk_load(User, _users(rng(seed, 'users'), scale, now), batch_size, use_copy)
+    log(f'users: {user_count} in {time.perf_counter() - started:.1f}s')
+
+    started = time.perf_counter()
+    with explicit_timestamps(UserProfile):
+        profile_count = bulk_load(UserProfile, _profiles(rng(seed, 'profiles'), scale, now), batch_size, use_copy)
+    log(f'profiles: {profile_count} in {time.perf_counter() - started:.1f}s')
+
+    # 主键是显式指定的：让序列从最大 id 之后继续，注册时才不会冲突
+    reset_sequences(User, UserProfile)
+    stats.rebuild_stats()
+    analyze()
+    return {'users': user_count, 'profiles': profile_count}
+
+
+def joined_at(user_id, users, now):
+    """When user ``user_id`` joined: evenly spread over ``HISTORY_DAYS`` in id order."""
+    return now - timedelta(seconds=int(HISTORY_DAYS * 86400 * (users - user_id + 1) / users))
+
+
+def _users(rand, scale, now):
+    organizers, users = population(scale)
+    for user_id in range(1, users + 1):
+        organizer = user_id <= organizers
+        # 越早注册的用户越活跃
+        activity = 1 - user_id / (users + 1)
+        hours = 0 if organizer else int(rand.paretovariate(1.5) * 10 * activity)
+        skills = user_skills(user_id)
+        languages = user_languages(user_id)
+        interests = rand.sample(INTERESTS, rand.randint(0, 3))
+        is_verified = organizer or rand.random() < 0.3 + 0.5 * activity
+        joined = joined_at(user_id, users, now)
+        last_seen = now - timedelta(days=rand.expovariate(activity + 0.05), seconds=rand.randint(0, 86400))
+        yield User(
+            id=user_id,
+            password='!',  # 不可用的密码，省去哈希
+            role='organizer' if organizer else 'volunteer',
+            bio=f'Volunteer from {CITIES[city_of(user_id)][0]}.' if rand.random() < 0.4 else '',
+            date_of_birth=date(1950, 1, 1) + timedelta(days=rand.randint(0, 55 * 365)),
+            is_verified=is_verified,
+            date_joined=joined,
+            created_at=joined,
+            updated_at=max(joined, last_seen),
+            last_seen_at=max(joined, last_seen),
+            total_volunteer_hours=hours,
+            impact_score=score_columns([hours], [skills], [languages], [interests], [is_verified])[0],
+            interests=interests,
+            skills=skills,
+            languages=languages,
+            sms_notifications=rand.random() < 0.2,
+            **user_fields(user_id),
+        )
+
+
+def _profiles(rand, scale, now):
+    _, users = population(scale)
+    for user_id in range(1, users + 1):
+        joined = joined_at(user_id, users, now)
+        has_contact = rand.random() < 0.6
+        yield UserProfile(
+            id=user_id,
+            user_id=user_id,
+            emergency_contact_name=f'{rand.choice(("Sam", "Alex", "Jordan", "Kim"))} Contact' if has_contact else '',
+            emergency_contact_phone=f'+1556{user_id:07d}' if has_contact else '',
+            emergency_contact_relationship=rand.choice(RELATIONSHIPS) if has_contact else '',
+            occupation=rand.choice(OCCUPATIONS),
+            preferred_activity_types=rand.sample(INTERESTS, rand.randint(1, 3)),
+            preferred_time_slots=rand.sample(TIME_SLOTS, rand.randint(1, 2)),
+            max_distance_willing_to_travel=rand.choice((5, 10, 20, 50, 100)),
+            profile_visibility=rand.choices(('public', 'volunteers', 'private'), (70, 20, 10))[0],
+            created_at=joined,
+            updated_at=joined,
+        )
@@ -5,7 +5,33 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from .models import User, UserProfile, UserAchievement, UserActivity, UserNotification
+from .values import ValuesSerializer
 from django.conf import settings
+from django.core.files.storage import default_storage
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def _media_url(media_domain, media_url, name):
+    # media_url 只参与缓存键：MEDIA_URL 变化时不会返回旧地址
+    return f"{media_domain}{default_storage.url(name)}"
+
+
+def build_avatar_url(avatar):
+    """
+    Absolute avatar URL under ``MEDIA_DOMAIN``, memoized per storage name.
+    """
+    if not avatar:
+        return None
+    return avatar_url_for_name(avatar.name)
+
+
+def avatar_url_for_name(name):
+    """``build_avatar_url`` for a raw storage name (e.g. from ``values()``)."""
+    if not name:
+        return None
+    return _media_url(getattr(settings, 'MEDIA_DOMAIN', ''), settings.MEDIA_URL, name)
+
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
@@ -35,9 +61,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
+        # create_user 已经完成密码哈希和保存，无需再次 set_password / save
+        user = User.objects.create_user(password=password, **validated_data)
         
         # Create user profile
         UserProfile.objects.create(user=user)
@@ -78,9 +103,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ('user', 'created_at', 'updated_at')
 
     def get_avatar(self, obj):
-        if obj.user.avatar:  # ⚠️ 注意这里是 obj.user.avatar
-            return f"{settings.MEDIA_DOMAIN}{obj.user.avatar.url}"
-        return None
+        # ⚠️ 注意这里是 obj.user.avatar；嵌套在 UserSerializer 中时 user 已缓存，不会额外查询
+        return build_avatar_url(obj.user.avatar)
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -140,13 +164,7 @@ class UserSerializer(serializers.ModelSerializer):
     #     # ✅ 默认退回相对路径
     #     return obj.avatar.url
     def get_avatar(self, obj):
-        if not obj.avatar:
-            return None
-        # 使用固定 MEDIA_DOMAIN
-        base = getattr(settings, 'MEDIA_DOMAIN', None)
-        if base:
-            return f"{base}{obj.avatar.url}"
-        return obj.avatar.url
+        return build_avatar_url(obj.avatar)
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
@@ -193,6 +211,15 @@ class UserNotificationSerializer(serializers.ModelSerializer):
         read_only_fields = ('user', 'created_at')
 
 
+class UserNotificationValuesSerializer(ValuesSerializer):
+    """
+    ``values()`` fast path for the notification inbox, same output as
+    ``UserNotificationSerializer``.
+    """
+    model = UserNotification
+    fields = '__all__'
+
+
 class PasswordChangeSerializer(serializers.Serializer):
     """
     Serializer for password change.
@@ -224,3 +251,16 @@ class UserStatsSerializer(serializers.Serializer):
     volunteer_level = serializers.CharField()
     recent_activities = UserActivitySerializer(many=True)
     recent_achievements = UserAchievementSerializer(many=True)
+
+
+class UserBatchLookupSerializer(serializers.Serializer):
+    """
+    Request body of the internal batch user lookup.
+    """
+    MAX_IDS = 500
+    FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'phone', 'role', 'avatar', 'is_active')
+    
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS
+    )
+    fields = serializers.MultipleChoiceField(choices=FIELDS, required=False)
@@ -0,0 +1,60 @@
+"""
+Signal handlers for users app.
+"""
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .authentication import token_users
+from .models import AuthToken, User, UserAchievement, UserActivity, UserProfile
+from . import stats
+
+
+@receiver(post_init, sender=User)
+def remember_user_stats_fields(sender, instance, **kwargs):
+    stats.remember(instance, stats.USER_TRACKED_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def user_stats_saved(sender, instance, created, raw=False, **kwargs):
+    """Keep the volunteer / organizer counts in sync with registrations and role changes."""
+    if not raw:
+        stats.user_saved(instance, created)
+
+
+@receiver(post_delete, sender=User)
+def user_stats_deleted(sender, instance, **kwargs):
+    stats.user_deleted(instance)
+
+
+@receiver(post_save, sender=UserActivity)
+@receiver(post_save, sender=UserAchievement)
+def dashboard_item_saved(sender, instance, raw=False, **kwargs):
+    """Refresh the user's materialized dashboard statistics."""
+    if not raw:
+        stats.recompute_user_stats([instance.user_id])
+
+
+@receiver(post_delete, sender=UserActivity)
+@receiver(post_delete, sender=UserAchievement)
+def dashboard_item_deleted(sender, instance, origin=None, **kwargs):
+    # 删除用户时级联删除的记录无需刷新（统计行也会被删除）
+    if isinstance(origin, User):
+        return
+    stats.recompute_user_stats([instance.user_id])
+
+
+@receiver(post_delete, sender=AuthToken)
+def token_deleted(sender, instance, **kwargs):
+    """Forget a deleted (logged out) token."""
+    token_users.invalidate_key(instance.digest)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Drop cached token lookups after password changes and profile updates."""
+    token_users.invalidate_user_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def user_profile_changed(sender, instance, **kwargs):
+    token_users.invalidate_user_on_commit(instance.user_id)
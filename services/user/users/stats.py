@@ -0,0 +1,291 @@
+"""
+Materialized statistics.
+
+Landing page (volunteer and organizer counts): the counts live in the
+single ``GlobalUserStats`` row and are maintained incrementally by the
+signals in ``users.signals``: registrations, role changes and deletions
+adjust the counters with ``F()`` updates instead of counting the ``users``
+table on every call. Bulk ``QuerySet.update()`` calls bypass signals, so
+``rebuild_stats`` (also ``manage.py rebuild_stats``) recomputes the row
+from scratch.
+
+Reads go through ``global_stats``, a per-process snapshot of the row that is
+reloaded at most every ``STATS_MAX_AGE`` seconds, so serving the stats
+costs no database query on the hot path. Writes in this process drop the
+snapshot immediately; other processes see them within ``STATS_MAX_AGE``.
+
+Dashboard (per user): ``UserStats`` holds each user's counts, completed
+hours and most recent participations / achievements, so ``UserStatsView``
+is a single primary-key lookup. ``recompute_user_stats`` rebuilds the rows
+for a set of users with grouped aggregate queries; the participation and
+achievement signals call it for the affected user, and
+``manage.py recompute_user_stats`` runs it over every user for backfills.
+It also writes the completed hours back to ``User.total_volunteer_hours``
+and refreshes ``impact_score``; ``bulk_update`` sends no ``post_save``, so
+it drops the cached token lookups of the users it changed itself. Reads
+never write: a user without a row yet gets the values computed on the fly.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+STATS_PK = 1
+
+# 角色 -> 计数字段
+ROLE_COUNTERS = {
+    'volunteer': 'total_volunteers',
+    'organizer': 'total_ngos',
+}
+USER_TRACKED_FIELDS = ('role',)
+
+
+def compute_stats():
+    """Count the users from scratch."""
+    from .models import User
+
+    return User.objects.aggregate(**{
+        counter: Count('id', filter=Q(role=role)) for role, counter in ROLE_COUNTERS.items()
+    })
+
+
+def rebuild_stats():
+    """Recompute the stats row and return the new values."""
+    from .models import GlobalUserStats
+
+    values = compute_stats()
+    GlobalUserStats.objects.update_or_create(
+        pk=STATS_PK, defaults={**values, 'rebuilt_at': timezone.now()}
+    )
+    global_stats.invalidate_on_commit()
+    return values
+
+
+def adjust_stats(**deltas):
+    """Add ``deltas`` to the stats counters; rebuilds if the row is missing."""
+    from .models import GlobalUserStats
+
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = GlobalUserStats.objects.filter(pk=STATS_PK).update(
+        updated_at=timezone.now(),
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+    if not updated:
+        # 统计行不存在：重建（已经包含本次变更）
+        rebuild_stats()
+        return
+    global_stats.invalidate_on_commit()
+
+
+def remember(instance, field_names):
+    """
+    Snapshot the loaded values of ``field_names`` on ``instance``.
+
+    Deferred fields are skipped rather than loaded, so ``.only()`` querysets
+    do not trigger extra queries.
+    """
+    instance._stats_original = {
+        name: instance.__dict__[name] for name in field_names if name in instance.__dict__
+    }
+
+
+def _role_deltas(old_role, new_role):
+    deltas = {}
+    if old_role in ROLE_COUNTERS:
+        deltas[ROLE_COUNTERS[old_role]] = -1
+    if new_role in ROLE_COUNTERS:
+        counter = ROLE_COUNTERS[new_role]
+        deltas[counter] = deltas.get(counter, 0) + 1
+    return deltas
+
+
+def user_saved(user, created):
+    original = getattr(user, '_stats_original', {})
+    role = user.__dict__.get('role')
+    if role is not None and (created or 'role' in original):
+        adjust_stats(**_role_deltas(None if created else original['role'], role))
+    remember(user, USER_TRACKED_FIELDS)
+
+
+def user_deleted(user):
+    role = getattr(user, '_stats_original', {}).get('role') or user.__dict__.get('role')
+    adjust_stats(**_role_deltas(role, None))
+
+
+# 仪表盘中"最近"列表的长度和时间窗口
+RECENT_ITEMS = 5
+RECENT_DAYS = 30
+
+
+def _recent_rows(queryset, date_field, user_ids):
+    """Up to ``RECENT_ITEMS`` newest rows per user, in one query."""
+    return queryset.filter(user_id__in=user_ids).annotate(
+        position=Window(RowNumber(), partition_by=F('user_id'), order_by=F(date_field).desc())
+    ).filter(position__lte=RECENT_ITEMS).order_by('user_id', f'-{date_field}')
+
+
+def _compute_rows(user_ids):
+    """Unsaved ``UserStats`` rows for ``user_ids``, keyed by user id."""
+    from .models import UserAchievement, UserActivity, UserStats
+    from .serializers import UserAchievementSerializer, UserActivitySerializer
+
+    rows = {
+        user_id: UserStats(user_id=user_id, recent_activities=[], recent_achievements=[])
+        for user_id in user_ids
+    }
+    activity_counts = UserActivity.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        joined=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        hours=Sum('hours_volunteered', filter=Q(status='completed')),
+    ).order_by()
+    for counts in activity_counts:
+        row = rows[counts['user_id']]
+        row.activities_joined = counts['joined']
+        row.activities_completed = counts['completed']
+        row.total_hours = counts['hours'] or 0
+    achievement_counts = UserAchievement.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        earned=Count('id'),
+    ).order_by()
+    for counts in achievement_counts:
+        rows[counts['user_id']].achievements_earned = counts['earned']
+    for activity in _recent_rows(UserActivity.objects.all(), 'registered_at', user_ids):
+        rows[activity.user_id].recent_activities.append(UserActivitySerializer(activity).data)
+    for achievement in _recent_rows(UserAchievement.objects.all(), 'earned_at', user_ids):
+        rows[achievement.user_id].recent_achievements.append(UserAchievementSerializer(achievement).data)
+    return rows
+
+
+def _recompute_chunk(user_ids):
+    from .authentication import token_users
+    from .models import User, UserStats
+
+    rows = _compute_rows(user_ids)
+    UserStats.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=[
+            'activities_joined', 'activities_completed', 'achievements_earned', 'total_hours',
+            'recent_activities', 'recent_achievements', 'updated_at',
+        ],
+    )
+
+    # 将完成时长同步回用户，并刷新影响力分数
+    users = list(User.objects.filter(pk__in=user_ids).only(
+        'id', 'total_volunteer_hours', 'impact_score', 'skills', 'languages', 'interests', 'is_verified'
+    ))
+    changed = []
+    for user in users:
+        old_values = (user.total_volunteer_hours, user.impact_score)
+        user.total_volunteer_hours = rows[user.pk].total_hours
+        user.impact_score = user.calculate_impact_score()
+        if (user.total_volunteer_hours, user.impact_score) != old_values:
+            changed.append(user)
+    if changed:
+        User.objects.bulk_update(changed, ['total_volunteer_hours', 'impact_score'])
+        # bulk_update 不触发 post_save：手动丢弃缓存中这些用户的旧 User 对象
+        for user in changed:
+            token_users.invalidate_user_on_commit(user.pk)
+    return list(rows.values())
+
+
+def recompute_user_stats(user_ids=None, batch_size=1000):
+    """
+    Rebuild ``UserStats`` for ``user_ids`` (every user when None), in
+    batches of ``batch_size``. Returns the number of users processed.
+    """
+    from .models import User
+
+    if user_ids is None:
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size)
+    processed = 0
+    chunk = []
+    for user_id in user_ids:
+        chunk.append(user_id)
+        if len(chunk) >= batch_size:
+            processed += len(_recompute_chunk(chunk))
+            chunk = []
+    if chunk:
+        processed += len(_recompute_chunk(chunk))
+    return processed
+
+
+def get_user_stats(user):
+    """
+    Dashboard statistics for ``user``. A single query once the user's
+    ``UserStats`` row exists; without one the values are computed but not
+    stored (only the signals and ``manage.py recompute_user_stats`` write).
+    """
+    from .models import UserStats, volunteer_level
+
+    row = UserStats.objects.filter(user_id=user.pk).first()
+    if row is None:
+        row = _compute_rows([user.pk])[user.pk]
+
+    since = timezone.now() - timedelta(days=RECENT_DAYS)
+    return {
+        'total_hours': row.total_hours,
+        'activities_joined': row.activities_joined,
+        'achievements_earned': row.achievements_earned,
+        'impact_score': user.impact_score,
+        'volunteer_level': volunteer_level(row.total_hours),
+        'recent_activities': [
+            item for item in row.recent_activities if parse_datetime(item['registered_at']) >= since
+        ],
+        'recent_achievements': [
+            item for item in row.recent_achievements if parse_datetime(item['earned_at']) >= since
+        ],
+    }
+
+
+class StatsSnapshot:
+    """
+    Per-process copy of the public statistics, at most ``STATS_MAX_AGE``
+    seconds old.
+    """
+
+    def __init__(self):
+        # 可重入：_load() 在缺少统计行时调用 rebuild_stats()，后者会再次 invalidate()
+        self._lock = threading.RLock()
+        self._value = None
+        self._loaded_at = 0.0
+
+    def _load(self):
+        from .models import GlobalUserStats
+
+        row = GlobalUserStats.objects.filter(pk=STATS_PK).values(*ROLE_COUNTERS.values()).first()
+        return row if row is not None else rebuild_stats()
+
+    def get(self):
+        """Public statistics dict (``total_volunteers``, ``total_ngos``)."""
+        value, loaded_at = self._value, self._loaded_at
+        if value is not None and time.monotonic() - loaded_at < settings.STATS_MAX_AGE:
+            return value
+        with self._lock:
+            if self._value is None or time.monotonic() - self._loaded_at >= settings.STATS_MAX_AGE:
+                self._value = self._load()
+                self._loaded_at = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def invalidate_on_commit(self):
+        """
+        Drop the snapshot now and again once the transaction commits, so a
+        reload that raced the write cannot keep uncommitted-era values.
+        """
+        self.invalidate()
+        transaction.on_commit(self.invalidate)
+
+
+global_stats = StatsSnapshot()
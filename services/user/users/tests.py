@@ -1,12 +1,12 @@
 """
 Unit tests for users app.
 """
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
-from rest_framework.authtoken.models import Token
-from .models import User, UserProfile
+from .models import AuthToken, User, UserProfile
+from .tokens import issue_token, token_digest
 
 # Test passwords - these are safe to hardcode in tests
 TEST_PASSWORD = 'testpass123'  # nosec B106
@@ -183,6 +183,109 @@ class UserLoginTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'login-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PASSWORD_HASH_ITERATIONS=1000)
+class LoginHardeningTestCase(APITestCase):
+    """测试登录路径：哈希令牌、重新哈希与限流"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.login_url = reverse('user-login')
+        self.user = User.objects.create_user(
+            username='hardened',
+            email='hardened@test.com',
+            password=TEST_PASSWORD,  # nosec B106
+            role='volunteer'
+        )
+    
+    def _login(self, email='hardened@test.com', password=TEST_PASSWORD):  # nosec B107
+        return self.client.post(self.login_url, {'email': email, 'password': password}, format='json')
+    
+    def _status_with(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token)
+        return self.client.get(reverse('user-profile')).status_code
+    
+    def test_token_stored_as_digest_and_kept_on_other_devices(self):
+        """测试令牌只保存摘要，在另一台设备登录不会使已有令牌失效"""
+        first = self._login().data['token']
+        second = self._login().data['token']
+        
+        digests = set(AuthToken.objects.filter(user=self.user).values_list('digest', flat=True))
+        self.assertEqual(digests, {token_digest(first), token_digest(second)})
+        self.assertEqual(self._status_with(first), status.HTTP_200_OK)
+        self.assertEqual(self._status_with(second), status.HTTP_200_OK)
+    
+    @override_settings(AUTH_TOKENS_PER_USER=2)
+    def test_oldest_tokens_dropped_beyond_limit(self):
+        """测试每个用户的令牌数有上限，超出时删除最早的令牌"""
+        oldest = issue_token(self.user)
+        self.assertEqual(self._status_with(oldest), status.HTTP_200_OK)
+        issue_token(self.user)
+        newest = issue_token(self.user)
+        
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self._status_with(oldest), status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._status_with(newest), status.HTTP_200_OK)
+    
+    def test_password_rehashed_when_cost_changes(self):
+        """测试哈希迭代次数变化后登录时自动重新哈希"""
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            response = self._login()
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(self.user.check_password(TEST_PASSWORD))
+    
+    @override_settings(LOGIN_RATE_LIMIT_PER_ACCOUNT='2/min')
+    def test_account_throttle_skips_password_check(self):
+        """测试同一账户超过限额后不再校验密码"""
+        from unittest.mock import patch
+        from django.contrib.auth import authenticate
+        with patch('users.serializers.authenticate', side_effect=authenticate) as mock_authenticate:
+            responses = [self._login(password=WRONG_PASSWORD) for _ in range(3)]  # nosec B106
+        
+        self.assertEqual([r.status_code for r in responses], [400, 400, 429])
+        self.assertEqual(mock_authenticate.call_count, 2)
+        self.assertIn('Retry-After', responses[2])
+    
+    @override_settings(LOGIN_RATE_LIMIT_PER_IP='2/min')
+    def test_ip_throttle_covers_many_accounts(self):
+        """测试同一 IP 尝试多个账户时被限流"""
+        statuses = [self._login(email=f'victim{index}@test.com').status_code for index in range(3)]
+        
+        self.assertEqual(statuses, [400, 400, 429])
+    
+    @override_settings(LOGIN_RATE_LIMIT_PER_IP='2/min')
+    def test_ip_throttle_ignores_spoofed_forwarded_for(self):
+        """测试伪造的 X-Forwarded-For 前缀不会重置 IP 限流计数"""
+        statuses = [
+            self.client.post(
+                self.login_url,
+                {'email': f'victim{index}@test.com', 'password': TEST_PASSWORD},  # nosec B106
+                format='json',
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{index}, 203.0.113.7',
+            ).status_code
+            for index in range(3)
+        ]
+        
+        self.assertEqual(statuses, [400, 400, 429])
+    
+    def test_throttle_fails_open_without_cache(self):
+        """测试限流缓存不可用时仍允许登录"""
+        from unittest.mock import patch
+        with patch('users.throttling.LoginRateThrottle.cache') as mock_cache:
+            mock_cache.get.side_effect = ConnectionError('cache down')
+            with self.assertLogs('users.throttling', level='WARNING'):
+                response = self._login()
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
 class UserProfileTestCase(APITestCase):
     """测试用户资料功能"""
     
@@ -203,10 +306,10 @@ class UserProfileTestCase(APITestCase):
         self.user.save()
         
         # 创建token
-        self.token = Token.objects.create(user=self.user)
+        self.token = issue_token(self.user)
         
         # 设置认证
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
         
     def test_get_profile(self):
         """测试获取用户资料"""
@@ -337,6 +440,7 @@ class UserModelTestCase(TestCase):
         self.assertLessEqual(user.impact_score, 1000)
 
 
+@override_settings(EVENT_BROKER_URL='memory://')
 class UserLogoutTestCase(APITestCase):
     """测试用户登出功能"""
     
@@ -350,8 +454,8 @@ class UserLogoutTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_logout_success(self):
         """测试登出成功"""
@@ -360,8 +464,264 @@ class UserLogoutTestCase(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # 验证token被删除
-        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertFalse(AuthToken.objects.filter(user=self.user).exists())
+    
+    def test_logout_keeps_other_devices_signed_in(self):
+        """测试登出只删除当前设备的令牌"""
+        other_device = issue_token(self.user)
+        
+        self.client.post(reverse('user-logout'))
+        
+        self.assertEqual(list(AuthToken.objects.values_list('digest', flat=True)), [token_digest(other_device)])
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + other_device)
+        self.assertEqual(self.client.get(reverse('user-profile')).status_code, status.HTTP_200_OK)
+
 
+@override_settings(
+    EVENT_BROKER_URL='memory://',
+    SERVICE_TOKEN_SIGNING_KEYS=['new-key', 'old-key'],
+    SERVICE_TOKEN_REVOCATION_POLL=0,
+)
+class ServiceTokenTestCase(APITestCase):
+    """测试签名服务令牌的签发、轮换与撤销"""
+    
+    def setUp(self):
+        from .broker import get_broker
+        from .service_tokens import revocations
+        get_broker().clear()
+        revocations.reset()
+        self.user = User.objects.create_user(
+            username='tokenuser',
+            email='token@test.com',
+            password=TEST_PASSWORD,  # nosec B106
+            first_name='Token',
+            last_name='User',
+            phone='13800000000',
+            role='organizer'
+        )
+    
+    def _login(self):
+        response = self.client.post(reverse('user-login'), {
+            'email': 'token@test.com',
+            'password': TEST_PASSWORD  # nosec B106
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_login_issues_verifiable_service_token(self):
+        """测试登录返回携带用户信息的服务令牌"""
+        from .service_tokens import verify_service_token
+        data = self._login()
+        
+        claims = verify_service_token(data['service_token'])
+        self.assertEqual(claims['id'], self.user.id)
+        self.assertEqual(claims['role'], 'organizer')
+        self.assertEqual(claims['email'], 'token@test.com')
+        self.assertEqual(claims['phone'], '13800000000')
+        self.assertEqual((claims['first_name'], claims['last_name']), ('Token', 'User'))
+        self.assertEqual(claims['exp'], data['service_token_expires_at'])
+    
+    def test_refresh_endpoint_issues_new_token(self):
+        """测试使用 DRF 令牌换取新的服务令牌"""
+        from .service_tokens import verify_service_token
+        token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token)
+        
+        response = self.client.post(reverse('service-token'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(verify_service_token(response.data['service_token'])['id'], self.user.id)
+    
+    def test_key_rotation(self):
+        """测试旧密钥签发的令牌在轮换期内仍有效，移除后失效"""
+        from .service_tokens import InvalidServiceToken, issue_service_token, verify_service_token
+        with self.settings(SERVICE_TOKEN_SIGNING_KEYS=['old-key']):
+            token, _ = issue_service_token({'id': self.user.id})
+        
+        self.assertEqual(verify_service_token(token)['id'], self.user.id)
+        with self.settings(SERVICE_TOKEN_SIGNING_KEYS=['new-key']):
+            with self.assertRaises(InvalidServiceToken):
+                verify_service_token(token)
+    
+    def test_tampered_and_expired_tokens_rejected(self):
+        """测试篡改和过期的令牌被拒绝"""
+        from .service_tokens import InvalidServiceToken, issue_service_token, verify_service_token
+        token, _ = issue_service_token({'id': self.user.id, 'role': 'volunteer'})
+        with self.assertRaises(InvalidServiceToken):
+            verify_service_token(token[:-2] + ('AA' if not token.endswith('AA') else 'BB'))
+        
+        with self.settings(SERVICE_TOKEN_TTL=-1):
+            expired, _ = issue_service_token({'id': self.user.id})
+        with self.assertRaises(InvalidServiceToken):
+            verify_service_token(expired)
+    
+    def test_logout_revokes_issued_tokens(self):
+        """测试登出撤销已签发的服务令牌，重新登录后签发的新令牌有效"""
+        from .broker import get_broker
+        from .service_tokens import InvalidServiceToken, revocations, verify_service_token
+        data = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + data['token'])
+        
+        response = self.client.post(reverse('user-logout'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        events, _ = get_broker().read('token-revocations')
+        self.assertEqual([event['user_id'] for event in events], [self.user.id])
+        # 其他进程从消息代理读取撤销记录
+        revocations.reset()
+        with self.assertRaises(InvalidServiceToken):
+            verify_service_token(data['service_token'])
+        
+        self.client.credentials()
+        fresh = self._login()
+        self.assertEqual(verify_service_token(fresh['service_token'])['id'], self.user.id)
+    
+    def test_logout_keeps_other_devices_signed_in(self):
+        """测试一台设备登出只撤销该设备的服务令牌"""
+        from .service_tokens import InvalidServiceToken, revocations, verify_service_token
+        phone = self._login()
+        laptop = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + phone['token'])
+        
+        self.client.post(reverse('user-logout'))
+        
+        revocations.reset()
+        with self.assertRaises(InvalidServiceToken):
+            verify_service_token(phone['service_token'])
+        self.assertEqual(verify_service_token(laptop['service_token'])['id'], self.user.id)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + laptop['token'])
+        response = self.client.post(reverse('service-token'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(verify_service_token(response.data['service_token'])['sid'], token_digest(laptop['token']))
+
+@override_settings(
+    EVENT_BROKER_URL='memory://',
+    SERVICE_TOKEN_REVOCATION_POLL=0,
+    TOKEN_AUTH_CACHE_TTL=60,
+    TOKEN_AUTH_CACHE_SIZE=100,
+    LAST_SEEN_FLUSH_INTERVAL=3600,
+)
+class CachedTokenAuthenticationTestCase(APITestCase):
+    """测试令牌解析缓存与 last_seen 批量写入"""
+    
+    def setUp(self):
+        from .authentication import last_seen, token_users
+        from .broker import get_broker
+        from .service_tokens import revocations
+        get_broker().clear()
+        revocations.reset()
+        token_users.clear()
+        last_seen.flush()
+        self.user = User.objects.create_user(
+            username='cached',
+            email='cached@test.com',
+            password=TEST_PASSWORD,  # nosec B106
+            first_name='Cached',
+            last_name='User',
+            role='volunteer'
+        )
+        UserProfile.objects.create(user=self.user)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        self.url = reverse('user-profile')
+    
+    def _get_profile(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        return response, len(ctx.captured_queries)
+    
+    def test_repeat_profile_requests_skip_database(self):
+        """测试热窗口内重复获取资料不访问数据库"""
+        first, first_queries = self._get_profile()
+        second, second_queries = self._get_profile()
+        
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first_queries, 1)
+        self.assertEqual(second_queries, 0)
+        self.assertEqual(second.data, first.data)
+        self.assertIsNotNone(second.data['profile'])
+    
+    def test_cache_hits_exposed_as_metrics(self):
+        """测试令牌缓存命中与未命中计入指标"""
+        from service_common.metrics import registry
+        registry.clear()
+        self._get_profile()
+        self._get_profile()
+        
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('cache_requests_total{cache="token-users",result="hit"} 1', body)
+        self.assertIn('cache_requests_total{cache="token-users",result="miss"} 1', body)
+    
+    def test_profile_update_invalidates(self):
+        """测试更新资料后缓存失效"""
+        self._get_profile()
+        self.client.patch(self.url, {'bio': 'Updated bio'}, format='json')
+        
+        response, queries = self._get_profile()
+        
+        self.assertEqual(response.data['bio'], 'Updated bio')
+        self.assertEqual(queries, 1)
+    
+    def test_password_change_invalidates(self):
+        """测试修改密码后缓存失效"""
+        from .authentication import token_users
+        self._get_profile()
+        response = self.client.post(reverse('password-change'), {
+            'old_password': TEST_PASSWORD,
+            'new_password': NEW_PASSWORD,
+            'new_password_confirm': NEW_PASSWORD
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(token_users.get(token_digest(self.token)))
+    
+    def test_logout_rejects_cached_token(self):
+        """测试登出后缓存的令牌不再有效"""
+        self._get_profile()
+        self.client.post(reverse('user-logout'))
+        
+        response, _ = self._get_profile()
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_revocation_from_other_process_invalidates(self):
+        """测试其他进程发布的登出撤销使缓存失效"""
+        import time
+        from .broker import get_broker
+        self._get_profile()
+        get_broker().publish('token-revocations', [
+            {'user_id': self.user.id, 'revoked_at': time.time() + 1, 'expires_at': time.time() + 900},
+        ])
+        
+        _, queries = self._get_profile()
+        
+        self.assertEqual(queries, 1)
+    
+    def test_cache_evicts_least_recently_used(self):
+        """测试超过容量时淘汰最久未使用的条目"""
+        from .authentication import token_users
+        other = User.objects.create_user(username='other', email='other@test.com', password=TEST_PASSWORD)  # nosec B106
+        other_token = issue_token(other)
+        with self.settings(TOKEN_AUTH_CACHE_SIZE=1):
+            self._get_profile()
+            self.client.credentials(HTTP_AUTHORIZATION='Token ' + other_token)
+            self._get_profile()
+        
+        self.assertIsNone(token_users.get(token_digest(self.token)))
+        self.assertIsNotNone(token_users.get(token_digest(other_token)))
+    
+    def test_last_seen_written_in_batches(self):
+        """测试 last_seen_at 缓冲后批量写入"""
+        from .authentication import last_seen
+        self._get_profile()
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_seen_at)
+        
+        self.assertEqual(last_seen.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_seen_at)
 
 class PasswordChangeTestCase(APITestCase):
     """测试密码修改功能"""
@@ -378,8 +738,8 @@ class PasswordChangeTestCase(APITestCase):
         )
         self.user.set_password(OLD_PASSWORD)  # nosec B106
         self.user.save()
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_change_password_success(self):
         """测试密码修改成功"""
@@ -434,8 +794,8 @@ class UserAvatarTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_upload_avatar_no_file(self):
         """测试上传头像但没有文件"""
@@ -451,6 +811,72 @@ class UserAvatarTestCase(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('message', response.data)
+    
+    def _avatar(self, color='red'):
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        buffer = BytesIO()
+        Image.new('RGB', (32, 32), color=color).save(buffer, format='PNG')
+        return SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+    
+    def _media_root(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return media_root
+    
+    def test_upload_avatar_content_addressed(self):
+        """测试头像按内容哈希存储，相同图片共享文件"""
+        from django.core.files.storage import default_storage
+        self._media_root()
+        url = reverse('upload-avatar')
+        
+        response = self.client.post(url, {'avatar': self._avatar()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertRegex(self.user.avatar.name, r'^avatars/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        
+        other = User.objects.create_user(
+            username='other', email='other@test.com', password=TEST_PASSWORD  # nosec B106
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(user=other)
+        other_client.post(url, {'avatar': self._avatar()}, format='multipart')
+        other.refresh_from_db()
+        self.assertEqual(other.avatar.name, self.user.avatar.name)
+        
+        # 共享的文件在其他用户仍引用时不被删除
+        shared_name = other.avatar.name
+        self.client.post(url, {'avatar': self._avatar(color='blue')}, format='multipart')
+        self.assertTrue(default_storage.exists(shared_name))
+        other_client.delete(reverse('remove-avatar'))
+        self.assertFalse(default_storage.exists(shared_name))
+    
+    def test_upload_avatar_rejects_non_image(self):
+        """测试上传非图片头像被拒绝"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self._media_root()
+        fake = SimpleUploadedFile('avatar.png', b'plain text', content_type='image/png')
+        
+        response = self.client.post(reverse('upload-avatar'), {'avatar': fake}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+    
+    def test_upload_avatar_request_too_large(self):
+        """测试请求体超过限制时返回 413"""
+        from django.test import override_settings
+        self._media_root()
+        with override_settings(UPLOAD_MAX_REQUEST_SIZE=10):
+            response = self.client.post(reverse('upload-avatar'), {'avatar': self._avatar()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
 
 
 class UserStatsTestCase(APITestCase):
@@ -466,8 +892,8 @@ class UserStatsTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_get_user_stats(self):
         """测试获取用户统计"""
@@ -490,6 +916,376 @@ class UserStatsTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class UserStatsMaterializationTestCase(APITestCase):
+    """测试物化的用户统计"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='statsuser',
+            email='stats@test.com',
+            password=TEST_PASSWORD,  # nosec B106
+            role='volunteer',
+            skills=['first aid']
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('user-stats')
+    
+    def test_participation_events_update_stats(self):
+        """测试参与和成就事件同步统计、时长和影响力分数"""
+        from .models import UserAchievement, UserActivity
+        participation = UserActivity.objects.create(user=self.user, activity_id=1)
+        UserActivity.objects.create(user=self.user, activity_id=2, status='completed', hours_volunteered=12)
+        UserAchievement.objects.create(user=self.user, achievement_type='first', title='First', description='-')
+        
+        participation.status = 'completed'
+        participation.hours_volunteered = 40
+        participation.save()
+        
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['activities_joined'], 2)
+        self.assertEqual(response.data['achievements_earned'], 1)
+        self.assertEqual(response.data['total_hours'], 52)
+        self.assertEqual(response.data['volunteer_level'], 'Intermediate')
+        self.assertEqual(len(response.data['recent_activities']), 2)
+        self.assertEqual(response.data['recent_achievements'][0]['title'], 'First')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_volunteer_hours, 52)
+        self.assertEqual(self.user.impact_score, 52 * 2 + 5)
+        
+        participation.delete()
+        self.assertEqual(self.client.get(self.url).data['total_hours'], 12)
+    
+    def test_dashboard_single_query(self):
+        """测试统计行存在时仪表盘只查询一次"""
+        from .models import UserActivity
+        UserActivity.objects.create(user=self.user, activity_id=1)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        
+        self.assertEqual(response.data['activities_joined'], 1)
+    
+    def test_recent_items_respect_window(self):
+        """测试最近列表只包含 30 天内的记录"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import UserActivity
+        old = UserActivity.objects.create(user=self.user, activity_id=1)
+        UserActivity.objects.filter(pk=old.pk).update(registered_at=timezone.now() - timedelta(days=40))
+        UserActivity.objects.create(user=self.user, activity_id=2)
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.data['activities_joined'], 2)
+        self.assertEqual([item['activity_id'] for item in response.data['recent_activities']], [2])
+    
+    def test_bulk_recompute_command(self):
+        """测试批量重算命令回填所有用户"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import UserActivity, UserStats
+        other = User.objects.create(username='other', email='other@test.com', password='!')
+        UserActivity.objects.create(user=other, activity_id=1, status='completed', hours_volunteered=3)
+        UserActivity.objects.filter(user=other).update(hours_volunteered=9)
+        UserStats.objects.all().delete()
+        
+        out = StringIO()
+        call_command('recompute_user_stats', batch_size=1, stdout=out)
+        
+        self.assertIn('users/s', out.getvalue())
+        self.assertEqual(UserStats.objects.count(), User.objects.count())
+        self.assertEqual(UserStats.objects.get(user=other).total_hours, 9)
+        other.refresh_from_db()
+        self.assertEqual(other.total_volunteer_hours, 9)
+    
+    def test_reading_stats_never_writes(self):
+        """测试统计行缺失时读取接口只计算不写库"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import UserActivity, UserStats
+        UserActivity.objects.bulk_create([
+            UserActivity(user=self.user, activity_id=1, status='completed', hours_volunteered=4)
+        ])
+        
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        
+        self.assertEqual((response.data['activities_joined'], response.data['total_hours']), (1, 4))
+        self.assertFalse(UserStats.objects.exists())
+        self.assertEqual([query['sql'] for query in ctx.captured_queries if not query['sql'].startswith('SELECT')], [])
+    
+    def test_recompute_drops_cached_token_lookups(self):
+        """测试批量回写时长后丢弃令牌缓存中的旧用户对象"""
+        from .authentication import CachedTokenAuthentication, token_users
+        from .models import UserActivity
+        from .stats import recompute_user_stats
+        token_users.clear()
+        key = issue_token(self.user)
+        CachedTokenAuthentication().authenticate_credentials(key)
+        UserActivity.objects.bulk_create([
+            UserActivity(user=self.user, activity_id=1, status='completed', hours_volunteered=7)
+        ])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            recompute_user_stats([self.user.pk])
+        
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+        self.assertEqual(user.total_volunteer_hours, 7)
+    
+    def test_deleting_user_cascades(self):
+        """测试删除用户时级联删除统计行"""
+        from .models import UserActivity, UserStats
+        UserActivity.objects.create(user=self.user, activity_id=1)
+        
+        self.user.delete()
+        
+        self.assertFalse(UserStats.objects.exists())
+
+
+class ImpactScoreBatchTestCase(TestCase):
+    """测试批量重算影响力分数"""
+    
+    def setUp(self):
+        self.users = [
+            User.objects.create(
+                username=f'score{index}', email=f'score{index}@test.com', password='!',
+                total_volunteer_hours=index * 40, skills=['a'] * index, languages=['en'],
+                interests=['x', 'y'][:index % 3], is_verified=index % 2 == 0,
+                impact_score=7,
+            )
+            for index in range(6)
+        ]
+    
+    def test_columns_match_single_user_rule(self):
+        """测试按列计算与单用户计算结果一致"""
+        from .scoring import score_columns
+        
+        expected = []
+        for user in self.users:
+            user.update_impact_score()
+            expected.append(user.impact_score)
+        
+        self.assertEqual(score_columns(
+            [user.total_volunteer_hours for user in self.users],
+            [user.skills for user in self.users],
+            [user.languages for user in self.users],
+            [user.interests for user in self.users],
+            [user.is_verified for user in self.users],
+        ), expected)
+        self.assertEqual(score_columns([1000], [['a'] * 200], [[]], [[]], [True]), [1000])
+    
+    def test_dry_run_reports_without_writing(self):
+        """测试试运行只报告差异不写入"""
+        from .scoring import recompute_impact_scores
+        
+        report = recompute_impact_scores(batch_size=4, dry_run=True)
+        
+        self.assertEqual(report.processed, 6)
+        self.assertEqual(report.changed, 6)
+        self.assertEqual(report.changes[0], (self.users[0].pk, 7, 3 + 50))
+        self.assertEqual(set(User.objects.values_list('impact_score', flat=True)), {7})
+    
+    def test_recompute_writes_changed_scores(self):
+        """测试重算写回变化的分数，且再次运行无变化"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        out = StringIO()
+        call_command('recompute_impact_scores', batch_size=4, stdout=out)
+        
+        self.assertIn('6 users, 6 scores changed', out.getvalue())
+        for user in self.users:
+            stored = User.objects.get(pk=user.pk).impact_score
+            self.assertEqual(stored, user.calculate_impact_score())
+        
+        from .scoring import recompute_impact_scores
+        self.assertEqual(recompute_impact_scores(batch_size=4).changed, 0)
+    
+    def test_recompute_drops_cached_token_lookups(self):
+        """测试批量写回分数后丢弃令牌缓存中的旧用户对象"""
+        from .authentication import CachedTokenAuthentication, token_users
+        from .scoring import recompute_impact_scores
+        token_users.clear()
+        user = self.users[3]
+        key = issue_token(user)
+        CachedTokenAuthentication().authenticate_credentials(key)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            recompute_impact_scores()
+        
+        cached, _ = CachedTokenAuthentication().authenticate_credentials(key)
+        self.assertEqual(cached.impact_score, user.calculate_impact_score())
+
+
+@override_settings(EVENT_BROKER_URL='memory://')
+class ParticipationSyncTestCase(TestCase):
+    """测试参与事件同步到 UserActivity"""
+    
+    def setUp(self):
+        from .broker import get_broker
+        self.broker = get_broker()
+        self.broker.clear()
+        self.user = User.objects.create(username='synced', email='synced@test.com', password='!')
+    
+    def _event(self, event_id, status='registered', event_type='participation.upserted', **extra):
+        event = {
+            'id': event_id, 'type': event_type, 'user_id': self.user.pk, 'activity_id': 10,
+            'participant_id': 1, 'status': status, 'hours': 0,
+            'registered_at': '2026-01-05T10:00:00+00:00', 'attended_at': None, 'completed_at': None,
+        }
+        event.update(extra)
+        return event
+    
+    def _consume(self, **kwargs):
+        from .participation import consume
+        return consume(**kwargs)
+    
+    def test_events_update_participation_and_hours(self):
+        """测试事件批量写入参与记录并同步时长"""
+        from .models import UserActivity
+        self.broker.publish('participation', [
+            self._event(1),
+            self._event(2, status='completed', hours=6, completed_at='2026-01-06T10:00:00+00:00'),
+            self._event(3, user_id=999999),
+        ])
+        
+        self.assertEqual(self._consume(batch_size=2), (3, 1))
+        
+        participation = UserActivity.objects.get(user=self.user, activity_id=10)
+        self.assertEqual(participation.status, 'completed')
+        self.assertEqual(participation.hours_volunteered, 6)
+        self.assertEqual(participation.registered_at.day, 5)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_volunteer_hours, 6)
+        self.assertEqual(self.user.stats.total_hours, 6)
+    
+    def test_replay_is_idempotent(self):
+        """测试重放和乱序的旧事件不会覆盖新状态"""
+        from .models import UserActivity
+        self.broker.publish('participation', [
+            self._event(5, status='completed', hours=2), self._event(4, status='cancelled'),
+        ])
+        self._consume()
+        
+        self.assertEqual(self._consume(from_offset=0), (2, 0))
+        self.assertEqual(UserActivity.objects.get(user=self.user).status, 'completed')
+    
+    def test_colliding_ids_from_other_sources_applied(self):
+        """测试不同活动服务副本的相同事件 id 不会被当作重复事件丢弃"""
+        from .models import UserActivity
+        self.broker.publish('participation', [
+            self._event(1, source='replica-a'),
+            self._event(1, source='replica-b', activity_id=11),
+        ])
+        self._consume()
+        self.broker.publish('participation', [self._event(2, source='replica-b', activity_id=12)])
+        
+        self._consume()
+        
+        self.assertEqual(
+            set(UserActivity.objects.filter(user=self.user).values_list('activity_id', flat=True)),
+            {10, 11, 12},
+        )
+    
+    def test_replayed_create_does_not_resurrect_deleted(self):
+        """测试删除后重放旧的创建事件不会恢复参与记录"""
+        from .models import UserActivity
+        self.broker.publish('participation', [
+            self._event(1, source='replica-a'),
+            self._event(2, source='replica-a', event_type='participation.deleted'),
+        ])
+        self._consume(batch_size=1)
+        self.broker.publish('participation', [self._event(1, source='replica-a')])
+        
+        self.assertEqual(self._consume(), (1, 0))
+        self.assertFalse(UserActivity.objects.filter(user=self.user).exists())
+    
+    def test_deletion_event(self):
+        """测试删除事件移除参与记录"""
+        from .models import UserActivity
+        self.broker.publish('participation', [self._event(1)])
+        self._consume()
+        self.broker.publish('participation', [self._event(2, event_type='participation.deleted')])
+        
+        self._consume()
+        
+        self.assertFalse(UserActivity.objects.filter(user=self.user).exists())
+    
+    def test_consume_command(self):
+        """测试消费命令 --once 处理完待消费事件后退出"""
+        from io import StringIO
+        from django.core.management import call_command
+        self.broker.publish('participation', [self._event(1)])
+        
+        out = StringIO()
+        call_command('consume_participation_events', once=True, stdout=out)
+        
+        self.assertIn('Applied 1 events (1 participations changed)', out.getvalue())
+    
+    def test_events_cross_services_through_shared_directory(self):
+        """测试活动服务容器写入共享目录的事件被用户服务消费（与部署中的 events 卷一致）"""
+        import tempfile
+        from io import StringIO
+        from pathlib import Path
+        from django.core.management import call_command
+        from .broker import create_broker
+        from .models import UserActivity
+        
+        with tempfile.TemporaryDirectory() as directory:
+            url = Path(directory).as_uri()
+            # 另一个进程（活动服务的中继）各自创建的代理实例
+            create_broker(url).publish('participation', [self._event(1, status='completed', hours=3)])
+            with self.settings(EVENT_BROKER_URL=url):
+                call_command('consume_participation_events', once=True, stdout=StringIO())
+        
+        self.assertEqual(UserActivity.objects.get(user=self.user).hours_volunteered, 3)
+
+
+@override_settings(INTERNAL_SERVICE_TOKENS=['old-token', 'service-token'])
+class InternalUserBatchTestCase(APITestCase):
+    """测试内部批量用户查询接口"""
+    
+    def setUp(self):
+        self.url = reverse('internal-user-batch')
+        self.users = [
+            User.objects.create(
+                username=f'batch{index}', email=f'batch{index}@test.com', first_name='Batch',
+                last_name=str(index), phone='123', password='!'
+            )
+            for index in range(30)
+        ]
+    
+    def _post(self, body, token='service-token'):
+        return self.client.post(self.url, body, format='json', HTTP_X_SERVICE_TOKEN=token)
+    
+    def test_requires_service_token(self):
+        """测试缺少或错误的服务令牌被拒绝"""
+        self.assertEqual(self.client.post(self.url, {'ids': [1]}, format='json').status_code,
+                         status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self._post({'ids': [1]}, token='wrong').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self._post({'ids': [1]}, token='old-token').status_code, status.HTTP_200_OK)
+    
+    def test_batch_lookup_single_query(self):
+        """测试一次查询解析全部用户，保持请求顺序并列出缺失 id"""
+        ids = [user.pk for user in reversed(self.users)] + [999999]
+        
+        with self.assertNumQueries(1):
+            response = self._post({'ids': ids, 'fields': ['email', 'first_name']})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['users']], ids[:-1])
+        self.assertEqual(response.data['users'][0], {
+            'id': self.users[-1].pk, 'email': 'batch29@test.com', 'first_name': 'Batch'
+        })
+        self.assertEqual(response.data['missing'], [999999])
+    
+    def test_rejects_oversized_batch(self):
+        """测试超过上限的批量请求返回 400"""
+        from .serializers import UserBatchLookupSerializer
+        ids = list(range(1, UserBatchLookupSerializer.MAX_IDS + 2))
+        self.assertEqual(self._post({'ids': ids}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class UserAchievementsTestCase(APITestCase):
     """测试用户成就功能"""
     
@@ -503,8 +1299,8 @@ class UserAchievementsTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_list_achievements(self):
         """测试列出用户成就"""
@@ -537,8 +1333,8 @@ class UserActivitiesTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_list_user_activities(self):
         """测试列出用户活动"""
@@ -570,8 +1366,8 @@ class UserNotificationsTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_list_notifications(self):
         """测试列出用户通知"""
@@ -642,6 +1438,48 @@ class UserNotificationsTestCase(APITestCase):
         response = self.client.post(url)
         
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_fast_path_matches_serializer(self):
+        """测试 values() 快速序列化与 ModelSerializer 输出一致"""
+        import json
+        from django.test import override_settings
+        from .models import UserNotification
+        
+        UserNotification.objects.create(
+            user=self.user,
+            notification_type='system',
+            title='Test Notification',
+            message='Test message'
+        )
+        
+        url = reverse('user-notifications')
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            fast = json.loads(self.client.get(url).content)
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            slow = json.loads(self.client.get(url).content)
+        
+        self.assertEqual(fast, slow)
+        self.assertEqual(len(fast['notifications']), 1)
+    
+    def test_notifications_gzip(self):
+        """测试通知列表响应按 Accept-Encoding 压缩"""
+        import gzip
+        from django.test import override_settings
+        from .models import UserNotification
+        
+        UserNotification.objects.create(
+            user=self.user,
+            notification_type='system',
+            title='Test Notification',
+            message='Test message'
+        )
+        
+        url = reverse('user-notifications')
+        plain = self.client.get(url)
+        with override_settings(RESPONSE_COMPRESSION_MIN_SIZE=0):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
 
 
 class GlobalStatsTestCase(APITestCase):
@@ -674,6 +1512,75 @@ class GlobalStatsTestCase(APITestCase):
         self.assertIn('total_ngos', response.data)
 
 
+class GlobalStatsIncrementalTestCase(APITestCase):
+    """测试增量维护的全局统计"""
+    
+    def setUp(self):
+        from . import stats
+        self.stats = stats
+        stats.global_stats.invalidate()
+        self.url = reverse('global-stats')
+    
+    def _create(self, username, role):
+        return User.objects.create(username=username, email=f'{username}@test.com', role=role, password='!')
+    
+    def _stored(self):
+        from .models import GlobalUserStats
+        return GlobalUserStats.objects.values('total_volunteers', 'total_ngos').get()
+    
+    def test_counters_follow_changes(self):
+        """测试注册、角色变更、删除后计数与全量统计一致"""
+        volunteer = self._create('vol', 'volunteer')
+        organizer = self._create('org', 'organizer')
+        self._create('adm', 'admin')
+        self.assertEqual(self._stored(), {'total_volunteers': 1, 'total_ngos': 1})
+        
+        volunteer.role = 'organizer'
+        volunteer.save()
+        volunteer.save()  # 重复保存不应重复计数
+        self.assertEqual(self._stored(), {'total_volunteers': 0, 'total_ngos': 2})
+        
+        organizer.delete()
+        self.assertEqual(self._stored(), self.stats.compute_stats())
+        self.assertEqual(self._stored(), {'total_volunteers': 0, 'total_ngos': 1})
+    
+    def test_hot_path_has_no_queries(self):
+        """测试统计接口命中快照时不查询数据库"""
+        self._create('vol', 'volunteer')
+        self.client.get(self.url)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        
+        self.assertEqual(response.data, {'total_volunteers': 1, 'total_ngos': 0})
+    
+    def test_missing_stats_row_is_rebuilt(self):
+        """测试统计行缺失时接口重建统计行而不会死锁"""
+        from .models import GlobalUserStats
+        self._create('vol', 'volunteer')
+        self._create('org', 'organizer')
+        GlobalUserStats.objects.all().delete()
+        self.stats.global_stats.invalidate()
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.data, {'total_volunteers': 1, 'total_ngos': 1})
+        self.assertEqual(self._stored(), {'total_volunteers': 1, 'total_ngos': 1})
+    
+    def test_rebuild_command_repairs_drift(self):
+        """测试绕过信号的批量更新可以通过重建命令修复"""
+        from django.core.management import call_command
+        from io import StringIO
+        
+        self._create('vol', 'volunteer')
+        User.objects.update(role='organizer')
+        
+        call_command('rebuild_stats', stdout=StringIO())
+        
+        response = self.client.get(self.url)
+        self.assertEqual(response.data, {'total_volunteers': 0, 'total_ngos': 1})
+
+
 class SearchUsersTestCase(APITestCase):
     """测试搜索用户功能"""
     
@@ -687,8 +1594,8 @@ class SearchUsersTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_search_users(self):
         """测试搜索用户"""
@@ -708,6 +1615,157 @@ class SearchUsersTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class SearchUsersRankingTestCase(APITestCase):
+    """测试用户搜索排序和游标分页"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='searcher',
+            email='searcher@test.com',
+            password=TEST_PASSWORD,  # nosec B106
+            role='volunteer'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('search-users')
+    
+    def _create(self, username, first_name, last_name, email, location=''):
+        return User.objects.create(
+            username=username, first_name=first_name, last_name=last_name,
+            email=email, location=location, password='!'
+        )
+    
+    def test_prefix_matches_ranked_first(self):
+        """测试姓名前缀匹配排在包含匹配之前"""
+        contains = self._create('a', 'Maria', 'Anna', 'maria@test.com')
+        email = self._create('b', 'Zed', 'Smith', 'anna.z@test.com')
+        prefix = self._create('c', 'Anna', 'Lee', 'lee@test.com')
+        
+        response = self.client.get(self.url, {'q': 'anna'})
+        
+        ids = [item['id'] for item in response.data]
+        self.assertEqual(ids[0], min(prefix.id, contains.id))
+        self.assertEqual(set(ids[:2]), {prefix.id, contains.id})
+        self.assertEqual(ids[2], email.id)
+    
+    def test_cursor_pagination(self):
+        """测试游标分页遍历全部结果且不重复"""
+        for index in range(7):
+            self._create(f'page{index}', 'Page', f'User{index}', f'page{index}@test.com')
+        
+        seen = []
+        response = self.client.get(self.url, {'q': 'page', 'page_size': 3})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in response.data)
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                break
+            self.assertIn('rel="next"', response['Link'])
+            response = self.client.get(self.url, {'q': 'page', 'page_size': 3, 'cursor': cursor})
+        
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+    
+    def test_invalid_cursor(self):
+        """测试非法游标返回 400"""
+        response = self.client.get(self.url, {'q': 'page', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_location_and_wildcards(self):
+        """测试地点过滤，且查询中的通配符按字面匹配"""
+        london = self._create('l', 'Lon', 'Don', 'lon@test.com', location='London')
+        self._create('p', 'Par', 'Is', 'par@test.com', location='Paris')
+        
+        response = self.client.get(self.url, {'location': 'lond'})
+        self.assertEqual([item['id'] for item in response.data], [london.id])
+        
+        response = self.client.get(self.url, {'q': '%'})
+        self.assertEqual(response.data, [])
+
+
+class UserQueryCountTestCase(APITestCase):
+    """测试用户列表和注册接口的查询次数"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='searcher',
+            email='searcher@test.com',
+            password=TEST_PASSWORD,  # nosec B106
+            role='volunteer'
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def _create_users(self, start, count):
+        users = User.objects.bulk_create([
+            User(
+                username=f'member{index}',
+                email=f'member{index}@test.com',
+                first_name='Member',
+                last_name=str(index),
+                avatar=f'avatars/member{index}.png',
+                password='!',
+            )
+            for index in range(start, start + count)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+    
+    def _count_search_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('search-users'), {'q': 'member'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response.data
+    
+    def test_search_users_constant_queries(self):
+        """测试搜索用户的查询次数与结果数量无关"""
+        self._create_users(0, 2)
+        few_queries, few = self._count_search_queries()
+        self._create_users(2, 15)
+        many_queries, many = self._count_search_queries()
+        
+        self.assertEqual(len(few), 2)
+        self.assertEqual(len(many), 17)
+        self.assertEqual(few_queries, many_queries)
+        self.assertEqual(few_queries, 1)
+        self.assertTrue(many[0]['avatar'].endswith('.png'))
+        self.assertEqual(many[0]['profile']['avatar'], many[0]['avatar'])
+    
+    def test_nested_profile_n_plus_one_fails(self):
+        """测试去掉 select_related 后嵌套 profile 的逐行查询被检测出来"""
+        from unittest.mock import patch
+        from service_common.query_inspection import QueryInspectionError
+        self._create_users(0, 6)
+        
+        with patch.object(User.objects, 'select_related', return_value=User.objects.all()):
+            with self.assertRaisesMessage(QueryInspectionError, 'queries with the same template'):
+                self.client.get(reverse('search-users'), {'q': 'member'})
+    
+    def test_registration_constant_queries(self):
+        """测试注册接口查询次数固定"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        counts = []
+        for index in range(2):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(reverse('user-register'), {
+                    'username': f'newuser{index}',
+                    'email': f'new{index}@test.com',
+                    'password': TEST_PASSWORD,
+                    'password_confirm': TEST_PASSWORD,
+                    'first_name': 'New',
+                    'last_name': 'User',
+                    'role': 'volunteer'
+                }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertIn('profile', response.data['user'])
+            counts.append(len(ctx.captured_queries))
+        
+        self.assertEqual(counts[0], counts[1])
+        # 用户名/邮箱唯一性校验 2 次 + 插入用户、资料、令牌 3 次 + 超出上限的旧令牌查询 1 次 + 全局统计计数 1 次
+        self.assertEqual(counts[0], 7)
+
+
 class HealthCheckTestCase(APITestCase):
     """测试健康检查功能"""
     
@@ -722,6 +1780,45 @@ class HealthCheckTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class RequestTimingTestCase(APITestCase):
+    """测试请求计时中间件"""
+    
+    def setUp(self):
+        from service_common.metrics import registry
+        registry.clear()
+    
+    def test_server_timing_and_metrics(self):
+        """测试 Server-Timing 头与按路由的延迟直方图"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('global-stats'))
+        
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', response['Server-Timing'])
+        body = self.client.get('/metrics').content.decode()
+        self.assertRegex(body, r'http_request_duration_seconds_count\{route="[^"]*global-stats[^"]*",method="GET"\} 1')
+    
+    def test_request_id_in_error_response_log(self):
+        """测试 Django 记录的 4xx 响应日志带有请求 id"""
+        import io
+        import json
+        import logging
+        from service_common.logs import QueueJSONHandler
+        stream = io.StringIO()
+        handler = QueueJSONHandler(stream=stream)
+        logger = logging.getLogger('django.request')
+        logger.addHandler(handler)
+        self.addCleanup(handler.close)
+        self.addCleanup(logger.removeHandler, handler)
+        
+        response = self.client.get('/api/v1/no-such-endpoint/', HTTP_X_REQUEST_ID='trace-7')
+        handler.flush()
+        
+        self.assertEqual(response['X-Request-ID'], 'trace-7')
+        record = json.loads(stream.getvalue().splitlines()[0])
+        self.assertEqual(record['request_id'], 'trace-7')
+        self.assertEqual(record['status_code'], 404)
+
 class CreateNotificationTestCase(APITestCase):
     """测试创建通知功能（跨服务调用）"""
     
@@ -802,8 +1899,8 @@ class SearchUsersExtendedTestCase(APITestCase):
             role='volunteer',
             location='Beijing'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
         
         # 创建更多测试用户
         User.objects.create_user(
@@ -873,8 +1970,8 @@ class UserProfileUpdateTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_get_user_profile(self):
         """测试获取用户详细资料"""
@@ -908,8 +2005,8 @@ class UserUpdateTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_update_user_basic_info(self):
         """测试更新用户基本信息"""
@@ -938,8 +2035,8 @@ class UserProfileViewTestCase(APITestCase):
             last_name='User',
             role='volunteer'
         )
-        self.token = Token.objects.create(user=self.user)
-        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.token = issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
     
     def test_get_profile(self):
         """测试获取用户资料"""
@@ -960,3 +2057,121 @@ class UserProfileViewTestCase(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+
+
+class SeedDataTestCase(TestCase):
+    """测试合成用户数据生成（seed_data 命令）"""
+    
+    def _rows(self):
+        return list(User.objects.order_by('pk').values_list(
+            'pk', 'username', 'role', 'skills', 'interests', 'is_verified', 'impact_score', 'date_joined'
+        ))
+    
+    def test_same_seed_same_rows(self):
+        """测试相同的种子生成相同的用户，且与其他服务共用 id 与姓名"""
+        from .seeding import seed
+        from .synthetic import user_fields
+        counts = seed(scale=0.001, seed=3)
+        self.assertEqual(counts, {'users': 202, 'profiles': 202})
+        first = self._rows()
+        User.objects.all().delete()
+        seed(scale=0.001, seed=3)
+        self.assertEqual(self._rows(), first)
+        
+        user = User.objects.get(pk=150)
+        self.assertEqual(user.role, 'volunteer')
+        self.assertEqual(user.email, user_fields(150)['email'])
+        self.assertEqual(user.impact_score, user.calculate_impact_score())
+        self.assertEqual(User.objects.filter(role='organizer').count(), 2)
+        self.assertEqual(UserProfile.objects.get(user=user).pk, 150)
+        self.assertFalse(user.has_usable_password())
+        # 序列已越过显式指定的 id，注册新用户不冲突
+        new_user = User.objects.create_user(
+            username='fresh', email='fresh@example.com', password='Fresh-Pass-2024', first_name='F', last_name='P'
+        )
+        self.assertEqual(new_user.pk, 203)
+    
+    def test_command(self):
+        """测试命令只在空库中生成，--copy 需要 PostgreSQL"""
+        from io import StringIO
+        from django.core.management import CommandError, call_command
+        from .stats import global_stats
+        
+        with self.assertRaisesMessage(CommandError, 'PostgreSQL'):
+            call_command('seed_data', copy=True, stdout=StringIO())
+        out = StringIO()
+        call_command('seed_data', scale=0.001, stdout=out)
+        self.assertIn('users=202', out.getvalue())
+        global_stats.invalidate()
+        self.assertEqual(global_stats.get()['total_volunteers'], 200)
+        with self.assertRaisesMessage(CommandError, 'already has users'):
+            call_command('seed_data', scale=0.001, stdout=StringIO())
+
+
+class DatabaseConnectionSettingsTestCase(TestCase):
+    """测试数据库持久连接与 PgBouncer 事务模式的配置"""
+    
+    def _load(self, **environ):
+        import importlib.util
+        from pathlib import Path
+        from unittest import mock
+        from django.conf import settings
+        path = Path(settings.BASE_DIR) / 'user_service/settings/base.py'
+        with mock.patch.dict('os.environ', environ):
+            spec = importlib.util.spec_from_file_location('settings_under_test', path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        return module.DATABASES['default']
+    
+    def test_persistent_connections_with_health_checks(self):
+        """测试默认保留连接并在复用前检查，可用 DB_CONN_MAX_AGE=0 关闭"""
+        database = self._load(USE_SQLITE='False')
+        self.assertEqual(database['CONN_MAX_AGE'], 600)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertFalse(database['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertEqual(database['OPTIONS']['application_name'], 'user-service')
+        self.assertEqual(self._load(USE_SQLITE='False', DB_CONN_MAX_AGE='0')['CONN_MAX_AGE'], 0)
+        self.assertEqual(self._load(USE_SQLITE='True')['CONN_MAX_AGE'], 600)
+    
+    def test_pgbouncer_transaction_mode(self):
+        """测试事务模式关闭服务端游标，未知模式报错"""
+        database = self._load(USE_SQLITE='False', DB_POOL_MODE='transaction')
+        self.assertTrue(database['DISABLE_SERVER_SIDE_CURSORS'])
+        with self.assertRaises(ValueError):
+            self._load(DB_POOL_MODE='statement')
+
+
+class ServiceSecretSettingsTestCase(TestCase):
+    """测试服务间密钥在关闭 DEBUG 时必须显式配置"""
+    
+    def _load(self, **environ):
+        import importlib.util
+        from pathlib import Path
+        from unittest import mock
+        from django.conf import settings
+        path = Path(settings.BASE_DIR) / 'user_service/settings/base.py'
+        environ.setdefault('INTERNAL_SERVICE_TOKENS', '')
+        environ.setdefault('SERVICE_TOKEN_SIGNING_KEYS', '')
+        with mock.patch.dict('os.environ', environ):
+            spec = importlib.util.spec_from_file_location('settings_under_test', path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        return module
+    
+    def test_internal_service_token_required_without_debug(self):
+        """测试生产环境缺少内部服务令牌时拒绝启动，DEBUG 下回退到开发令牌"""
+        from django.core.exceptions import ImproperlyConfigured
+        with self.assertRaisesMessage(ImproperlyConfigured, 'INTERNAL_SERVICE_TOKENS'):
+            self._load(DEBUG='False')
+        module = self._load(DEBUG='False', INTERNAL_SERVICE_TOKENS='rotated-token', SERVICE_TOKEN_SIGNING_KEYS='key')
+        self.assertEqual(module.INTERNAL_SERVICE_TOKENS, ['rotated-token'])
+        self.assertTrue(self._load(DEBUG='True').INTERNAL_SERVICE_TOKENS)
+    
+    def test_signing_keys_required_without_debug(self):
+        """测试生产环境缺少服务令牌签名密钥时拒绝启动，DEBUG 下回退到开发密钥"""
+        from django.core.exceptions import ImproperlyConfigured
+        with self.assertRaisesMessage(ImproperlyConfigured, 'SERVICE_TOKEN_SIGNING_KEYS'):
+            self._load(DEBUG='False', INTERNAL_SERVICE_TOKENS='token')
+        module = self._load(DEBUG='False', SERVICE_TOKEN_SIGNING_KEYS='new, old', INTERNAL_SERVICE_TOKENS='token')
+        self.assertEqual(module.SERVICE_TOKEN_SIGNING_KEYS, ['new', 'old'])
+        self.assertTrue(self._load(DEBUG='True').SERVICE_TOKEN_SIGNING_KEYS)
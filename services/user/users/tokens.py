@@ -0,0 +1,56 @@
+"""
+API tokens stored as SHA-256 digests.
+
+Clients still send ``Authorization: Token <key>``, but only the digest of
+the key is stored (``AuthToken``), so a database leak does not leak usable
+tokens. Keys are 160 random bits, so a fast unsalted hash is enough.
+Because the plaintext is never stored, a login cannot hand back an
+existing key: ``issue_token`` adds a token per login instead, so other
+devices stay signed in, and keeps at most ``AUTH_TOKENS_PER_USER`` of
+them. Logout deletes only the token it was made with, and revokes only
+the service tokens issued with it (``session_id``).
+"""
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def token_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def issue_token(user):
+    """Add a token for ``user`` and return its plaintext key."""
+    from .models import AuthToken
+
+    key = secrets.token_hex(20)
+    AuthToken.objects.create(user=user, digest=token_digest(key), created=timezone.now())
+    # 超出上限时删除最早的令牌（逐个删除以触发信号，丢弃其缓存解析）
+    stale = AuthToken.objects.filter(user=user).order_by('-created')[settings.AUTH_TOKENS_PER_USER:]
+    for token in stale:
+        token.delete()
+    return key
+
+
+def session_id(token):
+    """
+    Id that service tokens issued with ``token`` (an ``AuthToken``) carry as
+    ``sid``, or None for other credentials such as a session.
+    """
+    from .models import AuthToken
+
+    return token.digest if isinstance(token, AuthToken) else None
+
+
+def revoke_token(user, token=None):
+    """Delete ``token`` (logout), or every token of ``user`` when not given."""
+    from .authentication import token_users
+    from .models import AuthToken
+
+    tokens = AuthToken.objects.filter(user=user)
+    if isinstance(token, AuthToken):
+        tokens = tokens.filter(digest=token.digest)
+    tokens.delete()
+    token_users.invalidate_user_on_commit(user.pk)
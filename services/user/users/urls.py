@@ -9,6 +9,7 @@ urlpatterns = [
     path('auth/register/', views.UserRegistrationView.as_view(), name='user-register'),
     path('auth/login/', views.UserLoginView.as_view(), name='user-login'),
     path('auth/logout/', views.UserLogoutView.as_view(), name='user-logout'),
+    path('auth/service-token/', views.ServiceTokenView.as_view(), name='service-token'),
     
     # User profile
     path('profile/', views.UserProfileView.as_view(), name='user-profile'),
@@ -32,6 +33,9 @@ urlpatterns = [
     # Search
     path('search/', views.search_users, name='search-users'),
     
+    # Internal (service-to-service)
+    path('internal/users/batch/', views.InternalUserBatchView.as_view(), name='internal-user-batch'),
+    
     # Global stats
     path('global-stats/', views.global_stats, name='global-stats'),
     # Health check
@@ -4,23 +4,44 @@ Views for the users app.
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import login, logout
 from django.db.models import Q
 from django.utils import timezone
-from datetime import timedelta
 from functools import wraps
+import logging
 from rest_framework.views import APIView
 from django.http import JsonResponse
+from django.conf import settings
+from service_common.query_inspection import query_budget
 
 from .models import User, UserProfile, UserAchievement, UserActivity, UserNotification
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
     UserUpdateSerializer, UserProfileSerializer, UserAchievementSerializer,
     UserActivitySerializer, UserNotificationSerializer, PasswordChangeSerializer,
-    UserStatsSerializer
+    UserStatsSerializer, UserNotificationValuesSerializer, UserBatchLookupSerializer,
+    avatar_url_for_name
 )
+from .broker import BrokerError
+from .permissions import IsInternalService
+from .renderers import FastJSONRenderer
+from .service_tokens import CLAIMS as SERVICE_TOKEN_CLAIMS, issue_service_token, revoke_user_tokens
+from .throttling import LoginAccountThrottle, LoginIPThrottle
+from .tokens import issue_token, revoke_token, session_id, token_digest
+from .uploads import StreamingUploadMixin, save_content_addressed
+from . import search as user_search
+from . import stats as user_stats
+from rest_framework.utils.urls import replace_query_param
+
+logger = logging.getLogger(__name__)
+
+
+def service_token_data(user, sid=None):
+    """Response fields for a fresh signed service token for ``user``."""
+    claims = {name: getattr(user, name) for name in SERVICE_TOKEN_CLAIMS}
+    token, expires_at = issue_service_token(claims, sid)
+    return {'service_token': token, 'service_token_expires_at': expires_at}
 
 
 def require_role(roles):
@@ -55,12 +76,13 @@ class UserRegistrationView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         
-        # Create auth token
-        token, created = Token.objects.get_or_create(user=user)
+        # Create auth token（只保存摘要，明文仅在响应中返回一次）
+        token = issue_token(user)
         
         return Response({
             'user': UserSerializer(user, context={'request': request}).data,
-            'token': token.key,
+            'token': token,
+            **service_token_data(user, token_digest(token)),
             'message': 'User created successfully'
         }, status=status.HTTP_201_CREATED)
 
@@ -72,6 +94,8 @@ class UserLoginView(generics.GenericAPIView):
     serializer_class = UserLoginSerializer
     permission_classes = [AllowAny]
     authentication_classes = []  # 登录不需要认证
+    # 在校验密码之前限流，撞库请求不消耗哈希计算
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle]
     
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -86,15 +110,16 @@ class UserLoginView(generics.GenericAPIView):
                     'error': 'Invalid admin credentials'
                 }, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Create or get auth token
-        token, created = Token.objects.get_or_create(user=user)
+        # 签发新令牌（其他设备的令牌保持有效）
+        token = issue_token(user)
         
         # Login user
         login(request, user)
         
         return Response({
             'user': UserSerializer(user, context={'request': request}).data,
-            'token': token.key,
+            'token': token,
+            **service_token_data(user, token_digest(token)),
             'message': 'Login successful'
         })
     
@@ -115,13 +140,14 @@ class UserLogoutView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, *args, **kwargs):
-        # Delete auth token
+        # Delete auth token（只删除本次请求使用的令牌）
+        revoke_token(request.user, request.auth)
+        
+        # 撤销用该令牌签发的服务令牌（其他服务在下一次轮询时生效）
         try:
-            request.user.auth_token.delete()
-        except (AttributeError, Token.DoesNotExist):
-            # Token may not exist or user may not have auth_token attribute
-            # This is acceptable for logout, so we silently continue
-            pass
+            revoke_user_tokens(request.user.id, session_id(request.auth))
+        except BrokerError:
+            logger.exception('Revoking service tokens for user %s failed', request.user.id)
         
         # Logout user
         logout(request)
@@ -129,12 +155,24 @@ class UserLogoutView(generics.GenericAPIView):
         return Response({'message': 'Logout successful'})
 
 
+class ServiceTokenView(generics.GenericAPIView):
+    """
+    Issue a fresh signed service token for the authenticated user (used to
+    renew it before it expires).
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, *args, **kwargs):
+        return Response(service_token_data(request.user, session_id(request.auth)))
+
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """
     User profile endpoint.
     """
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 3
     
     def get_object(self):
         return self.request.user
@@ -160,6 +198,8 @@ class UserProfileUpdateView(generics.RetrieveUpdateAPIView):
     
     def get_object(self):
         profile, created = UserProfile.objects.get_or_create(user=self.request.user)
+        # 复用已加载的用户对象，序列化头像时不再查询 user
+        profile.user = self.request.user
         return profile
 
 
@@ -181,18 +221,32 @@ class PasswordChangeView(generics.GenericAPIView):
         return Response({'message': 'Password changed successfully'})
 
 
-class UserAvatarUploadView(generics.GenericAPIView):
+def _delete_unshared_avatar(name, user_id):
+    """
+    Delete an avatar file unless another user still points at it (uploads
+    are deduplicated by content hash, so users can share a file).
+    """
+    if not name or User.objects.filter(avatar=name).exclude(pk=user_id).exists():
+        return
+    from django.core.files.storage import default_storage
+    default_storage.delete(name)
+
+
+class UserAvatarUploadView(StreamingUploadMixin, generics.GenericAPIView):
     """
     User avatar upload endpoint.
     """
     permission_classes = [IsAuthenticated]
     
     def post(self, request, *args, **kwargs):
-        from django.db import transaction
         import logging
         
         logger = logging.getLogger(__name__)
         user = request.user
+        # 上传处理器在读取请求体时已拒绝超限或非图片文件
+        upload_errors = self.get_upload_errors(request)
+        if upload_errors:
+            return Response({'error': upload_errors[0]}, status=status.HTTP_400_BAD_REQUEST)
         avatar_file = request.FILES.get('avatar')
         
         if not avatar_file:
@@ -202,36 +256,27 @@ class UserAvatarUploadView(generics.GenericAPIView):
             )
         
         try:
-            with transaction.atomic():
-                # 删除旧头像
-                if user.avatar:
-                    try:
-                        user.avatar.delete(save=False)
-                    except Exception as e:
-                        logger.warning(f"Failed to delete old avatar: {str(e)}")
-                
-                # 保存新头像
-                user.avatar = avatar_file
-                # 显式保存 avatar 字段
-                user.save(update_fields=['avatar', 'updated_at'])
-                
-                # 强制刷新以确保数据库已更新
-                user.refresh_from_db()
-                
-                # 验证保存是否成功
-                if not user.avatar:
-                    logger.error("Avatar field is empty after save!")
-                    raise Exception("Failed to save avatar to database")
-                
-                # 返回头像 URL
-                avatar_url = request.build_absolute_uri(user.avatar.url)
-                
-                logger.info(f"Avatar uploaded successfully for user {user.id}: {user.avatar.name}")
-                
-                return Response({
-                    'avatar': avatar_url,
-                    'message': 'Avatar uploaded successfully'
-                })
+            old_name = user.avatar.name if user.avatar else None
+            # 按内容哈希保存，相同图片只存一份
+            user.avatar = save_content_addressed(avatar_file, 'avatars')
+            user.save(update_fields=['avatar', 'updated_at'])
+            
+            # 删除旧头像
+            if old_name and old_name != user.avatar.name:
+                try:
+                    _delete_unshared_avatar(old_name, user.id)
+                except Exception as e:
+                    logger.warning(f"Failed to delete old avatar: {str(e)}")
+            
+            # 返回头像 URL
+            avatar_url = request.build_absolute_uri(user.avatar.url)
+            
+            logger.info(f"Avatar uploaded successfully for user {user.id}: {user.avatar.name}")
+            
+            return Response({
+                'avatar': avatar_url,
+                'message': 'Avatar uploaded successfully'
+            })
                 
         except Exception as e:
             logger.error(f"Error uploading avatar: {str(e)}", exc_info=True)
@@ -251,7 +296,10 @@ class UserAvatarRemoveView(generics.GenericAPIView):
         user = request.user
         
         if user.avatar:
-            user.avatar.delete(save=True)
+            old_name = user.avatar.name
+            user.avatar = None
+            user.save(update_fields=['avatar', 'updated_at'])
+            _delete_unshared_avatar(old_name, user.id)
         
         return Response({
             'avatar': None,
@@ -266,32 +314,8 @@ class UserStatsView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
-        user = request.user
-        
-        # Get recent activities (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_activities = UserActivity.objects.filter(
-            user=user,
-            registered_at__gte=thirty_days_ago
-        ).order_by('-registered_at')[:5]
-        
-        # Get recent achievements (last 30 days)
-        recent_achievements = UserAchievement.objects.filter(
-            user=user,
-            earned_at__gte=thirty_days_ago
-        ).order_by('-earned_at')[:5]
-        
-        stats = {
-            'total_hours': user.total_volunteer_hours,
-            'activities_joined': UserActivity.objects.filter(user=user).count(),
-            'achievements_earned': UserAchievement.objects.filter(user=user).count(),
-            'impact_score': user.impact_score,
-            'volunteer_level': user.get_volunteer_level(),
-            'recent_activities': UserActivitySerializer(recent_activities, many=True).data,
-            'recent_achievements': UserAchievementSerializer(recent_achievements, many=True).data,
-        }
-        
-        return Response(stats)
+        # 从物化的统计行读取（见 users.stats）
+        return Response(user_stats.get_user_stats(request.user))
 
 
 class UserAchievementsView(generics.ListAPIView):
@@ -300,6 +324,7 @@ class UserAchievementsView(generics.ListAPIView):
     """
     serializer_class = UserAchievementSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 4
     
     def get_queryset(self):
         return UserAchievement.objects.filter(user=self.request.user)
@@ -311,6 +336,7 @@ class UserActivitiesView(generics.ListAPIView):
     """
     serializer_class = UserActivitySerializer
     permission_classes = [IsAuthenticated]
+    query_budget = 4
     
     def get_queryset(self):
         return UserActivity.objects.filter(user=self.request.user)
@@ -322,6 +348,8 @@ class UserNotificationsView(generics.ListAPIView):
     """
     serializer_class = UserNotificationSerializer
     permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer]
+    query_budget = 4
     
     def get_queryset(self):
         return UserNotification.objects.filter(user=self.request.user)
@@ -335,10 +363,15 @@ class UserNotificationsView(generics.ListAPIView):
         
         # Get notifications
         notifications = self.get_queryset()
+        if settings.FAST_LIST_SERIALIZATION:
+            serializer = UserNotificationValuesSerializer()
+            data = serializer.serialize(serializer.prepare(notifications))
+        else:
+            data = UserNotificationSerializer(notifications, many=True).data
         
         return Response({
             'unread_count': unread_count,
-            'notifications': UserNotificationSerializer(notifications, many=True).data
+            'notifications': data
         })
 
 
@@ -425,51 +458,88 @@ def create_notification(request):
         )
 
 
+class InternalUserBatchView(APIView):
+    """
+    Internal batch user lookup for other services.
+    
+    ``POST {"ids": [...], "fields": [...]}`` resolves up to
+    ``UserBatchLookupSerializer.MAX_IDS`` users with one ``id__in`` query
+    over the requested columns. Users are returned in request order;
+    unknown ids are listed in ``missing``.
+    """
+    authentication_classes = []
+    permission_classes = [IsInternalService]
+    renderer_classes = [FastJSONRenderer]
+    
+    def post(self, request, *args, **kwargs):
+        serializer = UserBatchLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        fields = serializer.validated_data.get('fields') or UserBatchLookupSerializer.FIELDS
+        columns = ['id', *(field for field in UserBatchLookupSerializer.FIELDS if field in fields and field != 'id')]
+        
+        rows = {row['id']: row for row in User.objects.filter(id__in=ids).values(*columns)}
+        if 'avatar' in columns:
+            for row in rows.values():
+                row['avatar'] = avatar_url_for_name(row['avatar'])
+        
+        return Response({
+            'users': [rows[user_id] for user_id in ids if user_id in rows],
+            'missing': [user_id for user_id in ids if user_id not in rows],
+        })
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def global_stats(request):
     """
     Global statistics endpoint (public access).
-    """
-    total_volunteers = User.objects.filter(role='volunteer').count()
-    total_ngos = User.objects.filter(role='organizer').count()
     
-    return Response({
-        'total_volunteers': total_volunteers,
-        'total_ngos': total_ngos,
-    })
+    Served from the incrementally maintained stats snapshot (see
+    ``users.stats``); no counting runs per request.
+    """
+    return Response(user_stats.global_stats.get())
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def search_users(request):
     """
     Search users endpoint.
+    
+    Returns a ranked list; when more results exist the next page is
+    advertised with ``X-Next-Cursor`` and a ``Link: rel="next"`` header.
     """
-    query = request.GET.get('q', '')
+    query = request.GET.get('q', '').strip()
     role = request.GET.get('role', '')
-    location = request.GET.get('location', '')
-
-    queryset = User.objects.all()
+    location = request.GET.get('location', '').strip()
+    cursor = request.GET.get('cursor')
+    try:
+        page_size = int(request.GET.get('page_size', user_search.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = user_search.DEFAULT_PAGE_SIZE
+    page_size = max(1, min(page_size, user_search.MAX_PAGE_SIZE))
 
-    if query:
-        queryset = queryset.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query)
-        )
+    # 嵌套的 profile 一并查询，避免 N+1
+    queryset = User.objects.select_related('profile')
 
     if role:
         queryset = queryset.filter(role=role)
 
-    if location:
-        queryset = queryset.filter(location__icontains=location)
-
     # Exclude current user
     queryset = queryset.exclude(id=request.user.id)
 
-    serializer = UserSerializer(queryset[:20], many=True)
-    return Response(serializer.data)
+    users, next_cursor = user_search.search_page(
+        queryset, query=query, location=location, cursor=cursor, page_size=page_size
+    )
+    serializer = UserSerializer(users, many=True)
+    response = Response(serializer.data)
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        response['X-Next-Cursor'] = next_cursor
+        response['Link'] = f'<{next_url}>; rel="next"'
+    return response
 
 
 @api_view(['GET'])
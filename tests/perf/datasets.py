@@ -0,0 +1,99 @@
+"""
+Deterministic datasets for the benchmark suite.
+
+``seed(service, scale, seed)`` fills the current database of ``service``
+with the service's own synthetic data generator (``<app>.seeding``, also
+``manage.py seed_data``) and returns a ``Dataset``. At ``--scale 1``:
+
+``activity``
+    100,000 activities in the 10 categories and 1,000,000 participants.
+    A few activities draw most applications, as on the live site.
+``user``
+    202,000 users (2,000 organizers) with profiles; the first 1,000
+    volunteers also get API tokens here (``token_key``).
+``notification``
+    1,000,000 notifications, skewed towards the most active users.
+
+The services share one population of user ids (``<app>.synthetic``), so
+rows referring to a user agree across the services. The same seed and
+scale always produce the same rows.
+"""
+from dataclasses import dataclass, field
+from importlib import import_module
+from types import ModuleType
+
+TOKENS = 1_000
+
+# 服务名 -> Django 应用
+APPS = {'activity': 'activities', 'user': 'users', 'notification': 'notification_service'}
+
+
+@dataclass
+class Dataset:
+    """Row counts of a seeded service, plus what its scenarios need to know about the rows."""
+
+    scale: float
+    organizers: int
+    users: int
+    # 服务的 synthetic 模块：user_fields、active_user 等
+    synthetic: ModuleType
+    counts: dict = field(default_factory=dict)
+    extra: dict = field(default_factory=dict)
+
+
+def token_key(user_id):
+    """The API token of a seeded user (``user`` dataset, ``Dataset.extra['token_users']``)."""
+    return f'perf-token-{user_id}'
+
+
+def activity_extra(dataset):
+    from django.db.models import Count
+
+    from activities.models import Activity
+    from activities.seeding import CATEGORIES, ensure_categories
+
+    # 报名高峰的目标：未来的热门已批准活动，同属一个组织者
+    upcoming = list(
+        Activity.objects.filter(approval_status='approved', start_date__gt=dataset.synthetic.anchor())
+        .annotate(applications=Count('participants')).order_by('-applications', 'pk')
+        .values_list('pk', 'organizer_id')
+    )
+    organizer_id = upcoming[0][1]
+    dataset.extra.update({
+        'category_ids': ensure_categories(),
+        'approved_ids': list(Activity.objects.filter(approval_status='approved').values_list('pk', flat=True)),
+        'organizer_id': organizer_id,
+        'target_activity_ids': [pk for pk, organizer in upcoming if organizer == organizer_id][:5],
+        'search_terms': sorted(
+            {cause.split()[0].lower() for category in CATEGORIES for cause in category[4]}
+            | {city.lower() for city, _, _ in dataset.synthetic.CITIES}
+        ),
+    })
+
+
+def user_extra(dataset):
+    from users.models import AuthToken
+    from users.tokens import token_digest
+
+    token_users = list(range(dataset.organizers + 1, min(dataset.users, dataset.organizers + TOKENS) + 1))
+    AuthToken.objects.bulk_create(
+        [AuthToken(user_id=user_id, digest=token_digest(token_key(user_id))) for user_id in token_users],
+        batch_size=500,
+    )
+    dataset.counts['tokens'] = len(token_users)
+    dataset.extra['token_users'] = token_users
+
+
+EXTRAS = {'activity': activity_extra, 'user': user_extra}
+
+
+def seed(service, scale, seed):
+    """Seed the current database of ``service``; returns the ``Dataset``."""
+    app = APPS[service]
+    synthetic = import_module(f'{app}.synthetic')
+    counts = import_module(f'{app}.seeding').seed(scale=scale, seed=seed)
+    organizers, users = synthetic.population(scale)
+    dataset = Dataset(scale=scale, organizers=organizers, users=users, synthetic=synthetic, counts=counts)
+    if service in EXTRAS:
+        EXTRAS[service](dataset)
+    return dataset
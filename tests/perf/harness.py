@@ -0,0 +1,240 @@
+"""
+Per-service machinery of the benchmark suite (see ``run.py``).
+
+A process can load only one Django settings module, so ``run.py`` runs
+each service in a child process (``python harness.py <service> ...``).
+The child sets the service up against a throwaway test database, seeds
+it (``datasets``), runs the service's scenarios (``scenarios``) through
+the test client, so every request passes the full middleware stack, and
+writes its part of the report as JSON to ``--output``.
+
+Calls to the other services go through ``StubServices``, which answers
+them in process instead of opening connections.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# 服务名 -> (目录, 配置模块)
+SERVICES = {
+    'activity': ('services/activity', 'activity_service.settings'),
+    'user': ('services/user', 'user_service.settings'),
+    'notification': ('services/notification', 'notification_service.settings'),
+}
+
+# 在配置模块读取环境变量之前设置：关闭仅用于开发的检查，事件只留在进程内
+BENCH_ENVIRONMENT = {
+    'DEBUG': 'False',
+    'QUERY_INSPECTION': 'False',
+    'REQUEST_TIMING_LOG': 'False',
+    'METRICS_MULTIPROC_DIR': '',
+    'EVENT_BROKER_URL': 'memory://',
+    'LOG_LEVEL': 'WARNING',
+    'LOG_DEBUG_SAMPLE_RATE': '0',
+    # 仅供基准使用的服务间令牌与签名密钥（DEBUG 关闭时必须设置）
+    'INTERNAL_SERVICE_TOKEN': 'bench-internal-token',
+    'INTERNAL_SERVICE_TOKENS': 'bench-internal-token',
+    'SERVICE_TOKEN_SIGNING_KEYS': 'bench-signing-key',
+}
+
+
+def setup_django(service, postgres):
+    """Load ``service``'s settings from its directory and set Django up."""
+    directory, settings_module = SERVICES[service]
+    path = ROOT / directory
+    sys.path.insert(0, str(path))
+    os.chdir(path)
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    os.environ.update(BENCH_ENVIRONMENT)
+    os.environ['USE_SQLITE'] = 'False' if postgres else 'True'
+
+    import django
+    from django.conf import settings
+    from django.test.utils import override_settings, setup_test_environment
+
+    django.setup()
+    # 基准不收集静态文件
+    warnings.filterwarnings('ignore', message='No directory at')
+    # 允许 testserver 主机，邮件写入内存
+    setup_test_environment(debug=False)
+    # Redis 不是基准的前提：缓存使用进程内实现
+    override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'perf'},
+    }).enable()
+    return settings
+
+
+class StubServices:
+    """
+    Answers outbound ``requests`` calls from a route table instead of the
+    network. ``routes`` is a list of ``(host, path prefix, responder)``;
+    a responder takes the ``PreparedRequest`` and returns ``(status,
+    json body)``. Calls without a route fail with ``ConnectionError``, as
+    they would offline, and are counted under ``unrouted``.
+    """
+
+    def __init__(self, routes, latency=0.0):
+        self.routes = routes
+        self.latency = latency
+        self.calls = Counter()
+
+    def send(self, adapter, request, **kwargs):
+        import requests
+
+        url = urlsplit(request.url)
+        for host, prefix, responder in self.routes:
+            if url.hostname == host and url.path.startswith(prefix):
+                self.calls[f'{request.method} {host}{prefix}'] += 1
+                if self.latency:
+                    time.sleep(self.latency)
+                status, body = responder(request)
+                response = requests.Response()
+                response.status_code = status
+                response._content = json.dumps(body).encode()
+                response.headers['Content-Type'] = 'application/json'
+                response.url = request.url
+                response.request = request
+                return response
+        self.calls['unrouted'] += 1
+        raise requests.exceptions.ConnectionError(f'No stub for {request.method} {request.url}')
+
+    @contextmanager
+    def installed(self):
+        # 在传输层替换：连接池、超时与计时钩子等上层逻辑照常执行
+        with mock.patch('requests.adapters.HTTPAdapter.send', autospec=True, side_effect=self.send):
+            yield self
+
+
+class QueryCounter:
+    """``execute_wrapper`` counting the SQL statements run."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_samples:
+        return 0.0
+    index = max(0, min(len(sorted_samples) - 1, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def measure(operation, ops, warmup, stubs):
+    """
+    Run ``operation(i)`` for ``i`` in ``ops..ops + warmup - 1`` untimed,
+    then for ``i`` in ``0..ops - 1``. ``operation`` returns the response;
+    status codes of 400 and above count as errors. Returns the scenario's
+    report entry.
+    """
+    from django.db import connection
+
+    for index in range(warmup):
+        operation(ops + index)
+    stubs.calls.clear()
+    counter = QueryCounter()
+    latencies = []
+    errors = Counter()
+    with connection.execute_wrapper(counter):
+        started = time.perf_counter()
+        for index in range(ops):
+            op_started = time.perf_counter()
+            response = operation(index)
+            latencies.append((time.perf_counter() - op_started) * 1000)
+            if response.status_code >= 400:
+                errors[str(response.status_code)] += 1
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'ops': ops,
+        'errors': sum(errors.values()),
+        'error_statuses': dict(errors),
+        'error_rate': round(sum(errors.values()) / ops, 4) if ops else 0.0,
+        'ops_per_sec': round(ops / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / ops, 3) if ops else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+        'queries_per_op': round(counter.count / ops, 2) if ops else 0.0,
+        'outbound_per_op': round(sum(stubs.calls.values()) / ops, 2) if ops else 0.0,
+        'outbound_calls': dict(stubs.calls),
+    }
+
+
+def run_service(service, args):
+    """Seed ``service``'s test database and run its scenarios; returns its report."""
+    settings = setup_django(service, args.postgres)
+
+    from django.db import connection
+
+    import datasets
+    import scenarios
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        started = time.perf_counter()
+        dataset = datasets.seed(service, args.scale, args.seed)
+        seed_seconds = time.perf_counter() - started
+        report = {
+            'vendor': connection.vendor,
+            'dataset': dataset.counts,
+            'seed_seconds': round(seed_seconds, 1),
+            'scenarios': {},
+        }
+        print(f'[{service}] seeded {dataset.counts} on {connection.vendor} in {seed_seconds:.1f}s', file=sys.stderr)
+        stubs = StubServices(scenarios.stub_routes(service, dataset), latency=args.stub_latency_ms / 1000)
+        with stubs.installed():
+            for scenario in scenarios.SCENARIOS[service]:
+                if args.only and f'{service}.{scenario.name}' not in args.only and scenario.name not in args.only:
+                    continue
+                ops = max(1, round(scenario.ops * args.ops_factor))
+                operation = scenario.prepare(dataset, settings)
+                entry = measure(operation, ops, min(scenario.warmup, ops), stubs)
+                entry['description'] = scenario.description
+                report['scenarios'][scenario.name] = entry
+                print(
+                    f'[{service}] {scenario.name}: p95 {entry["p95_ms"]} ms, '
+                    f'{entry["queries_per_op"]} queries/op, {entry["errors"]} errors',
+                    file=sys.stderr,
+                )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark one service (run by run.py).')
+    parser.add_argument('service', choices=sorted(SERVICES))
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ops-factor', type=float, default=1.0)
+    parser.add_argument('--stub-latency-ms', type=float, default=0.0)
+    parser.add_argument('--postgres', action='store_true')
+    parser.add_argument('--only', nargs='*', default=[])
+    parser.add_argument('--output', required=True, help='file to write the JSON report to')
+    args = parser.parse_args()
+    # 本目录下的 datasets / scenarios 模块
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    report = run_service(args.service, args)
+    with open(args.output, 'w') as output:
+        json.dump(report, output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Offline benchmark suite for the user, activity and notification services.
+
+For each service, seeds a throwaway test database with a deterministic
+dataset (``datasets``; 100k activities, 1M participants and 1M
+notifications at ``--scale 1``), runs the service's scenario workloads
+(``scenarios``) in process with the calls between services stubbed, and
+writes one JSON report. The local db.sqlite3 files are never touched.
+
+Each scenario reports latency percentiles, throughput, SQL queries and
+outbound calls per request, and errors. They are checked against the
+limits in ``thresholds.json`` (set for ``--scale 1`` on SQLite) and, with
+``--baseline``, against an earlier report: a p95/p99 latency (beyond
+2 ms of jitter) or query count more than ``--tolerance`` above the
+baseline fails. The exit status is 1 when any check fails.
+
+The figures are single-client service times. Concurrency, the network
+and gunicorn are what ``k6-load.js`` measures against a running stack.
+
+Usage: python tests/perf/run.py [--services S ...] [--scale F] [--seed N]
+       [--ops-factor F] [--stub-latency-ms N] [--postgres] [--only NAME ...]
+       [--output FILE] [--thresholds FILE] [--baseline FILE] [--tolerance F]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+SERVICES = ('user', 'activity', 'notification')
+# 与基线比较的指标 -> 额外允许的绝对增量（毫秒级的抖动不算退化）
+BASELINE_METRICS = {'p95_ms': 2.0, 'p99_ms': 2.0, 'queries_per_op': 0.0}
+
+
+def run_service(service, args):
+    """Benchmark ``service`` in a child process (``harness.py``); returns its report."""
+    with tempfile.NamedTemporaryFile(suffix='.json') as output:
+        command = [
+            sys.executable, str(HERE / 'harness.py'), service,
+            '--scale', str(args.scale), '--seed', str(args.seed), '--ops-factor', str(args.ops_factor),
+            '--stub-latency-ms', str(args.stub_latency_ms), '--output', output.name,
+        ]
+        if args.postgres:
+            command.append('--postgres')
+        if args.only:
+            command += ['--only', *args.only]
+        subprocess.run(command, check=True)
+        return json.load(open(output.name))
+
+
+def check(report, thresholds, baseline, tolerance):
+    """``[{scenario, metric, value, limit, source, passed}]`` for every limit that applies."""
+    checks = []
+    for service, service_report in report['services'].items():
+        for name, result in service_report['scenarios'].items():
+            scenario = f'{service}.{name}'
+            limits = [(metric, limit, 'thresholds') for metric, limit in thresholds.get(scenario, {}).items()]
+            previous = (baseline or {}).get('services', {}).get(service, {}).get('scenarios', {}).get(name)
+            if previous:
+                limits += [
+                    (metric, round(previous[metric] * (1 + tolerance) + slack, 3), 'baseline')
+                    for metric, slack in BASELINE_METRICS.items() if metric in previous
+                ]
+            for metric, limit, source in limits:
+                value = result[metric]
+                checks.append({
+                    'scenario': scenario, 'metric': metric, 'value': value, 'limit': limit,
+                    'source': source, 'passed': value <= limit,
+                })
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--services', nargs='+', choices=SERVICES, default=list(SERVICES))
+    parser.add_argument('--scale', type=float, default=1.0, help='dataset size relative to the full dataset')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ops-factor', type=float, default=1.0, help='multiplies the requests per scenario')
+    parser.add_argument('--stub-latency-ms', type=float, default=0.0, help='delay of each stubbed outbound call')
+    parser.add_argument('--postgres', action='store_true', help='use the DB_* PostgreSQL settings (not notification)')
+    parser.add_argument('--only', nargs='+', help='scenarios to run (name or service.name)')
+    parser.add_argument('--output', default=str(HERE / 'report.json'))
+    parser.add_argument('--thresholds', default=str(HERE / 'thresholds.json'))
+    parser.add_argument('--baseline', help='earlier report to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed increase over the baseline')
+    args = parser.parse_args()
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'seed': args.seed,
+        'ops_factor': args.ops_factor,
+        'stub_latency_ms': args.stub_latency_ms,
+        'services': {service: run_service(service, args) for service in args.services},
+    }
+    thresholds = json.load(open(args.thresholds)) if args.thresholds else {}
+    baseline = json.load(open(args.baseline)) if args.baseline else None
+    report['checks'] = check(report, thresholds, baseline, args.tolerance)
+    report['passed'] = all(entry['passed'] for entry in report['checks'])
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+
+    print(f'{"scenario":<34} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"ops/s":>8} {"queries":>8} {"errors":>7}')
+    for service, service_report in report['services'].items():
+        for name, result in service_report['scenarios'].items():
+            print(
+                f'{service + "." + name:<34} {result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} '
+                f'{result["p99_ms"]:>8.2f} {result["ops_per_sec"]:>8.1f} {result["queries_per_op"]:>8.2f} '
+                f'{result["errors"]:>7}'
+            )
+    for entry in report['checks']:
+        if not entry['passed']:
+            print(
+                f'REGRESSION {entry["scenario"]} {entry["metric"]}: {entry["value"]} > {entry["limit"]} '
+                f'({entry["source"]})'
+            )
+    print(f'report written to {args.output}')
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
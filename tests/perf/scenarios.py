@@ -0,0 +1,262 @@
+"""
+Scenario workloads of the benchmark suite.
+
+Each ``Scenario`` is one user journey, measured per request. ``prepare``
+gets the seeded ``Dataset`` and returns ``operation(i)``, which sends
+request ``i`` through the test client and returns the response. Requests
+``0..ops - 1`` are measured; the ones after them warm the caches first.
+
+activity
+    ``browse``: anonymous list pages (mostly the first), activity
+    details (popular ones more often) and categories.
+    ``search``: anonymous full-text search, half of it within a category.
+    ``signup_burst``: new volunteers applying to a few popular upcoming
+    activities of one organizer.
+    ``organizer_approval``: that organizer approving the open
+    applications, with a look at the pending list every fifth request.
+user
+    ``search``: user search by name, email and location.
+    ``profile``: ``/profile/``, as the other services and the frontend
+    call it with a user's API token.
+    ``registration_burst``: new accounts (password hashing included).
+notification
+    ``inbox_polling``: the frontend's 30 second inbox poll per user,
+    the unread badge, and marking a notification read.
+
+``stub_routes`` answers the activity service's calls to the user and
+notification services.
+"""
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from datasets import token_key
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    prepare: Callable
+    ops: int
+    warmup: int = 20
+
+
+def client():
+    from django.test import Client
+
+    return Client()
+
+
+def service_token(dataset, settings, user_id, role):
+    """A signed service token, as the user service issues at login (``Bearer`` scheme)."""
+    from django.core import signing
+
+    fields = dataset.synthetic.user_fields(user_id)
+    issued_at = round(time.time(), 3)
+    payload = {
+        'id': user_id, 'username': fields['username'], 'email': fields['email'],
+        'first_name': fields['first_name'], 'last_name': fields['last_name'], 'role': role, 'phone': '',
+        'iat': issued_at, 'exp': int(issued_at + 3600),
+    }
+    token = signing.dumps(payload, key=settings.SERVICE_TOKEN_SIGNING_KEYS[0], salt='service-token', compress=True)
+    return f'Bearer {token}'
+
+
+def popular(rng, ids):
+    # 平方分布：列表前部（较新的）活动被访问得更多
+    return ids[int(len(ids) * rng.random() ** 2)]
+
+
+# activity
+
+def activity_browse(dataset, settings):
+    http = client()
+    rng = random.Random(1)
+    approved = sorted(dataset.extra['approved_ids'], reverse=True)
+    last_page = max(1, min(50, len(approved) // settings.REST_FRAMEWORK['PAGE_SIZE']))
+
+    def operation(index):
+        kind = rng.random()
+        if kind < 0.5:
+            return http.get('/api/v1/activities/')
+        if kind < 0.7:
+            return http.get('/api/v1/activities/', {'page': rng.randint(2, last_page)})
+        if kind < 0.95:
+            return http.get(f'/api/v1/activities/{popular(rng, approved)}/')
+        return http.get('/api/v1/categories/')
+
+    return operation
+
+
+def activity_search(dataset, settings):
+    http = client()
+    rng = random.Random(2)
+    terms = dataset.extra['search_terms']
+
+    def operation(index):
+        params = {'search': rng.choice(terms)}
+        if rng.random() < 0.5:
+            params['category'] = rng.choice(dataset.extra['category_ids'])
+        return http.get('/api/v1/activities/', params)
+
+    return operation
+
+
+def activity_signup_burst(dataset, settings):
+    http = client()
+    targets = dataset.extra['target_activity_ids']
+
+    def operation(index):
+        # 刚注册的志愿者：id 在已有用户之后，不会与已有申请冲突
+        user_id = dataset.users + 1 + index
+        return http.post(
+            '/api/v1/participants/',
+            json.dumps({'activity': targets[index % len(targets)], 'application_message': 'Count me in!'}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=service_token(dataset, settings, user_id, 'volunteer'),
+        )
+
+    return operation
+
+
+def activity_organizer_approval(dataset, settings):
+    from activities.models import ActivityParticipant
+
+    http = client()
+    authorization = service_token(dataset, settings, dataset.extra['organizer_id'], 'organizer')
+    targets = dataset.extra['target_activity_ids']
+    # 报名高峰产生的申请在前
+    applications = list(
+        ActivityParticipant.objects.filter(activity_id__in=targets, status='applied')
+        .order_by('-id').values_list('id', flat=True)
+    )
+
+    def operation(index):
+        if index % 5 == 4:
+            return http.get(
+                '/api/v1/participants/', {'activity': targets[index % len(targets)], 'status': 'applied'},
+                HTTP_AUTHORIZATION=authorization,
+            )
+        participant_id = applications[index % len(applications)]
+        return http.patch(
+            f'/api/v1/participants/{participant_id}/', json.dumps({'status': 'approved'}),
+            content_type='application/json', HTTP_AUTHORIZATION=authorization,
+        )
+
+    return operation
+
+
+# user
+
+def user_search(dataset, settings):
+    http = client()
+    rng = random.Random(3)
+    token_users = dataset.extra['token_users']
+    queries = [
+        {'q': name[:3].lower()} for name in dataset.synthetic.FIRST_NAMES
+    ] + [
+        {'q': f'user{rng.randint(1, dataset.users)}'}, {'q': 'kaf'}, {'q': 'chen', 'location': 'lond'},
+    ]
+
+    def operation(index):
+        user_id = token_users[index % len(token_users)]
+        return http.get(
+            '/api/v1/search/', rng.choice(queries), HTTP_AUTHORIZATION=f'Token {token_key(user_id)}',
+        )
+
+    return operation
+
+
+def user_profile(dataset, settings):
+    http = client()
+    rng = random.Random(4)
+    token_users = dataset.extra['token_users']
+
+    def operation(index):
+        user_id = rng.choice(token_users)
+        return http.get('/api/v1/profile/', HTTP_AUTHORIZATION=f'Token {token_key(user_id)}')
+
+    return operation
+
+
+def user_registration_burst(dataset, settings):
+    http = client()
+
+    def operation(index):
+        username = f'perf-signup-{index}'
+        return http.post('/api/v1/auth/register/', json.dumps({
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': 'Volunteer-Perf-2024',
+            'password_confirm': 'Volunteer-Perf-2024',
+            'first_name': 'Perf',
+            'last_name': 'Signup',
+            'role': 'volunteer',
+        }), content_type='application/json')
+
+    return operation
+
+
+# notification
+
+def notification_inbox_polling(dataset, settings):
+    from notification_service.models import Notification
+
+    http = client()
+    rng = random.Random(5)
+    unread = list(Notification.objects.filter(is_read=False).order_by('id').values_list('id', flat=True)[:10000])
+
+    def operation(index):
+        kind = rng.random()
+        if kind < 0.9 or not unread:
+            params = {'recipient_id': dataset.synthetic.active_user(rng, dataset.users)}
+            if kind >= 0.7:
+                params['is_read'] = 'false'
+            return http.get('/api/v1/notifications/', params)
+        return http.post(f'/api/v1/notifications/{unread[index % len(unread)]}/mark_as_read/')
+
+    return operation
+
+
+SCENARIOS = {
+    'activity': [
+        Scenario('browse', 'Anonymous list pages, details and categories', activity_browse, ops=2000),
+        Scenario('search', 'Anonymous search, half within a category', activity_search, ops=500),
+        Scenario('signup_burst', 'New volunteers applying to popular activities', activity_signup_burst, ops=500),
+        Scenario(
+            'organizer_approval', 'Organizer approving applications and listing pending ones',
+            activity_organizer_approval, ops=500,
+        ),
+    ],
+    'user': [
+        Scenario('search', 'Authenticated user search', user_search, ops=300),
+        Scenario('profile', 'Token-authenticated /profile/ lookups', user_profile, ops=2000),
+        Scenario('registration_burst', 'New account registrations', user_registration_burst, ops=50, warmup=2),
+    ],
+    'notification': [
+        Scenario('inbox_polling', 'Inbox polls, unread badge and mark as read', notification_inbox_polling, ops=2000),
+    ],
+}
+
+
+def stub_routes(service, dataset):
+    """``StubServices`` routes for the outbound calls of ``service``."""
+    if service != 'activity':
+        return []
+
+    def user_batch(request):
+        ids = json.loads(request.body)['ids']
+        return 200, {'users': [
+            {'id': user_id, 'avatar': None, **dataset.synthetic.user_fields(user_id)} for user_id in ids
+        ]}
+
+    return [
+        ('notification-service', '/api/v1/notifications/', lambda request: (201, {'id': 1})),
+        ('user-service', '/api/v1/notifications/create/', lambda request: (201, {'id': 1})),
+        ('user-service', '/api/v1/internal/users/batch/', user_batch),
+        # 管理员列表（新活动通知）
+        ('user-service', '/api/v1/search/', lambda request: (200, [])),
+    ]